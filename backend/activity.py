@@ -0,0 +1,192 @@
+"""Timezone-aware activity tracking: event log, streaks and day bitmaps.
+
+The first activity of each day is appended to `activity_events` keyed by
+(user_id, day), where `day` is the calendar date in the user's own timezone;
+later ones that day change nothing. Reads never scan that log:
+
+- `users.streak` holds current/longest streak and the last active local day.
+- `users.weekly_activity` / `users.monthly_activity` hold per-type counts stamped
+  with the period they belong to, and read as zero once that period is over.
+- `activity_days` holds one document per (user, year) with a 31-bit mask per
+  month (`m1`..`m12`), so a year-long heatmap is a single small document.
+"""
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+DEFAULT_TIMEZONE = "UTC"
+ACTIVITY_TYPES = ("dsa", "github", "linkedin")
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def local_today(tz_name: Optional[str], now: Optional[datetime] = None) -> date:
+    """Today's date in the given IANA timezone (falls back to UTC)."""
+    now = now or datetime.now(timezone.utc)
+    try:
+        tz = ZoneInfo(tz_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.utc
+    return now.astimezone(tz).date()
+
+
+def week_key(day: date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    return f"{day.year}-{day.month:02d}"
+
+
+def empty_rollup(period_field: str, period: str) -> Dict[str, Any]:
+    rollup: Dict[str, Any] = {period_field: period}
+    rollup.update({t: 0 for t in ACTIVITY_TYPES})
+    return rollup
+
+
+def next_streak(streak: Optional[Dict[str, Any]], today: date) -> Dict[str, Any]:
+    """Streak after an activity on `today`; unchanged if already active today."""
+    streak = streak or {"current": 0, "longest": 0, "last_activity": None}
+    last_activity = streak.get("last_activity")
+    if last_activity == today.isoformat():
+        return streak
+
+    if last_activity == (today - timedelta(days=1)).isoformat():
+        current = streak.get("current", 0) + 1
+    else:
+        current = 1
+    return {"current": current, "longest": max(current, streak.get("longest", 0)), "last_activity": today.isoformat()}
+
+
+def effective_streak(user: dict, today: Optional[date] = None) -> Dict[str, Any]:
+    """Stored streak as of today: a streak whose last day is before yesterday has lapsed."""
+    streak = dict(user.get("streak") or {"current": 0, "longest": 0, "last_activity": None})
+    today = today or local_today(user.get("timezone"))
+    last_activity = streak.get("last_activity")
+    if last_activity and last_activity < (today - timedelta(days=1)).isoformat():
+        streak["current"] = 0
+    return streak
+
+
+def current_rollups(user: dict, today: Optional[date] = None) -> Dict[str, Dict[str, Any]]:
+    """Weekly and monthly activity counts, zeroed if the stored period is stale."""
+    today = today or local_today(user.get("timezone"))
+    week, month = week_key(today), month_key(today)
+
+    weekly = user.get("weekly_activity") or {}
+    if weekly.get("week") != week:
+        weekly = empty_rollup("week", week)
+    monthly = user.get("monthly_activity") or {}
+    if monthly.get("month") != month:
+        monthly = empty_rollup("month", month)
+    return {"weekly_activity": weekly, "monthly_activity": monthly}
+
+
+def bitmap_doc_id(user_id: str, year: int) -> str:
+    return f"{user_id}:{year}"
+
+
+def active_days(bitmap_doc: Optional[dict], year: int) -> List[str]:
+    """Decode a year bitmap document into a sorted list of ISO dates."""
+    if not bitmap_doc:
+        return []
+    days = []
+    for month in range(1, 13):
+        mask = bitmap_doc.get(f"m{month}", 0)
+        day = 1
+        while mask:
+            if mask & 1:
+                days.append(date(year, month, day).isoformat())
+            mask >>= 1
+            day += 1
+    return days
+
+
+async def record_activity(db, user: dict, activity_type: str, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """Update streak and rollups, and append an activity event and day bit, once per local day.
+
+    A repeat on the same day changes nothing ("Already logged today"). The streak and both rollups
+    change in one update, conditional on the streak and periods the new values were computed from;
+    if `user` was stale, it is re-read and the update retried."""
+    now = now or datetime.now(timezone.utc)
+    today = local_today(user.get("timezone"), now)
+    day = today.isoformat()
+    week, month = week_key(today), month_key(today)
+
+    for _ in range(3):
+        old_streak = user.get("streak")
+        new_streak = next_streak(old_streak, today)
+        if new_streak is old_streak:
+            return {"streak": new_streak, "day": day, "new_day": False}
+
+        # Pinned to the streak (and periods) `new_streak` was computed from
+        query: Dict[str, Any] = {"id": user["id"], "streak.last_activity": (old_streak or {}).get("last_activity")}
+        update: Dict[str, Any] = {"$set": {"streak": new_streak, "updated_at": now.isoformat()}}
+        # Period-stamped counters: $inc inside the current period, otherwise start a fresh one
+        for field, period_field, period in (("weekly_activity", "week", week), ("monthly_activity", "month", month)):
+            if (user.get(field) or {}).get(period_field) == period:
+                query[f"{field}.{period_field}"] = period
+                update.setdefault("$inc", {})[f"{field}.{activity_type}"] = 1
+            else:
+                query[f"{field}.{period_field}"] = {"$ne": period}
+                fresh = empty_rollup(period_field, period)
+                fresh[activity_type] = 1
+                update["$set"][field] = fresh
+        result = await db.users.update_one(query, update)
+        if result.matched_count:
+            break
+        # Another request got there first (or our copy was stale): decide again from the stored document
+        user = await db.users.find_one({"id": user["id"]}, {"_id": 0, "id": 1, "timezone": 1, "streak": 1,
+                                                            "weekly_activity": 1, "monthly_activity": 1})
+        if user is None:
+            raise ValueError("User not found")
+    else:
+        raise RuntimeError("Activity update kept conflicting")
+
+    await db.activity_events.insert_one({
+        "id": str(uuid.uuid4()),
+        "user_id": user["id"],
+        "day": day,
+        "type": activity_type,
+        "timestamp": now.isoformat()
+    })
+    await db.activity_days.update_one(
+        {"_id": bitmap_doc_id(user["id"], today.year)},
+        {"$bit": {f"m{today.month}": {"or": 1 << (today.day - 1)}},
+         "$setOnInsert": {"user_id": user["id"], "year": today.year}},
+        upsert=True
+    )
+
+    return {"streak": new_streak, "day": day, "new_day": True}
+
+
+async def reset_stale_periods(db, now: Optional[datetime] = None) -> int:
+    """Zero weekly/monthly rollups and lapsed streaks whose period has ended in each user's timezone.
+
+    Reads already treat stale periods as zero; this keeps the stored documents
+    (exports, admin queries, aggregates) in line. Returns the number of resets made.
+    """
+    modified = 0
+    stamp = (now or datetime.now(timezone.utc)).isoformat()
+    timezones = set(await db.users.distinct("timezone")) | {None}
+    for tz_name in timezones:
+        today = local_today(tz_name, now)
+        week, month = week_key(today), month_key(today)
+        in_tz = {"timezone": tz_name}
+        for query, update in (
+            ({**in_tz, "weekly_activity.week": {"$ne": week}}, {"weekly_activity": empty_rollup("week", week)}),
+            ({**in_tz, "monthly_activity.month": {"$ne": month}}, {"monthly_activity": empty_rollup("month", month)}),
+            ({**in_tz, "streak.current": {"$gt": 0},
+              "streak.last_activity": {"$lt": (today - timedelta(days=1)).isoformat()}}, {"streak.current": 0}),
+        ):
+            result = await db.users.update_many(query, {"$set": {**update, "updated_at": stamp}})
+            modified += result.modified_count
+    return modified
@@ -0,0 +1,173 @@
+"""In-process caches with a cross-worker invalidation channel.
+
+Each worker keeps its own `TTLCache`s. When one worker changes the data behind
+a cached entry it evicts locally and publishes an event on a small capped
+collection; every other worker tails that collection and evicts the same key.
+Capped collections and tailable cursors work on a standalone mongod, so no
+replica set (as change streams would need) is required.
+
+Since every write behind a cache already publishes here, `subscribe` also
+lets other code react to changes, e.g. pushing updates to a user's open
+WebSocket whichever worker made the write.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_COLLECTION = "cache_invalidations"
+INVALIDATION_COLLECTION_BYTES = 1024 * 1024
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, name: str, ttl: float, maxsize: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING or entry[0] < time.monotonic():
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        if not self.enabled:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def evict(self, key: Optional[Hashable] = None):
+        """Drop one key, or everything when `key` is None."""
+        if key is None:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class InvalidationBus:
+    """Broadcasts cache evictions to every worker through a capped collection."""
+
+    def __init__(self, db):
+        self.db = db
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.caches: Dict[str, TTLCache] = {}
+        self.subscribers: Dict[str, List[Callable[[Optional[Hashable]], None]]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, cache: TTLCache) -> TTLCache:
+        self.caches[cache.name] = cache
+        return cache
+
+    def subscribe(self, cache_name: str, callback: Callable[[Optional[Hashable]], None]):
+        """Call `callback(key)` on every eviction from `cache_name`, local or from another worker. Must not block."""
+        self.subscribers.setdefault(cache_name, []).append(callback)
+
+    def _notify(self, cache_name: str, key: Optional[Hashable]):
+        for callback in self.subscribers.get(cache_name, ()):
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Cache invalidation subscriber failed: {str(e)}")
+
+    async def publish(self, cache_name: str, key: Optional[Hashable] = None):
+        """Evict locally right away, then tell the other workers."""
+        cache = self.caches.get(cache_name)
+        if cache:
+            cache.evict(key)
+        self._notify(cache_name, key)
+        try:
+            await self.db[INVALIDATION_COLLECTION].insert_one({
+                "cache": cache_name,
+                "key": key,
+                "origin": self.worker_id,
+                "ts": datetime.now(timezone.utc).isoformat()
+            })
+        except PyMongoError as e:
+            logger.error(f"Cache invalidation publish failed: {str(e)}")
+
+    async def start(self):
+        try:
+            await self.db.create_collection(INVALIDATION_COLLECTION, capped=True, size=INVALIDATION_COLLECTION_BYTES)
+        except CollectionInvalid:
+            pass  # already exists
+        except Exception as e:
+            # Backend without capped collections: caches still evict locally and expire by TTL
+            logger.warning(f"Cross-worker cache invalidation disabled: {str(e)}")
+            return
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _apply(self, event: dict):
+        if event.get("origin") == self.worker_id:
+            return
+        cache = self.caches.get(event.get("cache"))
+        if cache:
+            cache.evict(event.get("key"))
+        self._notify(event.get("cache"), event.get("key"))
+
+    async def _listen(self):
+        collection = self.db[INVALIDATION_COLLECTION]
+        # Only events newer than the last one seen matter. Re-reading a few seconds
+        # back is harmless (evictions are idempotent) and covers clock skew between
+        # publishers.
+        since = datetime.now(timezone.utc)
+        backoff = 0.5
+        while True:
+            try:
+                query = {"ts": {"$gte": (since - timedelta(seconds=5)).isoformat()}}
+                cursor = collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT)
+                while cursor.alive:
+                    async for event in cursor:
+                        self._apply(event)
+                        since = max(since, datetime.fromisoformat(event["ts"]))
+                        backoff = 0.5
+                # A tailable cursor on an empty collection dies straight away
+                await asyncio.sleep(0.5)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Lost the cursor (failover, collection dropped, unsupported backend):
+                # anything may have been missed, so flush before resuming
+                logger.warning(f"Cache invalidation listener restarting: {str(e)}")
+                for cache in self.caches.values():
+                    cache.evict()
+                since = datetime.now(timezone.utc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
@@ -0,0 +1,494 @@
+"""Static time-complexity estimates and inefficiency warnings for submitted Python.
+
+`analyze` works on the AST alone: nothing is executed and no LLM is called,
+so it answers in milliseconds. Costs are tracked as (exponential, polynomial
+degree, log factors) in a single input size n:
+- a `for` loop over anything that isn't a constant-size literal or `range`
+  of constants multiplies its body by n; a `while` loop does too, or by
+  log n if its body halves something (`// 2`, `>> 1`),
+- a function's cost includes the cost of other functions it calls,
+- `x in seq` on a list, string or parameter is O(n). So are the built-ins
+  and methods in `LINEAR_CALLS`, `LINEAR_METHODS` and slicing. Sorting is
+  O(n log n),
+- recursion that branches on an integer argument (`f(n - 1) + f(n - 2)`, or a
+  self-call inside a loop) is exponential unless memoized with `lru_cache` /
+  `cache` or a `memo[...]` dict. Recursion on attributes (`node.left`) visits
+  each node once.
+
+Warnings point at the lines that set the estimate: nested loops over the
+same input, `in` on a list inside a loop, `+=` string building in a loop,
+and recursion without memoization. `review` adds one more when the
+estimate is worse than the task's `complexity` field (its reference
+solution's time complexity, e.g. "O(n)").
+
+Results are cached per code hash.
+"""
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import metrics
+
+ANALYSIS_CACHE_SIZE = 4096
+# Analysis is linear in the code's size (a few times `ast.parse`); longer code isn't analyzed
+MAX_CODE_CHARS = 20_000
+
+# (exponential, polynomial degree, log factors); tuples compare as costs do
+Cost = Tuple[int, int, int]
+CONSTANT: Cost = (0, 0, 0)
+LOG: Cost = (0, 0, 1)
+LINEAR: Cost = (0, 1, 0)
+N_LOG_N: Cost = (0, 1, 1)
+EXPONENTIAL: Cost = (1, 0, 0)
+
+LINEAR_CALLS = {"sum", "min", "max", "any", "all", "list", "set", "dict", "tuple", "Counter", "deque"}
+LINEAR_METHODS = {"index", "count", "remove", "copy", "extend", "join"}
+SORT_CALLS = {"sorted"}
+MEMO_DECORATORS = {"cache", "lru_cache"}
+HASHED_FACTORIES = {"set", "dict", "frozenset", "Counter", "defaultdict", "OrderedDict"}
+LIST_FACTORIES = {"list", "sorted"}
+
+COMPLEXITY_WARNINGS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "complexity_warnings_total", "Static complexity warnings returned, by kind", ("kind",)))
+
+_cache: "OrderedDict[str, dict]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def multiply(a: Cost, b: Cost) -> Cost:
+    return max(a[0], b[0]), a[1] + b[1], a[2] + b[2]
+
+
+def format_cost(cost: Cost) -> str:
+    if cost[0]:
+        return "O(2^n)"
+    terms = []
+    if cost[1] == 1:
+        terms.append("n")
+    elif cost[1] > 1:
+        terms.append(f"n^{cost[1]}")
+    if cost[2] == 1:
+        terms.append("log n")
+    elif cost[2] > 1:
+        terms.append(f"log^{cost[2]} n")
+    return f"O({' '.join(terms) or '1'})"
+
+
+def parse_cost(text: str) -> Optional[Cost]:
+    """Read a task's "O(...)" annotation. Every size variable counts as n; a sum keeps its largest term."""
+    text = (text or "").strip()
+    if not (text.startswith("O(") and text.endswith(")")):
+        return None
+    best = None
+    for term in text[2:-1].replace("²", "^2").replace("×", " ").replace("*", " ").split("+"):
+        term = term.replace("log ", "log").split()
+        if not term:
+            return None
+        cost = CONSTANT
+        for factor in term:
+            if factor == "1":
+                continue
+            if factor.startswith("log"):
+                cost = multiply(cost, LOG)
+            elif factor.startswith("2^"):
+                cost = multiply(cost, EXPONENTIAL)
+            elif factor.isidentifier():
+                cost = multiply(cost, LINEAR)
+            elif "^" in factor and factor.split("^")[0].isidentifier() and factor.split("^")[1].isdigit():
+                cost = multiply(cost, (0, int(factor.split("^")[1]), 0))
+            else:
+                return None
+        best = cost if best is None else max(best, cost)
+    return best
+
+
+def _root_name(node: ast.AST) -> Optional[str]:
+    """`nums` for `nums`, `nums[i:]`, `self.nums`, `len(nums)`, `enumerate(nums)`, `range(len(nums))`."""
+    while True:
+        if isinstance(node, ast.Name):
+            return node.id
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and node.value.id == "self":
+                return f"self.{node.attr}"
+            node = node.value
+        elif isinstance(node, ast.Subscript):
+            node = node.value
+        elif isinstance(node, ast.Call):
+            # `range(i + 1, len(nums))` iterates over `nums`, not `i`
+            for arg in node.args:
+                for inner in ast.walk(arg):
+                    if isinstance(inner, ast.Call) and _call_name(inner) == "len" and inner.args:
+                        return _root_name(inner.args[0])
+            return next(filter(None, map(_root_name, node.args)), None)
+        elif isinstance(node, ast.BinOp):
+            return _root_name(node.left) or _root_name(node.right)
+        else:
+            return None
+
+
+def _call_name(node: ast.Call) -> Optional[str]:
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    return None
+
+
+def _is_constant_size(node: ast.AST) -> bool:
+    """A literal, or `range` of literals: iterating it doesn't grow with the input."""
+    if isinstance(node, (ast.Constant, ast.Tuple, ast.List, ast.Set)):
+        return all(not isinstance(e, ast.Starred) for e in getattr(node, "elts", ()))
+    if isinstance(node, ast.Call) and _call_name(node) in ("range", "enumerate", "reversed", "zip"):
+        return all(_is_constant_size(a) for a in node.args)
+    if isinstance(node, ast.UnaryOp):
+        return _is_constant_size(node.operand)
+    if isinstance(node, ast.BinOp):
+        return _is_constant_size(node.left) and _is_constant_size(node.right)
+    return False
+
+
+def _halves(loop: ast.While) -> bool:
+    for node in ast.walk(loop):
+        if isinstance(node, (ast.BinOp, ast.AugAssign)) and isinstance(node.op, (ast.FloorDiv, ast.RShift, ast.Div)):
+            right = node.right if isinstance(node, ast.BinOp) else node.value
+            if isinstance(right, ast.Constant) and right.value in (1, 2):
+                return True
+    return False
+
+
+def _decorated_with_memo(func: ast.FunctionDef) -> bool:
+    for decorator in func.decorator_list:
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        name = target.id if isinstance(target, ast.Name) else getattr(target, "attr", None)
+        if name in MEMO_DECORATORS:
+            return True
+    return False
+
+
+def _memo_tables(func: ast.FunctionDef) -> Set[str]:
+    """Names both tested with `in` and assigned by subscript in `func`: a hand-written memo."""
+    tested, stored = set(), set()
+    for node in ast.walk(func):
+        if isinstance(node, ast.Compare) and isinstance(node.ops[0], (ast.In, ast.NotIn)):
+            tested.add(_root_name(node.comparators[0]))
+        elif isinstance(node, ast.Subscript) and isinstance(node.ctx, ast.Store):
+            stored.add(_root_name(node.value))
+        elif isinstance(node, ast.Call) and _call_name(node) == "get" and isinstance(node.func, ast.Attribute):
+            tested.add(_root_name(node.func.value))
+    return (tested & stored) - {None}
+
+
+class _Module:
+    def __init__(self, tree: ast.Module):
+        self.functions: Dict[str, ast.FunctionDef] = {}
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions.setdefault(node.name, node)
+        self.costs: Dict[str, Cost] = {}
+        self.warnings: List[dict] = []
+        self._in_progress: Set[str] = set()
+
+    def warn(self, kind: str, node: ast.AST, message: str):
+        self.warnings.append({"kind": kind, "line": getattr(node, "lineno", None), "message": message})
+
+    def cost_of(self, name: str) -> Cost:
+        if name in self.costs:
+            return self.costs[name]
+        if name in self._in_progress:
+            return CONSTANT  # mutual recursion; the outer call accounts for it
+        self._in_progress.add(name)
+        cost = _Function(self, self.functions[name]).cost()
+        self._in_progress.discard(name)
+        self.costs[name] = cost
+        return cost
+
+
+class _Function:
+    def __init__(self, module: _Module, func: ast.FunctionDef):
+        self.module = module
+        self.func = func
+        self.params = {a.arg for a in func.args.args + func.args.kwonlyargs} - {"self", "cls"}
+        self.kinds: Dict[str, str] = {}
+        self.loops: List[Optional[str]] = []  # what each enclosing loop iterates over
+        self.self_calls: List[Tuple[ast.Call, bool]] = []  # (call, inside a loop)
+        self.warned: Set[Tuple[str, object]] = set()
+
+    # ---- bookkeeping ----
+
+    def warn_once(self, kind: str, subject, node: ast.AST, message: str):
+        if (kind, subject) not in self.warned:
+            self.warned.add((kind, subject))
+            self.module.warn(kind, node, message)
+
+    def note_assignment(self, target: ast.AST, value: ast.AST):
+        if not isinstance(target, ast.Name):
+            return
+        kind = None
+        if isinstance(value, (ast.Set, ast.Dict, ast.SetComp, ast.DictComp)):
+            kind = "hashed"
+        elif isinstance(value, (ast.List, ast.ListComp)):
+            kind = "list"
+        elif isinstance(value, ast.JoinedStr) or (isinstance(value, ast.Constant) and isinstance(value.value, str)):
+            kind = "str"
+        elif isinstance(value, ast.Call):
+            name = _call_name(value)
+            if name in HASHED_FACTORIES:
+                kind = "hashed"
+            elif name in LIST_FACTORIES or name == "split":
+                kind = "list"
+            elif name == "str":
+                kind = "str"
+            elif name == "deque":
+                kind = "deque"
+        if kind:
+            self.kinds[target.id] = kind
+        else:
+            self.kinds.pop(target.id, None)
+
+    def is_self_call(self, node: ast.Call) -> bool:
+        func = node.func
+        if isinstance(func, ast.Name):
+            return func.id == self.func.name
+        return (isinstance(func, ast.Attribute) and func.attr == self.func.name
+                and isinstance(func.value, ast.Name) and func.value.id == "self")
+
+    # ---- statements ----
+
+    def cost(self) -> Cost:
+        body = self.block(self.func.body)
+        if not self.self_calls:
+            return body
+        return self.recursion_cost(body)
+
+    def block(self, statements) -> Cost:
+        cost = CONSTANT
+        for statement in statements:
+            cost = max(cost, self.statement(statement))
+        return cost
+
+    def statement(self, node: ast.stmt) -> Cost:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            return CONSTANT  # analyzed on its own, and costed where it's called
+        if isinstance(node, (ast.For, ast.AsyncFor)):
+            return self.for_loop(node)
+        if isinstance(node, ast.While):
+            size = LOG if _halves(node) else LINEAR
+            self.loops.append(None)
+            body = self.block(node.body)
+            self.loops.pop()
+            return max(self.expr(node.test), multiply(size, body), self.block(node.orelse))
+        if isinstance(node, ast.If):
+            return max(self.expr(node.test), self.block(node.body), self.block(node.orelse))
+        if isinstance(node, (ast.With, ast.AsyncWith)):
+            return max([self.expr(i.context_expr) for i in node.items] + [self.block(node.body)])
+        if isinstance(node, ast.Try):
+            return max(self.block(node.body), self.block(node.orelse), self.block(node.finalbody),
+                       *(self.block(h.body) for h in node.handlers))
+        if isinstance(node, ast.Assign):
+            cost = self.expr(node.value)
+            for target in node.targets:
+                self.string_concat(target, node.value, node)
+                self.note_assignment(target, node.value)
+            return cost
+        if isinstance(node, ast.AnnAssign):
+            if node.value is None:
+                return CONSTANT
+            self.note_assignment(node.target, node.value)
+            return self.expr(node.value)
+        if isinstance(node, ast.AugAssign):
+            cost = self.expr(node.value)
+            if isinstance(node.op, ast.Add) and isinstance(node.target, ast.Name):
+                if self.kinds.get(node.target.id) == "str" or isinstance(node.value, ast.JoinedStr) \
+                        or (isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+                    self.kinds[node.target.id] = "str"
+                    cost = max(cost, self.concat_in_loop(node.target.id, node))
+            return cost
+        cost = CONSTANT
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr):
+                cost = max(cost, self.expr(child))
+        return cost
+
+    def for_loop(self, node: ast.For) -> Cost:
+        source = None if _is_constant_size(node.iter) else _root_name(node.iter)
+        if source is not None and source in self.loops:
+            self.warn_once("nested_loops_same_input", source, node,
+                           f"Nested loops over `{source}` visit every pair of elements (O(n^2)). "
+                           "A hash map or a single pass with the right state usually removes the inner loop.")
+        size = CONSTANT if _is_constant_size(node.iter) else LINEAR
+        iter_cost = self.expr(node.iter)
+        self.loops.append(source)
+        body = self.block(node.body)
+        self.loops.pop()
+        return max(iter_cost, multiply(size, body), self.block(node.orelse))
+
+    def string_concat(self, target: ast.AST, value: ast.AST, node: ast.AST):
+        """`s = s + x` or `s = x + s` on a string"""
+        if isinstance(target, ast.Name) and isinstance(value, ast.BinOp) and isinstance(value.op, ast.Add) \
+                and self.kinds.get(target.id) == "str" \
+                and any(isinstance(side, ast.Name) and side.id == target.id for side in (value.left, value.right)):
+            self.concat_in_loop(target.id, node)
+
+    def concat_in_loop(self, name: str, node: ast.AST) -> Cost:
+        if not self.loops:
+            return CONSTANT
+        self.warn_once("string_concatenation", name, node,
+                       f"`{name}` is built with + inside a loop, which can copy the whole string every time "
+                       "(O(n^2) overall). Append the pieces to a list and ''.join() them once.")
+        return LINEAR
+
+    # ---- expressions ----
+
+    def expr(self, node: ast.expr) -> Cost:
+        if isinstance(node, ast.Lambda):
+            return CONSTANT
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            return self.comprehension(node)
+        cost = CONSTANT
+        if isinstance(node, ast.Compare):
+            for op, right in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.In, ast.NotIn)):
+                    cost = max(cost, self.membership(right, node))
+        elif isinstance(node, ast.Call):
+            cost = self.call(node)
+        elif isinstance(node, ast.Subscript) and isinstance(node.slice, ast.Slice) and isinstance(node.ctx, ast.Load):
+            cost = LINEAR
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr):
+                cost = max(cost, self.expr(child))
+        return cost
+
+    def membership(self, container: ast.expr, node: ast.Compare) -> Cost:
+        if isinstance(container, (ast.Set, ast.Dict, ast.SetComp, ast.DictComp)) or _is_constant_size(container):
+            return CONSTANT
+        if isinstance(container, ast.Call):
+            return CONSTANT if _call_name(container) in HASHED_FACTORIES | {"keys", "range"} else LINEAR
+        if isinstance(container, ast.Subscript) and isinstance(container.slice, ast.Slice):
+            name = _root_name(container)  # a slice is a new list, never hashed
+            kind = self.kinds.get(name) if name else None
+            if kind == "hashed":
+                kind = None
+        else:
+            name = container.id if isinstance(container, ast.Name) else None
+            kind = self.kinds.get(name) if name else None
+        if name is None or kind == "hashed":
+            return CONSTANT  # attributes and subscripts: unknown, assume the usual dict/set
+        if name not in self.params and name not in self.kinds:
+            return CONSTANT  # module-level constant or unknown
+        if self.loops and kind != "str":
+            self.warn_once("list_membership", name, node,
+                           f"`in {name}` scans the list on every iteration (O(n) each). "
+                           f"Keep the elements in a set or dict for O(1) lookups.")
+        return LINEAR
+
+    def call(self, node: ast.Call) -> Cost:
+        if self.is_self_call(node):
+            self.self_calls.append((node, bool(self.loops)))
+            return CONSTANT
+        name = _call_name(node)
+        if isinstance(node.func, ast.Name) and name in self.module.functions:
+            return self.module.cost_of(name)
+        if name in SORT_CALLS or (name == "sort" and isinstance(node.func, ast.Attribute)):
+            return N_LOG_N
+        if isinstance(node.func, ast.Name) and name in LINEAR_CALLS:
+            return LINEAR if len(node.args) == 1 and not _is_constant_size(node.args[0]) else CONSTANT
+        if isinstance(node.func, ast.Attribute):
+            if name in LINEAR_METHODS:
+                return LINEAR
+            if name in ("pop", "insert") and node.args and isinstance(node.args[0], ast.Constant) \
+                    and node.args[0].value == 0 and _root_name(node.func.value) not in self.deques():
+                return LINEAR  # shifts every element
+        return CONSTANT
+
+    def deques(self) -> Set[str]:
+        return {n for n, k in self.kinds.items() if k == "deque"}
+
+    def comprehension(self, node) -> Cost:
+        cost = CONSTANT
+        size = CONSTANT
+        for generator in node.generators:
+            cost = max(cost, self.expr(generator.iter))
+            if not _is_constant_size(generator.iter):
+                size = multiply(size, LINEAR)
+            self.loops.append(None if _is_constant_size(generator.iter) else _root_name(generator.iter))
+        elements = [node.key, node.value] if isinstance(node, ast.DictComp) else [node.elt]
+        element = max(self.expr(e) for e in elements)
+        for generator in node.generators:
+            for condition in generator.ifs:
+                element = max(element, self.expr(condition))
+        for _ in node.generators:
+            self.loops.pop()
+        return max(cost, multiply(size, element))
+
+    # ---- recursion ----
+
+    def recursion_cost(self, body: Cost) -> Cost:
+        memoized = _decorated_with_memo(self.func) or bool(_memo_tables(self.func))
+        branching = len(self.self_calls) > 1 or any(in_loop for _, in_loop in self.self_calls)
+        structural = all(
+            any(isinstance(arg, ast.Attribute) for arg in call.args) for call, _ in self.self_calls)
+        if branching and not memoized and not structural:
+            call = self.self_calls[0][0]
+            self.warn_once("recursion_without_memo", self.func.name, call,
+                           f"`{self.func.name}` calls itself more than once per call without memoization, so it "
+                           "solves the same subproblems again and again (exponential time). Cache results with "
+                           "@functools.lru_cache or a dict, or build the answer bottom-up.")
+            return EXPONENTIAL
+        # Memoized, single-branch or tree recursion: about n calls, each doing the body's own work
+        return multiply(LINEAR, body)
+
+
+def _digest(code: str) -> str:
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def _analyze(code: str) -> dict:
+    if len(code) > MAX_CODE_CHARS:
+        return {"big_o": None, "functions": {}, "warnings": [], "error": "Code too long to analyze"}
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError) as e:
+        return {"big_o": None, "functions": {}, "warnings": [],
+                "error": f"{type(e).__name__}: {getattr(e, 'msg', str(e))} (line {getattr(e, 'lineno', '?')})"}
+    module = _Module(tree)
+    try:
+        costs = {name: module.cost_of(name) for name in module.functions}
+    except RecursionError:
+        return {"big_o": None, "functions": {}, "warnings": [], "error": "Code is nested too deeply to analyze"}
+    overall = max(costs.values(), default=CONSTANT)
+    return {"big_o": format_cost(overall), "cost": overall,
+            "functions": {name: format_cost(cost) for name, cost in costs.items()},
+            "warnings": sorted(module.warnings, key=lambda w: w["line"] or 0), "error": None}
+
+
+def analyze(code: str) -> dict:
+    """Estimated Big-O of the code's slowest function, per-function estimates, and warnings. Cached per code hash."""
+    key = _digest(code)
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+            return cached
+    result = _analyze(code)
+    with _cache_lock:
+        _cache[key] = result
+        if len(_cache) > ANALYSIS_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def review(code: str, task: Optional[dict] = None) -> dict:
+    """`analyze`, compared with the task's target complexity, in the shape routes return."""
+    analysis = analyze(code)
+    warnings = list(analysis["warnings"])
+    target = parse_cost(task.get("complexity", "")) if task else None
+    if target is not None and analysis["big_o"] is not None and analysis["cost"] > target:
+        warnings.append({"kind": "above_target", "line": None,
+                         "message": f"Estimated {analysis['big_o']}, but this task can be solved in "
+                                    f"{task['complexity']}."})
+    for warning in warnings:
+        COMPLEXITY_WARNINGS_TOTAL.inc(warning["kind"])
+    return {"big_o": analysis["big_o"], "target": task.get("complexity") if task else None,
+            "functions": analysis["functions"], "warnings": warnings, "error": analysis["error"]}
@@ -0,0 +1,147 @@
+"""Negotiated response compression (brotli or gzip) with a size threshold.
+
+Brotli is used when the client accepts it and the optional `brotli` package is
+installed; otherwise gzip. Responses smaller than `minimum_size`, responses
+that already carry a Content-Encoding, and binary types that don't compress
+(e.g. Parquet exports) are passed through untouched. Streaming responses are
+compressed chunk by chunk and flushed, so NDJSON exports keep streaming.
+"""
+import zlib
+from typing import Iterable, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+
+import metrics
+
+try:
+    import brotli
+except ImportError:  # optional; gzip only
+    brotli = None
+
+DEFAULT_MINIMUM_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4  # dynamic content: good ratio at gzip-like speed
+INCOMPRESSIBLE_TYPES = ("image/", "audio/", "video/", "application/zip", "application/gzip",
+                        "application/vnd.apache.parquet")
+
+HTTP_RESPONSE_SIZE = metrics.REGISTRY.register(metrics.Histogram(
+    "http_response_size_bytes", "Response body size on the wire by route and encoding", ("route", "encoding"),
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)))
+
+
+def _parse_accept_encoding(value: str) -> dict:
+    accepted = {}
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if coding:
+            accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _parse_accept_encoding(accept_encoding)
+    candidates: List[Tuple[float, int, str]] = []
+    if brotli is not None:
+        candidates.append((accepted.get("br", 0.0), 1, "br"))
+    candidates.append((max(accepted.get("gzip", 0.0), accepted.get("*", 0.0) if "gzip" not in accepted else 0.0), 0, "gzip"))
+    q, _, coding = max(candidates)
+    return coding if q > 0 else None
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._obj.process(data) + self._obj.finish()
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = DEFAULT_MINIMUM_SIZE,
+                 incompressible_types: Iterable[str] = INCOMPRESSIBLE_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.incompressible_types = tuple(incompressible_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        state = {"start": None, "compressor": None, "passthrough": False, "bytes": 0}
+
+        def record():
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            HTTP_RESPONSE_SIZE.observe(state["bytes"], route, state["compressor"].encoding if state["compressor"] else "identity")
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                state["start"] = message
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                state["passthrough"] = (
+                    encoding is None
+                    or "content-encoding" in headers
+                    or content_type.startswith(self.incompressible_types)
+                )
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if state["start"] is not None:
+                start, state["start"] = state["start"], None
+                if state["passthrough"] or (not more_body and len(body) < self.minimum_size):
+                    state["passthrough"] = True
+                    await send(start)
+                else:
+                    compressor = state["compressor"] = _Compressor(encoding)
+                    headers = MutableHeaders(raw=start["headers"])
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    if more_body:
+                        del headers["Content-Length"]
+                        body = compressor.chunk(body)
+                    else:
+                        body = compressor.finish(body)
+                        headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+                    await send(start)
+                    state["bytes"] += len(body)
+                    await send(message)
+                    if not more_body:
+                        record()
+                    return
+
+            if state["compressor"] is not None:
+                compressor = state["compressor"]
+                message = {**message, "body": compressor.chunk(body) if more_body else compressor.finish(body)}
+            state["bytes"] += len(message.get("body", b""))
+            await send(message)
+            if not more_body:
+                record()
+
+        await self.app(scope, receive, send_wrapper)
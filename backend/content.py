@@ -0,0 +1,304 @@
+"""Track, job-trend and resume-template content, loaded from files in `content/`.
+
+Content lives in versioned JSON files (YAML too, if PyYAML is installed):
+
+    content/tracks/<family>.json    {"version": 1, "tracks": {track_id: {..., "tasks": [...]}}}
+    content/job_trends.json         {"version": 1, "trends": [...]}
+    content/resume_templates.json   {"version": 1, "templates": {company: {...}}}
+    content/skills.json             {"version": 1, "skills": {...}, "tracks": {...}, "tasks": {...}}
+
+`load_catalog` parses and validates them into a `Catalog`, an immutable view
+with a task-id index. A pickled snapshot of the parsed catalog is kept next to
+the sources and reused while their fingerprint (path, size, mtime) is unchanged,
+so startup doesn't re-parse thousands of tasks.
+
+`ContentStore` owns the current catalog. Its watcher polls the fingerprint and,
+when files change, builds a new catalog off the event loop and swaps the
+reference in one assignment. Requests read `store.catalog` once and keep using
+that version, so a reload never drops or tears a request; a broken edit is
+logged and the previous catalog stays live.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Tuple
+
+import metrics
+
+try:
+    import yaml
+except ImportError:  # optional; JSON content only
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+TRACK_FAMILIES = ("dsa", "analytics", "datascience", "ml")
+CONTENT_SUFFIXES = (".json", ".yaml", ".yml")
+REQUIRED_TASK_FIELDS = ("id", "title", "difficulty", "points", "type")
+SNAPSHOT_NAME = ".catalog.pickle"
+SNAPSHOT_FORMAT = 2
+SKILL_ID_RE = re.compile(r"[a-z0-9_]+")
+
+CONTENT_RELOADS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "content_reloads_total", "Content catalog reloads by result", ("result",)))
+CONTENT_TASKS = metrics.REGISTRY.register(metrics.Gauge(
+    "content_catalog_tasks", "Tasks in the live content catalog"))
+
+
+class ContentError(ValueError):
+    pass
+
+
+class Catalog:
+    """Immutable, indexed view of one version of the content files.
+
+    Track dicts are shared with every request that reads this version; routes
+    copy what they return instead of mutating it.
+    """
+
+    __slots__ = ("version", "_tracks", "_job_trends", "_resume_templates", "_skill_taxonomy", "_tasks")
+
+    def __init__(self, version: str, tracks: Dict[str, dict], job_trends: List[dict], resume_templates: Dict[str, dict],
+                 skill_taxonomy: Optional[dict] = None):
+        tasks = {}
+        for family, family_tracks in tracks.items():
+            for track_id, track in family_tracks.items():
+                for task in track["tasks"]:
+                    tasks[task["id"]] = (family, track_id, task)
+        self.version = version
+        self._tracks = MappingProxyType({f: MappingProxyType(tracks.get(f, {})) for f in TRACK_FAMILIES})
+        self._job_trends = tuple(job_trends)
+        self._resume_templates = MappingProxyType(resume_templates)
+        self._skill_taxonomy = MappingProxyType(skill_taxonomy or {})
+        self._tasks = MappingProxyType(tasks)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_tasks"):
+            raise AttributeError("Catalog is immutable")
+        object.__setattr__(self, name, value)
+
+    def tracks(self, family: str) -> Mapping[str, dict]:
+        return self._tracks[family]
+
+    @property
+    def job_trends(self) -> Tuple[dict, ...]:
+        return self._job_trends
+
+    @property
+    def resume_templates(self) -> Mapping[str, dict]:
+        return self._resume_templates
+
+    @property
+    def skill_taxonomy(self) -> Mapping[str, dict]:
+        return self._skill_taxonomy
+
+    def find_task(self, task_id: str) -> Optional[dict]:
+        entry = self._tasks.get(task_id)
+        return entry[2] if entry else None
+
+    @property
+    def task_count(self) -> int:
+        return len(self._tasks)
+
+    def __reduce__(self):
+        return (Catalog, (self.version, {f: dict(t) for f, t in self._tracks.items()},
+                          list(self._job_trends), dict(self._resume_templates), dict(self._skill_taxonomy)))
+
+
+def _read(path: Path):
+    if path.suffix == ".json":
+        return json.loads(path.read_bytes())
+    if yaml is None:
+        raise ContentError(f"{path}: install PyYAML to load YAML content")
+    return yaml.safe_load(path.read_bytes())
+
+
+def content_files(content_dir: Path) -> List[Path]:
+    return sorted(p for p in content_dir.rglob("*") if p.is_file() and p.suffix in CONTENT_SUFFIXES)
+
+
+def fingerprint(content_dir: Path) -> Tuple[Tuple[str, int, int], ...]:
+    """Cheap change detector: (relative path, size, mtime) of every content file."""
+    entries = []
+    for path in content_files(content_dir):
+        st = path.stat()
+        entries.append((str(path.relative_to(content_dir)), st.st_size, st.st_mtime_ns))
+    return tuple(entries)
+
+
+def _validate_tracks(family: str, tracks: dict, seen: Dict[str, str]):
+    if not isinstance(tracks, dict):
+        raise ContentError(f"tracks/{family}: 'tracks' must be a mapping")
+    for track_id, track in tracks.items():
+        for key in ("name", "description", "tasks"):
+            if key not in track:
+                raise ContentError(f"tracks/{family}/{track_id}: missing '{key}'")
+        for task in track["tasks"]:
+            missing = [k for k in REQUIRED_TASK_FIELDS if k not in task]
+            if missing:
+                raise ContentError(f"tracks/{family}/{track_id}/{task.get('id', '?')}: missing {missing}")
+            if task["id"] in seen:
+                raise ContentError(f"Duplicate task id {task['id']} in {family}/{track_id} and {seen[task['id']]}")
+            seen[task["id"]] = f"{family}/{track_id}"
+
+
+def _validate_skills(taxonomy: dict, tracks: Dict[str, dict], task_ids: Dict[str, str]):
+    skills = taxonomy.get("skills", {})
+    bad_ids = [s for s in skills if not SKILL_ID_RE.fullmatch(s)]
+    if bad_ids:
+        # Skill ids become Mongo field names (skill_levels.<id>)
+        raise ContentError(f"skills: ids must be lowercase letters, digits and underscores: {bad_ids}")
+    for key, weights in [*taxonomy.get("tracks", {}).items(), *taxonomy.get("tasks", {}).items()]:
+        unknown = [s for s in weights if s not in skills]
+        if unknown:
+            raise ContentError(f"skills/{key}: unknown skills {unknown}")
+    for key in taxonomy.get("tracks", {}):
+        family, _, track_id = key.partition("/")
+        if track_id not in tracks.get(family, {}):
+            raise ContentError(f"skills/tracks: no track '{key}'")
+    for task_id in taxonomy.get("tasks", {}):
+        if task_id not in task_ids:
+            raise ContentError(f"skills/tasks: no task '{task_id}'")
+
+
+def load_catalog(content_dir: Path) -> Catalog:
+    """Parse and validate every content file into a new Catalog."""
+    content_dir = Path(content_dir)
+    digest = hashlib.sha256()
+    documents = {}
+    for path in content_files(content_dir):
+        rel = path.relative_to(content_dir)
+        key = str(rel.with_suffix("")).replace(os.sep, "/")
+        if key in documents:
+            raise ContentError(f"{rel}: more than one file for '{key}'")
+        try:
+            documents[key] = _read(path)
+        except ContentError:
+            raise
+        except Exception as e:
+            raise ContentError(f"{rel}: {e}") from e
+        digest.update(str(rel).encode())
+        digest.update(path.read_bytes())
+
+    tracks, seen = {}, {}
+    for family in TRACK_FAMILIES:
+        family_tracks = documents.get(f"tracks/{family}", {}).get("tracks", {})
+        _validate_tracks(family, family_tracks, seen)
+        tracks[family] = family_tracks
+    skill_taxonomy = documents.get("skills", {})
+    _validate_skills(skill_taxonomy, tracks, seen)
+
+    return Catalog(
+        version=digest.hexdigest()[:12],
+        tracks=tracks,
+        job_trends=documents.get("job_trends", {}).get("trends", []),
+        resume_templates=documents.get("resume_templates", {}).get("templates", {}),
+        skill_taxonomy=skill_taxonomy
+    )
+
+
+def load_snapshot(snapshot_path: Path, expected_fingerprint) -> Optional[Catalog]:
+    try:
+        with open(snapshot_path, "rb") as f:
+            fmt, snapshot_fingerprint, catalog = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable content snapshot {snapshot_path}: {e}")
+        return None
+    if fmt != SNAPSHOT_FORMAT or snapshot_fingerprint != expected_fingerprint:
+        return None
+    return catalog
+
+
+def write_snapshot(snapshot_path: Path, source_fingerprint, catalog: Catalog):
+    # Write-then-rename so another worker never reads a half-written snapshot
+    tmp = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump((SNAPSHOT_FORMAT, source_fingerprint, catalog), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, snapshot_path)
+    except OSError as e:
+        logger.warning(f"Could not write content snapshot {snapshot_path}: {e}")
+        tmp.unlink(missing_ok=True)
+
+
+def build_catalog(content_dir: Path, snapshot_path: Optional[Path]) -> Tuple[Catalog, tuple]:
+    """Load from the snapshot when it matches the sources, else parse and refresh it."""
+    source_fingerprint = fingerprint(content_dir)
+    if snapshot_path:
+        catalog = load_snapshot(snapshot_path, source_fingerprint)
+        if catalog is not None:
+            return catalog, source_fingerprint
+    catalog = load_catalog(content_dir)
+    if snapshot_path:
+        write_snapshot(snapshot_path, source_fingerprint, catalog)
+    return catalog, source_fingerprint
+
+
+class ContentStore:
+    def __init__(self, content_dir: Path, snapshot_path: Optional[Path] = None, reload_interval: float = 2.0):
+        self.content_dir = Path(content_dir)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.reload_interval = reload_interval
+        self.catalog, self._fingerprint = build_catalog(self.content_dir, self.snapshot_path)
+        CONTENT_TASKS.set(value=self.catalog.task_count)
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[Catalog], object]] = []
+
+    def subscribe(self, listener: Callable[[Catalog], object]):
+        """Call `listener(catalog)` now and after every successful reload (from the reloading thread)."""
+        self._listeners.append(listener)
+        listener(self.catalog)
+
+    def reload(self) -> bool:
+        """Swap in a new catalog if the files changed. Returns whether it did."""
+        current = fingerprint(self.content_dir)
+        if current == self._fingerprint:
+            return False
+        try:
+            catalog, current = build_catalog(self.content_dir, self.snapshot_path)
+        except Exception as e:
+            CONTENT_RELOADS_TOTAL.inc("error")
+            # Remember the broken version so it's reported once, not every poll
+            self._fingerprint = current
+            logger.error(f"Content reload failed, keeping version {self.catalog.version}: {e}")
+            return False
+        self.catalog, self._fingerprint = catalog, current
+        CONTENT_TASKS.set(value=catalog.task_count)
+        CONTENT_RELOADS_TOTAL.inc("ok")
+        logger.info(f"Content reloaded: version {catalog.version}, {catalog.task_count} tasks")
+        for listener in self._listeners:
+            try:
+                listener(catalog)
+            except Exception as e:
+                logger.error(f"Content reload listener {listener!r} failed: {e}")
+        return True
+
+    def start(self):
+        if self.reload_interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _watch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await loop.run_in_executor(None, self.reload)
+            except Exception as e:
+                logger.warning(f"Content watcher error: {e}")
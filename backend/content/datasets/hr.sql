@@ -0,0 +1,152 @@
+-- Canonical HR dataset for the SQL track (employees/departments).
+-- Loaded once per worker into a read-only SQLite image; see sqlrunner.py.
+-- Research has no employees and two employees have no department, so INNER and LEFT JOINs differ.
+
+CREATE TABLE departments (
+    id INTEGER PRIMARY KEY,
+    dept_name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    budget INTEGER NOT NULL
+);
+
+CREATE TABLE employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    department TEXT,
+    dept_id INTEGER REFERENCES departments(id),
+    salary INTEGER NOT NULL,
+    hire_date TEXT NOT NULL,
+    manager_id INTEGER REFERENCES employees(id)
+);
+
+CREATE INDEX idx_employees_dept_id ON employees(dept_id);
+
+INSERT INTO departments (id, dept_name, location, budget) VALUES
+    (1, 'Engineering', 'Bengaluru', 5200000),
+    (2, 'Sales', 'Mumbai', 2100000),
+    (3, 'Marketing', 'Delhi', 1500000),
+    (4, 'Finance', 'Mumbai', 1300000),
+    (5, 'HR', 'Pune', 800000),
+    (6, 'Research', 'Hyderabad', 2400000);
+
+INSERT INTO employees (id, name, department, dept_id, salary, hire_date, manager_id) VALUES
+    (1, 'Ananya Iyer', 'Engineering', 1, 91500, '2012-02-27', NULL),
+    (2, 'Myra Verma', 'Engineering', 1, 89500, '2012-09-07', NULL),
+    (3, 'Vivaan Verma', 'Engineering', 1, 94000, '2013-04-03', NULL),
+    (4, 'Myra Patel', 'Engineering', 1, 67500, '2021-02-08', NULL),
+    (5, 'Kabir Rao', 'Engineering', 1, 105000, '2012-10-19', NULL),
+    (6, 'Saanvi Sharma', 'Engineering', 1, 133500, '2012-09-28', 2),
+    (7, 'Ishaan Patel', 'Engineering', 1, 73500, '2013-10-10', NULL),
+    (8, 'Myra Bose', 'Engineering', 1, 112000, '2013-10-19', 2),
+    (9, 'Diya Verma', 'Engineering', 1, 102500, '2013-10-02', 5),
+    (10, 'Reyansh Singh', 'Engineering', 1, 112000, '2018-06-15', 5),
+    (11, 'Tanvi Singh', 'Engineering', 1, 89000, '2015-03-23', 2),
+    (12, 'Aditya Menon', 'Engineering', 1, 84500, '2019-06-24', 4),
+    (13, 'Ishaan Menon', 'Engineering', 1, 133500, '2013-09-14', 2),
+    (14, 'Neha Gupta', 'Engineering', 1, 74000, '2019-07-02', NULL),
+    (15, 'Rohan Verma', 'Engineering', 1, 118000, '2021-06-11', 3),
+    (16, 'Ira Singh', 'Engineering', 1, 105000, '2019-02-27', 1),
+    (17, 'Krishna Singh', 'Engineering', 1, 113000, '2013-01-24', 3),
+    (18, 'Kabir Menon', 'Engineering', 1, 134500, '2019-05-23', 4),
+    (19, 'Pooja Rao', 'Engineering', 1, 88000, '2019-06-06', 5),
+    (20, 'Vihaan Singh', 'Engineering', 1, 67000, '2024-05-05', 2),
+    (21, 'Saanvi Patel', 'Engineering', 1, 129000, '2019-02-06', NULL),
+    (22, 'Pari Patel', 'Engineering', 1, 102500, '2014-07-28', 5),
+    (23, 'Krishna Kulkarni', 'Engineering', 1, 93000, '2017-11-13', 2),
+    (24, 'Arjun Verma', 'Engineering', 1, 75500, '2015-11-08', 1),
+    (25, 'Anika Bose', 'Engineering', 1, 105500, '2016-05-01', 2),
+    (26, 'Aadhya Das', 'Engineering', 1, 89500, '2021-06-05', 5),
+    (27, 'Ira Rao', 'Engineering', 1, 111500, '2012-08-28', 5),
+    (28, 'Kabir Patel', 'Engineering', 1, 67500, '2013-04-15', NULL),
+    (29, 'Sai Verma', 'Engineering', 1, 87500, '2012-02-01', 5),
+    (30, 'Arjun Das', 'Engineering', 1, 70500, '2017-10-01', 1),
+    (31, 'Sneha Reddy', 'Engineering', 1, 107000, '2014-11-09', 3),
+    (32, 'Ira Gupta', 'Engineering', 1, 97000, '2013-08-15', 4),
+    (33, 'Anika Nair', 'Engineering', 1, 69000, '2013-12-11', 3),
+    (34, 'Meera Iyer', 'Engineering', 1, 100000, '2015-09-12', 2),
+    (35, 'Meera Das', 'Engineering', 1, 129000, '2024-09-10', NULL),
+    (36, 'Kabir Bose', 'Engineering', 1, 69500, '2016-09-12', 2),
+    (37, 'Diya Joshi', 'Engineering', 1, 79000, '2020-09-11', 2),
+    (38, 'Ira Joshi', 'Engineering', 1, 120000, '2024-04-26', 2),
+    (39, 'Karan Patel', 'Engineering', 1, 116500, '2015-04-17', 4),
+    (40, 'Diya Kulkarni', 'Engineering', 1, 65000, '2012-05-16', 3),
+    (41, 'Reyansh Kulkarni', 'Sales', 2, 65000, '2017-08-26', 3),
+    (42, 'Ayaan Verma', 'Sales', 2, 48500, '2015-06-07', NULL),
+    (43, 'Anika Menon', 'Sales', 2, 82000, '2021-01-16', 3),
+    (44, 'Rahul Rao', 'Sales', 2, 42000, '2022-02-13', 2),
+    (45, 'Anika Khan', 'Sales', 2, 46500, '2024-11-11', 1),
+    (46, 'Rahul Kulkarni', 'Sales', 2, 56000, '2018-12-03', 2),
+    (47, 'Sai Iyer', 'Sales', 2, 39500, '2021-08-26', 2),
+    (48, 'Ira Bose', 'Sales', 2, 64500, '2019-11-12', 2),
+    (49, 'Myra Das', 'Sales', 2, 44500, '2012-12-21', NULL),
+    (50, 'Vihaan Das', 'Sales', 2, 71500, '2014-07-28', 2),
+    (51, 'Karan Bose', 'Sales', 2, 48000, '2016-04-10', 5),
+    (52, 'Ayaan Joshi', 'Sales', 2, 64500, '2016-09-14', 2),
+    (53, 'Vivaan Khan', 'Sales', 2, 71000, '2019-11-19', 5),
+    (54, 'Aadhya Bose', 'Sales', 2, 79000, '2020-03-18', 2),
+    (55, 'Navya Das', 'Sales', 2, 39500, '2019-03-20', 1),
+    (56, 'Neha Joshi', 'Sales', 2, 45000, '2014-08-20', NULL),
+    (57, 'Priya Verma', 'Sales', 2, 63000, '2017-11-17', 5),
+    (58, 'Myra Singh', 'Sales', 2, 73000, '2013-09-02', 2),
+    (59, 'Reyansh Nair', 'Sales', 2, 40500, '2013-09-15', 5),
+    (60, 'Aarav Joshi', 'Sales', 2, 78000, '2013-08-11', 5),
+    (61, 'Navya Menon', 'Sales', 2, 61000, '2023-05-15', 5),
+    (62, 'Myra Joshi', 'Sales', 2, 59500, '2015-12-17', 3),
+    (63, 'Tanvi Das', 'Sales', 2, 78000, '2015-08-05', NULL),
+    (64, 'Aadhya Verma', 'Sales', 2, 56000, '2017-02-22', 2),
+    (65, 'Reyansh Rao', 'Sales', 2, 52000, '2013-03-23', 3),
+    (66, 'Arjun Nair', 'Marketing', 3, 73000, '2019-04-24', 1),
+    (67, 'Saanvi Khan', 'Marketing', 3, 56500, '2022-04-06', 4),
+    (68, 'Navya Patel', 'Marketing', 3, 50500, '2015-06-11', 1),
+    (69, 'Priya Gupta', 'Marketing', 3, 37000, '2020-08-15', 1),
+    (70, 'Saanvi Gupta', 'Marketing', 3, 58000, '2016-09-03', NULL),
+    (71, 'Vihaan Khan', 'Marketing', 3, 69000, '2013-02-09', 3),
+    (72, 'Neha Iyer', 'Marketing', 3, 47500, '2014-07-28', 3),
+    (73, 'Saanvi Iyer', 'Marketing', 3, 58500, '2020-10-16', 3),
+    (74, 'Aditya Nair', 'Marketing', 3, 39000, '2023-03-14', 1),
+    (75, 'Krishna Sharma', 'Marketing', 3, 63000, '2024-05-03', 5),
+    (76, 'Sneha Verma', 'Marketing', 3, 55500, '2017-09-14', 3),
+    (77, 'Ira Iyer', 'Marketing', 3, 38000, '2023-04-04', NULL),
+    (78, 'Sai Nair', 'Marketing', 3, 38500, '2015-05-21', 3),
+    (79, 'Navya Joshi', 'Marketing', 3, 45000, '2019-09-22', 2),
+    (80, 'Krishna Gupta', 'Marketing', 3, 70000, '2016-01-01', 1),
+    (81, 'Priya Das', 'Marketing', 3, 59500, '2015-09-16', 2),
+    (82, 'Vihaan Rao', 'Marketing', 3, 70500, '2018-11-16', 5),
+    (83, 'Karan Khan', 'Marketing', 3, 53000, '2020-05-23', 2),
+    (84, 'Ayaan Gupta', 'Marketing', 3, 44500, '2023-12-21', NULL),
+    (85, 'Arjun Patel', 'Marketing', 3, 77500, '2012-03-01', 1),
+    (86, 'Kabir Kulkarni', 'Finance', 4, 87000, '2018-03-02', 1),
+    (87, 'Rohan Bose', 'Finance', 4, 62500, '2020-11-10', 5),
+    (88, 'Ayaan Kulkarni', 'Finance', 4, 58000, '2019-03-06', 3),
+    (89, 'Pari Sharma', 'Finance', 4, 56500, '2017-09-11', 2),
+    (90, 'Ishaan Reddy', 'Finance', 4, 61000, '2012-06-13', 1),
+    (91, 'Navya Rao', 'Finance', 4, 53500, '2020-01-03', NULL),
+    (92, 'Krishna Bose', 'Finance', 4, 48000, '2018-10-02', 4),
+    (93, 'Aarav Nair', 'Finance', 4, 58500, '2015-02-19', 5),
+    (94, 'Sneha Joshi', 'Finance', 4, 51000, '2023-10-13', 3),
+    (95, 'Priya Singh', 'Finance', 4, 51000, '2023-10-21', 2),
+    (96, 'Vivaan Bose', 'Finance', 4, 85000, '2020-11-14', 5),
+    (97, 'Arjun Khan', 'Finance', 4, 69500, '2020-10-27', 1),
+    (98, 'Karan Rao', 'Finance', 4, 72500, '2023-11-23', NULL),
+    (99, 'Kabir Reddy', 'Finance', 4, 47500, '2012-03-21', 3),
+    (100, 'Vihaan Patel', 'Finance', 4, 85000, '2020-01-21', 1),
+    (101, 'Kabir Das', 'Finance', 4, 77000, '2019-05-01', 4),
+    (102, 'Rahul Verma', 'Finance', 4, 80500, '2020-09-03', 5),
+    (103, 'Aditya Kulkarni', 'Finance', 4, 80000, '2016-02-28', 3),
+    (104, 'Neha Reddy', 'Finance', 4, 55000, '2022-08-16', 4),
+    (105, 'Aditya Singh', 'Finance', 4, 88500, '2016-01-20', NULL),
+    (106, 'Reyansh Verma', 'HR', 5, 53000, '2017-05-21', 3),
+    (107, 'Ira Menon', 'HR', 5, 36500, '2019-01-16', 3),
+    (108, 'Meera Reddy', 'HR', 5, 56000, '2016-12-17', 3),
+    (109, 'Pari Singh', 'HR', 5, 48500, '2013-09-07', 3),
+    (110, 'Aditya Khan', 'HR', 5, 48500, '2016-08-03', 5),
+    (111, 'Pari Nair', 'HR', 5, 45500, '2015-02-19', 1),
+    (112, 'Arjun Kulkarni', 'HR', 5, 50500, '2017-03-20', NULL),
+    (113, 'Navya Nair', 'HR', 5, 63500, '2023-06-08', 4),
+    (114, 'Pooja Khan', 'HR', 5, 49000, '2012-03-01', 4),
+    (115, 'Rohan Singh', 'HR', 5, 46000, '2023-03-14', 3),
+    (116, 'Vihaan Bose', 'HR', 5, 43500, '2017-06-27', 4),
+    (117, 'Aarav Khan', 'HR', 5, 58000, '2016-06-03', 4),
+    (118, 'Saanvi Bose', 'HR', 5, 52500, '2017-07-25', 3),
+    (119, 'Sneha Sharma', NULL, NULL, 46000, '2012-11-10', NULL),
+    (120, 'Kabir Khan', NULL, NULL, 41000, '2016-07-17', 3);
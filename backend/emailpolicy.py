@@ -0,0 +1,187 @@
+"""Which email addresses may register: a database-backed domain allowlist.
+
+Rules live in the `email_domain_rules` collection and come in three kinds:
+- `domain`: exactly this domain (`gmail.com`),
+- `suffix`: any subdomain of this domain (`edu` allows `mit.edu`, `ac.in`
+  allows `cs.iitb.ac.in`). At least one label must come before the suffix, so
+  `edu` doesn't admit `a@edu`; add a `domain` rule to allow the domain itself,
+- `pattern`: a regex searched against the whole lower-cased address, for
+  shapes a suffix can't express (`@iit\\w*\\.`).
+
+A `DomainPolicy` compiles the rules once. Domains and suffixes go into a trie
+keyed by reversed domain labels, so a check walks the address's few labels
+however many rules there are. All patterns are joined into one alternation and
+searched once, and only when the trie has no match.
+
+Each worker keeps the compiled policy in a `PolicyStore` and checks the
+`email_domain_policy` version document at most every `refresh_seconds`.
+Admin edits bump that version, and the editing worker recompiles immediately.
+The first start seeds `DEFAULT_RULES`; until then the defaults are used as-is.
+"""
+import logging
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+RULES_COLLECTION = "email_domain_rules"
+VERSION_COLLECTION = "email_domain_policy"
+VERSION_ID = "version"
+RULE_KINDS = ("domain", "suffix", "pattern")
+POLICY_REFRESH_SECONDS = 30.0
+
+DOMAIN_RE = re.compile(r"^[a-z0-9](?:[a-z0-9-]*[a-z0-9])?(?:\.[a-z0-9](?:[a-z0-9-]*[a-z0-9])?)*$")
+
+# The allowlist before it moved to the database
+DEFAULT_RULES = [
+    ("domain", "gmail.com"), ("domain", "yahoo.com"), ("domain", "outlook.com"), ("domain", "hotmail.com"),
+    ("suffix", "edu"), ("suffix", "college"), ("suffix", "university"),
+    ("pattern", r"\.edu\.\w+$"), ("pattern", r"\.ac\.\w+$"), ("pattern", r"@iit\w*\."), ("pattern", r"@nit\w*\."),
+    ("pattern", r"@bits-pilani\."), ("pattern", r"@vit\."), ("pattern", r"@manipal\."), ("pattern", r"@amity\."),
+    ("pattern", r"@srm\."), ("pattern", r"@iisc\."), ("pattern", r"@iiit\w*\."),
+]
+
+_EXACT, _SUBTREE = "\0domain", "\0suffix"
+# Patterns are joined into one alternation, which renumbers groups
+_BACKREFERENCE_RE = re.compile(r"\\[1-9]|\\g<|\(\?P=")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_rule(kind: str, value: str) -> str:
+    """Canonical rule value; raises ValueError for an unknown kind or a malformed value."""
+    if kind not in RULE_KINDS:
+        raise ValueError(f"Unknown rule kind {kind!r}; choose from {list(RULE_KINDS)}")
+    value = (value or "").strip()
+    if kind == "pattern":
+        if not value:
+            raise ValueError("Empty pattern")
+        if _BACKREFERENCE_RE.search(value):
+            raise ValueError("Invalid pattern: backreferences aren't supported")
+        try:
+            # As it is compiled in the policy: one branch of an alternation, so no global (?i) flags
+            re.compile(f"(?:{value})")
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}")
+        return value
+    value = value.lower().lstrip("@.").rstrip(".")
+    if not DOMAIN_RE.match(value):
+        raise ValueError(f"Invalid domain {value!r}")
+    return value
+
+
+class DomainPolicy:
+    def __init__(self, rules: Iterable[dict]):
+        self.rules = list(rules)
+        self._trie: dict = {}
+        patterns = []
+        for rule in self.rules:
+            if rule["kind"] == "pattern":
+                patterns.append(rule)
+                continue
+            node = self._trie
+            for label in reversed(rule["value"].split(".")):
+                node = node.setdefault(label, {})
+            node[_SUBTREE if rule["kind"] == "suffix" else _EXACT] = rule
+        self._patterns = patterns
+        try:
+            self._regex = re.compile("|".join(f"(?:{r['value']})" for r in patterns)) if patterns else None
+        except re.error as e:
+            raise ValueError(f"Patterns don't compile together: {e}")
+
+    def __len__(self):
+        return len(self.rules)
+
+    def _trie_match(self, domain: str) -> Optional[dict]:
+        labels = domain.split(".")
+        node, found = self._trie, None
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                return found
+            if depth < len(labels):  # a suffix needs a label before it
+                found = node.get(_SUBTREE, found)
+        return node.get(_EXACT) or found
+
+    def allows(self, email: str) -> bool:
+        email = email.lower()
+        if self._trie_match(email.rpartition("@")[2]) is not None:
+            return True
+        return self._regex is not None and self._regex.search(email) is not None
+
+    def matching_rule(self, email: str) -> Optional[dict]:
+        """The rule that admits `email` (for the admin check endpoint), or None."""
+        email = email.lower()
+        rule = self._trie_match(email.rpartition("@")[2])
+        if rule is None and self._regex is not None and self._regex.search(email):
+            rule = next(r for r in self._patterns if re.search(r["value"], email))
+        return rule
+
+
+def default_rule_documents() -> List[dict]:
+    now = datetime.now(timezone.utc).isoformat()
+    return [{"id": str(uuid.uuid4()), "kind": kind, "value": value, "note": "default", "created_at": now,
+             "created_by": None} for kind, value in DEFAULT_RULES]
+
+
+class PolicyStore:
+    def __init__(self, refresh_seconds: float = POLICY_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.policy = DomainPolicy(default_rule_documents())
+        self.version: Optional[int] = None
+        self._checked_at = float("-inf")
+
+    async def ensure_seeded(self, db):
+        """First start only: store the default rules, then the version document that marks them loaded."""
+        await db[RULES_COLLECTION].create_index([("kind", 1), ("value", 1)], unique=True)
+        await db[RULES_COLLECTION].create_index("id", unique=True)
+        if await db[VERSION_COLLECTION].find_one({"_id": VERSION_ID}):
+            return
+        try:
+            await db[RULES_COLLECTION].insert_many(default_rule_documents(), ordered=False)
+        except BulkWriteError:
+            pass  # another worker is seeding too; the unique index keeps one copy of each rule
+        try:
+            await db[VERSION_COLLECTION].insert_one({"_id": VERSION_ID, "version": 1})
+        except DuplicateKeyError:
+            pass
+
+    async def refresh(self, db, force: bool = False):
+        """Recompile if the rules changed, checking at most every `refresh_seconds`."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        meta = await db[VERSION_COLLECTION].find_one({"_id": VERSION_ID})
+        version = meta["version"] if meta else None
+        if force or version != self.version:
+            rules = await db[RULES_COLLECTION].find({}, {"_id": 0}).to_list(None)
+            try:
+                self.policy = DomainPolicy(rules) if meta else DomainPolicy(default_rule_documents())
+            except ValueError as e:
+                # A bad rule in the database; keep checking with the last policy that compiled
+                logger.error(f"Email domain policy version {version} doesn't compile, keeping the previous one: {e}")
+            self.version = version
+
+    async def add_rule(self, db, kind: str, value: str, note: Optional[str] = None,
+                       created_by: Optional[str] = None) -> dict:
+        rule = {"id": str(uuid.uuid4()), "kind": kind, "value": normalize_rule(kind, value), "note": note,
+                "created_at": datetime.now(timezone.utc).isoformat(), "created_by": created_by}
+        await self.refresh(db, force=True)
+        DomainPolicy(self.policy.rules + [rule])  # raises ValueError if it doesn't compile with the others
+        await db[RULES_COLLECTION].insert_one(dict(rule))
+        await self._changed(db)
+        return rule
+
+    async def remove_rule(self, db, rule_id: str) -> bool:
+        result = await db[RULES_COLLECTION].delete_one({"id": rule_id})
+        if result.deleted_count:
+            await self._changed(db)
+        return bool(result.deleted_count)
+
+    async def _changed(self, db):
+        await db[VERSION_COLLECTION].update_one({"_id": VERSION_ID}, {"$inc": {"version": 1}}, upsert=True)
+        await self.refresh(db, force=True)
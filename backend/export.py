@@ -0,0 +1,303 @@
+"""Streaming bulk export of users, task progress and chat history.
+
+Rows are pulled through server-side cursors in fixed-size batches and written
+out as they arrive, so memory stays flat no matter how many rows are exported.
+Encoding runs on the given executor so a long export never blocks the event loop;
+Parquet is streamed one row group at a time with the row count and watermark
+stored in the file footer (keys `export.rows` and `export.watermark`).
+
+CLI usage (from the backend directory):
+
+    python export.py users --format ndjson --out users.ndjson
+    python export.py progress --format parquet --out progress.parquet --since 2026-01-01T00:00:00+00:00
+"""
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+EXPORT_COLLECTIONS = ("users", "progress", "chat_history")
+EXPORT_FORMATS = ("ndjson", "parquet")
+DEFAULT_BATCH_SIZE = 1000
+
+# Parquet columns per collection, so every row group of an export (and every export) shares one
+# schema whatever the first batch happens to hold. "json" columns hold nested values as JSON text;
+# keys not declared here go into the `extra` JSON column rather than being dropped.
+EXPORT_FIELDS = {
+    "users": {
+        "id": "string", "email": "string", "name": "string", "role": "string", "points": "int64",
+        "level": "string", "created_at": "string", "updated_at": "string", "timezone": "string",
+        "progress_version": "int64",
+        "skill_levels": "json", "skill_levels_version": "int64", "weekly_activity": "json",
+        "monthly_activity": "json", "streak": "json", "resumes": "json", "invite": "json",
+    },
+    "progress": {
+        "user_id": "string", "task_id": "string", "attempts": "int64", "completed": "bool",
+        "last_submission": "string",
+    },
+    "chat_history": {
+        "id": "string", "user_id": "string", "message": "string", "response": "string", "context": "string",
+        "task_id": "string", "source": "string", "intent": "string", "timestamp": "string",
+    },
+}
+EXTRA_FIELD = "extra"
+
+# Field each collection is filtered on for incremental (watermark) exports. Users are stamped
+# with `updated_at` on every profile write; documents written before that field existed fall
+# back to `created_at`.
+WATERMARK_FIELDS = {
+    "users": "updated_at",
+    "progress": "last_submission",
+    "chat_history": "timestamp",
+}
+
+
+class ExportState:
+    """Tracks row count and the highest watermark value seen during an export."""
+
+    def __init__(self, collection: str):
+        self.collection = collection
+        self.field = WATERMARK_FIELDS[collection]
+        self.rows = 0
+        self.watermark: Optional[str] = None
+
+    def observe(self, row: Dict[str, Any]):
+        self.rows += 1
+        value = row.get(self.field)
+        if value is None and self.collection == "users":
+            value = row.get("created_at")
+        if value and (self.watermark is None or value > self.watermark):
+            self.watermark = value
+
+
+def _cursor(db, collection: str, since: Optional[str], batch_size: int):
+    if collection == "users":
+        query = {"$or": [
+            {"updated_at": {"$gt": since}},
+            {"updated_at": {"$exists": False}, "created_at": {"$gt": since}},
+        ]} if since else {}
+        projection = {"_id": 0, "password_hash": 0, "progress": 0, "invite.token_hash": 0}
+        return db.users.find(query, projection).batch_size(batch_size)
+
+    if collection == "chat_history":
+        query = {"timestamp": {"$gt": since}} if since else {}
+        return db.chat_history.find(query, {"_id": 0}).batch_size(batch_size)
+
+    # Progress lives inside each user document; unwind it into one row per (user, task)
+    pipeline: List[Dict[str, Any]] = [
+        {"$project": {"_id": 0, "user_id": "$id", "items": {"$objectToArray": {"$ifNull": ["$progress", {}]}}}},
+        {"$unwind": "$items"},
+        {"$project": {
+            "user_id": 1,
+            "task_id": "$items.k",
+            "attempts": "$items.v.attempts",
+            "completed": "$items.v.completed",
+            "last_submission": "$items.v.last_submission",
+        }},
+    ]
+    if since:
+        pipeline.append({"$match": {"last_submission": {"$gt": since}}})
+    return db.users.aggregate(pipeline, batchSize=batch_size, allowDiskUse=True)
+
+
+async def iter_batches(db, collection: str, since: Optional[str] = None,
+                       batch_size: int = DEFAULT_BATCH_SIZE,
+                       state: Optional[ExportState] = None) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield lists of at most `batch_size` rows from a server-side cursor."""
+    if collection not in EXPORT_COLLECTIONS:
+        raise ValueError(f"Unknown collection: {collection}")
+
+    cursor = _cursor(db, collection, since, batch_size)
+    batch: List[Dict[str, Any]] = []
+    async for row in cursor:
+        if state:
+            state.observe(row)
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _ndjson(batch: List[Dict[str, Any]]) -> bytes:
+    return "".join(json.dumps(row, default=str) + "\n" for row in batch).encode()
+
+
+async def stream_ndjson(db, collection: str, since: Optional[str] = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        state: Optional[ExportState] = None, executor=None) -> AsyncIterator[bytes]:
+    """Yield NDJSON-encoded chunks, one chunk per cursor batch, encoded on `executor`."""
+    loop = asyncio.get_running_loop()
+    async for batch in iter_batches(db, collection, since, batch_size, state):
+        yield await loop.run_in_executor(executor, _ndjson, batch)
+
+
+def _json(value: Any) -> str:
+    return json.dumps(value, default=str)
+
+
+def parquet_schema(collection: str):
+    import pyarrow as pa
+
+    types = {"string": pa.string(), "int64": pa.int64(), "bool": pa.bool_(), "json": pa.string()}
+    fields = [pa.field(name, types[kind]) for name, kind in EXPORT_FIELDS[collection].items()]
+    return pa.schema(fields + [pa.field(EXTRA_FIELD, pa.string())])
+
+
+def _parquet_row(fields: Dict[str, str], row: Dict[str, Any]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, kind in fields.items():
+        value = row.get(name)
+        if value is None:
+            out[name] = None
+        elif kind == "json":
+            out[name] = _json(value)
+        elif kind == "string":
+            out[name] = value if isinstance(value, str) else str(value)
+        elif kind == "int64":
+            out[name] = int(value)
+        else:
+            out[name] = bool(value)
+    extra = {k: v for k, v in row.items() if k not in fields}
+    out[EXTRA_FIELD] = _json(extra) if extra else None
+    return out
+
+
+class _Drain:
+    """Write-only file that hands over whatever the Parquet writer has written since the last take()."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def stream_parquet(db, collection: str, since: Optional[str] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE, state: Optional[ExportState] = None,
+                   executor=None) -> AsyncIterator[bytes]:
+    """Return an iterator of Parquet bytes, one row group per cursor batch, encoded on `executor`.
+
+    pyarrow is checked here rather than on first iteration so callers can fail before responding.
+    If the export fails part way the footer is never written, so a truncated file can't be read
+    as a complete one.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow to be installed")
+
+    schema = parquet_schema(collection)
+    fields = EXPORT_FIELDS[collection]
+    state = state or ExportState(collection)
+
+    async def chunks() -> AsyncIterator[bytes]:
+        loop = asyncio.get_running_loop()
+        sink = _Drain()
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+
+        def encode(batch: List[Dict[str, Any]]) -> bytes:
+            writer.write_table(pa.Table.from_pylist([_parquet_row(fields, r) for r in batch], schema=schema))
+            return sink.take()
+
+        def finish() -> bytes:
+            writer.add_key_value_metadata({
+                "export.rows": str(state.rows),
+                "export.watermark": state.watermark or since or "",
+            })
+            writer.close()
+            return sink.take()
+
+        # On failure the writer is left to be collected once no encode is still using it
+        async for batch in iter_batches(db, collection, since, batch_size, state):
+            yield await loop.run_in_executor(executor, encode, batch)
+        yield await loop.run_in_executor(executor, finish)
+
+    return chunks()
+
+
+async def write_parquet(db, collection: str, path: str, since: Optional[str] = None,
+                        batch_size: int = DEFAULT_BATCH_SIZE,
+                        state: Optional[ExportState] = None, executor=None) -> int:
+    """Write the export to a Parquet file; returns the number of rows written."""
+    state = state or ExportState(collection)
+    with open(path, "wb") as sink:
+        async for chunk in stream_parquet(db, collection, since, batch_size, state, executor):
+            sink.write(chunk)
+    return state.rows
+
+
+# ============ CLI ============
+
+def main():
+    import asyncio
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    def export(
+        collection: str = typer.Argument(..., help="users, progress or chat_history"),
+        format: str = typer.Option("ndjson", "--format", "-f", help="ndjson or parquet"),
+        out: Optional[str] = typer.Option(None, "--out", "-o", help="Output file (NDJSON defaults to stdout)"),
+        since: Optional[str] = typer.Option(None, help="Only export rows newer than this ISO timestamp"),
+        batch_size: int = typer.Option(DEFAULT_BATCH_SIZE, help="Cursor batch size"),
+    ):
+        if collection not in EXPORT_COLLECTIONS:
+            raise typer.BadParameter(f"collection must be one of {EXPORT_COLLECTIONS}")
+        if format not in EXPORT_FORMATS:
+            raise typer.BadParameter(f"format must be one of {EXPORT_FORMATS}")
+        if format == "parquet" and not out:
+            raise typer.BadParameter("--out is required for parquet exports")
+
+        async def run() -> ExportState:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            db = client[os.environ['DB_NAME']]
+            state = ExportState(collection)
+            try:
+                if format == "parquet":
+                    await write_parquet(db, collection, out, since, batch_size, state)
+                else:
+                    sink = open(out, "wb") if out else sys.stdout.buffer
+                    try:
+                        async for chunk in stream_ndjson(db, collection, since, batch_size, state):
+                            sink.write(chunk)
+                    finally:
+                        if out:
+                            sink.close()
+            finally:
+                client.close()
+            return state
+
+        state = asyncio.run(run())
+        # The watermark goes to stderr so it can be fed back in as --since next run
+        typer.echo(f"rows={state.rows} watermark={state.watermark or since or ''}", err=True)
+
+    typer.run(export)
+
+
+if __name__ == "__main__":
+    main()
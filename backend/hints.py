@@ -0,0 +1,221 @@
+"""Local answers for the routine part of BRO chat: hints and small talk.
+
+Many chat messages during a task are "give me a hint". The task already ships
+a `hints` list, so a round trip to the LLM adds only latency and cost.
+`IntentClassifier` is a multinomial naive Bayes over word unigrams and bigrams.
+It is trained at import on `INTENT_EXAMPLES` and classifies in microseconds.
+`answer` turns the intent into a reply:
+- hint: the user's next stored hint for the task. Hint levels are kept per
+  user and task in `progress.<task_id>.hint_level`, shared with the task
+  page's Hint button,
+- solution: no full solution (BRO's rule), but the next hint instead,
+- complexity: the task's target complexity, when it has one,
+- greeting / thanks: a short canned reply.
+
+Everything else escalates to the LLM (`answer` gives no reply):
+- open-ended questions,
+- low-confidence classifications,
+- long messages, or messages with code,
+- messages whose content words are mostly unknown to the classifier ("how do
+  i start a career in ml"): naive Bayes ignores unseen words, so it would
+  classify them confidently on the few words it knows,
+- hint or solution requests with a negation ("i dont want a hint"): a wrong
+  hint answer can't be taken back, since it advances the hint level,
+- greetings and thanks followed by a "but" clause ("thanks but that didnt
+  help"),
+- a hint request once every hint has been shown.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import metrics
+
+# Below this posterior the message goes to the LLM
+MIN_CONFIDENCE = 0.8
+# Additive smoothing; small, since most intents have only a few dozen words of examples
+SMOOTHING = 0.1
+# Longer messages carry context a canned reply would ignore
+MAX_LOCAL_WORDS = 16
+# Above this share of content words unseen in training, the message goes to the LLM
+MAX_UNKNOWN_SHARE = 0.5
+# Not counted as content words for MAX_UNKNOWN_SHARE
+STOPWORDS = frozenset(
+    "i im me my a an the to of in on at for with and or but is it its this that these do does did how what "
+    "where when why which who can could would should will you your we be am are was please pls plz so just "
+    "any some".split())
+OPEN = "open"
+
+INTENT_EXAMPLES: Dict[str, List[str]] = {
+    "hint": [
+        "give me a hint", "hint please", "can i get a hint", "i need a hint", "another hint", "next hint",
+        "one more hint", "any hints", "im stuck", "i am stuck", "stuck on this", "totally stuck",
+        "help me with this task", "help me get started", "how do i start", "where do i begin",
+        "what should i do first", "nudge me in the right direction", "point me in the right direction",
+        "i dont know how to approach this", "no idea how to solve this", "what approach should i use",
+        "can you give me a clue", "a small hint", "what is the trick here", "i have no clue", "help",
+        "help me", "give me some hints", "still stuck", "more hints please", "hint", "what is the next hint",
+    ],
+    "solution": [
+        "give me the solution", "show me the solution", "just give me the answer", "show me the answer",
+        "what is the answer", "write the code for me", "give me the code", "solve it for me",
+        "can you solve this", "show me the code", "paste the full solution", "tell me the answer",
+        "i give up show the solution", "complete code please", "just write it", "whats the solution",
+    ],
+    "complexity": [
+        "what is the time complexity", "what complexity should i aim for", "what is the optimal complexity",
+        "is there a faster way", "can i do better than n squared", "how fast should my solution be",
+        "what big o is expected", "is on squared ok", "what is the expected big o",
+        "can this be done in linear time", "whats the best possible time complexity",
+        "is my solution efficient enough", "what runtime should i target",
+    ],
+    "greeting": [
+        "hi", "hello", "hey", "hey bro", "hi bro", "hello there", "yo", "good morning", "good evening",
+        "sup", "whats up", "hey there",
+    ],
+    "thanks": [
+        "thanks", "thank you", "thanks bro", "got it thanks", "ok got it", "that helps", "cool thanks",
+        "awesome thanks", "makes sense now", "perfect thanks", "great thank you", "ok", "okay", "nice",
+        "understood", "ty", "thanks a lot",
+    ],
+    OPEN: [
+        "why does my code fail on an empty list", "explain how a hash map works",
+        "what is the difference between bfs and dfs", "can you review my approach",
+        "my output is wrong for negative numbers", "why is recursion slow here",
+        "how do i prepare for amazon interviews", "what is dynamic programming",
+        "is my resume good enough for product companies", "explain kadanes algorithm to me",
+        "why do we use a dummy node", "what does this error mean", "how does the two pointer technique work",
+        "what should i learn after arrays", "how many problems should i solve per day",
+        "my code works but times out on large input", "can you explain the example",
+        "what is a sliding window", "how do i handle duplicates", "why is my answer off by one",
+        "what are edge cases i should test", "should i use a set or a dict here",
+        "explain the problem statement", "what is the difference between a list and a tuple",
+        "how do i reverse a linked list in place", "is python good for interviews",
+        "what is the time complexity of sorting", "is appending to a list constant time",
+        "how fast is a set lookup", "which topic should i study next", "what do i do after finishing this track",
+        "i dont want a hint", "no hints please just explain", "help me understand the error",
+        "help me understand this concept", "that hint didnt help", "i dont need the solution",
+        "thanks but that didnt help", "thanks but i am still confused", "hi i have a question about recursion",
+    ],
+}
+
+REPLIES = {
+    "greeting": "Hey {name}! 👋 What are you working on? If you're stuck on a task, just ask for a hint.",
+    "thanks": "Anytime! Keep going 💪",
+    "no_task_hint": "Open the task you're working on and ask me there: I'll walk you through its hints one at a time.",
+    "solution_prefix": "I won't hand you the full solution: working it out yourself is what sticks in an "
+                       "interview. Here's a nudge instead.\n\n",
+    "solution_exhausted": "I won't hand you the full solution, and you've already seen every hint for this one. "
+                          "Tell me what you've tried and where it breaks, and we'll debug it together.",
+    "complexity": "The reference solution for **{title}** runs in **{complexity}** time. Press Run: it estimates "
+                  "your code's complexity and points at the lines that cost the most.",
+}
+
+CHAT_ANSWERS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "bro_chat_answers_total", "BRO chat replies by source (local or llm) and intent", ("source", "intent")))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CODE_RE = re.compile(r"```|\bdef |\breturn |[{};]|==|\n")
+# A negation anywhere in a short message with a hint term: "dont want a hint", "the hint didnt help"
+_NEGATION_RE = re.compile(r"\b(?:dont|doesnt|didnt|do not|does not|did not|not|never|without|no)\b")
+_HINT_TERM_RE = re.compile(r"\b(?:hints?|nudges?|tips?|solutions?|answers?|spoil\w*)\b")
+# A second clause after small talk: "thanks but ...", "hi, though ..."
+_BUT_CLAUSE_RE = re.compile(r"\b(?:but|though|however)\b\W+\w")
+
+
+def features(text: str) -> List[str]:
+    words = _TOKEN_RE.findall(text.lower().replace("'", ""))
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class IntentClassifier:
+    """Multinomial naive Bayes with additive smoothing and uniform class priors."""
+
+    def __init__(self, examples: Dict[str, List[str]], smoothing: float = SMOOTHING):
+        self.intents = list(examples)
+        counts = {intent: Counter(f for text in texts for f in features(text)) for intent, texts in examples.items()}
+        vocabulary = set().union(*counts.values())
+        self.vocabulary = vocabulary
+        self.log_prob: Dict[str, Dict[str, float]] = {}
+        self.log_unseen: Dict[str, float] = {}
+        for intent, counter in counts.items():
+            total = sum(counter.values()) + smoothing * len(vocabulary)
+            self.log_prob[intent] = {f: math.log((counter[f] + smoothing) / total) for f in counter}
+            self.log_unseen[intent] = math.log(smoothing / total)
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """(intent, posterior probability); features never seen in training are ignored."""
+        known = [f for f in features(text) if f in self.vocabulary]
+        if not known:
+            return OPEN, 1.0
+        scores = {intent: sum(self.log_prob[intent].get(f, self.log_unseen[intent]) for f in known)
+                  for intent in self.intents}
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1.0 / norm
+
+
+classifier = IntentClassifier(INTENT_EXAMPLES)
+
+
+def intent_of(message: str) -> Tuple[str, float]:
+    """The local intent of a chat message, or OPEN if it should go to the LLM."""
+    text = message.strip()
+    if not text or _CODE_RE.search(text) or len(text.split()) > MAX_LOCAL_WORDS:
+        return OPEN, 1.0
+    content_words = [w for w in _TOKEN_RE.findall(text.lower().replace("'", "")) if w not in STOPWORDS]
+    unknown = sum(1 for w in content_words if w not in classifier.vocabulary)
+    if content_words and unknown / len(content_words) > MAX_UNKNOWN_SHARE:
+        return OPEN, 1.0
+    intent, confidence = classifier.classify(text)
+    if confidence < MIN_CONFIDENCE:
+        return OPEN, confidence
+    lowered = text.lower().replace("'", "")
+    if intent in ("hint", "solution") and _NEGATION_RE.search(lowered) and _HINT_TERM_RE.search(lowered):
+        return OPEN, confidence
+    if intent in ("greeting", "thanks") and _BUT_CLAUSE_RE.search(lowered):
+        return OPEN, confidence
+    return intent, confidence
+
+
+async def next_hint(db, user_id: str, task: dict) -> Optional[Tuple[int, int, str]]:
+    """Advance the user's hint level for `task`: (level, total, hint), or None if every hint was shown."""
+    hints = task.get("hints") or []
+    if not hints:
+        return None  # the level filter below would match a missing field and advance past the end
+    field = f"progress.{task['id']}.hint_level"
+    before = await db.users.find_one_and_update(
+        {"id": user_id, field: {"$not": {"$gte": len(hints)}}},
+        {"$inc": {field: 1}},
+        projection={"_id": 0, field: 1})
+    if before is None:
+        return None
+    level = before.get("progress", {}).get(task["id"], {}).get("hint_level", 0)
+    return level + 1, len(hints), hints[level]
+
+
+def format_hint(level: int, total: int, hint: str) -> str:
+    return f"💡 Hint {level}/{total}: {hint}"
+
+
+async def answer(db, user: dict, task: Optional[dict], message: str) -> Tuple[str, Optional[str], Optional[int]]:
+    """(intent, local reply, hint level if a hint was shown). The reply is None when the message should go to the LLM."""
+    intent, _ = intent_of(message)
+    reply = None
+    level = None
+    if intent in ("greeting", "thanks"):
+        reply = REPLIES[intent].format(name=user.get("name", "there"))
+    elif intent == "hint" and task is None:
+        reply = REPLIES["no_task_hint"]
+    elif intent in ("hint", "solution") and task is not None:
+        hint = await next_hint(db, user["id"], task)
+        if hint is not None:
+            level = hint[0]
+            reply = (REPLIES["solution_prefix"] if intent == "solution" else "") + format_hint(*hint)
+        elif intent == "solution" and task.get("hints"):
+            reply = REPLIES["solution_exhausted"]
+    elif intent == "complexity" and task is not None and task.get("complexity"):
+        reply = REPLIES["complexity"].format(title=task["title"], complexity=task["complexity"])
+    CHAT_ANSWERS_TOTAL.inc("local" if reply is not None else "llm", intent)
+    return intent, reply, level
@@ -0,0 +1,285 @@
+"""In-process scheduler for periodic maintenance jobs.
+
+Every worker runs a `JobRunner` from the app lifespan, but only the worker
+holding the Mongo lease document (`job_leases`, `_id: "scheduler"`) starts
+jobs. The leader renews the lease every `lease_seconds / 3`; if it dies,
+another worker takes over once the lease expires.
+
+Schedules are 5-field cron expressions in UTC (`minute hour day month weekday`,
+with `*`, lists, ranges and `/step`) or one of `@hourly`, `@daily`, `@weekly`.
+Each job's next due time is kept in the `jobs` collection, so a new leader
+neither repeats a run nor skips one that came due during the handover.
+
+Jobs are `async def job(ctx)` coroutines, run with a timeout and retried with
+exponential backoff. CPU-heavy work goes through `ctx.run_heavy`, which uses
+the runner's own thread pool, never the request executor. Run durations and
+outcomes are exported as `job_duration_seconds` / `job_runs_total`.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LEASE_COLLECTION = "job_leases"
+JOBS_COLLECTION = "jobs"
+LEASE_ID = "scheduler"
+TICK_SECONDS = 1.0
+
+CRON_ALIASES = {"@hourly": "0 * * * *", "@daily": "0 0 * * *", "@weekly": "0 0 * * 1"}
+
+JOB_DURATION = metrics.REGISTRY.register(metrics.Histogram(
+    "job_duration_seconds", "Background job run duration", ("job", "status"),
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)))
+JOB_RUNS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "job_runs_total", "Background job runs by outcome", ("job", "status")))
+JOB_LEADER = metrics.REGISTRY.register(metrics.Gauge(
+    "job_scheduler_leader", "1 if this worker holds the job scheduler lease"))
+
+
+class CronSchedule:
+    # (name, min, max) per field; weekday is 0-6 with 0 = Sunday
+    FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 6))
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        parts = CRON_ALIASES.get(expression, expression).split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(part, low, high) for part, (_, low, high) in zip(parts, self.FIELDS))
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(part: str, low: int, high: int) -> Set[int]:
+        values: Set[int] = set()
+        for item in part.split(","):
+            spec, _, step = item.partition("/")
+            if spec == "*":
+                start, end = low, high
+            elif "-" in spec:
+                start, end = (int(x) for x in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+                if step:
+                    end = high
+            if not (low <= start <= end <= high):
+                raise ValueError(f"Cron field {item!r} out of range {low}-{high}")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_matches(self, moment: datetime) -> bool:
+        weekday = (moment.weekday() + 1) % 7
+        if self._any_day or self._any_weekday:
+            # Standard cron: if one of day/weekday is restricted, only it applies
+            return moment.day in self.days and weekday in self.weekdays
+        return moment.day in self.days or weekday in self.weekdays
+
+    def next_after(self, moment: datetime) -> datetime:
+        """First matching minute strictly after `moment` (UTC)."""
+        candidate = moment.astimezone(timezone.utc).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=366 * 5)
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+
+
+class Job:
+    def __init__(self, name: str, schedule: str, func: Callable[["JobContext"], Awaitable[Any]],
+                 timeout: float = 300.0, retries: int = 2, retry_delay: float = 5.0):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.func = func
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+
+class JobContext:
+    def __init__(self, db, executor: ThreadPoolExecutor, job: Job, attempt: int):
+        self.db = db
+        self.job = job
+        self.attempt = attempt
+        self._executor = executor
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        return self._executor
+
+    async def run_heavy(self, func: Callable, *args):
+        """Run CPU-bound work on the job executor, off the event loop and the request executor."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+
+class JobRunner:
+    def __init__(self, db, lease_seconds: float = 30.0, executor_workers: int = 1, worker_id: Optional[str] = None):
+        self.db = db
+        self.lease_seconds = lease_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._executor_workers = executor_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._next_run: Dict[str, datetime] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._lease_renewed_at: Optional[datetime] = None
+
+    def register(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        return job
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=self._executor_workers, thread_name_prefix="jobs")
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._running.values()):
+            task.cancel()
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if self.is_leader:
+            try:
+                await self.db[LEASE_COLLECTION].delete_one({"_id": LEASE_ID, "owner": self.worker_id})
+            except Exception as e:
+                logger.warning(f"Could not release job lease: {e}")
+            self._set_leader(False)
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---- leader election ----
+
+    async def _acquire_lease(self, now: datetime) -> bool:
+        try:
+            lease = await self.db[LEASE_COLLECTION].find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.worker_id}, {"expires_at": {"$lt": now}}]},
+                {"$set": {"owner": self.worker_id, "expires_at": now + timedelta(seconds=self.lease_seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            return False  # held by a live worker; the upsert raced its document
+        return bool(lease and lease.get("owner") == self.worker_id)
+
+    def _set_leader(self, leader: bool):
+        if leader != self.is_leader:
+            logger.info(f"Job scheduler {'acquired' if leader else 'lost'} leadership ({self.worker_id})")
+        self.is_leader = leader
+        JOB_LEADER.set(value=1 if leader else 0)
+
+    async def _loop(self):
+        while True:
+            now = datetime.now(timezone.utc)
+            try:
+                if not self.is_leader or self._lease_renewed_at is None or \
+                        (now - self._lease_renewed_at).total_seconds() >= self.lease_seconds / 3:
+                    leader = await self._acquire_lease(now)
+                    if leader and not self.is_leader:
+                        await self._load_schedule(now)
+                    self._lease_renewed_at = now if leader else None
+                    self._set_leader(leader)
+                if self.is_leader:
+                    await self._start_due(now)
+            except Exception as e:
+                # Mongo unavailable: stop acting as leader until the lease can be confirmed again
+                logger.warning(f"Job scheduler tick failed: {e}")
+                self._set_leader(False)
+                self._lease_renewed_at = None
+            await asyncio.sleep(TICK_SECONDS)
+
+    # ---- scheduling ----
+
+    async def _load_schedule(self, now: datetime):
+        stored = {doc["_id"]: doc async for doc in self.db[JOBS_COLLECTION].find({"_id": {"$in": list(self.jobs)}})}
+        for name, job in self.jobs.items():
+            next_run = stored.get(name, {}).get("next_run")
+            if next_run is not None and next_run.tzinfo is None:
+                next_run = next_run.replace(tzinfo=timezone.utc)
+            self._next_run[name] = next_run or job.schedule.next_after(now)
+
+    async def _start_due(self, now: datetime):
+        for name, job in self.jobs.items():
+            if name not in self._next_run:  # registered after this worker took the lease
+                self._next_run[name] = job.schedule.next_after(now)
+            if name in self._running or now < self._next_run[name]:
+                continue
+            # Advance before running so a crash mid-run doesn't make the next leader repeat it
+            self._next_run[name] = job.schedule.next_after(now)
+            await self.db[JOBS_COLLECTION].update_one(
+                {"_id": name},
+                {"$set": {"next_run": self._next_run[name], "last_started": now, "last_worker": self.worker_id}},
+                upsert=True
+            )
+            task = asyncio.create_task(self._run(job))
+            self._running[name] = task
+            task.add_done_callback(lambda _, name=name: self._running.pop(name, None))
+
+    async def run_now(self, name: str) -> str:
+        """Run a job immediately on this worker (admin/testing), regardless of leadership."""
+        return await self._run(self.jobs[name])
+
+    async def _run(self, job: Job) -> str:
+        status, error = "failed", None
+        loop = asyncio.get_running_loop()
+        for attempt in range(job.retries + 1):
+            started = loop.time()
+            try:
+                await asyncio.wait_for(job.func(JobContext(self.db, self._executor, job, attempt)), job.timeout)
+                status = "success"
+            except asyncio.TimeoutError:
+                status, error = "timeout", f"timed out after {job.timeout}s"
+            except asyncio.CancelledError:
+                JOB_RUNS_TOTAL.inc(job.name, "cancelled")
+                raise
+            except Exception as e:
+                status, error = "failed", repr(e)
+            JOB_DURATION.observe(loop.time() - started, job.name, status)
+            JOB_RUNS_TOTAL.inc(job.name, status)
+            if status == "success":
+                break
+            logger.warning(f"Job {job.name} attempt {attempt + 1}/{job.retries + 1} {status}: {error}")
+            if attempt < job.retries:
+                await asyncio.sleep(job.retry_delay * 2 ** attempt)
+
+        try:
+            await self.db[JOBS_COLLECTION].update_one(
+                {"_id": job.name},
+                {"$set": {"last_finished": datetime.now(timezone.utc), "last_status": status,
+                          "last_error": None if status == "success" else error}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Could not record job {job.name} result: {e}")
+        return status
+
+    def status(self) -> List[dict]:
+        return [{"name": name, "schedule": job.schedule.expression, "running": name in self._running,
+                 "next_run": self._next_run.get(name)} for name, job in self.jobs.items()]
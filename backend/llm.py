@@ -0,0 +1,83 @@
+"""Single gateway for outbound LLM and speech-to-text calls.
+
+Routes go through `LLMGateway` instead of building `LlmChat` clients inline, so
+the API key, model choice, scheduling and timing live in one place. Every call
+is queued on the gateway's `LLMScheduler`, with interactive endpoints ahead of
+background generation. One gateway is created per worker in the app lifespan;
+the LLM_MAX_CONCURRENCY and LLM_TOKENS_PER_MINUTE budgets are for the whole
+deployment and are divided over WEB_CONCURRENCY worker processes.
+"""
+import os
+from typing import BinaryIO, Dict, Optional
+
+import metrics
+from llm_scheduler import BACKGROUND, DEFAULT_COMPLETION_TOKENS, INTERACTIVE, LLMScheduler, estimate_tokens
+
+DEFAULT_PROVIDER = "openai"
+DEFAULT_MODEL = "gpt-5.2"
+
+# Anything not listed here is background work
+ENDPOINT_PRIORITIES: Dict[str, str] = {
+    "/bro/chat": INTERACTIVE,
+    "/bro/voice": INTERACTIVE,
+}
+
+
+class LLMGateway:
+    def __init__(self, api_key: Optional[str], provider: str = DEFAULT_PROVIDER, model: str = DEFAULT_MODEL,
+                 scheduler: Optional[LLMScheduler] = None):
+        self.api_key = api_key
+        self.provider = provider
+        self.model = model
+        self.scheduler = scheduler or LLMScheduler()
+
+    @classmethod
+    def from_env(cls) -> "LLMGateway":
+        return cls(
+            api_key=os.environ.get('EMERGENT_LLM_KEY'),
+            provider=os.environ.get('LLM_PROVIDER', DEFAULT_PROVIDER),
+            model=os.environ.get('LLM_MODEL', DEFAULT_MODEL),
+            scheduler=LLMScheduler(
+                max_concurrency=int(os.environ.get('LLM_MAX_CONCURRENCY', '32')),
+                tokens_per_minute=int(os.environ.get('LLM_TOKENS_PER_MINUTE', '200000')),
+                max_background_wait=float(os.environ.get('LLM_MAX_BACKGROUND_WAIT_SECONDS', '30')),
+                workers=int(os.environ.get('WEB_CONCURRENCY', '1'))
+            )
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def chat(self, endpoint: str, user_id: str, session_id: str, system_message: str, text: str) -> str:
+        """Send one user message and return the model's reply."""
+        from emergentintegrations.llm.chat import LlmChat, UserMessage
+
+        chat = LlmChat(api_key=self.api_key, session_id=session_id, system_message=system_message)
+        chat.with_model(self.provider, self.model)
+
+        async def call():
+            with metrics.llm_timer(endpoint):
+                return await chat.send_message(UserMessage(text=text))
+
+        priority = ENDPOINT_PRIORITIES.get(endpoint, BACKGROUND)
+        return await self.scheduler.submit(priority, user_id, estimate_tokens(system_message, text), call)
+
+    async def transcribe(self, endpoint: str, user_id: str, audio_file: BinaryIO) -> str:
+        """Transcribe an English audio file with Whisper."""
+        from emergentintegrations.llm.openai import OpenAISpeechToText
+
+        stt = OpenAISpeechToText(api_key=self.api_key)
+
+        async def call():
+            with metrics.llm_timer(f"{endpoint}:stt"):
+                return await stt.transcribe(
+                    file=audio_file,
+                    model="whisper-1",
+                    response_format="json",
+                    language="en"
+                )
+
+        priority = ENDPOINT_PRIORITIES.get(endpoint, BACKGROUND)
+        transcription = await self.scheduler.submit(priority, user_id, DEFAULT_COMPLETION_TOKENS, call)
+        return transcription.text
@@ -0,0 +1,188 @@
+"""Priority-aware scheduler in front of every LLM call.
+
+- Two priority classes: interactive (BRO chat/voice) is always dispatched before
+  background work (resume analysis, LinkedIn/GitHub drafts), except that
+  background requests waiting longer than `max_background_wait` are let through
+  so they can't starve.
+- Within a class, users share capacity by start-time fair queuing: each request
+  gets a virtual start tag max(class clock, user's last finish tag) and the
+  smallest tag goes next, so one user's batch of ten can't push everybody else
+  back ten places.
+- Across the deployment, at most `max_concurrency` calls run at once and
+  estimated tokens per minute stay under `tokens_per_minute` (a token bucket).
+  Each worker process runs its own scheduler, so both budgets are split evenly
+  over `workers` and every process enforces its share; with uneven load a busy
+  worker can queue while another has headroom, but the total never overshoots.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import metrics
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, BACKGROUND)
+
+# Rough prompt-size estimate plus a typical completion
+CHARS_PER_TOKEN = 4
+DEFAULT_COMPLETION_TOKENS = 512
+
+LLM_QUEUE_WAIT = metrics.REGISTRY.register(metrics.Histogram(
+    "llm_queue_wait_seconds", "Time LLM requests spend queued in the scheduler", ("priority",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)))
+LLM_QUEUE_DEPTH = metrics.REGISTRY.register(metrics.Gauge(
+    "llm_queue_depth", "LLM requests waiting in the scheduler", ("priority",)))
+LLM_IN_FLIGHT = metrics.REGISTRY.register(metrics.Gauge(
+    "llm_in_flight", "LLM requests currently being served"))
+
+
+def estimate_tokens(*texts: str, completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> int:
+    return sum(len(t) for t in texts if t) // CHARS_PER_TOKEN + completion_tokens
+
+
+class _Request:
+    __slots__ = ("priority", "user_id", "cost", "start_tag", "seq", "enqueued_at", "factory", "future")
+
+    def __init__(self, priority, user_id, cost, start_tag, seq, factory, future):
+        self.priority = priority
+        self.user_id = user_id
+        self.cost = cost
+        self.start_tag = start_tag
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.factory = factory
+        self.future = future
+
+    def __lt__(self, other: "_Request") -> bool:
+        return (self.start_tag, self.seq) < (other.start_tag, other.seq)
+
+
+class _FairQueue:
+    """Start-time fair queue across users for one priority class."""
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self.heap: List[_Request] = []
+        self.clock = 0.0
+        self.last_finish: Dict[str, float] = {}
+
+    def start_tag(self, user_id: str) -> float:
+        return max(self.clock, self.last_finish.get(user_id, 0.0))
+
+    def push(self, request: _Request, weight: float):
+        heapq.heappush(self.heap, request)
+        self.last_finish[request.user_id] = request.start_tag + request.cost / weight
+
+    def peek(self) -> Optional[_Request]:
+        while self.heap and self.heap[0].future.done():
+            heapq.heappop(self.heap)  # caller gave up while queued
+            LLM_QUEUE_DEPTH.dec(self.priority)
+        return self.heap[0] if self.heap else None
+
+    def pop(self) -> _Request:
+        request = heapq.heappop(self.heap)
+        self.clock = max(self.clock, request.start_tag)
+        if len(self.last_finish) > 10000:
+            self.last_finish = {u: f for u, f in self.last_finish.items() if f > self.clock}
+        return request
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 32, tokens_per_minute: int = 200000,
+                 max_background_wait: float = 30.0, workers: int = 1):
+        # This process's share of the deployment-wide budgets
+        workers = max(1, workers)
+        self.max_concurrency = max(1, max_concurrency // workers)
+        self.tokens_per_minute = max(1, tokens_per_minute // workers)
+        self.max_background_wait = max_background_wait
+        self._queues = {p: _FairQueue(p) for p in PRIORITIES}
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._tokens = float(self.tokens_per_minute)
+        self._tokens_at = time.monotonic()
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    def queue_depth(self, priority: str) -> int:
+        return len(self._queues[priority])
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def submit(self, priority: str, user_id: str, cost: int,
+                     factory: Callable[[], Awaitable[Any]], weight: float = 1.0) -> Any:
+        """Queue `factory()` and return its result once the scheduler has run it."""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+        cost = max(1, min(cost, self.tokens_per_minute))
+        queue = self._queues[priority]
+        future = asyncio.get_running_loop().create_future()
+        request = _Request(priority, user_id, cost, queue.start_tag(user_id), next(self._seq), factory, future)
+        queue.push(request, weight)
+        LLM_QUEUE_DEPTH.inc(priority)
+        self._pump()
+        # If the caller is cancelled while queued, awaiting cancels the future too
+        # and peek() drops the request
+        return await future
+
+    def _refill(self, now: float):
+        elapsed = now - self._tokens_at
+        self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+        self._tokens_at = now
+
+    def _next_request(self, now: float) -> Optional[_Request]:
+        interactive = self._queues[INTERACTIVE].peek()
+        background = self._queues[BACKGROUND].peek()
+        if background and (interactive is None or now - background.enqueued_at >= self.max_background_wait):
+            return background
+        return interactive
+
+    def _pump(self):
+        loop = asyncio.get_running_loop()
+        while self._in_flight < self.max_concurrency:
+            now = time.monotonic()
+            request = self._next_request(now)
+            if request is None:
+                return
+            self._refill(now)
+            if self._tokens < request.cost:
+                # Over the tokens-per-minute ceiling: come back when enough has refilled
+                delay = (request.cost - self._tokens) * 60 / self.tokens_per_minute
+                if self._wakeup is None or self._wakeup.cancelled():
+                    self._wakeup = loop.call_later(delay, self._on_wakeup)
+                return
+
+            self._queues[request.priority].pop()
+            self._tokens -= request.cost
+            self._in_flight += 1
+            LLM_QUEUE_DEPTH.dec(request.priority)
+            LLM_IN_FLIGHT.inc()
+            LLM_QUEUE_WAIT.observe(now - request.enqueued_at, request.priority)
+            task = loop.create_task(self._run(request))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        self._pump()
+
+    async def _run(self, request: _Request):
+        try:
+            result = await request.factory()
+        except BaseException as e:
+            if not request.future.done():
+                request.future.set_exception(e)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+        finally:
+            self._in_flight -= 1
+            LLM_IN_FLIGHT.dec()
+            self._pump()
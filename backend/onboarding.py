@@ -0,0 +1,227 @@
+"""Bulk cohort onboarding from a CSV or NDJSON roster.
+
+A roster row has `email` and optionally `name`, `password` and `timezone`.
+Rows are validated up front and every row gets an entry in the report:
+`created`, `duplicate` (already registered, or repeated in the roster) or
+`invalid`.
+
+Rows with a password are bcrypt-hashed in parallel in a process pool. Rows
+without one get an invite token instead: a random secret stored as a SHA-256
+hash, exchanged for a password at `/auth/activate`. That makes large rosters
+cheap, since at the default cost bcrypt is ~0.3s of CPU per user. Users are
+written with unordered `insert_many` batches, and duplicates are detected by
+the unique email index rather than a lookup per row.
+
+    python onboarding.py roster.csv [--report report.ndjson] [--workers 4]
+"""
+import csv
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import secrets
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import bcrypt
+from email_validator import EmailNotValidError, validate_email
+from pymongo.errors import BulkWriteError
+
+import activity
+
+ROSTER_FORMATS = ("csv", "ndjson")
+INSERT_BATCH_SIZE = 1000
+HASH_CHUNK_SIZE = 16
+INVITE_TTL_DAYS = 14
+DUPLICATE_KEY = 11000
+
+
+def new_user_document(email: str, name: str, password_hash: Optional[str], tz_name: Optional[str] = None) -> dict:
+    """A fresh user document, as created by `/auth/register` and bulk onboarding."""
+    user_tz = tz_name or activity.DEFAULT_TIMEZONE
+    today = activity.local_today(user_tz)
+    created_at = datetime.now(timezone.utc).isoformat()
+    return {
+        "id": str(uuid.uuid4()),
+        "email": email.lower(),
+        "name": name,
+        "password_hash": password_hash,
+        "role": None,
+        "points": 0,
+        "level": "Beginner",
+        "created_at": created_at,
+        "updated_at": created_at,
+        "timezone": user_tz,
+        "progress": {},
+        "progress_version": 0,
+        "weekly_activity": activity.empty_rollup("week", activity.week_key(today)),
+        "monthly_activity": activity.empty_rollup("month", activity.month_key(today)),
+        "streak": {"current": 0, "longest": 0, "last_activity": None},
+        "resumes": []
+    }
+
+
+def invite_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def parse_roster(text: str, fmt: str) -> List[dict]:
+    """Roster rows as dicts with lower-cased keys and a 1-based `row` number."""
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        rows = [{(k or "").strip().lower(): (v or "").strip() for k, v in record.items()} for record in reader]
+    elif fmt == "ndjson":
+        rows = []
+        for line_no, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Line {line_no}: {e}")
+            if not isinstance(record, dict):
+                raise ValueError(f"Line {line_no}: expected a JSON object")
+            rows.append({str(k).lower(): str(v).strip() if v is not None else "" for k, v in record.items()})
+    else:
+        raise ValueError(f"Unknown roster format {fmt!r}; choose from {list(ROSTER_FORMATS)}")
+    for i, row in enumerate(rows, 1):
+        row["row"] = i
+    return rows
+
+
+def _hash_chunk(passwords: List[str]) -> List[str]:
+    return [bcrypt.hashpw(p.encode(), bcrypt.gensalt()).decode() for p in passwords]
+
+
+def hash_passwords(passwords: List[str], workers: int) -> List[str]:
+    """bcrypt-hash passwords across a process pool (spawned, so it's safe from a threaded server)."""
+    if not passwords:
+        return []
+    chunks = [passwords[i:i + HASH_CHUNK_SIZE] for i in range(0, len(passwords), HASH_CHUNK_SIZE)]
+    if workers <= 1 or len(chunks) == 1:
+        return [h for chunk in chunks for h in _hash_chunk(chunk)]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        return [h for hashed in pool.map(_hash_chunk, chunks) for h in hashed]
+
+
+class RosterImport:
+    """Validates a parsed roster and inserts the valid rows; `report` is filled in as it goes."""
+
+    def __init__(self, rows: List[dict], email_validator: Callable[[str], bool]):
+        self.report: List[dict] = []
+        self.pending: List[dict] = []
+        seen = set()
+        for row in rows:
+            entry = {"row": row["row"], "email": row.get("email", "")}
+            self.report.append(entry)
+            try:
+                email = validate_email(row.get("email", ""), check_deliverability=False).normalized.lower()
+            except EmailNotValidError as e:
+                entry.update(status="invalid", detail=str(e))
+                continue
+            entry["email"] = email
+            if not email_validator(email):
+                entry.update(status="invalid", detail="Not an educational email")
+            elif row.get("timezone") and not activity.is_valid_timezone(row["timezone"]):
+                entry.update(status="invalid", detail="Invalid timezone")
+            elif email in seen:
+                entry.update(status="duplicate", detail="Repeated in roster")
+            else:
+                seen.add(email)
+                self.pending.append({**row, "email": email, "entry": entry})
+
+    async def run(self, db, loop_executor=None, hash_workers: int = 1,
+                  batch_size: int = INSERT_BATCH_SIZE) -> dict:
+        import asyncio
+
+        with_password = [r for r in self.pending if r.get("password")]
+        hashes = await asyncio.get_running_loop().run_in_executor(
+            loop_executor, hash_passwords, [r["password"] for r in with_password], hash_workers)
+        for row, hashed in zip(with_password, hashes):
+            row["password_hash"] = hashed
+
+        invite_expires = datetime.now(timezone.utc) + timedelta(days=INVITE_TTL_DAYS)
+        docs = []
+        for row in self.pending:
+            doc = new_user_document(row["email"], row.get("name") or row["email"].split("@")[0],
+                                    row.get("password_hash"), row.get("timezone") or None)
+            if doc["password_hash"] is None:
+                token = secrets.token_urlsafe(24)
+                doc["invite"] = {"token_hash": invite_hash(token), "expires_at": invite_expires}
+                row["entry"]["invite_token"] = token
+            row["entry"].update(status="created", id=doc["id"])
+            docs.append(doc)
+
+        for start in range(0, len(docs), batch_size):
+            batch = docs[start:start + batch_size]
+            try:
+                await db.users.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    entry = self.pending[start + error["index"]]["entry"]
+                    entry.pop("invite_token", None)
+                    entry.pop("id", None)
+                    if error.get("code") == DUPLICATE_KEY:
+                        entry.update(status="duplicate", detail="Email already registered")
+                    else:
+                        entry.update(status="error", detail=error.get("errmsg", "insert failed"))
+        return self.summary()
+
+    def summary(self) -> dict:
+        counts: Dict[str, int] = {}
+        for entry in self.report:
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return {"counts": counts, "rows": self.report}
+
+
+def roster_format(filename: str, explicit: Optional[str] = None) -> str:
+    if explicit:
+        return explicit
+    return "ndjson" if Path(filename or "").suffix.lower() in (".ndjson", ".jsonl", ".json") else "csv"
+
+
+def main():
+    import asyncio
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    def import_roster(roster: Path, format: Optional[str] = None, report: Optional[Path] = None,
+                      workers: int = os.cpu_count() or 1, batch_size: int = INSERT_BATCH_SIZE):
+        """Onboard every student in a CSV/NDJSON roster; writes the per-row report as NDJSON."""
+        import emailpolicy
+
+        rows = parse_roster(roster.read_text(encoding="utf-8-sig"), roster_format(roster.name, format))
+
+        async def run() -> dict:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            try:
+                db = client[os.environ['DB_NAME']]
+                await db.users.create_index("email", unique=True)
+                policy = emailpolicy.PolicyStore()
+                await policy.refresh(db, force=True)
+                job = RosterImport(rows, policy.policy.allows)
+                return await job.run(db, hash_workers=workers, batch_size=batch_size)
+            finally:
+                client.close()
+
+        result = asyncio.run(run())
+        out = report.open("w") if report else None
+        for entry in result["rows"]:
+            typer.echo(json.dumps(entry), file=out)
+        if out:
+            out.close()
+        typer.echo(" ".join(f"{k}={v}" for k, v in sorted(result["counts"].items())), err=True)
+
+    typer.run(import_roster)
+
+
+if __name__ == "__main__":
+    main()
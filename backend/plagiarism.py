@@ -0,0 +1,416 @@
+"""Near-duplicate detection for submitted code: normalized tokens, MinHash and LSH.
+
+Code is normalized before comparison so cosmetic edits don't hide a copy. Python
+is parsed and rewritten from its AST: every identifier that isn't a builtin
+becomes `v`, function and class names become `f`/`c`, string literals and
+docstrings are blanked, and `ast.unparse` drops comments and formatting.
+Anything that doesn't parse (SQL, broken code) falls back to a lexical
+tokenizer with comments and string contents stripped.
+
+The token stream is cut into `SHINGLE_SIZE`-grams and summarized as a
+`NUM_PERM`-value MinHash signature, whose agreement estimates the Jaccard
+similarity of the shingle sets. Signatures are split into `BANDS` bands of
+`ROWS` values. Two submissions become candidates only if some band is
+identical, so candidates are found by bucket lookups, not all-pairs
+comparison. With 16 bands of 8, pairs at 0.8 similarity are candidates ~95% of
+the time and pairs at 0.5 only ~6%. Candidates are confirmed against
+`MATCH_THRESHOLD` using the full signatures.
+
+Submissions that match the task's own starter code or published solution are
+kept out of the buckets. Otherwise everyone who submitted the untouched
+template would match everyone else.
+
+Signatures are indexed per task in `submission_signatures` as submissions
+arrive (`prepare` + `index`), and confirmed pairs are kept in
+`similarity_matches`. `scan` rebuilds both for a whole cohort in one pass,
+computing signatures across a process pool:
+
+    python plagiarism.py [--task arr-001] [--domain iitb.ac.in] [--workers 8] [--report matches.ndjson]
+"""
+import ast
+import builtins
+import hashlib
+import io
+import multiprocessing
+import os
+import re
+import tokenize
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from bson import Binary
+from pymongo import ReplaceOne
+
+import metrics
+import submissions
+
+SIGNATURES_COLLECTION = "submission_signatures"
+MATCHES_COLLECTION = "similarity_matches"
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 5
+MIN_SHINGLES = 8          # shorter code can't be told apart from coincidence
+MATCH_THRESHOLD = 0.8
+MAX_BUCKET_SIZE = 200     # a bucket this full is boilerplate, not a copy ring
+SIGNATURE_CHUNK_SIZE = 256
+LOAD_BATCH_SIZE = 1000
+
+_PRIME = (1 << 31) - 1
+_hash_params = np.random.default_rng(0x5EED).integers(1, _PRIME, size=(2, NUM_PERM, 1), dtype=np.int64)
+_A, _B = _hash_params[0], _hash_params[1]
+_KEEP_NAMES = frozenset(dir(builtins)) | {"self", "cls"}
+_COMMENT_RE = re.compile(r"--[^\n]*|#[^\n]*|//[^\n]*|/\*.*?\*/", re.S)
+_LEXICAL_TOKEN_RE = re.compile(r"'(?:[^'\\\n]|\\.)*'|\"(?:[^\"\\\n]|\\.)*\"|[A-Za-z_]\w*|\d+(?:\.\d+)?|[^\s\w]")
+_CODE_BLOCK_RE = re.compile(r"```\w*\n(.*?)```", re.S)
+_SKIPPED_TOKENS = {tokenize.ENCODING, tokenize.NL, tokenize.COMMENT, tokenize.ENDMARKER}
+_STRUCTURE_TOKENS = {tokenize.NEWLINE: ";", tokenize.INDENT: "{", tokenize.DEDENT: "}"}
+
+PLAGIARISM_MATCHES_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "plagiarism_matches_total", "Submission pairs confirmed above the similarity threshold", ("mode",)))
+
+
+class _Normalizer(ast.NodeTransformer):
+    @staticmethod
+    def _drop_docstring(node):
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            node.body = body[1:] or [ast.Pass()]
+
+    def visit_Module(self, node):
+        self._drop_docstring(node)
+        return self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        self._drop_docstring(node)
+        node.name, node.returns = "f", None
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._drop_docstring(node)
+        node.name = "c"
+        return self.generic_visit(node)
+
+    def visit_Name(self, node):
+        if node.id not in _KEEP_NAMES:
+            node.id = "v"
+        return node
+
+    def visit_arg(self, node):
+        if node.arg not in _KEEP_NAMES:
+            node.arg = "v"
+        node.annotation = None
+        return node
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, str):
+            node.value = "s"
+        return node
+
+
+def tokens(code: str) -> List[str]:
+    """Normalized token stream: renamed identifiers, no comments, whitespace or string contents."""
+    try:
+        source = ast.unparse(_Normalizer().visit(ast.parse(code)))
+        return [_STRUCTURE_TOKENS.get(tok.type, tok.string)
+                for tok in tokenize.generate_tokens(io.StringIO(source).readline) if tok.type not in _SKIPPED_TOKENS]
+    except (SyntaxError, ValueError, RecursionError, tokenize.TokenError):
+        return [t if t[0] not in "'\"" else "s" for t in _LEXICAL_TOKEN_RE.findall(_COMMENT_RE.sub(" ", code.lower()))]
+
+
+def shingles(code: str) -> np.ndarray:
+    """Distinct 32-bit hashes of the token `SHINGLE_SIZE`-grams (CRC32, so stable across processes)."""
+    toks = tokens(code)
+    grams = ["\x1f".join(toks[i:i + SHINGLE_SIZE]) for i in range(max(1, len(toks) - SHINGLE_SIZE + 1))] if toks else []
+    return np.unique(np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.int64, count=len(grams)))
+
+
+def signature(code: str) -> Optional[np.ndarray]:
+    """MinHash signature of `code`, or None if it's too short to compare meaningfully."""
+    values = shingles(code)
+    if len(values) < MIN_SHINGLES:
+        return None
+    values = values % _PRIME
+    sig = np.full(NUM_PERM, _PRIME, dtype=np.int64)
+    for start in range(0, len(values), 4096):
+        chunk = values[start:start + 4096]
+        np.minimum(sig, ((_A * chunk + _B) % _PRIME).min(axis=1), out=sig)
+    return sig.astype(np.uint32)
+
+
+def band_keys(sig: np.ndarray) -> List[str]:
+    return [f"{i:02d}" + hashlib.blake2b(sig[i * ROWS:(i + 1) * ROWS].tobytes(), digest_size=8).hexdigest()
+            for i in range(BANDS)]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def to_binary(sig: np.ndarray) -> Binary:
+    return Binary(sig.astype("<u4").tobytes())
+
+
+def from_binary(data: bytes) -> np.ndarray:
+    return np.frombuffer(bytes(data), dtype="<u4")
+
+
+@lru_cache(maxsize=4096)
+def _reference_signatures(starter_code: str, solution_explanation: str) -> Tuple[np.ndarray, ...]:
+    sources = [starter_code, *_CODE_BLOCK_RE.findall(solution_explanation)]
+    return tuple(sig for sig in map(signature, sources) if sig is not None)
+
+
+def prepare(task: dict, code: str) -> Optional[Tuple[np.ndarray, List[str]]]:
+    """(signature, band keys) for a submission; no bands if it's just the task's own starter/solution code.
+
+    CPU-bound; run it off the event loop.
+    """
+    sig = signature(code)
+    if sig is None:
+        return None
+    references = _reference_signatures(task.get("starter_code") or "", task.get("solution_explanation") or "")
+    if any(similarity(sig, ref) >= MATCH_THRESHOLD for ref in references):
+        return sig, []
+    return sig, band_keys(sig)
+
+
+def match_document(task_id: str, user_a: str, user_b: str, score: float, identical: bool, now: datetime) -> dict:
+    users = sorted((user_a, user_b))
+    return {"_id": f"{task_id}:{users[0]}:{users[1]}", "task_id": task_id, "users": users,
+            "similarity": round(score, 3), "identical": identical, "detected_at": now}
+
+
+async def ensure_indexes(db):
+    await db[SIGNATURES_COLLECTION].create_index([("task_id", 1), ("bands", 1)])
+    await db[MATCHES_COLLECTION].create_index([("task_id", 1), ("similarity", -1)])
+    await db[MATCHES_COLLECTION].create_index([("similarity", -1)])
+    await db[MATCHES_COLLECTION].create_index("users")
+
+
+async def index(db, task_id: str, user_id: str, code_hash: str,
+                prepared: Optional[Tuple[np.ndarray, List[str]]]) -> List[dict]:
+    """Index a user's latest submission for a task and re-check it against the task's bucket-mates.
+
+    Matches from the user's previous submission are dropped first. As in `find_matches`, buckets
+    holding more than `MAX_BUCKET_SIZE` submissions (this one included) are skipped. Returns the
+    new matches.
+    """
+    import asyncio
+
+    doc_id = f"{task_id}:{user_id}"
+    await db[MATCHES_COLLECTION].delete_many({"task_id": task_id, "users": user_id})
+    if prepared is None:
+        await db[SIGNATURES_COLLECTION].delete_one({"_id": doc_id})
+        return []
+    sig, bands = prepared
+    now = datetime.now(timezone.utc)
+    await db[SIGNATURES_COLLECTION].replace_one(
+        {"_id": doc_id},
+        {"task_id": task_id, "user_id": user_id, "code_hash": code_hash, "signature": to_binary(sig),
+         "bands": bands, "updated_at": now},
+        upsert=True
+    )
+    if not bands:
+        return []
+
+    # Counting stops past the cap, so a boilerplate bucket costs no more than a small one
+    sizes = await asyncio.gather(*(
+        db[SIGNATURES_COLLECTION].count_documents({"task_id": task_id, "bands": key}, limit=MAX_BUCKET_SIZE + 1)
+        for key in bands))
+    bands = [key for key, size in zip(bands, sizes) if size <= MAX_BUCKET_SIZE]
+    if not bands:
+        return []
+
+    matches = []
+    cursor = db[SIGNATURES_COLLECTION].find(
+        {"task_id": task_id, "bands": {"$in": bands}, "user_id": {"$ne": user_id}},
+        {"user_id": 1, "code_hash": 1, "signature": 1}
+    )
+    async for other in cursor:
+        identical = other["code_hash"] == code_hash
+        score = 1.0 if identical else similarity(sig, from_binary(other["signature"]))
+        if score >= MATCH_THRESHOLD:
+            matches.append(match_document(task_id, user_id, other["user_id"], score, identical, now))
+    if matches:
+        await db[MATCHES_COLLECTION].bulk_write([ReplaceOne({"_id": m["_id"]}, m, upsert=True) for m in matches],
+                                                ordered=False)
+        PLAGIARISM_MATCHES_TOTAL.inc("incremental", amount=len(matches))
+    return matches
+
+
+def find_matches(task_id: str, entries: Sequence[Tuple[str, str, np.ndarray, List[str]]],
+                 now: Optional[datetime] = None) -> Tuple[List[dict], int]:
+    """Confirmed matches among one task's (user_id, code_hash, signature, bands) entries, and the candidate count.
+
+    Buckets holding more than `MAX_BUCKET_SIZE` submissions are skipped.
+    """
+    now = now or datetime.now(timezone.utc)
+    buckets: Dict[str, List[int]] = defaultdict(list)
+    for i, (_, _, _, bands) in enumerate(entries):
+        for key in bands:
+            buckets[key].append(i)
+    candidates: Set[Tuple[int, int]] = set()
+    for members in buckets.values():
+        if 1 < len(members) <= MAX_BUCKET_SIZE:
+            candidates.update((a, b) for pos, a in enumerate(members) for b in members[pos + 1:])
+    matches = []
+    for a, b in candidates:
+        user_a, hash_a, sig_a, _ = entries[a]
+        user_b, hash_b, sig_b, _ = entries[b]
+        identical = hash_a == hash_b
+        score = 1.0 if identical else similarity(sig_a, sig_b)
+        if score >= MATCH_THRESHOLD:
+            matches.append(match_document(task_id, user_a, user_b, score, identical, now))
+    return matches, len(candidates)
+
+
+def _prepare_chunk(task: dict, codes: List[str]) -> List[Optional[Tuple[bytes, List[str]]]]:
+    out = []
+    for code in codes:
+        prepared = prepare(task, code)
+        out.append(None if prepared is None else (prepared[0].tobytes(), prepared[1]))
+    return out
+
+
+def prepare_many(work: Iterable[Tuple[dict, List[str]]], workers: int) -> List[List[Optional[Tuple[np.ndarray, List[str]]]]]:
+    """`prepare` over (task, codes) chunks, across a process pool (spawned, so it's safe from a threaded server)."""
+    work = list(work)
+    if workers <= 1 or len(work) <= 1:
+        results = [_prepare_chunk(task, codes) for task, codes in work]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(work)),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(pool.map(_prepare_chunk, *zip(*work)))
+    return [[None if p is None else (np.frombuffer(p[0], dtype=np.uint32), p[1]) for p in chunk] for chunk in results]
+
+
+async def scan(db, catalog, workers: int = 1, task_ids: Optional[Iterable[str]] = None,
+               user_filter: Optional[dict] = None, loop_executor=None) -> dict:
+    """Re-index and re-match every submission of the users matching `user_filter` (a cohort), per task.
+
+    Distinct code is signed once per task, across `workers` processes. Matches between two cohort
+    members that no longer hold are removed; matches with users outside the cohort are left alone.
+    """
+    import asyncio
+
+    wanted = set(task_ids) if task_ids else None
+    per_task: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    inline_code: Dict[str, str] = {}
+    cohort: Set[str] = set()
+    async for user in db.users.find(user_filter or {}, {"_id": 0, "id": 1, "progress": 1}):
+        cohort.add(user["id"])
+        for task_id, entry in (user.get("progress") or {}).items():
+            if not isinstance(entry, dict) or (wanted is not None and task_id not in wanted):
+                continue
+            code_hash = entry.get("code_hash")
+            if not code_hash and isinstance(entry.get("code"), str):  # not yet migrated to blobs
+                code_hash = submissions.digest(entry["code"])
+                inline_code[code_hash] = entry["code"]
+            if code_hash and catalog.find_task(task_id):
+                per_task[task_id].append((user["id"], code_hash))
+
+    code: Dict[str, str] = dict(inline_code)
+    missing = list({h for entries in per_task.values() for _, h in entries} - code.keys())
+    for start in range(0, len(missing), LOAD_BATCH_SIZE):
+        async for blob in db[submissions.BLOB_COLLECTION].find({"_id": {"$in": missing[start:start + LOAD_BATCH_SIZE]}}):
+            code[blob["_id"]] = submissions.decode(blob["codec"], blob["data"])
+
+    # One signature per distinct (task, code), computed in chunks across the pool
+    work, keys = [], []
+    for task_id, entries in per_task.items():
+        hashes = sorted({h for _, h in entries if h in code})
+        for start in range(0, len(hashes), SIGNATURE_CHUNK_SIZE):
+            chunk = hashes[start:start + SIGNATURE_CHUNK_SIZE]
+            work.append((dict(catalog.find_task(task_id)), [code[h] for h in chunk]))
+            keys.append((task_id, chunk))
+    results = await asyncio.get_running_loop().run_in_executor(loop_executor, prepare_many, work, workers)
+    prepared: Dict[Tuple[str, str], Optional[Tuple[np.ndarray, List[str]]]] = {}
+    for (task_id, chunk), chunk_results in zip(keys, results):
+        prepared.update(((task_id, h), p) for h, p in zip(chunk, chunk_results))
+
+    now = datetime.now(timezone.utc)
+    summary = {"users": len(cohort), "tasks": len(per_task), "submissions": 0, "signed": len(prepared),
+               "candidates": 0, "matches": []}
+    for task_id, entries in per_task.items():
+        indexed = [(user_id, h, *prepared[(task_id, h)]) for user_id, h in entries
+                   if prepared.get((task_id, h)) is not None]
+        summary["submissions"] += len(entries)
+        matches, candidates = find_matches(task_id, indexed, now)
+        summary["candidates"] += candidates
+        summary["matches"].extend(matches)
+
+        signature_writes = [ReplaceOne({"_id": f"{task_id}:{user_id}"},
+                                       {"task_id": task_id, "user_id": user_id, "code_hash": h,
+                                        "signature": to_binary(sig), "bands": bands, "updated_at": now}, upsert=True)
+                            for user_id, h, sig, bands in indexed]
+        for start in range(0, len(signature_writes), LOAD_BATCH_SIZE):
+            await db[SIGNATURES_COLLECTION].bulk_write(signature_writes[start:start + LOAD_BATCH_SIZE], ordered=False)
+
+        found = {m["_id"] for m in matches}
+        stale = [m["_id"] async for m in db[MATCHES_COLLECTION].find({"task_id": task_id, "users": {"$in": list(cohort)}},
+                                                                     {"users": 1})
+                 if m["_id"] not in found and all(u in cohort for u in m["users"])]
+        if stale:
+            await db[MATCHES_COLLECTION].delete_many({"_id": {"$in": stale}})
+        if matches:
+            await db[MATCHES_COLLECTION].bulk_write([ReplaceOne({"_id": m["_id"]}, m, upsert=True) for m in matches],
+                                                    ordered=False)
+    PLAGIARISM_MATCHES_TOTAL.inc("batch", amount=len(summary["matches"]))
+    return summary
+
+
+def main():
+    import asyncio
+    import json
+    import time
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    import content
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    def scan_cohort(task: Optional[List[str]] = typer.Option(None, help="Only these task ids (repeatable)"),
+                    domain: Optional[str] = typer.Option(None, help="Only users whose email is at this domain"),
+                    workers: int = os.cpu_count() or 1, report: Optional[Path] = None):
+        """Re-index every submission of a cohort and list pairs above the similarity threshold as NDJSON."""
+        catalog = content.load_catalog(Path(os.environ.get('CONTENT_DIR', Path(__file__).parent / 'content')))
+        user_filter = {"email": {"$regex": f"@{re.escape(domain.lower())}$"}} if domain else None
+
+        async def run() -> dict:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            try:
+                db = client[os.environ['DB_NAME']]
+                await ensure_indexes(db)
+                return await scan(db, catalog, workers=workers, task_ids=task, user_filter=user_filter)
+            finally:
+                client.close()
+
+        started = time.perf_counter()
+        result = asyncio.run(run())
+        out = report.open("w") if report else None
+        for match in sorted(result["matches"], key=lambda m: -m["similarity"]):
+            typer.echo(json.dumps({**match, "detected_at": match["detected_at"].isoformat()}), file=out)
+        if out:
+            out.close()
+        typer.echo(f"users={result['users']} tasks={result['tasks']} submissions={result['submissions']} "
+                   f"signed={result['signed']} candidates={result['candidates']} matches={len(result['matches'])} "
+                   f"took={time.perf_counter() - started:.1f}s", err=True)
+
+    typer.run(scan_cohort)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+"""Python code runs in warm, single-use worker processes forked from a preloaded template.
+
+A naive sandbox would start a fresh interpreter per run and pay seconds of
+`import pandas` / `sklearn` each time. `WarmPool` instead uses a
+multiprocessing forkserver whose template process, before it forks anything:
+- imports `PRELOAD_MODULES` (those that are installed),
+- memory-maps the course datasets in `content/datasets` read-only, and builds
+  a pandas DataFrame for each,
+- freezes the GC, so collections in children don't write to the template's
+  objects and un-share their pages.
+
+Each run gets its own child forked from that template, so imports and datasets
+are already in memory. Pages are shared copy-on-write with the template and
+every other child, so a run only pays for what it writes. A child runs one
+submission and exits, so no state leaks between runs. `size` children are kept
+forked and idle ahead of demand, and a replacement is forked as soon as one is
+taken.
+
+Datasets are `<name>.csv` (converted once into an Arrow IPC cache,
+`.<name>.arrow`, rebuilt when the CSV changes) or `<name>.npy`. Submitted code
+reads them with `load_dataset(name)`. A child's copy-on-write means mutating
+one never affects another run.
+
+Limits per run: wall-clock `timeout` (the child is killed), CPU seconds,
+address space above the template's, no file writes, and `MAX_OUTPUT_CHARS` of
+captured stdout/stderr. These limit resource use; they are not a security
+boundary. Two things reduce what a submission can reach in-process:
+- the forkserver starts with a minimal environment (`SAFE_ENV_KEYS`), so no
+  child inherits the server's secrets (`MONGO_URL`, the JWT secret, LLM keys),
+- `load_dataset` is defined in a namespace holding only builtins and the
+  datasets, so its `__globals__` doesn't lead to this module or `os`.
+
+Submitted code can still import modules, read files and open sockets as the
+server's user. Only enable workers (`CODE_EXECUTION_WORKERS` in server.py)
+where the process runs under real isolation: a separate unprivileged uid, no
+network access, and its own namespace or container with nothing mounted that
+students shouldn't read.
+"""
+import builtins
+import gc
+import importlib
+import io
+import multiprocessing
+import multiprocessing.process
+import os
+import platform
+import signal
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from importlib import metadata
+from multiprocessing import forkserver
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Optional
+
+import metrics
+
+try:
+    import resource
+except ImportError:  # not on Windows; runs there get only the wall-clock limit
+    resource = None
+
+PRELOAD_MODULES = ("numpy", "pandas", "pyarrow", "sklearn.model_selection", "sklearn.linear_model")
+# Distributions whose versions can change a run's output
+RUNTIME_DISTRIBUTIONS = ("numpy", "pandas", "pyarrow", "scikit-learn")
+# The only variables of the server's environment the forkserver (and so every run) inherits
+SAFE_ENV_KEYS = ("PATH", "LANG", "LC_ALL", "LC_CTYPE", "TZ", "TMPDIR", "PYTHONHOME")
+TEMPLATE_ENV = "PYRUNNER_TEMPLATE_DATASETS"
+PARENT_MAIN_ENV = "PYRUNNER_PARENT_MAIN"
+POOL_SIZE = 2
+RUN_TIMEOUT_SECONDS = 5.0
+MEMORY_LIMIT_MB = 512
+MAX_OUTPUT_CHARS = 64 * 1024
+MAX_CODE_CHARS = 100_000
+# One BLAS thread per child; runs are parallel across processes
+_SINGLE_THREAD_ENV = {"OMP_NUM_THREADS": "1", "OPENBLAS_NUM_THREADS": "1", "MKL_NUM_THREADS": "1"}
+
+CODE_RUNS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "code_runs_total", "Python code runs by outcome", ("result",)))
+CODE_RUN_DURATION = metrics.REGISTRY.register(metrics.Histogram(
+    "code_run_duration_seconds", "Python code run time, including handing the code to a warm worker",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)))
+
+# Filled in the template process (see `warm`); children inherit it
+_DATASETS: Dict[str, object] = {}
+
+
+def arrow_cache_path(csv_path: Path) -> Path:
+    return csv_path.with_name(f".{csv_path.stem}.arrow")
+
+
+def prepare_datasets(datasets_dir: Path) -> List[str]:
+    """Convert CSV datasets to Arrow IPC files (if missing or stale) so the template can memory-map them."""
+    import pyarrow.csv
+    import pyarrow.ipc
+
+    names = []
+    for csv_path in sorted(Path(datasets_dir).glob("*.csv")):
+        cache = arrow_cache_path(csv_path)
+        if not cache.exists() or cache.stat().st_mtime_ns < csv_path.stat().st_mtime_ns:
+            table = pyarrow.csv.read_csv(csv_path)
+            tmp = cache.with_name(f"{cache.name}.{os.getpid()}.tmp")
+            with pyarrow.ipc.new_file(str(tmp), table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp, cache)
+        names.append(csv_path.stem)
+    names.extend(p.stem for p in sorted(Path(datasets_dir).glob("*.npy")))
+    return names
+
+
+def _main_path() -> Optional[str]:
+    """The parent's main script as multiprocessing reports it to children (see `spawn.get_preparation_data`)."""
+    path = getattr(sys.modules["__main__"], "__file__", None)
+    if path is None or getattr(sys.modules["__main__"].__spec__, "name", None) is not None:
+        return None
+    return os.path.normpath(os.path.join(multiprocessing.process.ORIGINAL_DIR or "", path))
+
+
+def warm(datasets_dir: Path, parent_main: Optional[str] = None):
+    """Template setup: import the heavy libraries and map every dataset, once, before any fork."""
+    os.environ.update(_SINGLE_THREAD_ENV)
+    if parent_main:
+        # Children otherwise re-run the parent's main script as __mp_main__ before each run
+        # (with uvicorn or a benchmark, importing the whole app): make it look already loaded
+        sys.modules["__main__"].__file__ = parent_main
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    datasets_dir = Path(datasets_dir)
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        for path in sorted(datasets_dir.glob(".*.arrow")):
+            table = pyarrow.ipc.open_file(pyarrow.memory_map(str(path), "r")).read_all()
+            try:
+                _DATASETS[path.stem.lstrip(".")] = table.to_pandas()
+            except ImportError:
+                _DATASETS[path.stem.lstrip(".")] = table  # no pandas: the zero-copy Arrow table itself
+    except ImportError:
+        pass
+    try:
+        import numpy
+        for path in sorted(datasets_dir.glob("*.npy")):
+            _DATASETS[path.stem] = numpy.load(path, mmap_mode="r")
+    except ImportError:
+        pass
+    gc.collect()
+    gc.freeze()
+
+
+def runtime_version(datasets_dir: Path) -> str:
+    """Interpreter, library and dataset versions: with the limits, everything a run depends on besides its code."""
+    parts = [f"python {platform.python_version()}"]
+    for dist in RUNTIME_DISTRIBUTIONS:
+        try:
+            parts.append(f"{dist} {metadata.version(dist)}")
+        except metadata.PackageNotFoundError:
+            pass
+    for path in sorted(Path(datasets_dir).glob("*.csv")) + sorted(Path(datasets_dir).glob("*.npy")):
+        st = path.stat()
+        parts.append(f"{path.name} {st.st_size}:{st.st_mtime_ns}")
+    return "; ".join(parts)
+
+
+# Compiled into a namespace of its own (see `_make_loader`): a function's `__globals__` is reachable from
+# submitted code, and this module's would expose `os` and everything imported here
+_LOADER_SOURCE = '''
+def load_dataset(name):
+    """A course dataset (pandas DataFrame, or read-only array for .npy)."""
+    try:
+        return datasets[name]
+    except KeyError:
+        raise KeyError(f"Unknown dataset {name!r}; available: {sorted(datasets)}") from None
+'''
+
+
+def _make_loader():
+    namespace = {"__builtins__": builtins, "datasets": MappingProxyType(_DATASETS)}
+    exec(compile(_LOADER_SOURCE, "<pyrunner>", "exec"), namespace)
+    return namespace["load_dataset"]
+
+
+load_dataset = _make_loader()
+
+
+class _BoundedWriter(io.TextIOBase):
+    def __init__(self, limit: int):
+        self.parts: List[str] = []
+        self.size = 0
+        self.limit = limit
+        self.truncated = False
+
+    def writable(self):
+        return True
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.size
+        if room > 0:
+            self.parts.append(text[:room])
+            self.size += min(len(text), room)
+        if len(text) > room:
+            self.truncated = True
+        return len(text)
+
+    def getvalue(self) -> str:
+        return "".join(self.parts) + ("\n... output truncated" if self.truncated else "")
+
+
+def _vm_size_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def _apply_limits(timeout: float, memory_mb: int):
+    if resource is None:
+        return
+    cpu = int(timeout) + 1
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)  # a write then fails with EFBIG instead of killing us
+    resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+    base = _vm_size_bytes()
+    if base is not None:
+        # Relative to the template's mappings (libraries, datasets), which are already counted
+        limit = base + memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def execute(code: str) -> dict:
+    """Run `code` in this process, capturing output. Called in a forked child."""
+    out = _BoundedWriter(MAX_OUTPUT_CHARS)
+    namespace = {"__name__": "__main__", "__builtins__": builtins, "load_dataset": load_dataset}
+    started = time.perf_counter()
+    error = None
+    try:
+        with redirect_stdout(out), redirect_stderr(out):
+            exec(compile(code, "<submission>", "exec"), namespace)
+    except MemoryError:
+        error = "MemoryError: the run exceeded its memory limit"
+    except BaseException as e:  # SystemExit and KeyboardInterrupt included: report, don't die silently
+        tb = traceback.extract_tb(e.__traceback__)
+        frames = [f for f in tb if f.filename == "<submission>"]
+        where = f" (line {frames[-1].lineno})" if frames else ""
+        error = f"{type(e).__name__}: {e}{where}"
+    return {"success": error is None, "output": out.getvalue(), "error": error,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)}
+
+
+def _serve_one(conn, timeout: float, memory_mb: int):
+    """Child entry point: wait for one submission, run it, send the result, exit."""
+    try:
+        code = conn.recv()
+    except EOFError:
+        return  # pool shut down while we were idle
+    _apply_limits(timeout, memory_mb)
+    conn.send(execute(code))
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, timeout: float, memory_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_serve_one, args=(child_conn, timeout, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class WarmPool:
+    def __init__(self, datasets_dir: Path, size: int = POOL_SIZE, timeout: float = RUN_TIMEOUT_SECONDS,
+                 memory_mb: int = MEMORY_LIMIT_MB):
+        self.datasets_dir = Path(datasets_dir)
+        self.size = size
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.datasets: List[str] = []
+        self._ctx = multiprocessing.get_context("forkserver")
+        self._idle: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self.version = ""
+
+    def start(self):
+        """Start the template (imports + datasets) and fork the first idle workers. Blocking; takes seconds."""
+        if self._started:
+            return
+        self.datasets = prepare_datasets(self.datasets_dir)
+        # The template keeps the datasets it loaded at start, so this is the version every run sees
+        self.version = f"{runtime_version(self.datasets_dir)}; timeout {self.timeout:g}s; memory {self.memory_mb}MB"
+        # The forkserver imports this module at startup; the env var tells it to warm up as it does.
+        # It doesn't inherit sys.path (before Python 3.12), so it finds the module through PYTHONPATH.
+        # It is exec'd with os.environ as it is now, so swap in a minimal environment while it starts:
+        # runs must not see the server's secrets. start() runs before the server takes requests.
+        saved = dict(os.environ)
+        env = {k: saved[k] for k in SAFE_ENV_KEYS if k in saved}
+        env.update(_SINGLE_THREAD_ENV)
+        env[TEMPLATE_ENV] = str(self.datasets_dir)
+        env[PARENT_MAIN_ENV] = _main_path() or ""
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(Path(__file__).resolve().parent),
+                                                          saved.get("PYTHONPATH")]))
+        self._ctx.set_forkserver_preload([__name__])
+        os.environ.clear()
+        os.environ.update(env)
+        try:
+            forkserver.ensure_running()
+        finally:
+            os.environ.clear()
+            os.environ.update(saved)
+        self._started = True
+        with self._lock:
+            while len(self._idle) < self.size:
+                self._idle.append(_Worker(self._ctx, self.timeout, self.memory_mb))
+
+    def stop(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.kill()
+
+    def _take(self) -> _Worker:
+        with self._lock:
+            worker = self._idle.pop(0) if self._idle else None
+        if worker is None or not worker.process.is_alive():
+            if worker is not None:
+                worker.kill()
+            worker = _Worker(self._ctx, self.timeout, self.memory_mb)
+        # Fork the replacement now, while this one runs
+        replacement = _Worker(self._ctx, self.timeout, self.memory_mb)
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(replacement)
+                replacement = None
+        if replacement is not None:
+            replacement.kill()
+        return worker
+
+    def run(self, code: str) -> dict:
+        """Run `code` in a warm single-use worker. Blocking; call it from an executor thread."""
+        if not self._started:
+            raise RuntimeError("WarmPool.start() has not been called")
+        if len(code) > MAX_CODE_CHARS:
+            CODE_RUNS_TOTAL.inc("error")
+            return {"success": False, "output": "", "error": f"Code longer than {MAX_CODE_CHARS} characters"}
+        started = time.perf_counter()
+        worker = self._take()
+        try:
+            worker.conn.send(code)
+            if not worker.conn.poll(self.timeout):
+                CODE_RUNS_TOTAL.inc("timeout")
+                return {"success": False, "output": "", "error": f"Timed out after {self.timeout:g}s",
+                        "limit_exceeded": True}
+            try:
+                result = worker.conn.recv()
+            except (EOFError, ConnectionResetError):
+                worker.process.join(1)
+                CODE_RUNS_TOTAL.inc("crashed")
+                reason = "CPU or memory limit" if worker.process.exitcode in (-signal.SIGKILL, -signal.SIGXCPU) \
+                    else f"exit code {worker.process.exitcode}"
+                return {"success": False, "output": "", "error": f"Process died ({reason})", "limit_exceeded": True}
+            CODE_RUNS_TOTAL.inc("ok" if result["success"] else "error")
+            return result
+        finally:
+            worker.kill()
+            CODE_RUN_DURATION.observe(time.perf_counter() - started)
+
+
+# In the forkserver template, importing this module is what warms it (see `WarmPool.start`)
+if os.environ.get(TEMPLATE_ENV):
+    warm(Path(os.environ[TEMPLATE_ENV]), os.environ.get(PARENT_MAIN_ENV))
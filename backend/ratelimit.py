@@ -0,0 +1,145 @@
+"""Per-user, per-route-class rate limiting.
+
+Two layers, both keyed on (user_id, route class):
+
+1. An in-process token bucket. It is checked first, costs a dict lookup and
+   some float math, and absorbs bursts without touching the database.
+2. A shared fixed-window counter in Mongo (`rate_limits`), bumped with an atomic
+   `$inc` so the limit holds across workers. Each worker claims tokens from the
+   window in small leases, so most requests never wait on a round trip.
+
+Requests over either limit get a 429 with a Retry-After header.
+"""
+import itertools
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+import metrics
+
+WINDOW_SECONDS = 60
+MAX_LOCAL_ENTRIES = 50000
+
+RATE_LIMITED_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "rate_limited_requests_total", "Requests rejected with 429 by route class", ("route_class", "layer")))
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    per_minute: int
+    burst: int
+
+    @property
+    def lease_size(self) -> int:
+        # Claim up to a tenth of the window per round trip; small limits stay exact
+        return max(1, self.per_minute // 10)
+
+
+def _limit_from_env(route_class: str, per_minute: int, burst: int) -> RateLimit:
+    prefix = f"RATE_LIMIT_{route_class.upper()}"
+    return RateLimit(
+        per_minute=int(os.environ.get(f"{prefix}_PER_MINUTE", per_minute)),
+        burst=int(os.environ.get(f"{prefix}_BURST", burst))
+    )
+
+
+# Interactive chat gets more headroom than long background generations
+ROUTE_LIMITS: Dict[str, RateLimit] = {
+    "llm_chat": _limit_from_env("llm_chat", per_minute=20, burst=5),
+    "llm_generate": _limit_from_env("llm_generate", per_minute=6, burst=3),
+    "code_run": _limit_from_env("code_run", per_minute=60, burst=10),
+}
+
+
+def _evict_oldest(entries: dict):
+    """Drop the least recently used tenth of `entries`; callers re-insert a key when they use it."""
+    for key in list(itertools.islice(entries, max(1, len(entries) // 10))):
+        del entries[key]
+
+
+class RateLimiter:
+    def __init__(self, db, limits: Optional[Dict[str, RateLimit]] = None):
+        self.db = db
+        self.limits = limits or ROUTE_LIMITS
+        # (user_id, route_class) -> [tokens, last_refill], least recently used first
+        self._buckets: Dict[Tuple[str, str], list] = {}
+        # (user_id, route_class) -> [window_start, leased tokens left]
+        self._leases: Dict[Tuple[str, str], list] = {}
+
+    def _take_local(self, key: Tuple[str, str], limit: RateLimit, now: float) -> float:
+        """Take one token; returns 0 on success or seconds until one is available."""
+        rate = limit.per_minute / WINDOW_SECONDS
+        bucket = self._buckets.pop(key, None)
+        if bucket is None:
+            if len(self._buckets) >= MAX_LOCAL_ENTRIES:
+                _evict_oldest(self._buckets)
+            bucket = [float(limit.burst), now]
+        else:
+            bucket[0] = min(limit.burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        self._buckets[key] = bucket
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate if rate else float(WINDOW_SECONDS)
+
+    def _refund_local(self, key: Tuple[str, str], limit: RateLimit):
+        """Give back a token taken by `_take_local` for a request the shared layer then rejected."""
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(float(limit.burst), bucket[0] + 1)
+
+    async def _take_shared(self, key: Tuple[str, str], limit: RateLimit, now: float) -> float:
+        """Take one token from this worker's lease on the shared window, renewing it if needed."""
+        window_start = int(now // WINDOW_SECONDS) * WINDOW_SECONDS
+        lease = self._leases.get(key)
+        if lease and lease[0] == window_start and lease[1] > 0:
+            lease[1] -= 1
+            return 0.0
+
+        user_id, route_class = key
+        expires_at = datetime.fromtimestamp(window_start, timezone.utc) + timedelta(seconds=2 * WINDOW_SECONDS)
+        doc = await self.db.rate_limits.find_one_and_update(
+            {"_id": f"{route_class}:{user_id}:{window_start}"},
+            {"$inc": {"count": limit.lease_size}, "$setOnInsert": {"expires_at": expires_at}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        already_claimed = doc["count"] - limit.lease_size
+        granted = max(0, min(limit.lease_size, limit.per_minute - already_claimed))
+        if granted == 0:
+            return window_start + WINDOW_SECONDS - now
+
+        self._leases.pop(key, None)
+        if len(self._leases) >= MAX_LOCAL_ENTRIES:
+            _evict_oldest(self._leases)
+        self._leases[key] = [window_start, granted - 1]
+        return 0.0
+
+    async def check(self, user_id: str, route_class: str):
+        """Raise a 429 if this user has exhausted their budget for the route class."""
+        limit = self.limits[route_class]
+        key = (user_id, route_class)
+        now = time.time()
+
+        wait = self._take_local(key, limit, now)
+        layer = "local"
+        if not wait:
+            wait = await self._take_shared(key, limit, now)
+            layer = "shared"
+            if wait:
+                # Rejected requests shouldn't also drain the local burst
+                self._refund_local(key, limit)
+        if wait:
+            RATE_LIMITED_TOTAL.inc(route_class, layer)
+            raise HTTPException(
+                status_code=429,
+                detail="Slow down! Too many requests, try again shortly.",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
@@ -0,0 +1,297 @@
+"""One WebSocket per client for requests, replies and pushed updates.
+
+A client opens `/api/ws` and sends `{"type": "auth", "token": ...}` as its
+first frame. The token is checked once, and every later frame on the
+connection runs as that user. The connection lasts as long as the token
+would, so a revoked session loses its socket within the access-token TTL, as
+it would over HTTP. Before the token expires, the client sends another `auth`
+frame with a renewed token to keep the connection; otherwise the server
+closes it (1008 `token_expired`). After `ready`, frames are:
+
+- client -> server `{"type": "request", "id", "op", "data"}`: an API call
+  (BRO chat, code run, submission, ...). The server answers with
+  `{"type": "response", "id", "status", "data" | "error"}`.
+- server -> client `{"type": "event", "channel", "data"}`: a push, e.g.
+  `progress` after the user's points or streak change on any worker.
+- `ping` / `pong` in either direction. The server pings a connection once
+  it has been silent for `heartbeat_seconds`, and drops it after two silent
+  intervals. A connection that is sending requests isn't pinged.
+
+Per-connection memory is bounded, so idle sockets stay cheap:
+- There is no writer task or send queue. Replies are sent inline under a
+  per-connection lock. A client that can't take a frame within
+  `SEND_TIMEOUT_SECONDS` is disconnected.
+- Events are coalesced per channel: while a send is in progress, a newer
+  event replaces an unsent one on the same channel, so a slow client holds at
+  most one pending event per channel.
+- At most `MAX_INFLIGHT_REQUESTS` requests run at once. Past that, the
+  receive loop stops reading, and TCP flow control pushes back on the client.
+- Frames over `MAX_FRAME_BYTES` close the connection.
+
+When a connection goes away, requests already running still finish; only
+their replies are dropped.
+"""
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+import orjson
+from starlette.websockets import WebSocket, WebSocketDisconnect, WebSocketState
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+AUTH_TIMEOUT_SECONDS = 10.0
+SEND_TIMEOUT_SECONDS = 10.0
+MAX_FRAME_BYTES = 64 * 1024
+MAX_INFLIGHT_REQUESTS = 4
+# Heartbeat sweeps per interval
+HEARTBEAT_TICKS = 5
+
+# Close codes (RFC 6455)
+GOING_AWAY = 1001
+POLICY_VIOLATION = 1008
+MESSAGE_TOO_BIG = 1009
+TRY_AGAIN_LATER = 1013
+
+WS_CONNECTIONS = metrics.REGISTRY.register(metrics.Gauge(
+    "websocket_connections", "Open authenticated WebSocket connections"))
+WS_FRAMES_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "websocket_frames_total", "WebSocket frames by direction and type", ("direction", "type")))
+WS_EVENTS_COALESCED_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "websocket_events_coalesced_total", "Pushed events replaced by a newer one before a slow client read them",
+    ("channel",)))
+WS_DISCONNECTS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "websocket_disconnects_total", "Server-initiated WebSocket closes by reason", ("reason",)))
+
+# authenticate(token) -> claims; raises to reject
+Authenticator = Callable[[str], Awaitable[dict]]
+# handle(connection, op, data) -> (status, data or error detail)
+Handler = Callable[["Connection", str, dict], Awaitable[tuple]]
+
+
+def encode(frame: dict) -> str:
+    return orjson.dumps(frame).decode()
+
+
+class Connection:
+    __slots__ = ("websocket", "claims", "last_seen", "last_ping", "pending", "closed", "_send_lock", "_slots", "_tasks")
+
+    def __init__(self, websocket: WebSocket, claims: dict):
+        self.websocket = websocket
+        self.claims = claims
+        self.last_seen = self.last_ping = time.monotonic()
+        self.pending: Dict[str, dict] = {}
+        self.closed = False
+        self._send_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(MAX_INFLIGHT_REQUESTS)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def user_id(self) -> str:
+        return self.claims["id"]
+
+    async def send(self, frame: dict):
+        """Send one frame, waiting for the socket to take it; a client too slow to read is disconnected."""
+        if self.closed:
+            return
+        async with self._send_lock:
+            try:
+                await asyncio.wait_for(self.websocket.send_text(encode(frame)), SEND_TIMEOUT_SECONDS)
+                WS_FRAMES_TOTAL.inc("out", frame["type"])
+            except asyncio.TimeoutError:
+                await self.close(TRY_AGAIN_LATER, "slow_consumer")
+            except Exception:
+                self.closed = True  # already gone; the receive loop cleans up
+
+    def notify(self, channel: str, data: dict):
+        """Queue an event; it replaces an unsent event on the same channel."""
+        if self.closed:
+            return
+        if channel in self.pending:
+            WS_EVENTS_COALESCED_TOTAL.inc(channel)
+        flush = not self.pending
+        self.pending[channel] = data
+        if flush:
+            self.spawn(self._flush())
+
+    async def _flush(self):
+        while self.pending and not self.closed:
+            channel = next(iter(self.pending))
+            frame = {"type": "ping"} if channel == "ping" else {
+                "type": "event", "channel": channel, "data": self.pending[channel]}
+            del self.pending[channel]
+            await self.send(frame)
+
+    async def close(self, code: int, reason: str):
+        if self.closed:
+            return
+        self.closed = True
+        WS_DISCONNECTS_TOTAL.inc(reason)
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run(self, request_id, op: str, data, handle: Handler):
+        try:
+            if isinstance(data, dict):
+                status, body = await handle(self, op, data)
+            else:
+                status, body = 422, "`data` must be an object"
+            frame = {"type": "response", "id": request_id, "status": status}
+            frame["data" if status < 400 else "error"] = body
+            await self.send(frame)
+        except Exception as e:
+            logger.error(f"WebSocket op {op} error: {str(e)}")
+            await self.send({"type": "response", "id": request_id, "status": 500, "error": "Internal error"})
+        finally:
+            self._slots.release()
+
+    async def _reauth(self, token, authenticate: Authenticator):
+        try:
+            claims = await authenticate(token)
+        except Exception:
+            claims = None
+        if claims is None or claims["id"] != self.user_id:
+            await self.close(POLICY_VIOLATION, "auth_failed")
+        else:
+            self.claims = claims
+
+    def expired(self, now: float) -> bool:
+        return self.claims.get("expires_at", now) < now
+
+    async def receive(self, authenticate: Authenticator, handle: Handler):
+        """Read frames until the client goes away."""
+        while not self.closed:
+            try:
+                text = await self.websocket.receive_text()
+            except (WebSocketDisconnect, RuntimeError, KeyError):
+                # KeyError: a binary frame (receive_text expects "text")
+                break
+            self.last_seen = time.monotonic()
+            if len(text) > MAX_FRAME_BYTES:
+                await self.close(MESSAGE_TOO_BIG, "frame_too_big")
+                break
+            try:
+                frame = orjson.loads(text)
+                kind = frame["type"]
+            except (orjson.JSONDecodeError, KeyError, TypeError):
+                await self.close(POLICY_VIOLATION, "bad_frame")
+                break
+            WS_FRAMES_TOTAL.inc("in", kind if kind in ("request", "ping", "pong", "auth") else "other")
+            if kind == "ping":
+                self.spawn(self.send({"type": "pong"}))
+            elif kind == "auth":
+                self.spawn(self._reauth(frame.get("token"), authenticate))
+            elif kind == "request":
+                # With the in-flight budget spent, stop reading until a request finishes
+                await self._slots.acquire()
+                self.spawn(self._run(frame.get("id"), str(frame.get("op")), frame.get("data") or {}, handle))
+
+    def detach(self):
+        """Stop sending. Running requests aren't cancelled: like an HTTP handler whose client left, they finish
+        (a submission cut off halfway would leak blob references or leave caches stale); their replies are dropped."""
+        self.closed = True
+        self.pending.clear()
+
+
+class ConnectionManager:
+    """Authenticated connections of this worker, by user."""
+
+    def __init__(self, max_connections: int, max_per_user: int, heartbeat_seconds: float):
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.heartbeat_seconds = heartbeat_seconds
+        self.by_user: Dict[str, Set[Connection]] = {}
+        self.count = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    def connected(self, user_id: Optional[str]) -> bool:
+        return user_id in self.by_user
+
+    def publish(self, user_id: str, channel: str, data: dict):
+        """Push an event to every connection of one user on this worker."""
+        for connection in self.by_user.get(user_id, ()):
+            connection.notify(channel, data)
+
+    async def serve(self, websocket: WebSocket, authenticate: Authenticator, handle: Handler):
+        await websocket.accept()
+        try:
+            frame = orjson.loads(await asyncio.wait_for(websocket.receive_text(), AUTH_TIMEOUT_SECONDS))
+            claims = await authenticate(frame["token"]) if frame.get("type") == "auth" else None
+        except Exception:
+            claims = None
+        if claims is None:
+            await self._reject(websocket, POLICY_VIOLATION, "auth_failed")
+            return
+        if self.count >= self.max_connections or len(self.by_user.get(claims["id"], ())) >= self.max_per_user:
+            await self._reject(websocket, TRY_AGAIN_LATER, "capacity")
+            return
+
+        connection = Connection(websocket, claims)
+        self.by_user.setdefault(connection.user_id, set()).add(connection)
+        self.count += 1
+        WS_CONNECTIONS.inc()
+        try:
+            await connection.send({"type": "ready", "user_id": connection.user_id,
+                                   "heartbeat_seconds": self.heartbeat_seconds})
+            await connection.receive(authenticate, handle)
+        finally:
+            connection.detach()
+            connections = self.by_user.get(connection.user_id)
+            connections.discard(connection)
+            if not connections:
+                del self.by_user[connection.user_id]
+            self.count -= 1
+            WS_CONNECTIONS.dec()
+            if websocket.client_state == WebSocketState.CONNECTED:
+                try:
+                    await websocket.close()
+                except Exception:
+                    pass
+
+    async def _reject(self, websocket: WebSocket, code: int, reason: str):
+        WS_DISCONNECTS_TOTAL.inc(reason)
+        try:
+            await websocket.close(code=code, reason=reason)
+        except Exception:
+            pass  # the client left first
+
+    async def start(self):
+        self._heartbeat = asyncio.create_task(self._beat())
+
+    async def stop(self):
+        if self._heartbeat:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+        for connections in list(self.by_user.values()):
+            for connection in list(connections):
+                await connection.close(GOING_AWAY, "shutdown")
+
+    async def _beat(self):
+        """One loop for every connection instead of a timer per socket. It runs a few times per interval, so
+        pings go out as each connection comes due, rather than to every socket at once."""
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds / HEARTBEAT_TICKS)
+            now, wall = time.monotonic(), time.time()
+            for connections in list(self.by_user.values()):
+                for connection in list(connections):
+                    if now - connection.last_seen > 2 * self.heartbeat_seconds:
+                        connection.spawn(connection.close(GOING_AWAY, "heartbeat_timeout"))
+                    elif connection.expired(wall):
+                        connection.spawn(connection.close(POLICY_VIOLATION, "token_expired"))
+                    elif now - max(connection.last_seen, connection.last_ping) >= self.heartbeat_seconds:
+                        connection.last_ping = now
+                        connection.notify("ping", {})
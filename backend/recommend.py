@@ -0,0 +1,393 @@
+"""Personalised next-task recommendations.
+
+Offline (the `rebuild-recommendations` background job, or `python recommend.py build`):
+- users are streamed from the database in batches of `USER_BATCH_SIZE`; each
+  batch's completed tasks become a sparse user x task matrix whose
+  co-completion counts are added to a sparse task x task total,
+- co-completion counts give an item-item cosine similarity, shrunk towards 0
+  when few users back it, and only each task's top `NEIGHBORS` are kept,
+- per-role completion rates give a popularity prior,
+- the result is stored as one document in `recommendation_models`.
+
+Memory in the build is proportional to the pairs of tasks actually completed
+together, never to tasks squared or to all users at once.
+
+Online (`Recommender.recommend`), per request:
+- the model's neighbour lists are mapped to catalog indices once per
+  model/catalog version (tasks x `NEIGHBORS`, no dense matrix),
+- collaborative scores add up the neighbour lists of the user's completed
+  (signal 1) and attempted (0.5) tasks, so a request costs O(touched tasks x
+  `NEIGHBORS`) plus O(tasks) for the blend,
+- that is blended with role affinity, role popularity and track ordering (the
+  first unfinished task of each track scores highest, later ones decay).
+
+With no model yet (new deployment, no users) the blend falls back to role and
+track ordering alone.
+"""
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+import content
+
+MODEL_COLLECTION = "recommendation_models"
+MODEL_ID = "task-similarity"
+NEIGHBORS = 50
+SIMILARITY_SHRINKAGE = 10.0  # co-completions at which a similarity keeps half its weight
+USER_BATCH_SIZE = 5000
+MODEL_REFRESH_SECONDS = 300
+
+ATTEMPTED_SIGNAL = 0.5
+SCORE_WEIGHTS = {"similar": 0.35, "role": 0.25, "popular": 0.15, "next": 0.25}
+
+# How relevant each track family is to each target role
+ROLE_FAMILIES: Dict[str, Dict[str, float]] = {
+    "SDE": {"dsa": 1.0, "analytics": 0.2},
+    "Data Analyst": {"analytics": 1.0, "datascience": 0.5, "dsa": 0.2},
+    "Data Scientist": {"datascience": 1.0, "analytics": 0.6, "ml": 0.6, "dsa": 0.3},
+    "ML Engineer": {"ml": 1.0, "dsa": 0.6, "datascience": 0.5},
+}
+DEFAULT_FAMILY_WEIGHT = 0.5  # role not chosen yet
+
+
+class TaskModel:
+    """Top-K item-item similarities plus per-role popularity, as NumPy arrays."""
+
+    def __init__(self, task_ids: List[str], neighbors: np.ndarray, similarities: np.ndarray,
+                 popularity: Dict[str, np.ndarray], users: int, built_at: float):
+        self.task_ids = task_ids
+        self.neighbors = neighbors          # (tasks, k) int32 indices into task_ids; -1 pads short lists
+        self.similarities = similarities    # (tasks, k) float32
+        self.popularity = popularity        # role (or "*") -> (tasks,) completion rate
+        self.users = users
+        self.built_at = built_at
+
+    @property
+    def version(self) -> str:
+        return f"{self.built_at:.0f}-{len(self.task_ids)}-{self.users}"
+
+    def to_document(self) -> dict:
+        return {
+            "_id": MODEL_ID,
+            "task_ids": self.task_ids,
+            "k": int(self.neighbors.shape[1]),
+            "neighbors": self.neighbors.astype(np.int32).tobytes(),
+            "similarities": self.similarities.astype(np.float32).tobytes(),
+            "popularity": {role: values.astype(np.float32).tobytes() for role, values in self.popularity.items()},
+            "users": self.users,
+            "built_at": self.built_at,
+        }
+
+    @classmethod
+    def from_document(cls, doc: dict) -> "TaskModel":
+        n, k = len(doc["task_ids"]), doc["k"]
+        return cls(
+            task_ids=list(doc["task_ids"]),
+            neighbors=np.frombuffer(doc["neighbors"], dtype=np.int32).reshape(n, k),
+            similarities=np.frombuffer(doc["similarities"], dtype=np.float32).reshape(n, k),
+            popularity={role: np.frombuffer(b, dtype=np.float32) for role, b in doc["popularity"].items()},
+            users=doc["users"],
+            built_at=doc["built_at"]
+        )
+
+
+class ModelBuilder:
+    """Accumulates co-completion counts batch by batch; `finish` turns them into a `TaskModel`."""
+
+    def __init__(self, neighbors: int = NEIGHBORS):
+        self.neighbors = neighbors
+        self.task_index: Dict[str, int] = {}
+        self.co = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.role_counts: Dict[str, np.ndarray] = {}
+        self.role_users: Dict[str, int] = {}
+        self.users = 0
+
+    def add(self, users: Iterable[Tuple[Optional[str], dict]]):
+        """Add a batch of (role, progress) pairs."""
+        roles, rows, cols = [], [], []
+        for role, progress in users:
+            done = [tid for tid, p in (progress or {}).items() if p.get("completed")]
+            if not done:
+                continue
+            for tid in done:
+                cols.append(self.task_index.setdefault(tid, len(self.task_index)))
+            rows.extend([len(roles)] * len(done))
+            roles.append(role)
+        n = len(self.task_index)
+        x = sparse.csr_matrix((np.ones(len(cols), dtype=np.float32), (rows, cols)), shape=(len(roles), n))
+        self.co.resize((n, n))
+        self.co = self.co + (x.T @ x).tocsr()
+        for key in self.role_counts:
+            self.role_counts[key] = np.pad(self.role_counts[key], (0, n - len(self.role_counts[key])))
+        by_role: Dict[str, List[int]] = {}
+        for i, role in enumerate(roles):
+            for key in ("*", role) if role else ("*",):
+                by_role.setdefault(key, []).append(i)
+        for key, members in by_role.items():
+            counts = np.asarray(x[members].sum(axis=0), dtype=np.float32).ravel()
+            self.role_counts[key] = self.role_counts.get(key, np.zeros(n, dtype=np.float32)) + counts
+            self.role_users[key] = self.role_users.get(key, 0) + len(members)
+        self.users += len(roles)
+
+    def finish(self) -> TaskModel:
+        n = len(self.task_index)
+        co = self.co.tocoo()
+        counts = self.co.diagonal()
+        off = co.row != co.col
+        rows, cols, together = co.row[off], co.col[off], co.data[off]
+        similarity = together / np.sqrt(counts[rows] * counts[cols]) * (together / (together + SIMILARITY_SHRINKAGE))
+
+        # Top k per row: sort by (row, -similarity), keep each row's first k
+        k = min(self.neighbors, max(n - 1, 1))
+        order = np.lexsort((-similarity, rows))
+        rows, cols, similarity = rows[order], cols[order], similarity[order]
+        starts = np.searchsorted(rows, np.arange(n))
+        rank = np.arange(len(rows)) - starts[rows]
+        keep = rank < k
+        top = np.full((n, k), -1, dtype=np.int32)
+        top_sims = np.zeros((n, k), dtype=np.float32)
+        top[rows[keep], rank[keep]] = cols[keep]
+        top_sims[rows[keep], rank[keep]] = similarity[keep]
+
+        popularity = {role: total / self.role_users[role] for role, total in self.role_counts.items()}
+        return TaskModel(list(self.task_index), top, top_sims, popularity, self.users, time.time())
+
+
+def build_model(users: Iterable[Tuple[Optional[str], dict]], neighbors: int = NEIGHBORS) -> TaskModel:
+    """Build the model from (role, progress) pairs, one per user, `USER_BATCH_SIZE` at a time."""
+    builder = ModelBuilder(neighbors)
+    batch = []
+    for user in users:
+        batch.append(user)
+        if len(batch) >= USER_BATCH_SIZE:
+            builder.add(batch)
+            batch = []
+    builder.add(batch)
+    return builder.finish()
+
+
+async def build_and_store(db, executor=None) -> TaskModel:
+    """Batch job: rebuild the model from every user's progress, streamed in batches, and publish it."""
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    builder = ModelBuilder()
+    batch = []
+    async for user in db.users.find({}, {"_id": 0, "role": 1, "progress": 1}).batch_size(USER_BATCH_SIZE):
+        batch.append((user.get("role"), user.get("progress")))
+        if len(batch) >= USER_BATCH_SIZE:
+            await loop.run_in_executor(executor, builder.add, batch)
+            batch = []
+    await loop.run_in_executor(executor, builder.add, batch)
+    model = await loop.run_in_executor(executor, builder.finish)
+    await db[MODEL_COLLECTION].replace_one({"_id": MODEL_ID}, model.to_document(), upsert=True)
+    return model
+
+
+class _Layout:
+    """Catalog tasks in track order, as arrays; built once per catalog version."""
+
+    def __init__(self, catalog: content.Catalog):
+        self.version = catalog.version
+        self.tasks: List[dict] = []
+        self.tracks: List[Tuple[str, str, str]] = []  # (family, track_id, name)
+        families, positions, track_of, track_starts = [], [], [], []
+        for family in content.TRACK_FAMILIES:
+            for track_id, track in catalog.tracks(family).items():
+                if not track["tasks"]:
+                    continue
+                track_starts.append(len(self.tasks))
+                for position, task in enumerate(track["tasks"]):
+                    self.tasks.append(task)
+                    families.append(family)
+                    positions.append(position)
+                    track_of.append(len(self.tracks))
+                self.tracks.append((family, track_id, track["name"]))
+        self.index = {task["id"]: i for i, task in enumerate(self.tasks)}
+        self.families = np.array(families)
+        self.positions = np.array(positions, dtype=np.float32)
+        self.track_of = np.array(track_of, dtype=np.int64)
+        self.track_starts = np.array(track_starts, dtype=np.int64)
+        self._role_fit: Dict[Optional[str], np.ndarray] = {}
+
+    def role_fit(self, role: Optional[str]) -> np.ndarray:
+        fit = self._role_fit.get(role)
+        if fit is None:
+            weights = ROLE_FAMILIES.get(role, {})
+            fit = self._role_fit[role] = np.array(
+                [weights.get(f, 0.0 if weights else DEFAULT_FAMILY_WEIGHT) for f in self.families], dtype=np.float32)
+        return fit
+
+
+class Recommender:
+    def __init__(self, refresh_seconds: float = MODEL_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.model: Optional[TaskModel] = None
+        self._checked_at = 0.0
+        self._layout: Optional[_Layout] = None
+        self._mapped_key = None
+        # Per catalog task: its model neighbours as catalog indices (-1 if absent) and their similarities
+        self._neighbors = np.zeros((0, 0), dtype=np.int64)
+        self._similarities = np.zeros((0, 0), dtype=np.float32)
+        self._popularity: Dict[str, np.ndarray] = {}
+
+    async def refresh(self, db, force: bool = False):
+        """Pick up a newer model from the batch job, at most every `refresh_seconds`."""
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.refresh_seconds:
+            return
+        self._checked_at = now
+        meta = await db[MODEL_COLLECTION].find_one({"_id": MODEL_ID}, {"built_at": 1})
+        if meta and (self.model is None or meta["built_at"] != self.model.built_at):
+            self.model = TaskModel.from_document(await db[MODEL_COLLECTION].find_one({"_id": MODEL_ID}))
+
+    def _prepare(self, catalog: content.Catalog) -> _Layout:
+        if self._layout is None or self._layout.version != catalog.version:
+            self._layout = _Layout(catalog)
+        layout = self._layout
+        key = (layout.version, self.model.version if self.model else None)
+        if key != self._mapped_key:
+            n = len(layout.tasks)
+            k = self.model.neighbors.shape[1] if self.model is not None else 0
+            neighbors = np.full((n, k), -1, dtype=np.int64)
+            similarities = np.zeros((n, k), dtype=np.float32)
+            popularity = {}
+            if self.model is not None:
+                # Model indices -> catalog indices; tasks no longer in the catalog (and padding) map to -1
+                to_catalog = np.array([layout.index.get(tid, -1) for tid in self.model.task_ids] + [-1], dtype=np.int64)
+                present = to_catalog[:-1] >= 0
+                mapped = to_catalog[self.model.neighbors[present]]
+                neighbors[to_catalog[:-1][present]] = mapped
+                similarities[to_catalog[:-1][present]] = np.where(mapped >= 0, self.model.similarities[present], 0.0)
+                for role, values in self.model.popularity.items():
+                    by_task = np.zeros(n, dtype=np.float32)
+                    by_task[to_catalog[:-1][present]] = values[present]
+                    popularity[role] = by_task
+            self._neighbors, self._similarities, self._popularity = neighbors, similarities, popularity
+            self._mapped_key = key
+        return layout
+
+    def _similar(self, signal: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Collaborative score per task, from the neighbour lists of the tasks the user touched.
+
+        Also returns, per (touched task, neighbour) pair, the source task and weighted similarity, for `_explain`."""
+        touched = np.flatnonzero(signal)
+        cols = self._neighbors[touched]
+        weights = self._similarities[touched] * signal[touched, None]
+        valid = cols >= 0
+        sources, cols, weights = np.broadcast_to(touched[:, None], cols.shape)[valid], cols[valid], weights[valid]
+        similar = np.zeros(len(signal), dtype=np.float32)
+        np.add.at(similar, cols, weights)
+        return similar, np.stack([sources, cols]), weights
+
+    def recommend(self, catalog: content.Catalog, user: dict, limit: int = 5) -> List[dict]:
+        layout = self._prepare(catalog)
+        n = len(layout.tasks)
+        if n == 0:
+            return []
+        progress = user.get("progress", {})
+        role = user.get("role")
+
+        completed = np.zeros(n, dtype=bool)
+        signal = np.zeros(n, dtype=np.float32)
+        for task_id, p in progress.items():
+            i = layout.index.get(task_id)
+            if i is None:
+                continue
+            if p.get("completed"):
+                completed[i] = True
+                signal[i] = 1.0
+            elif p.get("attempts"):
+                signal[i] = ATTEMPTED_SIGNAL
+
+        similar, pairs, weights = self._similar(signal)
+        role_fit = layout.role_fit(role)
+        popular = self._popularity.get(role, self._popularity.get("*", np.zeros(n, dtype=np.float32)))
+
+        # Track ordering: distance from the first unfinished task of the same track
+        unfinished_at = np.where(completed, np.inf, layout.positions)
+        frontier = np.minimum.reduceat(unfinished_at, layout.track_starts)[layout.track_of]
+        steps_ahead = layout.positions - frontier
+        next_up = np.where(steps_ahead >= 0, 1.0 / (1.0 + np.maximum(steps_ahead, 0.0)), 0.0)
+
+        parts = {"similar": _unit(similar), "role": role_fit, "popular": _unit(popular), "next": next_up}
+        score = sum(SCORE_WEIGHTS[name] * values for name, values in parts.items())
+        score[completed] = -np.inf
+
+        k = min(limit, int((~completed).sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top], kind="stable")]
+        started_tracks = set(layout.track_of[signal > 0].tolist())
+        return [self._explain(layout, int(i), score, parts, (pairs, weights), role, started_tracks) for i in top]
+
+    def _explain(self, layout: _Layout, i: int, score, parts, similar_pairs, role, started_tracks) -> dict:
+        task = layout.tasks[i]
+        family, track_id, track_name = layout.tracks[layout.track_of[i]]
+        contributions = {name: SCORE_WEIGHTS[name] * float(values[i]) for name, values in parts.items()}
+        reason = max(contributions, key=contributions.get)
+        if reason == "similar" and contributions["similar"] > 0:
+            (sources, cols), weights = similar_pairs
+            to_i = cols == i
+            because = int(sources[to_i][np.argmax(weights[to_i])])
+            text = f"Students who did {layout.tasks[because]['title']} often do this next"
+        elif reason == "next" and layout.track_of[i] in started_tracks:
+            text = f"Next up in {track_name}"
+        elif reason == "popular" and role:
+            text = f"Popular with {role} candidates"
+        elif role:
+            text = f"Core {track_name} practice for {role} roles"
+        else:
+            text = f"A good place to start in {track_name}"
+        return {
+            "id": task["id"],
+            "title": task["title"],
+            "difficulty": task.get("difficulty"),
+            "points": task.get("points"),
+            "family": family,
+            "track_id": track_id,
+            "track_name": track_name,
+            "score": round(float(score[i]), 4),
+            "reason": text,
+        }
+
+
+def _unit(values: np.ndarray) -> np.ndarray:
+    peak = float(values.max()) if len(values) else 0.0
+    return values / peak if peak > 0 else np.zeros_like(values)
+
+
+# ============ CLI ============
+
+def main():
+    import asyncio
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+
+    def build():
+        """Rebuild the task-similarity model from all users' progress now."""
+        async def run() -> TaskModel:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            try:
+                return await build_and_store(client[os.environ['DB_NAME']])
+            finally:
+                client.close()
+
+        started = time.perf_counter()
+        model = asyncio.run(run())
+        typer.echo(f"users={model.users} tasks={len(model.task_ids)} version={model.version} "
+                   f"took={time.perf_counter() - started:.1f}s", err=True)
+
+    typer.run(build)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Cache of code-run results, keyed on what a run's result depends on.
+
+Students press Run again and again on unchanged code, and many run the
+untouched starter code. A run's result is a function of:
+- the code, normalized so that line-ending and trailing-whitespace
+  differences don't matter (leading lines are kept, since error messages
+  report line numbers),
+- the task id,
+- the task's test-suite version: a digest of its `sql` spec and `tests`,
+- the runtime version the runner reports: interpreter, library and dataset
+  versions, and its limits.
+
+`key` hashes those four values. A change to any of them gives a new key, so an
+edited test suite, dataset or runtime never serves a stale result. Entries
+under old suite versions are deleted by `purge_stale` (the
+`purge-run-results` job), and every entry expires after `ttl` seconds through
+a TTL index.
+
+Lookups check a per-worker `TTLCache` first, then the `run_results`
+collection. Only results that can't depend on load or chance are cached:
+- runs that hit a wall-clock or kill limit (`limit_exceeded`) are not stored,
+- code that asks for randomness or the current time (`NONDETERMINISTIC_RE`,
+  see `deterministic`) bypasses the cache.
+
+`run_cache_lookups_total{result}` gives the hit rate.
+`run_cache_saved_seconds_total` adds up how long each served result
+originally took to compute.
+"""
+import hashlib
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import cache
+import metrics
+
+RESULTS_COLLECTION = "run_results"
+MEMORY_CACHE_SIZE = 2000
+PURGE_BATCH_SIZE = 200
+# Python and SQL constructs whose output changes from run to run
+NONDETERMINISTIC_RE = re.compile(
+    r"\b(?:random|randomblob|secrets|uuid|urandom|time|datetime|perf_counter|monotonic"
+    r"|current_(?:date|time|timestamp))\b|'now'",
+    re.IGNORECASE)
+
+RUN_CACHE_LOOKUPS_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "run_cache_lookups_total", "Code-run result cache lookups by outcome", ("result",)))
+RUN_CACHE_SAVED_SECONDS = metrics.REGISTRY.register(metrics.Counter(
+    "run_cache_saved_seconds_total", "Run time that cached results saved, by what it would have cost to compute them"))
+
+
+def normalize(code: str) -> str:
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).rstrip("\n")
+
+
+def suite_version(task: Optional[dict]) -> str:
+    """Digest of everything in the task that grades or checks a run."""
+    spec = {"sql": task.get("sql"), "tests": task.get("tests")} if task else {}
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def key(code: str, task_id: str, suite: str, runtime: str) -> str:
+    h = hashlib.sha256()
+    for part in (task_id, suite, runtime, normalize(code)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def deterministic(code: str) -> bool:
+    return NONDETERMINISTIC_RE.search(code) is None
+
+
+class ResultCache:
+    def __init__(self, ttl: float, memory_ttl: float, maxsize: int = MEMORY_CACHE_SIZE):
+        self.ttl = ttl
+        self.memory = cache.TTLCache(RESULTS_COLLECTION, memory_ttl if ttl > 0 else 0, maxsize)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def get(self, db, cache_key: Optional[str]) -> Optional[dict]:
+        """The cached result for `cache_key`, marked `cached`, or None. A None key is a run that bypasses the cache."""
+        if cache_key is None:
+            RUN_CACHE_LOOKUPS_TOTAL.inc("bypass")
+            return None
+        entry = self.memory.get(cache_key)
+        outcome = "hit_memory"
+        if entry is None:
+            entry = await db[RESULTS_COLLECTION].find_one(
+                {"_id": cache_key, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+                {"_id": 0, "result": 1, "cost_seconds": 1})
+            outcome = "hit_db"
+            if entry is not None:
+                self.memory.set(cache_key, entry)
+        if entry is None:
+            RUN_CACHE_LOOKUPS_TOTAL.inc("miss")
+            return None
+        RUN_CACHE_LOOKUPS_TOTAL.inc(outcome)
+        RUN_CACHE_SAVED_SECONDS.inc(amount=entry["cost_seconds"])
+        return {**entry["result"], "cached": True}
+
+    async def put(self, db, cache_key: str, task_id: str, suite: str, result: dict, cost_seconds: float):
+        if result.get("limit_exceeded"):
+            return  # timeouts and kills depend on load, not only on the code
+        entry = {"result": result, "cost_seconds": round(cost_seconds, 6)}
+        self.memory.set(cache_key, entry)
+        await db[RESULTS_COLLECTION].replace_one(
+            {"_id": cache_key},
+            {**entry, "task_id": task_id, "suite": suite,
+             "expires_at": datetime.now(timezone.utc) + timedelta(seconds=self.ttl)},
+            upsert=True)
+
+    async def purge_stale(self, db, suites: Dict[str, str]) -> int:
+        """Delete entries whose task's suite version isn't `suites[task_id]` (or whose task is gone).
+
+        Runs outside any task (task id "") have no suite to go stale and are left to the TTL.
+        """
+        deleted = 0
+        task_ids = list(suites)
+        for start in range(0, len(task_ids), PURGE_BATCH_SIZE):
+            batch = task_ids[start:start + PURGE_BATCH_SIZE]
+            result = await db[RESULTS_COLLECTION].delete_many(
+                {"$or": [{"task_id": t, "suite": {"$ne": suites[t]}} for t in batch]})
+            deleted += result.deleted_count
+        result = await db[RESULTS_COLLECTION].delete_many({"task_id": {"$nin": task_ids + [""]}})
+        return deleted + result.deleted_count
+
+
+async def ensure_indexes(db):
+    await db[RESULTS_COLLECTION].create_index("expires_at", expireAfterSeconds=0)
+    await db[RESULTS_COLLECTION].create_index([("task_id", 1), ("suite", 1)])
@@ -0,0 +1,356 @@
+"""In-memory full-text search over catalog tasks.
+
+Tasks are indexed field by field (title, description, hints,
+solution_explanation) and ranked with BM25F: each field's term frequency is
+length-normalised against that field's average length and weighted, the
+weighted sum is saturated once per (term, task), and that value is stored in the
+postings. Tasks live in integer slots and each term's postings are materialised
+as NumPy (slot, value) arrays, so a query is one vectorised `idf * value`
+scatter-add per term plus a partial sort, which keeps queries under a
+millisecond on a 10k-task catalog (see benchmarks/search_bench.py).
+
+`update(catalog)` diffs the catalog against what is indexed and only
+re-tokenises tasks that were added, removed or edited. Stored values use the
+field averages from the last full normalisation; when the averages drift more
+than `RENORMALIZE_DRIFT`, every task is re-normalised from its stored counts.
+The update is applied to a copy of the current snapshot (postings are copied
+per term, on first write) and the finished snapshot replaces the current one
+in a single assignment, so queries never wait on an update and never see one
+half-applied.
+
+Prefix autocomplete works on the surface words (before stemming), ranked by how
+many tasks use them.
+"""
+import bisect
+import hashlib
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import content
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "description": 1.0,
+    "hints": 1.5,
+    "solution_explanation": 0.5,
+}
+BM25_K1 = 1.2
+BM25_B = 0.75
+RENORMALIZE_DRIFT = 0.1
+SUGGEST_CACHE_SIZE = 4096
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+# SQL keywords (by, on, in, as, from, where, and, or, ...) are deliberately not stopwords
+STOPWORDS = frozenset("""
+a an are be but for how i if it its of so such that the their then there these this to was we what when
+which while will with you your
+""".split())
+DOUBLE_CONSONANTS = frozenset("bdfgmnprt")
+
+
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer: plurals, -ing, -ed, -ly.
+
+    Good enough to match "sliding"/"slides"/"slide" or "sorted"/"sorting";
+    not a full Porter stemmer.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        word = word[:-3] + "y"
+    elif word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        word = word[:-1]
+    for suffix in ("ing", "ed", "ly"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            word = word[:-len(suffix)]
+            if len(word) > 3 and word[-1] == word[-2] and word[-1] in DOUBLE_CONSONANTS:
+                word = word[:-1]  # running -> run
+            break
+    if len(word) > 4 and word.endswith("e"):
+        word = word[:-1]  # slide -> slid, to meet sliding -> slid
+    return word
+
+
+def words(text: str) -> List[str]:
+    return [w for w in TOKEN_RE.findall(text.lower()) if w not in STOPWORDS]
+
+
+def analyze(text: str) -> List[str]:
+    return [stem(w) for w in words(text)]
+
+
+def _field_text(task: dict, field: str) -> str:
+    value = task.get(field) or ""
+    return " ".join(value) if isinstance(value, list) else str(value)
+
+
+def _signature(task: dict) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for field in FIELD_WEIGHTS:
+        digest.update(_field_text(task, field).encode())
+        digest.update(b"\0")
+    for key in ("title", "difficulty", "points", "type"):
+        digest.update(str(task.get(key)).encode())
+    return digest.hexdigest()
+
+
+class _Doc:
+    __slots__ = ("task_id", "slot", "signature", "meta", "counts", "lengths", "surface")
+
+    def __init__(self, task_id, signature, meta, counts, lengths, surface):
+        self.task_id = task_id
+        self.slot = -1
+        self.signature = signature
+        self.meta = meta
+        self.counts: Dict[str, Counter] = counts
+        self.lengths: Dict[str, int] = lengths
+        self.surface: set = surface
+
+
+class _Snapshot:
+    """One version of the index. Only `SearchIndex.update` mutates it, before publishing it."""
+
+    def __init__(self, field_weights: Dict[str, float]):
+        self.field_weights = field_weights
+        self._docs: Dict[str, _Doc] = {}
+        self._slots: List[Optional[_Doc]] = []
+        self._free_slots: List[int] = []
+        # term -> {slot: saturated weighted tf}; `_arrays` caches each as NumPy arrays
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # Terms whose postings dict belongs to this snapshot rather than the one it was copied from
+        self._owned: set = set()
+        self._arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._family_masks: Dict[str, np.ndarray] = {}
+        self._field_totals = {f: 0 for f in self.field_weights}
+        self._norm_averages = {f: 1.0 for f in self.field_weights}
+        self._surface_df: Counter = Counter()
+        self._vocabulary: Optional[List[str]] = None
+        self._suggest_cache: Dict[Tuple[str, int], List[dict]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # ---- indexing ----
+
+    def copy(self) -> "_Snapshot":
+        other = _Snapshot(self.field_weights)
+        other._docs = dict(self._docs)
+        other._slots = list(self._slots)
+        other._free_slots = list(self._free_slots)
+        other._postings = dict(self._postings)
+        other._arrays = dict(self._arrays)
+        other._field_totals = dict(self._field_totals)
+        other._norm_averages = dict(self._norm_averages)
+        other._surface_df = Counter(self._surface_df)
+        return other
+
+    def apply(self, incoming: Dict[str, tuple], signatures: Dict[str, str]) -> Tuple[int, int]:
+        stale = [tid for tid, doc in self._docs.items() if doc.signature != signatures.get(tid)]
+        for task_id in stale:
+            self._remove(task_id)
+        added = [tid for tid in incoming if tid not in self._docs]
+        new_docs = [self._analyze_doc(tid, signatures[tid], *incoming[tid]) for tid in added]
+        for doc in new_docs:
+            self._add_totals(doc)
+        if self._averages_drifted():
+            self._renormalize()
+        else:
+            for doc in new_docs:
+                self._post(doc)
+        return len(added), sum(1 for tid in stale if tid not in incoming)
+
+    def _own_postings(self, term: str) -> Optional[Dict[int, float]]:
+        postings = self._postings.get(term)
+        if postings is not None and term not in self._owned:
+            postings = self._postings[term] = dict(postings)
+            self._owned.add(term)
+        return postings
+
+    def _analyze_doc(self, task_id, signature, family, track_id, track_name, task) -> _Doc:
+        counts, lengths, surface = {}, {}, set()
+        for field in self.field_weights:
+            raw = words(_field_text(task, field))
+            surface.update(raw)
+            counts[field] = Counter(stem(w) for w in raw)
+            lengths[field] = len(raw)
+        meta = {
+            "id": task_id,
+            "title": task["title"],
+            "difficulty": task.get("difficulty"),
+            "points": task.get("points"),
+            "type": task.get("type"),
+            "family": family,
+            "track_id": track_id,
+            "track_name": track_name,
+        }
+        return _Doc(task_id, signature, meta, counts, lengths, surface)
+
+    def _add_totals(self, doc: _Doc):
+        if self._free_slots:
+            doc.slot = self._free_slots.pop()
+            self._slots[doc.slot] = doc
+        else:
+            doc.slot = len(self._slots)
+            self._slots.append(doc)
+        self._docs[doc.task_id] = doc
+        for field, length in doc.lengths.items():
+            self._field_totals[field] += length
+        self._surface_df.update(doc.surface)
+
+    def _remove(self, task_id: str):
+        doc = self._docs.pop(task_id)
+        self._slots[doc.slot] = None
+        self._free_slots.append(doc.slot)
+        for field, length in doc.lengths.items():
+            self._field_totals[field] -= length
+        self._surface_df.subtract(doc.surface)
+        for word in doc.surface:
+            if self._surface_df[word] <= 0:
+                del self._surface_df[word]
+        for term in set().union(*doc.counts.values()):
+            postings = self._own_postings(term)
+            if postings is not None:
+                postings.pop(doc.slot, None)
+                self._arrays.pop(term, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _current_averages(self) -> Dict[str, float]:
+        n = max(1, len(self._docs))
+        return {f: max(1.0, total / n) for f, total in self._field_totals.items()}
+
+    def _averages_drifted(self) -> bool:
+        current = self._current_averages()
+        return any(abs(current[f] - self._norm_averages[f]) > RENORMALIZE_DRIFT * self._norm_averages[f]
+                   for f in current)
+
+    def _post(self, doc: _Doc):
+        weighted: Dict[str, float] = {}
+        for field, counts in doc.counts.items():
+            weight = self.field_weights[field]
+            norm = 1 - BM25_B + BM25_B * doc.lengths[field] / self._norm_averages[field]
+            for term, tf in counts.items():
+                weighted[term] = weighted.get(term, 0.0) + weight * tf / norm
+        for term, tf in weighted.items():
+            postings = self._own_postings(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._owned.add(term)
+            postings[doc.slot] = tf * (BM25_K1 + 1) / (tf + BM25_K1)
+            self._arrays.pop(term, None)
+
+    def _renormalize(self):
+        self._norm_averages = self._current_averages()
+        self._postings = {}
+        self._owned = set()
+        self._arrays = {}
+        for doc in self._docs.values():
+            self._post(doc)
+
+    def _term_arrays(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings.get(term)
+            if not postings:
+                return None
+            arrays = self._arrays[term] = (np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                                           np.fromiter(postings.values(), dtype=np.float64, count=len(postings)))
+        return arrays
+
+    def _family_mask(self, family: str) -> np.ndarray:
+        mask = self._family_masks.get(family)
+        if mask is None:
+            mask = self._family_masks[family] = np.array(
+                [doc is not None and doc.meta["family"] == family for doc in self._slots], dtype=bool)
+        return mask
+
+    # ---- querying ----
+
+    def search(self, query: str, limit: int = 10, family: Optional[str] = None) -> List[dict]:
+        terms = set(analyze(query))
+        if not terms:
+            return []
+        n = len(self._docs)
+        scores = np.zeros(len(self._slots))
+        for term in terms:
+            arrays = self._term_arrays(term)
+            if arrays is None:
+                continue
+            slots, values = arrays
+            idf = math.log(1 + (n - len(slots) + 0.5) / (len(slots) + 0.5))
+            scores[slots] += idf * values
+        if family:
+            scores[~self._family_mask(family)] = 0.0
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        k = min(limit, len(candidates))
+        top = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [{**self._slots[slot].meta, "score": round(float(scores[slot]), 4)} for slot in top]
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        tokens = TOKEN_RE.findall(prefix.lower())
+        if not tokens:
+            return []
+        stub = tokens[-1]
+        key = (stub, limit)
+        cached = self._suggest_cache.get(key)
+        if cached is not None:
+            return cached
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._surface_df)
+        vocabulary = self._vocabulary
+        lo = bisect.bisect_left(vocabulary, stub)
+        hi = bisect.bisect_left(vocabulary, stub + "\uffff", lo)
+        top = heapq.nlargest(limit, vocabulary[lo:hi], key=lambda w: (self._surface_df[w], -len(w)))
+        result = [{"term": w, "tasks": self._surface_df[w]} for w in top]
+        if len(self._suggest_cache) >= SUGGEST_CACHE_SIZE:
+            self._suggest_cache.clear()
+        self._suggest_cache[key] = result
+        return result
+
+
+class SearchIndex:
+    def __init__(self, field_weights: Optional[Dict[str, float]] = None):
+        self._snapshot = _Snapshot(dict(field_weights or FIELD_WEIGHTS))
+        # Serialises updates only; queries read whichever snapshot is current without locking
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def update(self, catalog) -> Tuple[int, int]:
+        """Sync the index with a catalog; returns (tasks indexed, tasks removed)."""
+        incoming = {}
+        for family in content.TRACK_FAMILIES:
+            for track_id, track in catalog.tracks(family).items():
+                for task in track["tasks"]:
+                    incoming[task["id"]] = (family, track_id, track["name"], task)
+
+        signatures = {tid: _signature(entry[3]) for tid, entry in incoming.items()}
+
+        with self._lock:
+            current = self._snapshot
+            if signatures.keys() == current._docs.keys() and all(
+                    doc.signature == signatures[tid] for tid, doc in current._docs.items()):
+                return 0, 0
+            snapshot = current.copy()
+            counts = snapshot.apply(incoming, signatures)
+            self._snapshot = snapshot
+            return counts
+
+    def search(self, query: str, limit: int = 10, family: Optional[str] = None) -> List[dict]:
+        return self._snapshot.search(query, limit, family)
+
+    def suggest(self, prefix: str, limit: int = 8) -> List[dict]:
+        """Most-used indexed words starting with the last word of `prefix`."""
+        return self._snapshot.suggest(prefix, limit)
@@ -1,35 +1,145 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, Response, status, UploadFile, File, Form, WebSocket
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, ValidationError
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import bcrypt
-import re
 import tempfile
+import asyncio
+import functools
+import time
+
+import activity
+import cache
+import complexity
+import compression
+import content
+import emailpolicy
+import search
+import sessions
+import submissions
+import skillgap
+import sqlrunner
+import export
+import hints
+import jobs
+import metrics
+import onboarding
+import plagiarism
+import pyrunner
+import realtime
+import recommend
+import resultcache
+from llm import LLMGateway
+from ratelimit import RateLimiter
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+
+# Per-worker resources. These are created in `lifespan`, never at import time, so
+# the app can be forked safely by gunicorn / `uvicorn --workers N`. Tests and
+# benchmarks may assign `db` before startup to supply their own database.
+client: Optional[AsyncIOMotorClient] = None
+db = None
+llm_gateway: Optional[LLMGateway] = None
+cpu_executor: Optional[ThreadPoolExecutor] = None
+cache_bus: Optional[cache.InvalidationBus] = None
+rate_limiter: Optional[RateLimiter] = None
+session_store: Optional[sessions.SessionStore] = None
+job_runner: Optional[jobs.JobRunner] = None
+code_pool: Optional[pyrunner.WarmPool] = None
+ws_manager: Optional[realtime.ConnectionManager] = None
+
+CPU_EXECUTOR_WORKERS = int(os.environ.get('CPU_EXECUTOR_WORKERS', str(min(8, (os.cpu_count() or 1) + 2))))
+
+# Short-lived per-worker cache of user documents; 0 disables it
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '5'))
+user_cache = cache.TTLCache("users", USER_CACHE_TTL_SECONDS)
+
+# Track, trend and template content; edits to these files are picked up without a restart
+CONTENT_DIR = Path(os.environ.get('CONTENT_DIR', ROOT_DIR / 'content'))
+CONTENT_RELOAD_INTERVAL_SECONDS = float(os.environ.get('CONTENT_RELOAD_INTERVAL_SECONDS', '2'))
+content_store = content.ContentStore(
+    CONTENT_DIR,
+    snapshot_path=CONTENT_DIR / content.SNAPSHOT_NAME,
+    reload_interval=CONTENT_RELOAD_INTERVAL_SECONDS
+)
+# Kept in sync with the catalog incrementally on every reload
+search_index = search.SearchIndex()
+content_store.subscribe(search_index.update)
+
+# SQL tasks run against read-only SQLite images of the scripts in content/datasets
+SQL_POOL_SIZE = int(os.environ.get('SQL_POOL_SIZE', str(sqlrunner.POOL_SIZE)))
+sql_engine = sqlrunner.SqlEngine(CONTENT_DIR / 'datasets', pool_size=SQL_POOL_SIZE)
+
+# Python runs in single-use workers forked from a template with pandas/NumPy and the course
+# datasets preloaded (see pyrunner.py); 0 workers keeps /code/run in demo mode. Runs execute
+# student code as this process's user: only enable workers (pyrunner.POOL_SIZE is a sensible
+# count) under a separate uid with no network access, in its own namespace or container
+CODE_EXECUTION_WORKERS = int(os.environ.get('CODE_EXECUTION_WORKERS', '0'))
+CODE_RUN_TIMEOUT_SECONDS = float(os.environ.get('CODE_RUN_TIMEOUT_SECONDS', str(pyrunner.RUN_TIMEOUT_SECONDS)))
+CODE_RUN_MEMORY_MB = int(os.environ.get('CODE_RUN_MEMORY_MB', str(pyrunner.MEMORY_LIMIT_MB)))
+
+# Results of /code/run, keyed on normalized code, task, test-suite and runtime versions; a TTL of 0 disables it
+RUN_CACHE_TTL_SECONDS = float(os.environ.get('RUN_CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+RUN_CACHE_MEMORY_TTL_SECONDS = float(os.environ.get('RUN_CACHE_MEMORY_TTL_SECONDS', '600'))
+run_cache = resultcache.ResultCache(RUN_CACHE_TTL_SECONDS, RUN_CACHE_MEMORY_TTL_SECONDS)
+
+# BRO answers hint requests and small talk from the task's stored hints, without an LLM call
+HINT_ENGINE_ENABLED = os.environ.get('HINT_ENGINE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# One authenticated WebSocket per client carries chat, runs, submissions and pushed progress (see realtime.py)
+WS_MAX_CONNECTIONS = int(os.environ.get('WS_MAX_CONNECTIONS', '10000'))
+WS_MAX_CONNECTIONS_PER_USER = int(os.environ.get('WS_MAX_CONNECTIONS_PER_USER', '5'))
+WS_HEARTBEAT_SECONDS = float(os.environ.get('WS_HEARTBEAT_SECONDS', '25'))
+# Writes to a user document come in bursts (a submission makes several); push once per burst
+WS_PUSH_DELAY_SECONDS = float(os.environ.get('WS_PUSH_DELAY_SECONDS', '0.05'))
+
+# Next-task recommendations; the similarity model is rebuilt by the `rebuild-recommendations` job
+RECOMMENDER_REFRESH_SECONDS = float(os.environ.get('RECOMMENDER_REFRESH_SECONDS', str(recommend.MODEL_REFRESH_SECONDS)))
+recommender = recommend.Recommender(RECOMMENDER_REFRESH_SECONDS)
+
+# Bulk onboarding: bcrypt for roster-supplied passwords runs in a process pool of this size
+ONBOARDING_HASH_WORKERS = int(os.environ.get('ONBOARDING_HASH_WORKERS', str(os.cpu_count() or 1)))
+ONBOARDING_MAX_ROWS = int(os.environ.get('ONBOARDING_MAX_ROWS', '20000'))
+
+# Each submission's MinHash signature is indexed per task and checked for near-copies (see plagiarism.py)
+PLAGIARISM_ENABLED = os.environ.get('PLAGIARISM_ENABLED', '1') == '1'
+
+# Background maintenance jobs; one worker across the deployment runs them (see jobs.py)
+JOBS_ENABLED = os.environ.get('JOBS_ENABLED', '1') == '1'
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '30'))
+JOB_EXECUTOR_WORKERS = int(os.environ.get('JOB_EXECUTOR_WORKERS', '1'))
+CHAT_HISTORY_RETENTION_DAYS = int(os.environ.get('CHAT_HISTORY_RETENTION_DAYS', '180'))
 
 # JWT Config
 JWT_SECRET = os.environ.get('JWT_SECRET', 'default-secret-key')
 JWT_ALGORITHM = "HS256"
-JWT_EXPIRATION_HOURS = 72
+# Access tokens carry the user's claims and are checked without a database read, so
+# they are short-lived; clients renew them with the session's refresh token
+ACCESS_TOKEN_TTL_MINUTES = float(os.environ.get('ACCESS_TOKEN_TTL_MINUTES', '15'))
+REFRESH_TOKEN_TTL_DAYS = float(os.environ.get('REFRESH_TOKEN_TTL_DAYS', '30'))
+
+# Comma-separated list of emails allowed to use /api/admin routes
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get('ADMIN_EMAILS', '').split(',') if e.strip()}
 
-# Create the main app
-app = FastAPI()
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
@@ -37,23 +147,13 @@ security = HTTPBearer()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Educational domain patterns
-ALLOWED_EMAIL_DOMAINS = [
-    r'\.edu$', r'\.edu\.\w+$', r'\.ac\.\w+$', r'@iit\w*\.', r'@nit\w*\.',
-    r'@bits-pilani\.', r'@vit\.', r'@manipal\.', r'@amity\.', r'@srm\.',
-    r'@iisc\.', r'@iiit\w*\.', r'\.college$', r'\.university$'
-]
+# Allowed registration domains are kept in Mongo and managed via /api/admin/email-domains
+EMAIL_POLICY_REFRESH_SECONDS = float(os.environ.get('EMAIL_POLICY_REFRESH_SECONDS', str(emailpolicy.POLICY_REFRESH_SECONDS)))
+email_policy = emailpolicy.PolicyStore(EMAIL_POLICY_REFRESH_SECONDS)
 
-def is_valid_edu_email(email: str) -> bool:
-    email_lower = email.lower()
-    demo_domains = ['gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com']
-    domain = email_lower.split('@')[-1]
-    if domain in demo_domains:
-        return True
-    for pattern in ALLOWED_EMAIL_DOMAINS:
-        if re.search(pattern, email_lower):
-            return True
-    return False
+async def is_valid_edu_email(email: str) -> bool:
+    await email_policy.refresh(db)
+    return email_policy.policy.allows(email)
 
 # ============ MODELS ============
 
@@ -61,14 +161,30 @@ class UserCreate(BaseModel):
     email: EmailStr
     password: str
     name: str
+    timezone: Optional[str] = None
 
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class EmailDomainRuleCreate(BaseModel):
+    kind: str  # 'domain', 'suffix' or 'pattern' (see emailpolicy.py)
+    value: str
+    note: Optional[str] = None
+
+class InviteActivation(BaseModel):
+    invite_token: str
+    password: str
+
 class RoleUpdate(BaseModel):
     role: str
 
+class TimezoneUpdate(BaseModel):
+    timezone: str  # IANA name, e.g. 'Asia/Kolkata'
+
 class TaskSubmission(BaseModel):
     task_id: str
     code: str
@@ -77,6 +193,7 @@ class TaskSubmission(BaseModel):
 class ChatMessage(BaseModel):
     message: str
     context: Optional[str] = None
+    task_id: Optional[str] = None
 
 class CodeRunRequest(BaseModel):
     code: str
@@ -110,1166 +227,199 @@ def hash_password(password: str) -> str:
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode(), hashed.encode())
 
-def create_token(user_id: str, email: str) -> str:
+def create_token(user: dict, session_id: str) -> str:
+    """Access token for `user`; its claims are a snapshot, renewed on refresh or by `reissue_token`"""
+    now = datetime.now(timezone.utc)
     payload = {
-        "user_id": user_id,
-        "email": email,
-        "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+        "type": "access",
+        "user_id": user["id"],
+        "sid": session_id,
+        "email": user["email"],
+        "name": user.get("name"),
+        "role": user.get("role"),
+        "level": user.get("level", "Beginner"),
+        "pv": user.get("progress_version", 0),
+        "iat": now,
+        "exp": now + timedelta(minutes=ACCESS_TOKEN_TTL_MINUTES)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def token_response(user: dict, session_id: str, refresh_token: str) -> dict:
+    return {
+        "token": create_token(user, session_id),
+        "refresh_token": refresh_token,
+        "expires_in": int(ACCESS_TOKEN_TTL_MINUTES * 60)
+    }
+
+async def reissue_token(response: Response, claims: dict):
+    """After a write that changes token claims (role, level, progress), hand the client a fresh access token"""
+    user = await db.users.find_one({"id": claims["id"]}, {"_id": 0, "password_hash": 0})
+    if user:
+        response.headers["X-Access-Token"] = create_token(user, claims["session_id"])
+
+async def run_blocking(func, *args, **kwargs):
+    """Run CPU-bound or blocking work (e.g. bcrypt) off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(func, *args, **kwargs))
+
+async def invalidate_user(user_id: str):
+    """Call after any write to a user document so no worker serves a stale copy"""
+    if cache_bus:
+        await cache_bus.publish(user_cache.name, user_id)
+    else:
+        user_cache.evict(user_id)
+
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    """The caller's identity and profile claims, straight from the access token (no database read).
+
+    Use this for routes that only need id/email/name/role/level; they may be up to
+    ACCESS_TOKEN_TTL_MINUTES stale. Routes that read progress, resumes etc. use
+    `get_current_user`.
+    """
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user = await db.users.find_one({"id": payload["user_id"]}, {"_id": 0})
-        if not user:
-            raise HTTPException(status_code=401, detail="User not found")
-        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
-
-# ============ DSA TRACK DATA ============
-
-DSA_TRACKS = {
-    "arrays": {
-        "name": "Arrays",
-        "description": "Master array operations - the foundation of coding interviews",
-        "order": 1,
-        "tasks": [
-            {
-                "id": "arr-001",
-                "title": "Two Sum",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Given an array of integers and a target sum, find two numbers that add up to the target.
-
-**Your Task:** Return the indices of two numbers that sum to target.
-
-**Example:**
-Input: nums = [2, 7, 11, 15], target = 9
-Output: [0, 1] (because nums[0] + nums[1] = 2 + 7 = 9)
-
-**Constraints:**
-- 2 <= nums.length <= 10^4
-- -10^9 <= nums[i] <= 10^9
-- Only one valid answer exists
-
-**Think about:**
-- What's the brute force approach? What's its time complexity?
-- Can you do better with a hash map?""",
-                "starter_code": """def two_sum(nums, target):
-    # Your code here
-    pass
-
-# Test your solution
-print(two_sum([2, 7, 11, 15], 9))  # Expected: [0, 1]
-print(two_sum([3, 2, 4], 6))  # Expected: [1, 2]""",
-                "hints": ["Start with the simplest approach: check every pair", "A hash map can help you find complements in O(1)", "Think about what you need to store as you iterate"],
-                "solution_explanation": """**Approach 1: Brute Force O(n²)**
-Check every pair of numbers. Simple but slow.
-
-**Approach 2: Hash Map O(n)**
-As you traverse, store each number and its index. For each number, check if (target - num) exists in your map.
-
-```python
-def two_sum(nums, target):
-    seen = {}
-    for i, num in enumerate(nums):
-        complement = target - num
-        if complement in seen:
-            return [seen[complement], i]
-        seen[num] = i
-    return []
-```
-
-**Time: O(n), Space: O(n)**"""
-            },
-            {
-                "id": "arr-002",
-                "title": "Maximum Subarray",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Find the contiguous subarray with the largest sum.
-
-**Your Task:** Return the maximum sum possible from any contiguous subarray.
-
-**Example:**
-Input: nums = [-2, 1, -3, 4, -1, 2, 1, -5, 4]
-Output: 6 (subarray [4, -1, 2, 1] has the largest sum)
-
-**Constraints:**
-- 1 <= nums.length <= 10^5
-- -10^4 <= nums[i] <= 10^4
-
-**Think about:**
-- At each position, should you extend the previous subarray or start fresh?
-- This is a classic dynamic programming problem (Kadane's Algorithm)""",
-                "starter_code": """def max_subarray(nums):
-    # Your code here
-    pass
-
-# Test
-print(max_subarray([-2, 1, -3, 4, -1, 2, 1, -5, 4]))  # Expected: 6""",
-                "hints": ["At each element, you have two choices: start fresh or continue", "Track the best ending at current position"],
-                "solution_explanation": """**Kadane's Algorithm O(n)**
-```python
-def max_subarray(nums):
-    max_ending_here = max_so_far = nums[0]
-    for num in nums[1:]:
-        max_ending_here = max(num, max_ending_here + num)
-        max_so_far = max(max_so_far, max_ending_here)
-    return max_so_far
-```
-**Time: O(n), Space: O(1)**"""
-            },
-            {
-                "id": "arr-003",
-                "title": "Contains Duplicate",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Check if any value appears at least twice in the array.
-
-**Your Task:** Return True if duplicates exist, False otherwise.
-
-**Example:**
-Input: nums = [1, 2, 3, 1]
-Output: True""",
-                "starter_code": """def contains_duplicate(nums):
-    # Your code here
-    pass
-
-print(contains_duplicate([1, 2, 3, 1]))  # Expected: True""",
-                "hints": ["Sets have O(1) lookup", "Compare set size with array size"],
-                "solution_explanation": """```python
-def contains_duplicate(nums):
-    return len(nums) != len(set(nums))
-```
-**Time: O(n), Space: O(n)**"""
-            },
-            {
-                "id": "arr-004",
-                "title": "Product of Array Except Self",
-                "difficulty": "Medium",
-                "points": 25,
-                "type": "coding",
-                "description": """Given an array nums, return an array where each element is the product of all other elements WITHOUT using division.
-
-**Example:**
-Input: nums = [1, 2, 3, 4]
-Output: [24, 12, 8, 6]""",
-                "starter_code": """def product_except_self(nums):
-    # No division allowed!
-    pass
-
-print(product_except_self([1, 2, 3, 4]))  # Expected: [24, 12, 8, 6]""",
-                "hints": ["Think prefix and suffix products", "Each answer = prefix[i-1] × suffix[i+1]"],
-                "solution_explanation": """**Two Pass Approach O(n)**
-```python
-def product_except_self(nums):
-    n = len(nums)
-    result = [1] * n
-    left = 1
-    for i in range(n):
-        result[i] = left
-        left *= nums[i]
-    right = 1
-    for i in range(n - 1, -1, -1):
-        result[i] *= right
-        right *= nums[i]
-    return result
-```"""
-            },
-            {
-                "id": "arr-005",
-                "title": "Rotate Array",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Rotate an array to the right by k steps in-place.
-
-**Example:**
-Input: nums = [1,2,3,4,5,6,7], k = 3
-Output: [5,6,7,1,2,3,4]""",
-                "starter_code": """def rotate(nums, k):
-    # Modify in-place
-    pass
-
-arr = [1,2,3,4,5,6,7]
-rotate(arr, 3)
-print(arr)  # Expected: [5,6,7,1,2,3,4]""",
-                "hints": ["k = k % len(nums) handles large k", "Try reversing: whole array, then first k, then rest"],
-                "solution_explanation": """**Reverse Method O(n) time, O(1) space**
-```python
-def rotate(nums, k):
-    n = len(nums)
-    k = k % n
-    def reverse(start, end):
-        while start < end:
-            nums[start], nums[end] = nums[end], nums[start]
-            start += 1
-            end -= 1
-    reverse(0, n - 1)
-    reverse(0, k - 1)
-    reverse(k, n - 1)
-```"""
-            }
-        ]
-    },
-    "strings": {
-        "name": "Strings",
-        "description": "String manipulation and pattern matching problems",
-        "order": 2,
-        "tasks": [
-            {
-                "id": "str-001",
-                "title": "Valid Palindrome",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Check if a string is a palindrome, considering only alphanumeric characters.
-
-**Example:**
-Input: "A man, a plan, a canal: Panama"
-Output: True""",
-                "starter_code": """def is_palindrome(s):
-    # Your code here
-    pass
-
-print(is_palindrome("A man, a plan, a canal: Panama"))  # True""",
-                "hints": ["Use two pointers", "Filter out non-alphanumeric characters"],
-                "solution_explanation": """```python
-def is_palindrome(s):
-    clean = ''.join(c.lower() for c in s if c.isalnum())
-    return clean == clean[::-1]
-```"""
-            },
-            {
-                "id": "str-002",
-                "title": "Valid Anagram",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Check if two strings are anagrams of each other.
-
-**Example:**
-Input: s = "anagram", t = "nagaram"
-Output: True""",
-                "starter_code": """def is_anagram(s, t):
-    pass
-
-print(is_anagram("anagram", "nagaram"))  # True""",
-                "hints": ["Count character frequencies", "Or sort both strings"],
-                "solution_explanation": """```python
-from collections import Counter
-def is_anagram(s, t):
-    return Counter(s) == Counter(t)
-```"""
-            },
-            {
-                "id": "str-003",
-                "title": "Longest Substring Without Repeating",
-                "difficulty": "Medium",
-                "points": 25,
-                "type": "coding",
-                "description": """Find the length of the longest substring without repeating characters.
-
-**Example:**
-Input: "abcabcbb"
-Output: 3 (substring "abc")""",
-                "starter_code": """def length_of_longest_substring(s):
-    pass
-
-print(length_of_longest_substring("abcabcbb"))  # 3""",
-                "hints": ["Use sliding window technique", "Track character positions with a hash map"],
-                "solution_explanation": """```python
-def length_of_longest_substring(s):
-    char_index = {}
-    max_len = start = 0
-    for i, c in enumerate(s):
-        if c in char_index and char_index[c] >= start:
-            start = char_index[c] + 1
-        char_index[c] = i
-        max_len = max(max_len, i - start + 1)
-    return max_len
-```"""
-            },
-            {
-                "id": "str-004",
-                "title": "Group Anagrams",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Group anagrams together from a list of strings.
-
-**Example:**
-Input: ["eat","tea","tan","ate","nat","bat"]
-Output: [["bat"],["nat","tan"],["ate","eat","tea"]]""",
-                "starter_code": """def group_anagrams(strs):
-    pass
-
-print(group_anagrams(["eat","tea","tan","ate","nat","bat"]))""",
-                "hints": ["Use sorted string as key", "defaultdict makes grouping easier"],
-                "solution_explanation": """```python
-from collections import defaultdict
-def group_anagrams(strs):
-    groups = defaultdict(list)
-    for s in strs:
-        groups[tuple(sorted(s))].append(s)
-    return list(groups.values())
-```"""
-            }
-        ]
-    },
-    "linked_lists": {
-        "name": "Linked Lists",
-        "description": "Pointer manipulation and linked data structures",
-        "order": 3,
-        "tasks": [
-            {
-                "id": "ll-001",
-                "title": "Reverse Linked List",
-                "difficulty": "Easy",
-                "points": 15,
-                "type": "coding",
-                "description": """Reverse a singly linked list.
-
-**Example:**
-Input: 1 -> 2 -> 3 -> 4 -> 5
-Output: 5 -> 4 -> 3 -> 2 -> 1""",
-                "starter_code": """class ListNode:
-    def __init__(self, val=0, next=None):
-        self.val = val
-        self.next = next
-
-def reverse_list(head):
-    # Your code here
-    pass""",
-                "hints": ["Use three pointers: prev, curr, next", "Iterative is simpler than recursive for interviews"],
-                "solution_explanation": """```python
-def reverse_list(head):
-    prev = None
-    curr = head
-    while curr:
-        next_node = curr.next
-        curr.next = prev
-        prev = curr
-        curr = next_node
-    return prev
-```"""
-            },
-            {
-                "id": "ll-002",
-                "title": "Detect Cycle in Linked List",
-                "difficulty": "Easy",
-                "points": 15,
-                "type": "coding",
-                "description": """Detect if a linked list has a cycle.
-
-**Think about:** Floyd's Cycle Detection (Tortoise and Hare)""",
-                "starter_code": """def has_cycle(head):
-    # Your code here
-    pass""",
-                "hints": ["Use slow and fast pointers", "If they meet, there's a cycle"],
-                "solution_explanation": """```python
-def has_cycle(head):
-    slow = fast = head
-    while fast and fast.next:
-        slow = slow.next
-        fast = fast.next.next
-        if slow == fast:
-            return True
-    return False
-```"""
-            },
-            {
-                "id": "ll-003",
-                "title": "Merge Two Sorted Lists",
-                "difficulty": "Easy",
-                "points": 15,
-                "type": "coding",
-                "description": """Merge two sorted linked lists into one sorted list.""",
-                "starter_code": """def merge_two_lists(l1, l2):
-    pass""",
-                "hints": ["Use a dummy head node", "Compare values and advance pointers"],
-                "solution_explanation": """```python
-def merge_two_lists(l1, l2):
-    dummy = ListNode()
-    curr = dummy
-    while l1 and l2:
-        if l1.val <= l2.val:
-            curr.next = l1
-            l1 = l1.next
-        else:
-            curr.next = l2
-            l2 = l2.next
-        curr = curr.next
-    curr.next = l1 or l2
-    return dummy.next
-```"""
-            }
-        ]
-    },
-    "stacks_queues": {
-        "name": "Stacks & Queues",
-        "description": "LIFO and FIFO data structures",
-        "order": 4,
-        "tasks": [
-            {
-                "id": "sq-001",
-                "title": "Valid Parentheses",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Check if brackets are valid: (), {}, []
-
-**Example:**
-Input: "()[]{}"
-Output: True""",
-                "starter_code": """def is_valid(s):
-    pass
-
-print(is_valid("()[]{}"))  # True""",
-                "hints": ["Use a stack", "Push opening brackets, pop for closing"],
-                "solution_explanation": """```python
-def is_valid(s):
-    stack = []
-    pairs = {')': '(', '}': '{', ']': '['}
-    for c in s:
-        if c in pairs:
-            if not stack or stack.pop() != pairs[c]:
-                return False
-        else:
-            stack.append(c)
-    return len(stack) == 0
-```"""
-            },
-            {
-                "id": "sq-002",
-                "title": "Min Stack",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Design a stack that supports getMin() in O(1) time.""",
-                "starter_code": """class MinStack:
-    def __init__(self):
-        pass
-    
-    def push(self, val):
-        pass
-    
-    def pop(self):
-        pass
-    
-    def top(self):
-        pass
-    
-    def getMin(self):
-        pass""",
-                "hints": ["Store (value, current_min) pairs", "Or maintain two stacks"],
-                "solution_explanation": """```python
-class MinStack:
-    def __init__(self):
-        self.stack = []
-    
-    def push(self, val):
-        min_val = min(val, self.stack[-1][1]) if self.stack else val
-        self.stack.append((val, min_val))
-    
-    def pop(self):
-        self.stack.pop()
-    
-    def top(self):
-        return self.stack[-1][0]
-    
-    def getMin(self):
-        return self.stack[-1][1]
-```"""
-            }
-        ]
-    },
-    "trees": {
-        "name": "Trees",
-        "description": "Binary trees and tree traversals",
-        "order": 5,
-        "tasks": [
-            {
-                "id": "tree-001",
-                "title": "Maximum Depth of Binary Tree",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Find the maximum depth (height) of a binary tree.""",
-                "starter_code": """class TreeNode:
-    def __init__(self, val=0, left=None, right=None):
-        self.val = val
-        self.left = left
-        self.right = right
-
-def max_depth(root):
-    pass""",
-                "hints": ["Use recursion", "Depth = 1 + max(left_depth, right_depth)"],
-                "solution_explanation": """```python
-def max_depth(root):
-    if not root:
-        return 0
-    return 1 + max(max_depth(root.left), max_depth(root.right))
-```"""
-            },
-            {
-                "id": "tree-002",
-                "title": "Invert Binary Tree",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """Invert (mirror) a binary tree.""",
-                "starter_code": """def invert_tree(root):
-    pass""",
-                "hints": ["Swap left and right children recursively"],
-                "solution_explanation": """```python
-def invert_tree(root):
-    if not root:
-        return None
-    root.left, root.right = invert_tree(root.right), invert_tree(root.left)
-    return root
-```"""
-            },
-            {
-                "id": "tree-003",
-                "title": "Validate Binary Search Tree",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Check if a binary tree is a valid BST.""",
-                "starter_code": """def is_valid_bst(root):
-    pass""",
-                "hints": ["Track valid range for each node", "Left subtree < root < right subtree"],
-                "solution_explanation": """```python
-def is_valid_bst(root, min_val=float('-inf'), max_val=float('inf')):
-    if not root:
-        return True
-    if root.val <= min_val or root.val >= max_val:
-        return False
-    return is_valid_bst(root.left, min_val, root.val) and is_valid_bst(root.right, root.val, max_val)
-```"""
-            }
-        ]
-    },
-    "dynamic_programming": {
-        "name": "Dynamic Programming",
-        "description": "Optimization problems with overlapping subproblems",
-        "order": 6,
-        "tasks": [
-            {
-                "id": "dp-001",
-                "title": "Climbing Stairs",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """You can climb 1 or 2 steps at a time. How many ways to reach the top?
-
-**Example:** n = 3 → Output: 3 (1+1+1, 1+2, 2+1)""",
-                "starter_code": """def climb_stairs(n):
-    pass
-
-print(climb_stairs(3))  # 3""",
-                "hints": ["It's the Fibonacci sequence!", "ways[n] = ways[n-1] + ways[n-2]"],
-                "solution_explanation": """```python
-def climb_stairs(n):
-    if n <= 2:
-        return n
-    a, b = 1, 2
-    for _ in range(3, n + 1):
-        a, b = b, a + b
-    return b
-```"""
-            },
-            {
-                "id": "dp-002",
-                "title": "House Robber",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "coding",
-                "description": """Rob houses without robbing adjacent ones. Maximize money.
-
-**Example:** [1,2,3,1] → Output: 4 (rob house 1 and 3)""",
-                "starter_code": """def rob(nums):
-    pass
-
-print(rob([1,2,3,1]))  # 4""",
-                "hints": ["At each house: rob it + prev_prev OR skip it + prev", "Track two states"],
-                "solution_explanation": """```python
-def rob(nums):
-    if not nums:
-        return 0
-    prev, curr = 0, 0
-    for n in nums:
-        prev, curr = curr, max(curr, prev + n)
-    return curr
-```"""
-            },
-            {
-                "id": "dp-003",
-                "title": "Coin Change",
-                "difficulty": "Medium",
-                "points": 25,
-                "type": "coding",
-                "description": """Find minimum coins needed to make the amount.
-
-**Example:** coins = [1,2,5], amount = 11 → Output: 3 (5+5+1)""",
-                "starter_code": """def coin_change(coins, amount):
-    pass
-
-print(coin_change([1,2,5], 11))  # 3""",
-                "hints": ["Build up from amount 0", "dp[i] = min coins to make amount i"],
-                "solution_explanation": """```python
-def coin_change(coins, amount):
-    dp = [float('inf')] * (amount + 1)
-    dp[0] = 0
-    for i in range(1, amount + 1):
-        for c in coins:
-            if c <= i:
-                dp[i] = min(dp[i], dp[i - c] + 1)
-    return dp[amount] if dp[amount] != float('inf') else -1
-```"""
-            }
-        ]
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return {
+        "id": payload["user_id"],
+        "session_id": payload["sid"],
+        "email": payload["email"],
+        "name": payload.get("name"),
+        "role": payload.get("role"),
+        "level": payload.get("level", "Beginner"),
+        "progress_version": payload.get("pv", 0),
+        "expires_at": payload["exp"]
     }
-}
 
-# ============ DATA ANALYTICS TRACK ============
-
-DATA_ANALYTICS_TRACKS = {
-    "sql": {
-        "name": "SQL Fundamentals",
-        "description": "Master SQL for data analysis and interviews",
-        "order": 1,
-        "tasks": [
-            {
-                "id": "sql-001",
-                "title": "SELECT Basics",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "concept",
-                "description": """**SELECT Statement Basics**
-
-The SELECT statement retrieves data from tables.
-
-```sql
--- Select all columns
-SELECT * FROM employees;
-
--- Select specific columns
-SELECT name, salary FROM employees;
-
--- Filter with WHERE
-SELECT name, salary FROM employees WHERE salary > 50000;
-
--- Order results
-SELECT name, salary FROM employees ORDER BY salary DESC;
-```
-
-**Practice:** Write a query to find all employees in the 'Engineering' department.""",
-                "starter_code": """-- Write your SQL query
-SELECT * FROM employees WHERE department = 'Engineering';""",
-                "hints": ["Use WHERE to filter", "Column names are case-insensitive in most databases"],
-                "solution_explanation": "SELECT filters rows, WHERE adds conditions, ORDER BY sorts results."
-            },
-            {
-                "id": "sql-002",
-                "title": "JOINs Explained",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "concept",
-                "description": """**SQL JOINs**
-
-JOINs combine rows from multiple tables.
-
-```sql
--- INNER JOIN: Only matching rows
-SELECT e.name, d.dept_name
-FROM employees e
-INNER JOIN departments d ON e.dept_id = d.id;
-
--- LEFT JOIN: All from left + matches from right
-SELECT e.name, d.dept_name
-FROM employees e
-LEFT JOIN departments d ON e.dept_id = d.id;
-```
-
-**Interview Tip:** Always know when to use INNER vs LEFT JOIN!""",
-                "starter_code": """-- Practice JOINs here""",
-                "hints": ["INNER JOIN = only matches", "LEFT JOIN = all left rows + matching right"],
-                "solution_explanation": "JOINs are crucial for combining normalized data."
-            },
-            {
-                "id": "sql-003",
-                "title": "GROUP BY & Aggregations",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "concept",
-                "description": """**Aggregation Functions**
-
-```sql
--- Count, Sum, Avg
-SELECT department, COUNT(*) as emp_count, AVG(salary) as avg_salary
-FROM employees
-GROUP BY department
-HAVING AVG(salary) > 60000;
-```
-
-**Common Functions:** COUNT, SUM, AVG, MIN, MAX""",
-                "starter_code": """-- Practice aggregations""",
-                "hints": ["GROUP BY groups rows", "HAVING filters groups (not rows)"],
-                "solution_explanation": "GROUP BY + aggregates = powerful data summarization"
-            }
-        ]
-    },
-    "excel": {
-        "name": "Excel for Analysis",
-        "description": "Essential Excel skills for data analysis",
-        "order": 2,
-        "tasks": [
-            {
-                "id": "excel-001",
-                "title": "VLOOKUP & XLOOKUP",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "concept",
-                "description": """**Lookup Functions**
-
-VLOOKUP searches vertically, XLOOKUP is the modern replacement.
-
-```
-=VLOOKUP(search_key, range, index, [is_sorted])
-=XLOOKUP(search_key, lookup_range, return_range)
-```
-
-**Interview Question:** Why is XLOOKUP better?
-- Can search left
-- Cleaner syntax
-- Better error handling""",
-                "starter_code": "Practice VLOOKUP formulas",
-                "hints": ["XLOOKUP is newer and more flexible", "Always use FALSE for exact match in VLOOKUP"],
-                "solution_explanation": "Lookup functions are essential for joining data in Excel"
-            },
-            {
-                "id": "excel-002",
-                "title": "Pivot Tables",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "concept",
-                "description": """**Pivot Tables**
-
-Pivot tables summarize large datasets quickly.
-
-Steps:
-1. Select data range
-2. Insert → Pivot Table
-3. Drag fields to Rows, Columns, Values
-
-**Common Uses:**
-- Sales by region
-- Count by category
-- Average by time period""",
-                "starter_code": "Create a pivot table showing sales by product category",
-                "hints": ["Rows = categories", "Values = what you're measuring"],
-                "solution_explanation": "Pivot tables are interview favorites for data analyst roles"
-            }
-        ]
-    },
-    "eda": {
-        "name": "Exploratory Data Analysis",
-        "description": "Techniques for understanding data",
-        "order": 3,
-        "tasks": [
-            {
-                "id": "eda-001",
-                "title": "Data Profiling Steps",
-                "difficulty": "Easy",
-                "points": 15,
-                "type": "concept",
-                "description": """**EDA Checklist**
-
-1. **Shape & Size**: rows, columns
-2. **Data Types**: numeric, categorical, datetime
-3. **Missing Values**: count, percentage
-4. **Distributions**: histograms, box plots
-5. **Correlations**: heatmaps
-6. **Outliers**: IQR method, z-scores
-
-```python
-df.info()
-df.describe()
-df.isnull().sum()
-df.hist()
-```""",
-                "starter_code": """import pandas as pd
-# Load and explore your data
-df = pd.read_csv('data.csv')
-print(df.info())""",
-                "hints": ["Always start with .info() and .describe()", "Visualize before modeling"],
-                "solution_explanation": "EDA is 80% of a data scientist's work!"
-            }
-        ]
-    }
-}
+async def get_current_user(claims: dict = Depends(get_token_claims)):
+    user = user_cache.get(claims["id"])
+    # A cached copy older than the progress the token has seen is stale: refetch it
+    if user is None or user.get("progress_version", 0) < claims["progress_version"]:
+        user = await db.users.find_one({"id": claims["id"]}, {"_id": 0})
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        user_cache.set(user["id"], user)
+    return user
 
-# ============ DATA SCIENCE TRACK ============
-
-DATA_SCIENCE_TRACKS = {
-    "python_ds": {
-        "name": "Python for Data Science",
-        "description": "NumPy, Pandas, and data manipulation",
-        "order": 1,
-        "tasks": [
-            {
-                "id": "pyds-001",
-                "title": "NumPy Arrays",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """**NumPy Basics**
-
-NumPy is the foundation of Python data science.
-
-```python
-import numpy as np
-
-arr = np.array([1, 2, 3, 4, 5])
-print(arr.mean())  # 3.0
-print(arr.std())   # 1.414...
-
-# Broadcasting
-arr * 2  # [2, 4, 6, 8, 10]
-```""",
-                "starter_code": """import numpy as np
-
-# Create an array and calculate statistics
-arr = np.array([10, 20, 30, 40, 50])
-# Your code here""",
-                "hints": ["NumPy operations are vectorized", "Use .reshape() to change dimensions"],
-                "solution_explanation": "NumPy is fast because operations happen in C"
-            },
-            {
-                "id": "pyds-002",
-                "title": "Pandas DataFrames",
-                "difficulty": "Easy",
-                "points": 15,
-                "type": "coding",
-                "description": """**Pandas Essentials**
-
-```python
-import pandas as pd
-
-df = pd.DataFrame({
-    'name': ['Alice', 'Bob', 'Charlie'],
-    'age': [25, 30, 35],
-    'salary': [50000, 60000, 70000]
-})
-
-# Filter
-df[df['age'] > 25]
-
-# Group
-df.groupby('age')['salary'].mean()
-```""",
-                "starter_code": """import pandas as pd
-
-# Create and manipulate a DataFrame
-df = pd.DataFrame({
-    'product': ['A', 'B', 'A', 'B'],
-    'sales': [100, 200, 150, 250]
-})
-# Group by product and sum sales""",
-                "hints": ["Use .groupby() for aggregations", ".loc[] for label-based indexing"],
-                "solution_explanation": "Pandas is built on NumPy, adding labels and data manipulation"
-            }
-        ]
-    },
-    "statistics": {
-        "name": "Statistics Simplified",
-        "description": "Statistics concepts in plain English",
-        "order": 2,
-        "tasks": [
-            {
-                "id": "stats-001",
-                "title": "Mean, Median, Mode",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "concept",
-                "description": """**Central Tendency**
-
-- **Mean**: Average (sensitive to outliers)
-- **Median**: Middle value (robust to outliers)
-- **Mode**: Most frequent value
-
-**Interview Question:** When to use median over mean?
-Answer: When data has outliers (e.g., income data)
-
-```python
-import numpy as np
-data = [1, 2, 2, 3, 100]
-np.mean(data)    # 21.6 (skewed by 100)
-np.median(data)  # 2 (better representation)
-```""",
-                "starter_code": "# Calculate mean, median, mode",
-                "hints": ["Median is robust to outliers", "Mode can have multiple values"],
-                "solution_explanation": "Understanding when to use each measure is crucial for interviews"
-            },
-            {
-                "id": "stats-002",
-                "title": "Standard Deviation & Variance",
-                "difficulty": "Medium",
-                "points": 15,
-                "type": "concept",
-                "description": """**Spread Measures**
-
-- **Variance**: Average squared distance from mean
-- **Std Dev**: Square root of variance (same units as data)
-
-```python
-data = [2, 4, 6, 8, 10]
-variance = np.var(data)  # 8.0
-std_dev = np.std(data)   # 2.83
-```
-
-**68-95-99.7 Rule**: In normal distribution:
-- 68% within 1 std dev
-- 95% within 2 std dev
-- 99.7% within 3 std dev""",
-                "starter_code": "# Calculate variance and std dev",
-                "hints": ["Std dev has same units as data", "Variance is std dev squared"],
-                "solution_explanation": "Standard deviation tells you how spread out data is"
-            }
-        ]
-    }
-}
+def rate_limited(route_class: str):
+    """Dependency: the caller's token claims, after charging one request to their budget for `route_class`"""
+    async def dependency(claims: dict = Depends(get_token_claims)):
+        await rate_limiter.check(claims["id"], route_class)
+        return claims
+    return dependency
 
-# ============ ML TRACK ============
-
-ML_TRACKS = {
-    "ml_basics": {
-        "name": "ML Fundamentals",
-        "description": "Core machine learning concepts",
-        "order": 1,
-        "tasks": [
-            {
-                "id": "ml-001",
-                "title": "Supervised vs Unsupervised",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "concept",
-                "description": """**Types of Machine Learning**
-
-**Supervised Learning**
-- Has labeled data (X → y)
-- Examples: Classification, Regression
-- Algorithms: Linear Regression, Random Forest, SVM
-
-**Unsupervised Learning**
-- No labels
-- Examples: Clustering, Dimensionality Reduction
-- Algorithms: K-Means, PCA, DBSCAN
-
-**Interview Question:** Give an example of each.
-- Supervised: Predicting house prices (regression)
-- Unsupervised: Customer segmentation (clustering)""",
-                "starter_code": "# Understand the difference",
-                "hints": ["Labels = supervised", "No labels = unsupervised"],
-                "solution_explanation": "This is a fundamental interview question!"
-            },
-            {
-                "id": "ml-002",
-                "title": "Overfitting & Underfitting",
-                "difficulty": "Medium",
-                "points": 20,
-                "type": "concept",
-                "description": """**Model Fitting**
-
-**Underfitting** (High Bias)
-- Model too simple
-- Poor on training AND test data
-- Fix: More features, complex model
-
-**Overfitting** (High Variance)
-- Model memorizes training data
-- Great on training, poor on test
-- Fix: Regularization, more data, simpler model
-
-**The Sweet Spot**
-- Good on both training and test
-- Achieved through cross-validation""",
-                "starter_code": "# Identify fitting issues",
-                "hints": ["Training error low, test error high = overfitting", "Both errors high = underfitting"],
-                "solution_explanation": "Understanding this trade-off is crucial for ML interviews"
-            },
-            {
-                "id": "ml-003",
-                "title": "Train-Test Split",
-                "difficulty": "Easy",
-                "points": 10,
-                "type": "coding",
-                "description": """**Data Splitting**
-
-```python
-from sklearn.model_selection import train_test_split
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
-```
-
-**Why split?**
-- Evaluate on unseen data
-- Prevent overfitting
-- Common splits: 80/20, 70/30""",
-                "starter_code": """from sklearn.model_selection import train_test_split
-# Split your data""",
-                "hints": ["random_state for reproducibility", "Stratify for imbalanced classes"],
-                "solution_explanation": "Never evaluate on training data!"
-            }
-        ]
-    }
-}
+async def get_admin_user(claims: dict = Depends(get_token_claims)):
+    if claims["email"].lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return claims
 
-# ============ JOB TRENDS DATA ============
-
-JOB_TRENDS = [
-    {
-        "id": "trend-1",
-        "title": "AI/ML Engineers in High Demand",
-        "description": "Companies are actively hiring ML engineers with PyTorch/TensorFlow experience. Average salary: $150K+",
-        "skills": ["Python", "PyTorch", "TensorFlow", "MLOps"],
-        "category": "ML Engineer"
-    },
-    {
-        "id": "trend-2", 
-        "title": "Data Analytics Boom",
-        "description": "SQL and Python skills are must-haves. Power BI and Tableau knowledge is a plus.",
-        "skills": ["SQL", "Python", "Power BI", "Excel"],
-        "category": "Data Analyst"
-    },
-    {
-        "id": "trend-3",
-        "title": "Full-Stack Still Strong",
-        "description": "React + Node.js remains the most popular stack. TypeScript adoption increasing.",
-        "skills": ["React", "Node.js", "TypeScript", "PostgreSQL"],
-        "category": "SDE"
-    },
-    {
-        "id": "trend-4",
-        "title": "Cloud Skills Essential",
-        "description": "AWS, GCP, and Azure certifications boost hiring chances significantly.",
-        "skills": ["AWS", "Docker", "Kubernetes", "CI/CD"],
-        "category": "SDE"
-    }
-]
+# ============ CONTENT ============
 
-# ============ RESUME TEMPLATES ============
-
-RESUME_TEMPLATES = {
-    "google": {
-        "name": "Google",
-        "focus": ["Impact metrics", "Technical depth", "Leadership"],
-        "tips": [
-            "Quantify impact (X% improvement, $Y saved)",
-            "Highlight system design experience",
-            "Show cross-team collaboration",
-            "Include open-source contributions"
-        ],
-        "sections": ["Summary", "Experience", "Projects", "Skills", "Education"]
-    },
-    "microsoft": {
-        "name": "Microsoft",
-        "focus": ["Growth mindset", "Collaboration", "Innovation"],
-        "tips": [
-            "Emphasize learning and adaptation",
-            "Show team collaboration examples",
-            "Highlight product impact",
-            "Include certifications if relevant"
-        ],
-        "sections": ["Summary", "Experience", "Projects", "Skills", "Education", "Certifications"]
-    },
-    "infosys": {
-        "name": "Infosys",
-        "focus": ["Technical skills", "Problem-solving", "Adaptability"],
-        "tips": [
-            "List all technical skills clearly",
-            "Include academic projects",
-            "Mention relevant coursework",
-            "Highlight internship experience"
-        ],
-        "sections": ["Objective", "Education", "Skills", "Projects", "Internships", "Achievements"]
-    },
-    "amazon": {
-        "name": "Amazon",
-        "focus": ["Leadership Principles", "Customer obsession", "Ownership"],
-        "tips": [
-            "Use STAR format for experiences",
-            "Align with Amazon's 16 Leadership Principles",
-            "Show customer-centric thinking",
-            "Demonstrate bias for action"
-        ],
-        "sections": ["Summary", "Experience", "Projects", "Skills", "Education"]
-    }
-}
+def catalog() -> content.Catalog:
+    """Current content version; read it once per request so a reload can't change it midway"""
+    return content_store.catalog
 
 # ============ AUTH ROUTES ============
 
 @api_router.post("/auth/register")
-async def register(user: UserCreate):
-    if not is_valid_edu_email(user.email):
+async def register(user: UserCreate, request: Request):
+    if not await is_valid_edu_email(user.email):
         raise HTTPException(status_code=400, detail="Please use a valid educational email")
+    if user.timezone and not activity.is_valid_timezone(user.timezone):
+        raise HTTPException(status_code=400, detail="Invalid timezone")
     
+    # Cheap pre-check so a known address doesn't cost a bcrypt hash; the unique index settles races
     existing = await db.users.find_one({"email": user.email.lower()}, {"_id": 0, "id": 1})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    user_id = str(uuid.uuid4())
-    user_doc = {
-        "id": user_id,
-        "email": user.email.lower(),
-        "name": user.name,
-        "password_hash": hash_password(user.password),
-        "role": None,
-        "points": 0,
-        "level": "Beginner",
-        "created_at": datetime.now(timezone.utc).isoformat(),
-        "progress": {},
-        "weekly_activity": {"dsa": 0, "github": 0, "linkedin": 0},
-        "streak": {"current": 0, "longest": 0, "last_activity": None},
-        "resumes": []
-    }
-    
-    await db.users.insert_one(user_doc)
-    token = create_token(user_id, user.email)
+    user_doc = onboarding.new_user_document(
+        user.email, user.name, await run_blocking(hash_password, user.password), user.timezone)
+    user_id = user_doc["id"]
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    session_id, refresh_token = await session_store.create(user_id, request.headers.get("user-agent"))
     
     return {
-        "token": token,
+        **token_response(user_doc, session_id, refresh_token),
         "user": {"id": user_id, "email": user.email.lower(), "name": user.name, "role": None, "points": 0, "level": "Beginner"}
     }
 
 @api_router.post("/auth/login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, request: Request):
     user = await db.users.find_one({"email": credentials.email.lower()}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password_hash"]):
+    # Onboarded users without a password yet have to activate their invite first
+    if not user or not user.get("password_hash") or \
+            not await run_blocking(verify_password, credentials.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    token = create_token(user["id"], user["email"])
+    session_id, refresh_token = await session_store.create(user["id"], request.headers.get("user-agent"))
     return {
-        "token": token,
+        **token_response(user, session_id, refresh_token),
         "user": {"id": user["id"], "email": user["email"], "name": user["name"], "role": user.get("role"), "points": user.get("points", 0), "level": user.get("level", "Beginner")}
     }
 
+@api_router.post("/auth/activate")
+async def activate_invite(body: InviteActivation, request: Request):
+    """Set the password for a bulk-onboarded account and sign in"""
+    password_hash = await run_blocking(hash_password, body.password)
+    user = await db.users.find_one_and_update(
+        {"invite.token_hash": onboarding.invite_hash(body.invite_token),
+         "invite.expires_at": {"$gt": datetime.now(timezone.utc)}},
+        {"$set": {"password_hash": password_hash, "updated_at": datetime.now(timezone.utc).isoformat()},
+         "$unset": {"invite": ""}},
+        projection={"_id": 0, "password_hash": 0, "invite": 0}
+    )
+    if not user:
+        raise HTTPException(status_code=400, detail="Invite is invalid or has expired")
+    await invalidate_user(user["id"])
+    session_id, refresh_token = await session_store.create(user["id"], request.headers.get("user-agent"))
+    return {
+        **token_response(user, session_id, refresh_token),
+        "user": {"id": user["id"], "email": user["email"], "name": user["name"], "role": user.get("role"), "points": user.get("points", 0), "level": user.get("level", "Beginner")}
+    }
+
+@api_router.post("/auth/refresh")
+async def refresh_session(body: RefreshRequest):
+    """Rotate the refresh token and issue a new access token with current claims"""
+    rotated = await session_store.rotate(body.refresh_token)
+    if rotated is None:
+        raise HTTPException(status_code=401, detail="Session expired or revoked")
+    session, refresh_token = rotated
+    user = await db.users.find_one({"id": session["user_id"]}, {"_id": 0, "password_hash": 0})
+    if not user:
+        await session_store.revoke(session["_id"])
+        raise HTTPException(status_code=401, detail="User not found")
+    return token_response(user, session["_id"], refresh_token)
+
+@api_router.post("/auth/logout")
+async def logout(body: RefreshRequest):
+    await session_store.revoke_token(body.refresh_token)
+    return {"message": "Logged out"}
+
+@api_router.get("/auth/sessions")
+async def list_sessions(claims: dict = Depends(get_token_claims)):
+    active = await session_store.active(claims["id"])
+    return {"sessions": [{**s, "current": s["id"] == claims["session_id"]} for s in active]}
+
+@api_router.delete("/auth/sessions/{session_id}")
+async def revoke_session(session_id: str, claims: dict = Depends(get_token_claims)):
+    """Sign out one session; its access tokens lapse within ACCESS_TOKEN_TTL_MINUTES"""
+    if not await session_store.revoke(session_id, user_id=claims["id"]):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"message": "Session revoked"}
+
 # ============ USER ROUTES ============
 
 @api_router.get("/users/profile")
 async def get_profile(user: dict = Depends(get_current_user)):
+    rollups = activity.current_rollups(user)
     return {
         "id": user["id"],
         "email": user["email"],
@@ -1277,56 +427,122 @@ async def get_profile(user: dict = Depends(get_current_user)):
         "role": user.get("role"),
         "points": user.get("points", 0),
         "level": user.get("level", "Beginner"),
+        "timezone": user.get("timezone", activity.DEFAULT_TIMEZONE),
         "progress": user.get("progress", {}),
-        "weekly_activity": user.get("weekly_activity", {}),
-        "streak": user.get("streak", {"current": 0, "longest": 0}),
+        "weekly_activity": rollups["weekly_activity"],
+        "monthly_activity": rollups["monthly_activity"],
+        "streak": activity.effective_streak(user),
         "resumes": user.get("resumes", [])
     }
 
 @api_router.put("/users/role")
-async def update_role(role_data: RoleUpdate, user: dict = Depends(get_current_user)):
+async def update_role(role_data: RoleUpdate, response: Response, user: dict = Depends(get_token_claims)):
     valid_roles = ["SDE", "Data Analyst", "Data Scientist", "ML Engineer"]
     if role_data.role not in valid_roles:
         raise HTTPException(status_code=400, detail=f"Invalid role. Choose from: {valid_roles}")
     
-    await db.users.update_one({"id": user["id"]}, {"$set": {"role": role_data.role}})
+    await db.users.update_one({"id": user["id"]},
+                              {"$set": {"role": role_data.role, "updated_at": datetime.now(timezone.utc).isoformat()}})
+    await invalidate_user(user["id"])
+    await reissue_token(response, user)
     return {"message": "Role updated", "role": role_data.role}
 
+@api_router.put("/users/timezone")
+async def update_timezone(tz_data: TimezoneUpdate, user: dict = Depends(get_token_claims)):
+    if not activity.is_valid_timezone(tz_data.timezone):
+        raise HTTPException(status_code=400, detail="Invalid timezone")
+    
+    await db.users.update_one({"id": user["id"]},
+                              {"$set": {"timezone": tz_data.timezone, "updated_at": datetime.now(timezone.utc).isoformat()}})
+    await invalidate_user(user["id"])
+    return {"message": "Timezone updated", "timezone": tz_data.timezone}
+
 @api_router.post("/users/streak")
 async def update_streak(streak_data: StreakUpdate, user: dict = Depends(get_current_user)):
-    current_streak = user.get("streak", {"current": 0, "longest": 0, "last_activity": None})
-    last_activity = current_streak.get("last_activity")
-    today = datetime.now(timezone.utc).date().isoformat()
+    if streak_data.activity_type not in activity.ACTIVITY_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid activity type. Choose from: {list(activity.ACTIVITY_TYPES)}")
     
-    if last_activity == today:
-        return {"message": "Already logged today", "streak": current_streak}
+    result = await activity.record_activity(db, user, streak_data.activity_type)
+    await invalidate_user(user["id"])
     
-    yesterday = (datetime.now(timezone.utc).date() - timedelta(days=1)).isoformat()
-    
-    if last_activity == yesterday:
-        new_current = current_streak.get("current", 0) + 1
-    else:
-        new_current = 1
+    if not result["new_day"]:
+        return {"message": "Already logged today", "streak": result["streak"]}
+    return {"message": "Streak updated!", "streak": result["streak"]}
+
+@api_router.get("/users/activity/heatmap")
+async def get_activity_heatmap(year: Optional[int] = None, user: dict = Depends(get_current_user)):
+    year = year or activity.local_today(user.get("timezone")).year
+    bitmap = await db.activity_days.find_one({"_id": activity.bitmap_doc_id(user["id"], year)})
+    return {"year": year, "days": activity.active_days(bitmap, year)}
+
+# ============ SKILLS ROUTES ============
+
+# Track pages only need these; the heavy markdown fields come from the task routes
+TASK_SUMMARY_FIELDS = ("id", "title", "difficulty", "points", "type")
+TASK_DETAIL_FIELDS = ("id", "title", "difficulty", "points", "type", "description",
+                      "starter_code", "hints", "solution_explanation")
+
+def parse_task_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Parse a `fields=a,b,c` selector; None means every detail field"""
+    if not fields:
+        return None
+    selected = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in selected if f not in TASK_DETAIL_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {unknown}. Choose from: {list(TASK_DETAIL_FIELDS)}")
+    return selected
+
+def task_summary(task: dict, user_progress: dict) -> dict:
+    summary = {k: task[k] for k in TASK_SUMMARY_FIELDS if k in task}
+    summary["completed"] = user_progress.get(task["id"], {}).get("completed", False)
+    summary["attempts"] = user_progress.get(task["id"], {}).get("attempts", 0)
+    return summary
+
+def task_detail(task: dict, user_progress: dict, fields: Optional[List[str]] = None) -> dict:
+    progress = user_progress.get(task["id"], {})
+    completed = progress.get("completed", False)
+    detail = {k: task[k] for k in (fields or TASK_DETAIL_FIELDS) if k in task}
+    # Solutions unlock once the task is completed
+    if not completed and "solution_explanation" in detail:
+        del detail["solution_explanation"]
+        detail["solution_locked"] = True
+    detail["id"] = task["id"]
+    detail["completed"] = completed
+    detail["attempts"] = progress.get("attempts", 0)
+    detail["hint_level"] = progress.get("hint_level", 0)
+    return detail
+
+def get_track_summary(tracks: dict, track_id: str, user: dict) -> dict:
+    if track_id not in tracks:
+        raise HTTPException(status_code=404, detail="Track not found")
     
-    new_longest = max(new_current, current_streak.get("longest", 0))
+    track = tracks[track_id]
+    user_progress = user.get("progress", {})
+    tasks = [task_summary(task, user_progress) for task in track["tasks"]]
     
-    new_streak = {"current": new_current, "longest": new_longest, "last_activity": today}
+    return {
+        "id": track_id,
+        "name": track["name"],
+        "description": track["description"],
+        "total_tasks": len(tasks),
+        "completed_tasks": sum(1 for t in tasks if t["completed"]),
+        "tasks": tasks
+    }
+
+def get_track_task(tracks: dict, track_id: str, task_id: str, user: dict, fields: Optional[str]) -> dict:
+    if track_id not in tracks:
+        raise HTTPException(status_code=404, detail="Track not found")
     
-    # Update weekly activity
-    activity_key = f"weekly_activity.{streak_data.activity_type}"
-    await db.users.update_one(
-        {"id": user["id"]},
-        {"$set": {"streak": new_streak}, "$inc": {activity_key: 1}}
-    )
+    task = next((t for t in tracks[track_id]["tasks"] if t["id"] == task_id), None)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
     
-    return {"message": "Streak updated!", "streak": new_streak}
-
-# ============ SKILLS ROUTES ============
+    return task_detail(task, user.get("progress", {}), parse_task_fields(fields))
 
 @api_router.get("/skills/dsa")
 async def get_dsa_tracks(user: dict = Depends(get_current_user)):
     tracks = []
-    for key, track in DSA_TRACKS.items():
+    for key, track in catalog().tracks("dsa").items():
         user_progress = user.get("progress", {})
         completed = sum(1 for t in track["tasks"] if user_progress.get(t["id"], {}).get("completed", False))
         tracks.append({
@@ -1341,48 +557,16 @@ async def get_dsa_tracks(user: dict = Depends(get_current_user)):
 
 @api_router.get("/skills/dsa/{track_id}")
 async def get_dsa_track(track_id: str, user: dict = Depends(get_current_user)):
-    if track_id not in DSA_TRACKS:
-        raise HTTPException(status_code=404, detail="Track not found")
-    
-    track = DSA_TRACKS[track_id]
-    user_progress = user.get("progress", {})
-    
-    tasks_with_progress = []
-    for task in track["tasks"]:
-        task_copy = task.copy()
-        task_copy["completed"] = user_progress.get(task["id"], {}).get("completed", False)
-        task_copy["attempts"] = user_progress.get(task["id"], {}).get("attempts", 0)
-        tasks_with_progress.append(task_copy)
-    
-    return {
-        "id": track_id,
-        "name": track["name"],
-        "description": track["description"],
-        "total_tasks": len(track["tasks"]),
-        "completed_tasks": sum(1 for t in tasks_with_progress if t["completed"]),
-        "tasks": tasks_with_progress
-    }
+    return get_track_summary(catalog().tracks("dsa"), track_id, user)
 
 @api_router.get("/skills/dsa/{track_id}/{task_id}")
-async def get_dsa_task(track_id: str, task_id: str, user: dict = Depends(get_current_user)):
-    if track_id not in DSA_TRACKS:
-        raise HTTPException(status_code=404, detail="Track not found")
-    
-    task = next((t for t in DSA_TRACKS[track_id]["tasks"] if t["id"] == task_id), None)
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    
-    user_progress = user.get("progress", {}).get(task_id, {})
-    task_copy = task.copy()
-    task_copy["completed"] = user_progress.get("completed", False)
-    task_copy["attempts"] = user_progress.get("attempts", 0)
-    
-    return task_copy
+async def get_dsa_task(track_id: str, task_id: str, fields: Optional[str] = None, user: dict = Depends(get_current_user)):
+    return get_track_task(catalog().tracks("dsa"), track_id, task_id, user, fields)
 
 @api_router.get("/skills/analytics")
 async def get_analytics_tracks(user: dict = Depends(get_current_user)):
     tracks = []
-    for key, track in DATA_ANALYTICS_TRACKS.items():
+    for key, track in catalog().tracks("analytics").items():
         user_progress = user.get("progress", {})
         completed = sum(1 for t in track["tasks"] if user_progress.get(t["id"], {}).get("completed", False))
         tracks.append({
@@ -1396,24 +580,16 @@ async def get_analytics_tracks(user: dict = Depends(get_current_user)):
 
 @api_router.get("/skills/analytics/{track_id}")
 async def get_analytics_track(track_id: str, user: dict = Depends(get_current_user)):
-    if track_id not in DATA_ANALYTICS_TRACKS:
-        raise HTTPException(status_code=404, detail="Track not found")
-    
-    track = DATA_ANALYTICS_TRACKS[track_id]
-    user_progress = user.get("progress", {})
-    
-    tasks = []
-    for task in track["tasks"]:
-        task_copy = task.copy()
-        task_copy["completed"] = user_progress.get(task["id"], {}).get("completed", False)
-        tasks.append(task_copy)
-    
-    return {"id": track_id, "name": track["name"], "tasks": tasks}
+    return get_track_summary(catalog().tracks("analytics"), track_id, user)
+
+@api_router.get("/skills/analytics/{track_id}/{task_id}")
+async def get_analytics_task(track_id: str, task_id: str, fields: Optional[str] = None, user: dict = Depends(get_current_user)):
+    return get_track_task(catalog().tracks("analytics"), track_id, task_id, user, fields)
 
 @api_router.get("/skills/datascience")
 async def get_datascience_tracks(user: dict = Depends(get_current_user)):
     tracks = []
-    for key, track in DATA_SCIENCE_TRACKS.items():
+    for key, track in catalog().tracks("datascience").items():
         user_progress = user.get("progress", {})
         completed = sum(1 for t in track["tasks"] if user_progress.get(t["id"], {}).get("completed", False))
         tracks.append({
@@ -1428,7 +604,7 @@ async def get_datascience_tracks(user: dict = Depends(get_current_user)):
 @api_router.get("/skills/ml")
 async def get_ml_tracks(user: dict = Depends(get_current_user)):
     tracks = []
-    for key, track in ML_TRACKS.items():
+    for key, track in catalog().tracks("ml").items():
         user_progress = user.get("progress", {})
         completed = sum(1 for t in track["tasks"] if user_progress.get(t["id"], {}).get("completed", False))
         tracks.append({
@@ -1440,43 +616,92 @@ async def get_ml_tracks(user: dict = Depends(get_current_user)):
         })
     return {"tracks": tracks}
 
+@api_router.get("/skills/datascience/{track_id}")
+async def get_datascience_track(track_id: str, user: dict = Depends(get_current_user)):
+    return get_track_summary(catalog().tracks("datascience"), track_id, user)
+
+@api_router.get("/skills/datascience/{track_id}/{task_id}")
+async def get_datascience_task(track_id: str, task_id: str, fields: Optional[str] = None, user: dict = Depends(get_current_user)):
+    return get_track_task(catalog().tracks("datascience"), track_id, task_id, user, fields)
+
+@api_router.get("/skills/ml/{track_id}")
+async def get_ml_track(track_id: str, user: dict = Depends(get_current_user)):
+    return get_track_summary(catalog().tracks("ml"), track_id, user)
+
+@api_router.get("/skills/ml/{track_id}/{task_id}")
+async def get_ml_task(track_id: str, task_id: str, fields: Optional[str] = None, user: dict = Depends(get_current_user)):
+    return get_track_task(catalog().tracks("ml"), track_id, task_id, user, fields)
+
+# ============ SEARCH ============
+
+@api_router.get("/search")
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    family: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    user: dict = Depends(get_current_user)
+):
+    if family and family not in content.TRACK_FAMILIES:
+        raise HTTPException(status_code=400, detail=f"Unknown track family. Choose from: {list(content.TRACK_FAMILIES)}")
+    
+    user_progress = user.get("progress", {})
+    results = search_index.search(q, limit=limit, family=family)
+    for result in results:
+        result["completed"] = user_progress.get(result["id"], {}).get("completed", False)
+    return {"query": q, "results": results}
+
+@api_router.get("/search/suggest")
+async def suggest_search_terms(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(8, ge=1, le=20),
+    user: dict = Depends(get_current_user)
+):
+    return {"query": q, "suggestions": search_index.suggest(q, limit=limit)}
+
 # ============ TASK SUBMISSION ============
 
 @api_router.post("/tasks/{task_id}/submit")
-async def submit_task(task_id: str, submission: TaskSubmission, user: dict = Depends(get_current_user)):
-    # Find task in all tracks
-    task = None
-    for track_data in [DSA_TRACKS, DATA_ANALYTICS_TRACKS, DATA_SCIENCE_TRACKS, ML_TRACKS]:
-        for track in track_data.values():
-            task = next((t for t in track["tasks"] if t["id"] == task_id), None)
-            if task:
-                break
-        if task:
-            break
+async def submit_task(task_id: str, submission: TaskSubmission, response: Response, claims: dict = Depends(get_token_claims),
+                      user: dict = Depends(get_current_user)):
+    task = catalog().find_task(task_id)
     
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
     
     progress_key = f"progress.{task_id}"
-    current_progress = user.get("progress", {}).get(task_id, {"attempts": 0, "completed": False})
+    analysis = await review_complexity(task, submission.code)
+    # Identical code is stored once; the progress record only points at it
+    code_hash = await submissions.store(db, submission.code)
     
-    new_progress = {
-        "attempts": current_progress.get("attempts", 0) + 1,
-        "completed": True,
-        "last_submission": datetime.now(timezone.utc).isoformat(),
-        "code": submission.code
+    # Field-level $set/$inc keeps this correct even if `user` is a slightly stale cached copy
+    submitted_at = datetime.now(timezone.utc).isoformat()
+    progress_update = {
+        "$set": {
+            f"{progress_key}.completed": True,
+            f"{progress_key}.last_submission": submitted_at,
+            f"{progress_key}.code_hash": code_hash,
+            "updated_at": submitted_at
+        },
+        "$unset": {f"{progress_key}.code": ""},
+        "$inc": {f"{progress_key}.attempts": 1, "progress_version": 1}
     }
+    # The pre-update document tells us which blob the record stops referencing
+    previous = {"_id": 0, f"{progress_key}.code_hash": 1}
     
-    points_earned = 0
-    if not current_progress.get("completed"):
-        points_earned = task.get("points", 10)
-        await db.users.update_one(
-            {"id": user["id"]},
-            {"$set": {progress_key: new_progress}, "$inc": {"points": points_earned}}
-        )
-        
+    # Points and skill levels are only added by the update that flips `completed`, so
+    # concurrent submissions (possibly on different workers) can't double-count them
+    points_earned = task.get("points", 10)
+    space = skillgap.space_for(catalog())
+    skill_increments = space.task_increments(task_id) if user.get(skillgap.VERSION_FIELD) == space.version else {}
+    before = await db.users.find_one_and_update(
+        {"id": user["id"], f"{progress_key}.completed": {"$ne": True}},
+        {**progress_update, "$inc": {**progress_update["$inc"], "points": points_earned, **skill_increments}},
+        projection=previous
+    )
+    
+    if before is not None:
         # Update level
-        updated_user = await db.users.find_one({"id": user["id"]}, {"_id": 0, "points": 1})
+        updated_user = await db.users.find_one({"id": user["id"]}, {"_id": 0, "points": 1, "progress": 1})
         total_points = updated_user.get("points", 0)
         new_level = "Beginner"
         if total_points >= 200:
@@ -1484,20 +709,82 @@ async def submit_task(task_id: str, submission: TaskSubmission, user: dict = Dep
         elif total_points >= 100:
             new_level = "Intermediate"
         
-        await db.users.update_one({"id": user["id"]}, {"$set": {"level": new_level}})
+        level_update = {"level": new_level, "updated_at": datetime.now(timezone.utc).isoformat()}
+        if not skill_increments:
+            # First skill vector for this user, or the taxonomy changed: rebuild it from progress
+            level_update.update(space.levels_document(updated_user.get("progress", {})))
+        await db.users.update_one({"id": user["id"]}, {"$set": level_update})
     else:
-        await db.users.update_one({"id": user["id"]}, {"$set": {progress_key: new_progress}})
+        points_earned = 0
+        before = await db.users.find_one_and_update({"id": user["id"]}, progress_update, projection=previous)
+    previous_hash = (before or {}).get("progress", {}).get(task_id, {}).get("code_hash")
+    await submissions.release(db, previous_hash)
+    if PLAGIARISM_ENABLED and previous_hash != code_hash:
+        await index_for_plagiarism(task, user["id"], code_hash, submission.code)
+    await invalidate_user(user["id"])
+    await reissue_token(response, claims)
     
-    return {"success": True, "points_earned": points_earned, "message": "Great work!" if points_earned > 0 else "Submission recorded."}
+    response_body = {"success": True, "points_earned": points_earned,
+                     "message": "Great work!" if points_earned > 0 else "Submission recorded."}
+    if analysis:
+        response_body["analysis"] = analysis
+    return response_body
+
+async def index_for_plagiarism(task: dict, user_id: str, code_hash: str, code: str):
+    """Best effort: the submission is already recorded, so a failure here is only logged"""
+    try:
+        prepared = await run_blocking(plagiarism.prepare, task, code)
+        matches = await plagiarism.index(db, task["id"], user_id, code_hash, prepared)
+        if matches:
+            logger.info(f"Submission by {user_id} for {task['id']} matches {len(matches)} other(s)")
+    except Exception as e:
+        logger.error(f"Plagiarism indexing error: {str(e)}")
+
+@api_router.get("/tasks/{task_id}/submission")
+async def get_last_submission(task_id: str, user: dict = Depends(get_current_user)):
+    """The caller's most recent code for a task, to restore the editor"""
+    progress = user.get("progress", {}).get(task_id)
+    if not progress or not (progress.get("code_hash") or progress.get("code")):
+        raise HTTPException(status_code=404, detail="No submission for this task")
+    code = progress.get("code")  # written before blob storage, not yet migrated
+    if progress.get("code_hash"):
+        code = await submissions.load(db, progress["code_hash"])
+        if code is None:
+            raise HTTPException(status_code=404, detail="Submission not found")
+    return {"task_id": task_id, "code": code, "attempts": progress.get("attempts", 0),
+            "last_submission": progress.get("last_submission")}
+
+@api_router.post("/tasks/{task_id}/hints/next")
+async def next_task_hint(task_id: str, user: dict = Depends(get_current_user)):
+    """Reveal the caller's next hint; the level is shared with hints BRO gives in chat"""
+    task = catalog().find_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    total = len(task.get("hints", []))
+    hint = await hints.next_hint(db, user["id"], task)
+    if hint is None:
+        return {"hint": None, "level": total, "total": total}
+    await invalidate_user(user["id"])
+    level, total, text = hint
+    return {"hint": text, "level": level, "total": total}
 
 # ============ BRO MENTOR ROUTES ============
 
 @api_router.post("/bro/chat")
-async def chat_with_bro(message: ChatMessage, user: dict = Depends(get_current_user)):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
+async def chat_with_bro(message: ChatMessage, user: dict = Depends(rate_limited("llm_chat"))):
+    task = catalog().find_task(message.task_id) if message.task_id else None
+    intent = None
+    if HINT_ENGINE_ENABLED:
+        # Hints and small talk are answered locally; only open-ended questions reach the LLM
+        intent, reply, hint_level = await hints.answer(db, user, task, message.message)
+        if reply is not None:
+            if hint_level is not None:
+                await invalidate_user(user["id"])
+            await save_chat(user["id"], message, reply, source="local", intent=intent)
+            return {"response": reply, "source": "local", "intent": intent, "hint_level": hint_level}
     
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
+    if not llm_gateway.configured:
         raise HTTPException(status_code=500, detail="LLM API key not configured")
     
     system_prompt = f"""You are BRO, an open-source AI mentor for college students preparing for tech placements.
@@ -1522,41 +809,45 @@ Rules:
 
 You help with: DSA, Data Analytics, Data Science, ML, Resume Building, Interview Prep.
 Current user: {user.get("name", "Student")} (Level: {user.get("level", "Beginner")}, Role: {user.get("role", "Not Set")})"""
+    if task:
+        full_user = await get_current_user(user)
+        hints_shown = full_user.get("progress", {}).get(task["id"], {}).get("hint_level", 0)
+        system_prompt += f"\nCurrent task: {task['title']} ({hints_shown} of {len(task.get('hints', []))} hints already shown)"
 
     try:
-        chat = LlmChat(
-            api_key=api_key,
+        response = await llm_gateway.chat(
+            "/bro/chat",
+            user_id=user["id"],
             session_id=f"bro-{user['id']}-{datetime.now(timezone.utc).strftime('%Y%m%d')}",
-            system_message=system_prompt
+            system_message=system_prompt,
+            text=message.message
         )
-        chat.with_model("openai", "gpt-5.2")
         
-        user_message = UserMessage(text=message.message)
-        response = await chat.send_message(user_message)
+        await save_chat(user["id"], message, response, source="llm", intent=intent)
         
-        chat_doc = {
-            "id": str(uuid.uuid4()),
-            "user_id": user["id"],
-            "message": message.message,
-            "response": response,
-            "context": message.context,
-            "timestamp": datetime.now(timezone.utc).isoformat()
-        }
-        await db.chat_history.insert_one(chat_doc)
-        
-        return {"response": response}
+        return {"response": response, "source": "llm", "intent": intent}
     except Exception as e:
         logger.error(f"BRO chat error: {str(e)}")
         raise HTTPException(status_code=500, detail="BRO is taking a coffee break. Try again!")
 
+async def save_chat(user_id: str, message: ChatMessage, response: str, source: str, intent: Optional[str]):
+    chat_doc = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "message": message.message,
+        "response": response,
+        "context": message.context,
+        "task_id": message.task_id,
+        "source": source,
+        "intent": intent,
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
+    await db.chat_history.insert_one(chat_doc)
+
 @api_router.post("/bro/voice")
-async def bro_voice_input(audio: UploadFile = File(...), context: str = Form(None), user: dict = Depends(get_current_user)):
+async def bro_voice_input(audio: UploadFile = File(...), context: str = Form(None), user: dict = Depends(rate_limited("llm_chat"))):
     """Handle voice input - transcribe and respond"""
-    from emergentintegrations.llm.openai import OpenAISpeechToText
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
+    if not llm_gateway.configured:
         raise HTTPException(status_code=500, detail="API key not configured")
     
     try:
@@ -1567,29 +858,20 @@ async def bro_voice_input(audio: UploadFile = File(...), context: str = Form(Non
             tmp_path = tmp.name
         
         # Transcribe audio
-        stt = OpenAISpeechToText(api_key=api_key)
         with open(tmp_path, "rb") as audio_file:
-            transcription = await stt.transcribe(
-                file=audio_file,
-                model="whisper-1",
-                response_format="json",
-                language="en"
-            )
+            transcribed_text = await llm_gateway.transcribe("/bro/voice", user["id"], audio_file)
         
         # Clean up temp file
         os.unlink(tmp_path)
         
-        transcribed_text = transcription.text
-        
         # Now get BRO's response
         system_prompt = f"""You are BRO, a friendly AI mentor. The user is speaking to you via voice.
 Keep responses concise and conversational.
 User: {user.get("name")} (Level: {user.get("level")})"""
         
-        chat = LlmChat(api_key=api_key, session_id=f"bro-voice-{user['id']}", system_message=system_prompt)
-        chat.with_model("openai", "gpt-5.2")
-        
-        response = await chat.send_message(UserMessage(text=transcribed_text))
+        response = await llm_gateway.chat(
+            "/bro/voice", user_id=user["id"], session_id=f"bro-voice-{user['id']}", system_message=system_prompt, text=transcribed_text
+        )
         
         return {
             "transcription": transcribed_text,
@@ -1600,7 +882,7 @@ User: {user.get("name")} (Level: {user.get("level")})"""
         raise HTTPException(status_code=500, detail="Voice processing failed. Try text instead!")
 
 @api_router.get("/bro/history")
-async def get_chat_history(user: dict = Depends(get_current_user)):
+async def get_chat_history(user: dict = Depends(get_token_claims)):
     history = await db.chat_history.find(
         {"user_id": user["id"]}, {"_id": 0}
     ).sort("timestamp", -1).limit(50).to_list(50)
@@ -1610,10 +892,10 @@ async def get_chat_history(user: dict = Depends(get_current_user)):
 
 @api_router.get("/resume/templates")
 async def get_resume_templates():
-    return {"templates": RESUME_TEMPLATES}
+    return {"templates": dict(catalog().resume_templates)}
 
 @api_router.post("/resume/create")
-async def create_resume(resume_data: ResumeCreate, user: dict = Depends(get_current_user)):
+async def create_resume(resume_data: ResumeCreate, user: dict = Depends(get_token_claims)):
     resume_id = str(uuid.uuid4())
     resume = {
         "id": resume_id,
@@ -1626,8 +908,9 @@ async def create_resume(resume_data: ResumeCreate, user: dict = Depends(get_curr
     
     await db.users.update_one(
         {"id": user["id"]},
-        {"$push": {"resumes": resume}}
+        {"$push": {"resumes": resume}, "$set": {"updated_at": resume["updated_at"]}}
     )
+    await invalidate_user(user["id"])
     
     return {"message": "Resume created", "resume_id": resume_id}
 
@@ -1636,32 +919,32 @@ async def list_resumes(user: dict = Depends(get_current_user)):
     return {"resumes": user.get("resumes", [])}
 
 @api_router.put("/resume/{resume_id}")
-async def update_resume(resume_id: str, resume_data: ResumeUpdate, user: dict = Depends(get_current_user)):
-    resumes = user.get("resumes", [])
-    resume_idx = next((i for i, r in enumerate(resumes) if r["id"] == resume_id), None)
-    
-    if resume_idx is None:
-        raise HTTPException(status_code=404, detail="Resume not found")
-    
-    resumes[resume_idx]["content"] = resume_data.content
+async def update_resume(resume_id: str, resume_data: ResumeUpdate, user: dict = Depends(get_token_claims)):
+    # Positional update of just this resume, so concurrent edits to other resumes aren't lost
+    now = datetime.now(timezone.utc).isoformat()
+    updates = {
+        "resumes.$.content": resume_data.content,
+        "resumes.$.updated_at": now,
+        "updated_at": now
+    }
     if resume_data.template:
-        resumes[resume_idx]["template"] = resume_data.template
-    resumes[resume_idx]["updated_at"] = datetime.now(timezone.utc).isoformat()
+        updates["resumes.$.template"] = resume_data.template
     
-    await db.users.update_one({"id": user["id"]}, {"$set": {"resumes": resumes}})
+    result = await db.users.update_one({"id": user["id"], "resumes.id": resume_id}, {"$set": updates})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    await invalidate_user(user["id"])
     
     return {"message": "Resume updated"}
 
 @api_router.post("/resume/analyze")
-async def analyze_resume(resume_data: ResumeCreate, user: dict = Depends(get_current_user)):
+async def analyze_resume(resume_data: ResumeCreate, user: dict = Depends(rate_limited("llm_generate"))):
     """AI-powered resume analysis"""
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
+    if not llm_gateway.configured:
         raise HTTPException(status_code=500, detail="API key not configured")
     
-    template = RESUME_TEMPLATES.get(resume_data.company.lower(), RESUME_TEMPLATES["google"])
+    templates = catalog().resume_templates
+    template = templates.get(resume_data.company.lower(), templates["google"])
     
     prompt = f"""Analyze this resume for {resume_data.company} application.
 
@@ -1680,10 +963,10 @@ Provide:
 Keep it concise and actionable."""
 
     try:
-        chat = LlmChat(api_key=api_key, session_id=f"resume-{user['id']}", system_message="You are a professional resume reviewer.")
-        chat.with_model("openai", "gpt-5.2")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm_gateway.chat(
+            "/resume/analyze", user_id=user["id"], session_id=f"resume-{user['id']}",
+            system_message="You are a professional resume reviewer.", text=prompt
+        )
         return {"analysis": response}
     except Exception as e:
         logger.error(f"Resume analysis error: {str(e)}")
@@ -1692,11 +975,8 @@ Keep it concise and actionable."""
 # ============ CONTENT GENERATION ============
 
 @api_router.post("/generate/linkedin")
-async def generate_linkedin_post(request: LinkedInDraftRequest, user: dict = Depends(get_current_user)):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
+async def generate_linkedin_post(request: LinkedInDraftRequest, user: dict = Depends(rate_limited("llm_generate"))):
+    if not llm_gateway.configured:
         raise HTTPException(status_code=500, detail="API key not configured")
     
     prompt = f"""Generate a professional LinkedIn post about learning {request.topic} ({request.learning_type}).
@@ -1712,20 +992,17 @@ User's name: {user.get('name')}
 User's role goal: {user.get('role')}"""
 
     try:
-        chat = LlmChat(api_key=api_key, session_id=f"linkedin-{user['id']}", system_message="You write engaging LinkedIn posts.")
-        chat.with_model("openai", "gpt-5.2")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm_gateway.chat(
+            "/generate/linkedin", user_id=user["id"], session_id=f"linkedin-{user['id']}",
+            system_message="You write engaging LinkedIn posts.", text=prompt
+        )
         return {"draft": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Generation failed")
 
 @api_router.post("/generate/github")
-async def generate_github_commit(request: GitHubDraftRequest, user: dict = Depends(get_current_user)):
-    from emergentintegrations.llm.chat import LlmChat, UserMessage
-    
-    api_key = os.environ.get('EMERGENT_LLM_KEY')
-    if not api_key:
+async def generate_github_commit(request: GitHubDraftRequest, user: dict = Depends(rate_limited("llm_generate"))):
+    if not llm_gateway.configured:
         raise HTTPException(status_code=500, detail="API key not configured")
     
     prompt = f"""Generate a professional GitHub commit message and README update for:
@@ -1738,10 +1015,10 @@ Provide:
 2. README update snippet"""
 
     try:
-        chat = LlmChat(api_key=api_key, session_id=f"github-{user['id']}", system_message="You write clear technical documentation.")
-        chat.with_model("openai", "gpt-5.2")
-        
-        response = await chat.send_message(UserMessage(text=prompt))
+        response = await llm_gateway.chat(
+            "/generate/github", user_id=user["id"], session_id=f"github-{user['id']}",
+            system_message="You write clear technical documentation.", text=prompt
+        )
         return {"draft": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail="Generation failed")
@@ -1751,10 +1028,23 @@ Provide:
 @api_router.get("/trends")
 async def get_job_trends(user: dict = Depends(get_current_user)):
     user_role = user.get("role", "SDE")
-    relevant_trends = [t for t in JOB_TRENDS if t["category"] == user_role or t["category"] == "All"]
+    gaps = skillgap.space_for(catalog()).gaps({**user, "role": user_role}, task_limit=3)
+    by_id = {t["id"]: t for t in gaps["trends"]}
+    
+    # Biggest gap first among the trends for this role
+    trends = catalog().job_trends
+    relevant_trends = [t for t in trends if t["category"] == user_role or t["category"] == "All"]
     if not relevant_trends:
-        relevant_trends = JOB_TRENDS[:2]
-    return {"trends": relevant_trends, "user_role": user_role}
+        relevant_trends = list(trends[:2])
+    relevant_trends = sorted(
+        ({**t, **{k: by_id[t["id"]][k] for k in ("gap", "matched_skills", "missing_skills")}} for t in relevant_trends),
+        key=lambda t: -t["gap"]
+    )
+    return {"trends": relevant_trends, "user_role": user_role, "gap_closing_tasks": gaps["tasks"]}
+
+@api_router.get("/users/skill-gaps")
+async def get_skill_gaps(limit: int = Query(5, ge=1, le=20), user: dict = Depends(get_current_user)):
+    return skillgap.space_for(catalog()).gaps(user, task_limit=limit)
 
 # ============ PLACEMENT READINESS ============
 
@@ -1764,7 +1054,7 @@ async def get_readiness_score(user: dict = Depends(get_current_user)):
     points = user.get("points", 0)
     level = user.get("level", "Beginner")
     role = user.get("role", "SDE")
-    streak = user.get("streak", {})
+    streak = activity.effective_streak(user)
     
     # Calculate skill scores
     dsa_completed = sum(1 for k, v in progress.items() if k.startswith(("arr", "str", "ll", "sq", "tree", "dp")) and v.get("completed"))
@@ -1786,6 +1076,12 @@ async def get_readiness_score(user: dict = Depends(get_current_user)):
     
     overall_readiness = int((skill_score * 0.6) + (consistency_score * 0.2) + (min(points, 200) / 200 * 100 * 0.2))
     
+    await recommender.refresh(db)
+    next_tasks = recommender.recommend(catalog(), user, limit=3)
+    recommendations = [f"{t['title']} ({t['track_name']}): {t['reason']}" for t in next_tasks]
+    if streak.get("current", 0) < 7:
+        recommendations.append("Maintain your streak for better consistency")
+    
     return {
         "overall_readiness": overall_readiness,
         "skill_score": int(skill_score),
@@ -1800,32 +1096,381 @@ async def get_readiness_score(user: dict = Depends(get_current_user)):
             "ml": ml_completed
         },
         "streak": streak,
-        "recommendations": [
-            "Complete more DSA problems" if dsa_completed < 10 else "Great DSA progress!",
-            "Maintain your streak for better consistency" if streak.get("current", 0) < 7 else "Awesome streak!",
-            "Try SQL problems for analytics" if analytics_completed < 3 else "Good analytics skills!"
-        ]
+        "next_tasks": next_tasks,
+        "recommendations": recommendations
     }
 
+@api_router.get("/recommendations")
+async def get_recommendations(limit: int = Query(5, ge=1, le=20), user: dict = Depends(get_current_user)):
+    await recommender.refresh(db)
+    return {"tasks": recommender.recommend(catalog(), user, limit=limit)}
+
 # ============ CODE EXECUTION ============
 
 @api_router.post("/code/run")
-async def run_code(request: CodeRunRequest, user: dict = Depends(get_current_user)):
+async def run_code(request: CodeRunRequest, user: dict = Depends(rate_limited("code_run"))):
     code = request.code
+    task = catalog().find_task(request.task_id) if request.task_id else None
+    if task and task.get("sql"):
+        return await cached_run(task, code, lambda: sql_engine.version(task["sql"]), lambda: run_sql(task, code))
     
     dangerous_keywords = ["import os", "import subprocess", "exec(", "eval(", "open(", "__import__"]
     for kw in dangerous_keywords:
         if kw in code:
             return {"success": False, "output": "", "error": f"Security Error: '{kw}' is not allowed."}
     
-    if "print(" in code:
-        return {
+    analysis = await review_complexity(task, code)
+    if code_pool is not None:
+        result = await cached_run(task, code, lambda: code_pool.version, lambda: run_python(code))
+    elif "print(" in code:
+        result = {
             "success": True,
             "output": "Code executed! (Demo mode)\n\nTip: Use 'Submit' to validate against test cases.",
             "error": None
         }
+    else:
+        result = {"success": True, "output": "No output. Add print() statements.", "error": None}
     
-    return {"success": True, "output": "No output. Add print() statements.", "error": None}
+    if analysis:
+        result = {**result, "analysis": analysis}
+    return result
+
+async def review_complexity(task: Optional[dict], code: str) -> Optional[dict]:
+    """Static Big-O estimate and warnings for tasks with a `complexity` target; best effort, never blocks a run"""
+    if not task or not task.get("complexity"):
+        return None
+    try:
+        return await run_blocking(complexity.review, code, task)
+    except Exception as e:
+        logger.error(f"Complexity analysis error for {task['id']}: {str(e)}")
+        return None
+
+async def cached_run(task: Optional[dict], code: str, runtime_version, run) -> dict:
+    """`await run()`, unless the result cache already has this code's result for the same task, tests and runtime"""
+    if not run_cache.enabled:
+        return await run()
+    task_id = task["id"] if task else ""
+    suite = resultcache.suite_version(task)
+    cache_key = None
+    if resultcache.deterministic(code):
+        try:
+            cache_key = resultcache.key(code, task_id, suite, runtime_version())
+        except sqlrunner.DatasetError:
+            pass  # run() reports it
+    try:
+        cached = await run_cache.get(db, cache_key)
+        if cached is not None:
+            return cached
+    except Exception as e:
+        logger.error(f"Run cache lookup error: {str(e)}")
+    
+    started = time.perf_counter()
+    result = await run()
+    if cache_key is not None:
+        try:
+            await run_cache.put(db, cache_key, task_id, suite, result, time.perf_counter() - started)
+        except Exception as e:
+            logger.error(f"Run cache store error: {str(e)}")
+    return result
+
+async def run_python(code: str) -> dict:
+    result = await run_blocking(code_pool.run, code)
+    response = {"success": result["success"], "output": result["output"], "error": result["error"],
+                "elapsed_ms": result.get("elapsed_ms")}
+    if result.get("limit_exceeded"):
+        response["limit_exceeded"] = True
+    return response
+
+async def run_sql(task: dict, query: str) -> dict:
+    """Execute a SQL task's query on its dataset; the output pane gets the table, the check and the plan"""
+    try:
+        result = await run_blocking(sql_engine.run, task["sql"], query)
+    except sqlrunner.DatasetError as e:
+        logger.error(f"SQL dataset error for {task['id']}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Dataset unavailable")
+    except TimeoutError:
+        raise HTTPException(status_code=503, detail="SQL runner busy, try again")
+    if not result["success"]:
+        return {"success": False, "output": "", "error": result["error"], "result": result,
+                "limit_exceeded": result.get("limit_exceeded", False)}
+    
+    output = [sqlrunner.format_table(result["columns"], result["rows"]),
+              f"\n{result['row_count']}{'+' if result['truncated'] else ''} rows in {result['elapsed_ms']:.1f} ms"]
+    check = result.get("check")
+    if check:
+        output.append("Correct! Matches the expected result." if check["correct"] else f"Not yet: {check['reason']}")
+    plan = result["plan"]
+    if plan:
+        output.append("\nQuery plan:\n" + "\n".join(f"  {step['detail']}" for step in plan["steps"]))
+        if plan["full_scans"]:
+            output.append(f"Full table scan of: {', '.join(plan['full_scans'])}")
+    return {"success": True, "output": "\n".join(output), "error": None, "result": result}
+
+@api_router.get("/tasks/{task_id}/sql/schema")
+async def get_sql_schema(task_id: str, user: dict = Depends(get_current_user)):
+    """Tables, columns and indexes of a SQL task's dataset"""
+    task = catalog().find_task(task_id)
+    if not task or not task.get("sql"):
+        raise HTTPException(status_code=404, detail="Not a SQL task")
+    try:
+        tables = await run_blocking(sql_engine.schema, task["sql"]["dataset"])
+    except sqlrunner.DatasetError as e:
+        logger.error(f"SQL dataset error for {task_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Dataset unavailable")
+    return {"dataset": task["sql"]["dataset"], "tables": tables}
+
+# ============ REALTIME ============
+
+@api_router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    await ws_manager.serve(websocket, ws_authenticate, ws_handle)
+
+async def ws_authenticate(token: str) -> dict:
+    return await get_token_claims(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+async def ws_chat(connection: realtime.Connection, data: dict):
+    await rate_limiter.check(connection.user_id, "llm_chat")
+    return await chat_with_bro(ChatMessage.model_validate(data), connection.claims)
+
+async def ws_run(connection: realtime.Connection, data: dict):
+    await rate_limiter.check(connection.user_id, "code_run")
+    return await run_code(CodeRunRequest.model_validate(data), connection.claims)
+
+async def ws_submit(connection: realtime.Connection, data: dict):
+    submission = TaskSubmission.model_validate(data)
+    response = Response()
+    result = await submit_task(submission.task_id, submission, response, connection.claims,
+                               await get_current_user(connection.claims))
+    token = response.headers.get("X-Access-Token")
+    if token:
+        # As an HTTP client would with the reissued token: later requests see the new progress version
+        connection.claims = await ws_authenticate(token)
+        result = {**result, "access_token": token}
+    return result
+
+async def ws_streak(connection: realtime.Connection, data: dict):
+    return await update_streak(StreakUpdate.model_validate(data), await get_current_user(connection.claims))
+
+async def ws_hint(connection: realtime.Connection, data: dict):
+    return await next_task_hint(str(data.get("task_id", "")), connection.claims)
+
+async def ws_history(connection: realtime.Connection, data: dict):
+    return await get_chat_history(connection.claims)
+
+async def ws_profile(connection: realtime.Connection, data: dict):
+    return await get_profile(await get_current_user(connection.claims))
+
+# Request ops on the socket; each runs the same code as its HTTP route
+WS_OPS = {
+    "chat": ws_chat,
+    "run": ws_run,
+    "submit": ws_submit,
+    "streak": ws_streak,
+    "hint": ws_hint,
+    "history": ws_history,
+    "profile": ws_profile,
+}
+
+async def ws_handle(connection: realtime.Connection, op: str, data: dict) -> tuple:
+    handler = WS_OPS.get(op)
+    if handler is None:
+        return 404, f"Unknown op '{op}'. Choose from: {list(WS_OPS)}"
+    try:
+        return 200, await handler(connection, data)
+    except HTTPException as e:
+        return e.status_code, e.detail
+    except ValidationError as e:
+        return 422, e.errors(include_url=False, include_context=False)
+
+ws_pushes: Dict[str, asyncio.Task] = {}
+
+def on_user_changed(user_id: Optional[str]):
+    """Cache bus subscriber: a user document changed on some worker, so push progress to their sockets here"""
+    if ws_manager is None or not ws_manager.connected(user_id) or user_id in ws_pushes:
+        return
+    ws_pushes[user_id] = asyncio.create_task(push_progress(user_id))
+
+async def push_progress(user_id: str):
+    try:
+        await asyncio.sleep(WS_PUSH_DELAY_SECONDS)
+        # Writes from here on schedule another push
+        ws_pushes.pop(user_id, None)
+        user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        if not user:
+            return
+        user_cache.set(user_id, user)
+        rollups = activity.current_rollups(user)
+        ws_manager.publish(user_id, "progress", {
+            "points": user.get("points", 0),
+            "level": user.get("level", "Beginner"),
+            "streak": activity.effective_streak(user),
+            "weekly_activity": rollups["weekly_activity"],
+            "monthly_activity": rollups["monthly_activity"],
+            "completed": sum(1 for p in user.get("progress", {}).values() if p.get("completed"))
+        })
+    except Exception as e:
+        logger.error(f"Progress push error for {user_id}: {str(e)}")
+
+# ============ ADMIN EXPORT ============
+
+@api_router.get("/admin/export/{collection}")
+async def export_collection(collection: str, format: str = "ndjson", since: Optional[str] = None,
+                            batch_size: int = export.DEFAULT_BATCH_SIZE, admin: dict = Depends(get_admin_user)):
+    """Stream a collection as NDJSON or Parquet, optionally only rows newer than `since`"""
+    if collection not in export.EXPORT_COLLECTIONS:
+        raise HTTPException(status_code=404, detail="Unknown export collection")
+    if format not in export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Choose from: {list(export.EXPORT_FORMATS)}")
+    batch_size = max(1, min(batch_size, 10000))
+
+    if format == "ndjson":
+        return StreamingResponse(
+            export.stream_ndjson(db, collection, since, batch_size, executor=cpu_executor),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="{collection}.ndjson"'}
+        )
+
+    # Row groups are sent as they are encoded; the row count and watermark are in the footer metadata
+    try:
+        chunks = export.stream_parquet(db, collection, since, batch_size, executor=cpu_executor)
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type="application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{collection}.parquet"'}
+    )
+
+# ============ ADMIN ONBOARDING ============
+
+@api_router.post("/admin/users/bulk")
+async def bulk_register(roster: UploadFile = File(...), format: Optional[str] = Form(None),
+                        admin: dict = Depends(get_admin_user)):
+    """Onboard a cohort from a CSV/NDJSON roster (email, name, password?, timezone?); returns a per-row report.
+
+    Rows without a password get an `invite_token` to hand to the student for `/auth/activate`.
+    """
+    fmt = onboarding.roster_format(roster.filename, format)
+    if fmt not in onboarding.ROSTER_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Choose from: {list(onboarding.ROSTER_FORMATS)}")
+    try:
+        rows = onboarding.parse_roster((await roster.read()).decode("utf-8-sig"), fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse roster: {e}")
+    if len(rows) > ONBOARDING_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Roster too large (max {ONBOARDING_MAX_ROWS} rows)")
+    
+    await email_policy.refresh(db)
+    job = onboarding.RosterImport(rows, email_policy.policy.allows)
+    result = await job.run(db, hash_workers=ONBOARDING_HASH_WORKERS)
+    logger.info(f"Bulk onboarding by {admin['email']}: {result['counts']}")
+    return result
+
+# ============ ADMIN EMAIL DOMAINS ============
+
+@api_router.get("/admin/email-domains")
+async def list_email_domains(admin: dict = Depends(get_admin_user)):
+    await email_policy.refresh(db, force=True)
+    return {"version": email_policy.version, "rules": sorted(email_policy.policy.rules, key=lambda r: (r["kind"], r["value"]))}
+
+@api_router.post("/admin/email-domains")
+async def add_email_domain(rule: EmailDomainRuleCreate, admin: dict = Depends(get_admin_user)):
+    try:
+        return await email_policy.add_rule(db, rule.kind, rule.value, rule.note, created_by=admin["email"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Rule already exists")
+
+@api_router.delete("/admin/email-domains/{rule_id}")
+async def remove_email_domain(rule_id: str, admin: dict = Depends(get_admin_user)):
+    if not await email_policy.remove_rule(db, rule_id):
+        raise HTTPException(status_code=404, detail="Rule not found")
+    return {"message": "Rule removed"}
+
+@api_router.get("/admin/email-domains/check")
+async def check_email_domain(email: str, admin: dict = Depends(get_admin_user)):
+    """Whether `email` may register, and which rule admits it"""
+    await email_policy.refresh(db)
+    return {"email": email, "allowed": email_policy.policy.allows(email), "rule": email_policy.policy.matching_rule(email)}
+
+# ============ ADMIN PLAGIARISM ============
+
+@api_router.get("/admin/plagiarism")
+async def list_similar_submissions(
+    task_id: Optional[str] = None,
+    min_similarity: float = Query(plagiarism.MATCH_THRESHOLD, ge=0, le=1),
+    limit: int = Query(100, ge=1, le=1000),
+    admin: dict = Depends(get_admin_user)
+):
+    """Submission pairs above `min_similarity`, most similar first; run `python plagiarism.py` to rescan a cohort"""
+    query: Dict[str, Any] = {"similarity": {"$gte": min_similarity}}
+    if task_id:
+        query["task_id"] = task_id
+    matches = await db[plagiarism.MATCHES_COLLECTION].find(query, {"_id": 0}).sort("similarity", -1).to_list(limit)
+    
+    user_ids = list({u for m in matches for u in m["users"]})
+    users = {u["id"]: u async for u in db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, "email": 1, "name": 1})}
+    for match in matches:
+        match["users"] = [users.get(u, {"id": u}) for u in match["users"]]
+    return {"threshold": min_similarity, "matches": matches}
+
+# ============ BACKGROUND JOBS ============
+
+async def reset_activity_periods(ctx: jobs.JobContext):
+    """Zero weekly/monthly counters and lapsed streaks; hourly, since periods roll over per timezone"""
+    resets = await activity.reset_stale_periods(ctx.db)
+    if resets:
+        await cache_bus.publish(user_cache.name)
+    logger.info(f"Reset {resets} stale activity periods")
+
+async def prune_chat_history(ctx: jobs.JobContext):
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=CHAT_HISTORY_RETENTION_DAYS)).isoformat()
+    result = await ctx.db.chat_history.delete_many({"timestamp": {"$lt": cutoff}})
+    logger.info(f"Pruned {result.deleted_count} chat messages older than {CHAT_HISTORY_RETENTION_DAYS} days")
+
+async def rebuild_recommendations(ctx: jobs.JobContext):
+    model = await recommend.build_and_store(ctx.db, executor=ctx.executor)
+    logger.info(f"Rebuilt recommendation model ({len(model.task_ids)} tasks)")
+
+async def purge_run_results(ctx: jobs.JobContext):
+    """Drop cached run results of tasks whose tests changed (or that were removed); the rest expire by TTL"""
+    current = catalog()
+    suites = {"": resultcache.suite_version(None)}
+    for family in content.TRACK_FAMILIES:
+        for track in current.tracks(family).values():
+            for task in track["tasks"]:
+                suites[task["id"]] = resultcache.suite_version(task)
+    deleted = await run_cache.purge_stale(ctx.db, suites)
+    logger.info(f"Purged {deleted} stale cached run results")
+
+BACKGROUND_JOBS = [
+    jobs.Job("reset-activity-periods", "5 * * * *", reset_activity_periods),
+    jobs.Job("prune-chat-history", "30 3 * * *", prune_chat_history),
+    jobs.Job("rebuild-recommendations", "0 4 * * *", rebuild_recommendations, timeout=1800),
+    jobs.Job("purge-run-results", "@hourly", purge_run_results),
+]
+
+@api_router.get("/admin/jobs")
+async def list_jobs(admin: dict = Depends(get_admin_user)):
+    if job_runner is None:
+        return {"enabled": False, "jobs": []}
+    # Run history lives in Mongo so it's the same whichever worker answers
+    history = {}
+    async for doc in db[jobs.JOBS_COLLECTION].find({}):
+        history[doc.pop("_id")] = doc
+    return {
+        "enabled": True,
+        "leader": job_runner.is_leader,
+        "jobs": [{**job, **history.get(job["name"], {})} for job in job_runner.status()]
+    }
+
+@api_router.post("/admin/jobs/{name}/run")
+async def run_job(name: str, admin: dict = Depends(get_admin_user)):
+    """Run a job now on this worker, outside its schedule"""
+    if job_runner is None or name not in job_runner.jobs:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {"name": name, "status": await job_runner.run_now(name)}
 
 # ============ ROOT ============
 
@@ -1833,16 +1478,103 @@ async def run_code(request: CodeRunRequest, user: dict = Depends(get_current_use
 async def root():
     return {"message": "SkillForge API", "version": "2.0.0"}
 
-app.include_router(api_router)
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def ensure_indexes():
+    await db.users.create_index("id", unique=True)
+    await db.users.create_index("email", unique=True)
+    await db.users.create_index("invite.token_hash", sparse=True)
+    await db.users.create_index("created_at")
+    await db.users.create_index("updated_at")
+    await db.chat_history.create_index([("user_id", 1), ("timestamp", -1)])
+    await db.chat_history.create_index("timestamp")
+    await db.activity_events.create_index([("user_id", 1), ("day", 1)])
+    await db.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+    await session_store.ensure_indexes()
+    await email_policy.ensure_seeded(db)
+    await submissions.ensure_indexes(db)
+    await plagiarism.ensure_indexes(db)
+    await resultcache.ensure_indexes(db)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global client, db, llm_gateway, cpu_executor, cache_bus, rate_limiter, session_store, job_runner, code_pool, ws_manager
+    
+    owns_client = db is None
+    if owns_client:
+        client = AsyncIOMotorClient(
+            mongo_url,
+            maxPoolSize=MONGO_MAX_POOL_SIZE,
+            minPoolSize=MONGO_MIN_POOL_SIZE,
+            event_listeners=[metrics.MongoCommandListener()]
+        )
+        db = client[os.environ['DB_NAME']]
+    
+    cpu_executor = ThreadPoolExecutor(max_workers=CPU_EXECUTOR_WORKERS, thread_name_prefix="cpu")
+    llm_gateway = LLMGateway.from_env()
+    rate_limiter = RateLimiter(db)
+    session_store = sessions.SessionStore(db, ttl_days=REFRESH_TOKEN_TTL_DAYS)
+    cache_bus = cache.InvalidationBus(db)
+    cache_bus.register(user_cache)
+    ws_manager = realtime.ConnectionManager(WS_MAX_CONNECTIONS, WS_MAX_CONNECTIONS_PER_USER, WS_HEARTBEAT_SECONDS)
+    cache_bus.subscribe(user_cache.name, on_user_changed)
+    
+    await ensure_indexes()
+    await cache_bus.start()
+    await ws_manager.start()
+    if CODE_EXECUTION_WORKERS > 0:
+        code_pool = pyrunner.WarmPool(CONTENT_DIR / 'datasets', size=CODE_EXECUTION_WORKERS,
+                                      timeout=CODE_RUN_TIMEOUT_SECONDS, memory_mb=CODE_RUN_MEMORY_MB)
+        await run_blocking(code_pool.start)
+    content_store.start()
+    if JOBS_ENABLED:
+        job_runner = jobs.JobRunner(db, lease_seconds=JOB_LEASE_SECONDS, executor_workers=JOB_EXECUTOR_WORKERS)
+        for job in BACKGROUND_JOBS:
+            job_runner.register(job)
+        await job_runner.start()
+    logger.info(f"Worker {os.getpid()} started (mongo pool {MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE}, cpu executor {CPU_EXECUTOR_WORKERS}, "
+                f"code workers {CODE_EXECUTION_WORKERS})")
+    try:
+        yield
+    finally:
+        if job_runner:
+            await job_runner.stop()
+            job_runner = None
+        if code_pool:
+            code_pool.stop()
+            code_pool = None
+        await ws_manager.stop()
+        await content_store.stop()
+        await cache_bus.stop()
+        cpu_executor.shutdown(wait=True)
+        if owns_client:
+            client.close()
+            client, db = None, None
+
+def create_app() -> FastAPI:
+    """Build the ASGI app; per-worker resources are set up by `lifespan`"""
+    app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+    app.include_router(api_router)
+    
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+    
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=["X-Access-Token"],
+    )
+    
+    # Added after CORS so it wraps it; metrics stays outermost to time the whole stack
+    app.add_middleware(compression.CompressionMiddleware,
+                       minimum_size=int(os.environ.get('COMPRESSION_MIN_BYTES', compression.DEFAULT_MINIMUM_SIZE)))
+    app.add_middleware(metrics.MetricsMiddleware)
+    return app
+
+# Run with e.g. `WEB_CONCURRENCY=4 uvicorn server:app --ws-per-message-deflate false` or
+# `WEB_CONCURRENCY=4 gunicorn -k uvicorn.workers.UvicornWorker server:app`; both read the worker
+# count from WEB_CONCURRENCY, and the LLM scheduler splits its budgets by it (see llm.py).
+# Per-message deflate keeps ~100KB of zlib state per open WebSocket, for frames that are small JSON anyway.
+app = create_app()
@@ -0,0 +1,112 @@
+"""Login sessions and rotating refresh tokens.
+
+Access tokens are short-lived JWTs that carry the claims most routes need, so
+they are checked without touching Mongo. Each login creates a session document
+(`sessions` collection); its refresh token is `<session id>.<secret>`, and only
+a hash of the secret is stored.
+
+Every refresh rotates the secret. Presenting an already-rotated secret means the
+token was copied, so the session is revoked, unless it arrives within
+`REUSE_GRACE_SECONDS` of the rotation (two tabs refreshing at once), in which
+case only that request is refused. Revoking a session stops further refreshes;
+access tokens already issued for it stay valid until they expire.
+"""
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+SESSIONS_COLLECTION = "sessions"
+REUSE_GRACE_SECONDS = 30
+
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _split(refresh_token: str) -> Tuple[Optional[str], Optional[str]]:
+    session_id, _, secret = (refresh_token or "").partition(".")
+    if not session_id or not secret:
+        return None, None
+    return session_id, secret
+
+
+class SessionStore:
+    def __init__(self, db, ttl_days: float = 30.0):
+        self.db = db
+        self.ttl = timedelta(days=ttl_days)
+
+    @property
+    def collection(self):
+        return self.db[SESSIONS_COLLECTION]
+
+    async def ensure_indexes(self):
+        await self.collection.create_index("user_id")
+        await self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    async def create(self, user_id: str, user_agent: Optional[str] = None) -> Tuple[str, str]:
+        """Start a session; returns (session id, refresh token)."""
+        now = datetime.now(timezone.utc)
+        session_id, secret = uuid.uuid4().hex, secrets.token_urlsafe(32)
+        await self.collection.insert_one({
+            "_id": session_id,
+            "user_id": user_id,
+            "token_hash": _hash(secret),
+            "previous_hash": None,
+            "rotated_at": None,
+            "created_at": now,
+            "last_used_at": now,
+            "expires_at": now + self.ttl,
+            "user_agent": (user_agent or "")[:200],
+            "revoked_at": None
+        })
+        return session_id, f"{session_id}.{secret}"
+
+    async def rotate(self, refresh_token: str) -> Optional[Tuple[dict, str]]:
+        """Exchange a refresh token for a new one; returns (session, new token) or None if refused."""
+        session_id, secret = _split(refresh_token)
+        if session_id is None:
+            return None
+        now = datetime.now(timezone.utc)
+        presented, new_secret = _hash(secret), secrets.token_urlsafe(32)
+        session = await self.collection.find_one_and_update(
+            {"_id": session_id, "token_hash": presented, "revoked_at": None, "expires_at": {"$gt": now}},
+            {"$set": {"token_hash": _hash(new_secret), "previous_hash": presented, "rotated_at": now,
+                      "last_used_at": now, "expires_at": now + self.ttl}}
+        )
+        if session is not None:
+            return session, f"{session_id}.{new_secret}"
+
+        # Refused: if this was the session's previous secret, someone is replaying it
+        await self.collection.update_one(
+            {"_id": session_id, "previous_hash": presented, "revoked_at": None,
+             "rotated_at": {"$lt": now - timedelta(seconds=REUSE_GRACE_SECONDS)}},
+            {"$set": {"revoked_at": now, "revoked_reason": "refresh token reuse"}}
+        )
+        return None
+
+    async def revoke(self, session_id: str, user_id: Optional[str] = None) -> bool:
+        query = {"_id": session_id, "revoked_at": None}
+        if user_id is not None:
+            query["user_id"] = user_id
+        result = await self.collection.update_one(query, {"$set": {"revoked_at": datetime.now(timezone.utc)}})
+        return result.modified_count > 0
+
+    async def revoke_token(self, refresh_token: str) -> bool:
+        """Revoke the session a refresh token belongs to, if the token is its current one."""
+        session_id, secret = _split(refresh_token)
+        if session_id is None:
+            return False
+        result = await self.collection.update_one(
+            {"_id": session_id, "token_hash": _hash(secret), "revoked_at": None},
+            {"$set": {"revoked_at": datetime.now(timezone.utc)}}
+        )
+        return result.modified_count > 0
+
+    async def active(self, user_id: str) -> List[dict]:
+        cursor = self.collection.find(
+            {"user_id": user_id, "revoked_at": None, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+            {"_id": 1, "created_at": 1, "last_used_at": 1, "user_agent": 1}
+        ).sort("last_used_at", -1)
+        return [{"id": s.pop("_id"), **s} async for s in cursor]
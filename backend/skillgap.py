@@ -0,0 +1,238 @@
+"""Skill-gap scoring: job-trend skills against what each user has practised.
+
+`content/skills.json` maps every track (and, where it differs, individual tasks)
+to weighted skills. A `SkillSpace` turns one catalog version into arrays:
+- `task_skills`: tasks x skills weights,
+- `trend_demand`: trends x skills, each row summing to 1.
+
+Each user keeps raw skill levels in `skill_levels` (skill id -> summed task
+weight), incremented atomically when a task is first completed. The vector is
+stamped with the space version; after a taxonomy change it is rebuilt from
+`progress` on the next completion, and readers rebuild it on the fly meanwhile.
+Mastery is `1 - exp(-level / MASTERY_SCALE)`.
+
+A trend's gap is the demand-weighted share of its skills not yet mastered.
+Tasks are ranked by how much of the role-weighted gap they would close.
+`score_users` does the same for a whole user matrix at once, in chunks.
+"""
+import hashlib
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import content
+
+LEVELS_FIELD = "skill_levels"
+VERSION_FIELD = "skill_levels_version"
+MASTERY_SCALE = 2.0   # two full-weight tasks ~ 63% mastery
+MASTERED = 0.5        # mastery at which a skill counts as covered
+OTHER_ROLE_WEIGHT = 0.4
+USER_CHUNK = 2048
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+class SkillSpace:
+    def __init__(self, catalog: content.Catalog):
+        taxonomy = catalog.skill_taxonomy
+        skills: Dict[str, dict] = {sid: dict(info) for sid, info in taxonomy.get("skills", {}).items()}
+        lookup = {}
+        for sid, info in skills.items():
+            for name in (sid, info.get("name", sid), *info.get("aliases", ())):
+                lookup.setdefault(name.lower(), sid)
+
+        # Trend skills the taxonomy doesn't know still count as demand; no task teaches them
+        self.trends = list(catalog.job_trends)
+        trend_skill_ids = []
+        for trend in self.trends:
+            ids = []
+            for name in trend.get("skills", []):
+                sid = lookup.get(name.lower())
+                if sid is None:
+                    sid = _slug(name)
+                    skills.setdefault(sid, {"name": name})
+                    lookup[name.lower()] = sid
+                ids.append(sid)
+            trend_skill_ids.append(ids)
+
+        self.skill_ids = list(skills)
+        self.skill_names = [skills[sid].get("name", sid) for sid in self.skill_ids]
+        self.skill_index = {sid: i for i, sid in enumerate(self.skill_ids)}
+
+        self.tasks: List[dict] = []
+        rows = []
+        track_weights = taxonomy.get("tracks", {})
+        task_weights = taxonomy.get("tasks", {})
+        for family in content.TRACK_FAMILIES:
+            for track_id, track in catalog.tracks(family).items():
+                for task in track["tasks"]:
+                    weights = {**track_weights.get(f"{family}/{track_id}", {}), **task_weights.get(task["id"], {})}
+                    self.tasks.append({"id": task["id"], "title": task["title"], "difficulty": task.get("difficulty"),
+                                       "points": task.get("points"), "family": family, "track_id": track_id,
+                                       "track_name": track["name"]})
+                    rows.append(weights)
+        self.task_index = {t["id"]: i for i, t in enumerate(self.tasks)}
+        self.task_skills = np.zeros((len(self.tasks), len(self.skill_ids)), dtype=np.float32)
+        for i, weights in enumerate(rows):
+            for sid, weight in weights.items():
+                self.task_skills[i, self.skill_index[sid]] = weight
+
+        self.trend_demand = np.zeros((len(self.trends), len(self.skill_ids)), dtype=np.float32)
+        for t, ids in enumerate(trend_skill_ids):
+            for sid in ids:
+                self.trend_demand[t, self.skill_index[sid]] = 1.0
+        totals = self.trend_demand.sum(axis=1, keepdims=True)
+        np.divide(self.trend_demand, totals, out=self.trend_demand, where=totals > 0)
+        self.teachable = self.task_skills.max(axis=0) > 0 if len(self.tasks) else np.zeros(len(self.skill_ids), bool)
+
+        digest = hashlib.blake2b(digest_size=6)
+        digest.update("\0".join(self.skill_ids).encode())
+        digest.update("\0".join(self.task_index).encode())
+        digest.update(self.task_skills.tobytes())
+        self.version = digest.hexdigest()
+
+    # ---- per-user vectors ----
+
+    def task_increments(self, task_id: str) -> Dict[str, float]:
+        """`$inc` fields that add one completed task to a user's skill levels."""
+        i = self.task_index.get(task_id)
+        if i is None:
+            return {}
+        return {f"{LEVELS_FIELD}.{self.skill_ids[s]}": round(float(self.task_skills[i, s]), 4)
+                for s in np.flatnonzero(self.task_skills[i])}
+
+    def completed_mask(self, progress: dict) -> np.ndarray:
+        mask = np.zeros(len(self.tasks), dtype=bool)
+        for task_id, p in (progress or {}).items():
+            i = self.task_index.get(task_id)
+            if i is not None and p.get("completed"):
+                mask[i] = True
+        return mask
+
+    def levels_from_progress(self, progress: dict) -> np.ndarray:
+        return self.completed_mask(progress).astype(np.float32) @ self.task_skills
+
+    def levels_document(self, progress: dict) -> dict:
+        """`$set` fields that replace a user's skill levels, rebuilt from progress."""
+        levels = self.levels_from_progress(progress)
+        return {
+            LEVELS_FIELD: {self.skill_ids[s]: round(float(levels[s]), 4) for s in np.flatnonzero(levels)},
+            VERSION_FIELD: self.version
+        }
+
+    def user_levels(self, user: dict) -> np.ndarray:
+        if user.get(VERSION_FIELD) != self.version:
+            return self.levels_from_progress(user.get("progress", {}))
+        levels = np.zeros(len(self.skill_ids), dtype=np.float32)
+        for sid, value in (user.get(LEVELS_FIELD) or {}).items():
+            s = self.skill_index.get(sid)
+            if s is not None:
+                levels[s] = value
+        return levels
+
+    def role_weights(self, role: Optional[str]) -> np.ndarray:
+        return np.array([1.0 if role is None or t.get("category") in (role, "All") else OTHER_ROLE_WEIGHT
+                         for t in self.trends], dtype=np.float32)
+
+    # ---- scoring ----
+
+    def gaps(self, user: dict, task_limit: int = 5) -> dict:
+        """Per-skill mastery, every trend's gap, and the tasks that close the most of it."""
+        levels = self.user_levels(user)
+        mastery = 1.0 - np.exp(-levels / MASTERY_SCALE)
+        missing = 1.0 - mastery
+        trend_gap = self.trend_demand @ missing
+        relevance = self.role_weights(user.get("role"))
+        demand = relevance @ self.trend_demand
+        need = demand * missing
+
+        trends = []
+        for t in np.argsort(-(relevance * trend_gap), kind="stable"):
+            demanded = np.flatnonzero(self.trend_demand[t])
+            trends.append({
+                "id": self.trends[t]["id"],
+                "title": self.trends[t]["title"],
+                "category": self.trends[t].get("category"),
+                "relevance": round(float(relevance[t]), 2),
+                "gap": round(float(trend_gap[t]), 3),
+                "matched_skills": [self.skill_names[s] for s in demanded if mastery[s] >= MASTERED],
+                "missing_skills": [self.skill_names[s] for s in demanded if mastery[s] < MASTERED],
+                "practicable_skills": [self.skill_names[s] for s in demanded
+                                       if mastery[s] < MASTERED and self.teachable[s]],
+            })
+
+        task_scores = self.task_skills @ need
+        task_scores[self.completed_mask(user.get("progress", {}))] = 0.0
+        tasks = []
+        for i in _top(task_scores, task_limit):
+            builds = np.argsort(-(self.task_skills[i] * need))[:2]
+            tasks.append({**self.tasks[i], "gap_closed": round(float(task_scores[i]), 3),
+                          "skills": [self.skill_names[s] for s in builds if self.task_skills[i, s] > 0]})
+
+        skills = [{"id": sid, "name": self.skill_names[s], "level": round(float(levels[s]), 2),
+                   "mastery": round(float(mastery[s]), 3), "demand": round(float(demand[s]), 3)}
+                  for s, sid in enumerate(self.skill_ids)]
+        return {"version": self.version, "skills": skills, "trends": trends, "tasks": tasks}
+
+    def score_users(self, levels: np.ndarray, roles: Sequence[Optional[str]],
+                    completed: Optional[np.ndarray] = None, task_limit: int = 5) -> dict:
+        """Batch scoring for a users x skills level matrix.
+
+        Returns per-user trend gaps (users x trends), the index of each user's most
+        pressing trend, and their top `task_limit` task indices (-1 when fewer)
+        with the gap each would close.
+        """
+        role_names = sorted({r for r in roles if r is not None}, key=str)
+        role_rows = {r: i for i, r in enumerate(role_names)}
+        role_relevance = np.stack([self.role_weights(r) for r in role_names] + [self.role_weights(None)])
+        role_idx = np.array([role_rows.get(r, len(role_names)) for r in roles], dtype=np.int64)
+
+        n_users = levels.shape[0]
+        trend_gaps = np.empty((n_users, len(self.trends)), dtype=np.float32)
+        top_tasks = np.full((n_users, task_limit), -1, dtype=np.int64)
+        top_scores = np.zeros((n_users, task_limit), dtype=np.float32)
+        k = min(task_limit, len(self.tasks))
+        for start in range(0, n_users, USER_CHUNK):
+            end = min(start + USER_CHUNK, n_users)
+            missing = np.exp(-levels[start:end] / MASTERY_SCALE)  # 1 - mastery
+            trend_gaps[start:end] = missing @ self.trend_demand.T
+            relevance = role_relevance[role_idx[start:end]]
+            need = (relevance @ self.trend_demand) * missing
+            scores = need @ self.task_skills.T
+            if completed is not None:
+                scores[completed[start:end]] = 0.0
+            if k:
+                best = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(scores, best, axis=1), axis=1, kind="stable")
+                best = np.take_along_axis(best, order, axis=1)
+                best_scores = np.take_along_axis(scores, best, axis=1)
+                best[best_scores <= 0] = -1
+                top_tasks[start:end, :k] = best
+                top_scores[start:end, :k] = np.maximum(best_scores, 0.0)
+        pressing = np.argmax(trend_gaps * role_relevance[role_idx], axis=1)
+        return {"trend_gaps": trend_gaps, "pressing_trend": pressing, "top_tasks": top_tasks, "top_scores": top_scores}
+
+
+def _top(scores: np.ndarray, limit: int) -> List[int]:
+    candidates = np.flatnonzero(scores > 0)
+    if not len(candidates):
+        return []
+    k = min(limit, len(candidates))
+    best = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+    return [int(i) for i in best[np.argsort(-scores[best], kind="stable")]]
+
+
+_spaces: Dict[str, SkillSpace] = {}
+
+
+def space_for(catalog: content.Catalog) -> SkillSpace:
+    """SkillSpace for a catalog version, built once and reused until the content changes."""
+    space = _spaces.get(catalog.version)
+    if space is None:
+        space = SkillSpace(catalog)
+        _spaces.clear()
+        _spaces[catalog.version] = space
+    return space
@@ -0,0 +1,377 @@
+"""Executable SQL tasks: student queries run against canonical SQLite datasets.
+
+A dataset is a SQL script, `content/datasets/<name>.sql`. It is executed once
+into an in-memory database, and that database's serialized image is
+deserialized into each connection of a small per-dataset pool. Queries never
+pay for loading data, and connections never share mutable state. Pooled
+connections are read-only: `PRAGMA query_only` is set, and an authorizer
+allows only reads (no writes, ATTACH or PRAGMA). Editing a script rebuilds its
+image on the next query.
+
+Each query runs under a progress handler that aborts it after `STEP_LIMIT`
+virtual-machine steps or `TIME_LIMIT_SECONDS`, whichever comes first, and at
+most `MAX_ROWS` rows are returned.
+
+Tasks opt in with a `sql` spec:
+
+    "sql": {"dataset": "hr", "reference": "SELECT ...", "ordered": false}
+
+The reference query's result is computed once per dataset image. A student's
+result is compared with it ignoring column names: as a multiset of rows, or as
+a list when `ordered`. Floats are compared to 6 decimal places. Every run also
+reports `EXPLAIN QUERY PLAN`, summarized into full table scans vs. index
+lookups by table (the plan names tables by their alias in the query; aliases
+are mapped back to the dataset's tables). A query that is itself an `EXPLAIN`
+gets the plan of the statement it explains.
+
+Runs are blocking; call `SqlEngine.run` from an executor thread.
+"""
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import metrics
+
+STEP_LIMIT = 10_000_000
+TIME_LIMIT_SECONDS = 2.0
+PROGRESS_INTERVAL = 1000          # VM steps between limit checks
+MAX_ROWS = 1000
+MAX_QUERY_LENGTH = 20_000
+MAX_VALUE_BYTES = 1_000_000       # caps zeroblob()/printf() style memory blowups
+POOL_SIZE = 4
+POOL_WAIT_SECONDS = 5.0
+FLOAT_PLACES = 6
+
+# Reads only: SELECT, table/column reads, function calls and recursive CTEs
+_ALLOWED_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+_DATASET_NAME_RE = re.compile(r"[a-z0-9_]+")
+# The name SQLite prints is the table's alias in the query, if it has one
+_SCAN_RE = re.compile(r"^SCAN (\w+)")
+_SEARCH_RE = re.compile(r"^SEARCH (\w+)")
+# Whitespace and comments before the first token
+_LEADING_RE = re.compile(r"(?:\s+|--[^\n]*(?:\n|$)|/\*.*?(?:\*/|$))*", re.S)
+_EXPLAIN_RE = re.compile(r"EXPLAIN(?:\s+QUERY\s+PLAN)?\b", re.I)
+# Words that can follow a table name but aren't an alias
+_NOT_ALIASES = {"as", "on", "using", "where", "join", "inner", "left", "right", "full", "outer", "cross",
+                "natural", "group", "order", "limit", "having", "union", "except", "intersect", "window",
+                "indexed", "not"}
+
+SQL_QUERIES_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "sql_queries_total", "Student SQL queries by outcome", ("result",)))
+SQL_QUERY_DURATION = metrics.REGISTRY.register(metrics.Histogram(
+    "sql_query_duration_seconds", "Student SQL query execution time",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)))
+
+
+class DatasetError(Exception):
+    """The dataset named by a task is missing or its script is broken (a content problem, not the student's)."""
+
+
+def _authorize(action, arg1, arg2, db_name, trigger):
+    return sqlite3.SQLITE_OK if action in _ALLOWED_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def build_image(script: str) -> bytes:
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.executescript(script)
+        conn.execute("ANALYZE")  # gives the planner row counts, as a real database would have
+        conn.commit()
+        return conn.serialize()
+    finally:
+        conn.close()
+
+
+class DatasetPool:
+    """Read-only connections to one dataset image."""
+
+    def __init__(self, name: str, image: bytes, version: Tuple[int, int], size: int = POOL_SIZE):
+        self.name = name
+        self.image = image
+        self.version = version
+        self.reference_results: Dict[Tuple[str, bool], Tuple[List[str], List[tuple]]] = {}
+        self.tables = set()
+        self._idle: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._created = 0
+        self._size = size
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        conn.deserialize(self.image)
+        conn.execute("PRAGMA query_only = ON")
+        if not self.tables:
+            self.tables = {name.lower() for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")}
+        conn.setlimit(sqlite3.SQLITE_LIMIT_LENGTH, MAX_VALUE_BYTES)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_SQL_LENGTH, MAX_QUERY_LENGTH)
+        conn.setlimit(sqlite3.SQLITE_LIMIT_ATTACHED, 0)
+        conn.set_authorizer(_authorize)
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self._size:
+                self._created += 1
+                return self._connect()
+        try:
+            return self._idle.get(timeout=POOL_WAIT_SECONDS)
+        except queue.Empty:
+            raise TimeoutError(f"All {self._size} connections to dataset '{self.name}' are busy")
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def _normalize(value):
+    if isinstance(value, float):
+        return round(value, FLOAT_PLACES)
+    return value
+
+
+def _json_value(value):
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def compare(columns: Sequence[str], rows: Sequence[tuple], truncated: bool,
+            expected_columns: Sequence[str], expected_rows: Sequence[tuple], ordered: bool) -> dict:
+    """Whether a result matches the reference, with a short reason if not."""
+    if len(columns) != len(expected_columns):
+        return {"correct": False, "reason": f"Expected {len(expected_columns)} columns, got {len(columns)}"}
+    if truncated:
+        return {"correct": False, "reason": f"Expected {len(expected_rows)} rows, got more than {len(rows)}"}
+    actual = [tuple(map(_normalize, r)) for r in rows]
+    expected = [tuple(map(_normalize, r)) for r in expected_rows]
+    missing, extra = Counter(expected) - Counter(actual), Counter(actual) - Counter(expected)
+    if missing or extra:
+        return {"correct": False, "reason": f"{sum(missing.values())} expected rows missing, "
+                                            f"{sum(extra.values())} unexpected rows",
+                "missing_rows": sum(missing.values()), "unexpected_rows": sum(extra.values())}
+    if ordered and actual != expected:
+        return {"correct": False, "reason": "Right rows, wrong order"}
+    return {"correct": True, "reason": None}
+
+
+def table_aliases(query: str, tables) -> Dict[str, str]:
+    """Lower-cased alias -> table for each dataset table the query names with an alias (`employees e`, `... AS e`)."""
+    aliases = {}
+    # A lookahead, so "FROM employees" doesn't consume the "employees" of "employees e"
+    for match in re.finditer(r'(?=\b"?(\w+)"?\s+(?:AS\s+)?"?(\w+)"?)', query, re.I):
+        table, alias = match.group(1).lower(), match.group(2).lower()
+        if table in tables and alias not in _NOT_ALIASES and alias not in tables:
+            aliases[alias] = table
+    return aliases
+
+
+def summarize_plan(plan_rows: Sequence[tuple], tables=(), aliases: Dict[str, str] = None) -> dict:
+    """EXPLAIN QUERY PLAN rows, plus which tables are fully scanned and which are searched through an index.
+
+    Names in the plan are resolved through `aliases` to `tables`; scans of anything else (CTEs,
+    subqueries, constant rows) stay in `steps` but aren't counted as table scans."""
+    aliases = aliases or {}
+    steps, full_scans, index_lookups, temp_btrees = [], [], [], 0
+    for node_id, parent, _, detail in plan_rows:
+        steps.append({"id": node_id, "parent": parent, "detail": detail})
+        scan, search = _SCAN_RE.match(detail), _SEARCH_RE.match(detail)
+        name = (scan or search).group(1).lower() if scan or search else None
+        table = aliases.get(name, name if name in tables else None)
+        if table is not None and scan and "USING" not in detail:
+            full_scans.append(table)
+        elif table is not None:
+            index_lookups.append(table)
+        if "TEMP B-TREE" in detail:
+            temp_btrees += 1
+    return {"steps": steps, "full_scans": full_scans, "index_lookups": index_lookups, "temp_btrees": temp_btrees}
+
+
+def statement_body(query: str) -> str:
+    """The query without leading whitespace and comments; empty if it holds no statement."""
+    return query[_LEADING_RE.match(query).end():].strip().rstrip(";").strip()
+
+
+def format_table(columns: Sequence[str], rows: Sequence[tuple], limit: int = 50) -> str:
+    """Plain-text rendering for the code runner's output pane."""
+    shown = [["NULL" if v is None else str(_json_value(v)) for v in row] for row in rows[:limit]]
+    widths = [max([len(c)] + [len(r[i]) for r in shown]) for i, c in enumerate(columns)]
+    lines = [" | ".join(c.ljust(w) for c, w in zip(columns, widths)), "-+-".join("-" * w for w in widths)]
+    lines += [" | ".join(v.ljust(w) for v, w in zip(row, widths)) for row in shown]
+    if len(rows) > limit:
+        lines.append(f"... {len(rows) - limit} more rows")
+    return "\n".join(lines)
+
+
+class QueryLimitExceeded(Exception):
+    pass
+
+
+class SqlEngine:
+    def __init__(self, datasets_dir: Path, pool_size: int = POOL_SIZE, step_limit: int = STEP_LIMIT,
+                 time_limit: float = TIME_LIMIT_SECONDS):
+        self.datasets_dir = Path(datasets_dir)
+        self.pool_size = pool_size
+        self.step_limit = step_limit
+        self.time_limit = time_limit
+        self._pools: Dict[str, DatasetPool] = {}
+        self._lock = threading.Lock()
+
+    def pool(self, name: str) -> DatasetPool:
+        """The dataset's pool, (re)building its image if the script is new or changed."""
+        if not _DATASET_NAME_RE.fullmatch(name or ""):
+            raise DatasetError(f"Invalid dataset name {name!r}")
+        path = self.datasets_dir / f"{name}.sql"
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            raise DatasetError(f"No dataset '{name}'")
+        version = (st.st_size, st.st_mtime_ns)
+        pool = self._pools.get(name)
+        if pool is not None and pool.version == version:
+            return pool
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None or pool.version != version:
+                try:
+                    image = build_image(path.read_text(encoding="utf-8"))
+                except sqlite3.Error as e:
+                    raise DatasetError(f"Dataset '{name}': {e}") from e
+                old, pool = pool, DatasetPool(name, image, version, self.pool_size)
+                self._pools[name] = pool
+                if old is not None:
+                    old.close()  # connections still checked out are simply dropped on release
+            return pool
+
+    def version(self, spec: dict) -> str:
+        """What a query's result depends on besides the query and spec: dataset contents, SQLite, step limit."""
+        pool = self.pool(spec.get("dataset", ""))
+        return f"sqlite {sqlite3.sqlite_version}; {pool.name} {pool.version[0]}:{pool.version[1]}; steps {self.step_limit}"
+
+    def _execute(self, conn: sqlite3.Connection, query: str, max_rows: int) -> Tuple[List[str], List[tuple], bool]:
+        steps = 0
+        deadline = time.monotonic() + self.time_limit
+        exceeded: List[str] = []
+
+        def progress():
+            nonlocal steps
+            steps += PROGRESS_INTERVAL
+            if steps > self.step_limit:
+                exceeded.append(f"Query exceeded {self.step_limit:,} steps")
+            elif time.monotonic() > deadline:
+                exceeded.append(f"Query exceeded {self.time_limit:g}s")
+            return 1 if exceeded else 0
+
+        conn.set_progress_handler(progress, PROGRESS_INTERVAL)
+        try:
+            cursor = conn.execute(query)
+            columns = [d[0] for d in cursor.description or ()]
+            rows = cursor.fetchmany(max_rows + 1)
+            cursor.close()
+        except sqlite3.OperationalError:
+            if exceeded:
+                raise QueryLimitExceeded(exceeded[0])
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+        return columns, rows[:max_rows], len(rows) > max_rows
+
+    def _reference(self, pool: DatasetPool, conn: sqlite3.Connection, spec: dict) -> Tuple[List[str], List[tuple]]:
+        key = (spec["reference"], bool(spec.get("ordered")))
+        cached = pool.reference_results.get(key)
+        if cached is None:
+            try:
+                columns, rows, _ = self._execute(conn, spec["reference"], max_rows=1_000_000)
+            except (QueryLimitExceeded, sqlite3.Error, sqlite3.Warning) as e:
+                raise DatasetError(f"Dataset '{pool.name}': reference query failed: {e}") from e
+            cached = pool.reference_results[key] = (columns, rows)
+        return cached
+
+    def _plan(self, pool: DatasetPool, conn: sqlite3.Connection, query: str):
+        """The summarized plan of `query`, or None if SQLite can't explain it."""
+        body = statement_body(query)
+        explained = _EXPLAIN_RE.match(body)
+        if explained:
+            body = body[explained.end():]
+        try:
+            plan_rows = conn.execute(f"EXPLAIN QUERY PLAN {body}").fetchall()
+        except (sqlite3.Error, sqlite3.Warning):
+            return None
+        return summarize_plan(plan_rows, pool.tables, table_aliases(body, pool.tables))
+
+    def run(self, spec: dict, query: str, max_rows: int = MAX_ROWS) -> dict:
+        """Execute a student query against the spec's dataset; compare with the reference if the spec has one."""
+        pool = self.pool(spec.get("dataset", ""))
+        if len(query) > MAX_QUERY_LENGTH:
+            SQL_QUERIES_TOTAL.inc("error")
+            return {"success": False, "error": f"Query longer than {MAX_QUERY_LENGTH} characters"}
+        if not statement_body(query):
+            SQL_QUERIES_TOTAL.inc("error")
+            return {"success": False, "error": "Empty query: write a SELECT statement"}
+        conn = pool.acquire()
+        started = time.perf_counter()
+        try:
+            try:
+                columns, rows, truncated = self._execute(conn, query, max_rows)
+            except QueryLimitExceeded as e:
+                SQL_QUERIES_TOTAL.inc("limit")
+                return {"success": False, "error": str(e), "limit_exceeded": True}
+            except (sqlite3.Error, sqlite3.Warning) as e:
+                SQL_QUERIES_TOTAL.inc("error")
+                return {"success": False, "error": str(e).replace("not authorized", "only SELECT queries are allowed")}
+            elapsed = time.perf_counter() - started
+            SQL_QUERY_DURATION.observe(elapsed)
+            SQL_QUERIES_TOTAL.inc("ok")
+
+            result = {
+                "success": True,
+                "error": None,
+                "columns": columns,
+                "rows": [[_json_value(v) for v in row] for row in rows],
+                "row_count": len(rows),
+                "truncated": truncated,
+                "elapsed_ms": round(elapsed * 1000, 3),
+                "plan": self._plan(pool, conn, query),
+            }
+            if spec.get("reference"):
+                expected_columns, expected_rows = self._reference(pool, conn, spec)
+                result["check"] = compare(columns, rows, truncated, expected_columns, expected_rows,
+                                          bool(spec.get("ordered")))
+            return result
+        finally:
+            if self._pools.get(pool.name) is pool:
+                pool.release(conn)
+            else:
+                conn.close()
+
+    def schema(self, name: str) -> List[dict]:
+        """Tables, columns, indexes and row counts of a dataset, for the task page."""
+        pool = self.pool(name)
+        conn = pool.acquire()
+        try:
+            conn.set_authorizer(None)
+            tables = []
+            for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table' "
+                                         "AND name NOT LIKE 'sqlite_%' ORDER BY name").fetchall():
+                columns = [{"name": c[1], "type": c[2], "primary_key": bool(c[5])}
+                           for c in conn.execute(f"PRAGMA table_info('{table}')")]
+                indexes = [i[1] for i in conn.execute(f"PRAGMA index_list('{table}')")]
+                count = conn.execute(f"SELECT COUNT(*) FROM \"{table}\"").fetchone()[0]
+                tables.append({"table": table, "columns": columns, "indexes": indexes, "rows": count})
+            return tables
+        finally:
+            conn.set_authorizer(_authorize)
+            pool.release(conn)
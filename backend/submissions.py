@@ -0,0 +1,199 @@
+"""Content-addressed, compressed storage for submitted code.
+
+Each distinct submission is stored once in `submission_blobs`, keyed by the
+SHA-256 of its UTF-8 bytes (unpadded base64url, 43 characters: submissions
+are often only a few hundred bytes, so the reference size matters), compressed with zstd when the optional `zstandard`
+package is installed and zlib otherwise (kept raw if that isn't smaller).
+Progress records hold only `code_hash`.
+
+Blobs are reference counted: `store` takes a reference before the progress
+record points at the blob, and `release` drops the one a record no longer
+uses. A blob is deleted when its count reaches zero; the delete is conditional
+on the count, so a concurrent `store` of the same code either keeps it alive or
+re-creates it. A failed progress write leaks one reference, which only delays
+collection.
+
+Blobs never change once written, so decoded code is cached per worker.
+
+    python submissions.py migrate   # move inline progress.<task>.code into blobs
+"""
+import base64
+import hashlib
+import os
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Tuple
+
+from bson import Binary
+
+import metrics
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib only
+    zstandard = None
+
+BLOB_COLLECTION = "submission_blobs"
+ZSTD_LEVEL = 6
+ZLIB_LEVEL = 6
+DECODED_CACHE_SIZE = 1024
+
+SUBMISSION_BYTES_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "submission_bytes_total", "Submitted code bytes received vs. newly written to blob storage", ("stage",)))
+SUBMISSION_BLOB_WRITES_TOTAL = metrics.REGISTRY.register(metrics.Counter(
+    "submission_blob_writes_total", "Submission stores by whether the content was already present", ("result",)))
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard else None
+_decoded: "OrderedDict[str, str]" = OrderedDict()
+
+
+def digest(code: str) -> str:
+    return base64.urlsafe_b64encode(hashlib.sha256(code.encode("utf-8")).digest()).rstrip(b"=").decode()
+
+
+def encode(code: str) -> Tuple[str, bytes]:
+    """(codec, payload) for `code`, whichever of the available codecs is smallest."""
+    raw = code.encode("utf-8")
+    if _zstd_compressor is not None:
+        codec, payload = "zstd", _zstd_compressor.compress(raw)
+    else:
+        codec, payload = "zlib", zlib.compress(raw, ZLIB_LEVEL)
+    if len(payload) >= len(raw):
+        return "raw", raw
+    return codec, payload
+
+
+def decode(codec: str, payload: bytes) -> str:
+    if codec == "zstd":
+        if _zstd_decompressor is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed")
+        raw = _zstd_decompressor.decompress(payload)
+    elif codec == "zlib":
+        raw = zlib.decompress(payload)
+    else:
+        raw = payload
+    return bytes(raw).decode("utf-8")
+
+
+async def ensure_indexes(db):
+    # Partial index so collecting unreferenced blobs doesn't scan the collection
+    await db[BLOB_COLLECTION].create_index("refs", partialFilterExpression={"refs": {"$lte": 0}})
+
+
+async def store(db, code: str) -> str:
+    """Take a reference to `code`'s blob, writing it if new; returns the hash."""
+    key = digest(code)
+    size = len(code.encode("utf-8"))
+    SUBMISSION_BYTES_TOTAL.inc("received", amount=size)
+    # Most submissions repeat existing code (starter code, common solutions): try a bare $inc first
+    result = await db[BLOB_COLLECTION].update_one({"_id": key}, {"$inc": {"refs": 1}})
+    if result.matched_count:
+        SUBMISSION_BLOB_WRITES_TOTAL.inc("dedup")
+        return key
+    codec, payload = encode(code)
+    await db[BLOB_COLLECTION].update_one(
+        {"_id": key},
+        {"$inc": {"refs": 1},
+         "$setOnInsert": {"codec": codec, "data": Binary(payload), "size": size,
+                          "created_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    SUBMISSION_BLOB_WRITES_TOTAL.inc("new")
+    SUBMISSION_BYTES_TOTAL.inc("stored", amount=len(payload))
+    return key
+
+
+async def release(db, key: Optional[str]):
+    """Drop one reference to a blob, deleting it once nothing refers to it."""
+    if not key:
+        return
+    blob = await db[BLOB_COLLECTION].find_one_and_update(
+        {"_id": key}, {"$inc": {"refs": -1}}, projection={"refs": 1})
+    if blob is not None and blob["refs"] <= 1:
+        await db[BLOB_COLLECTION].delete_one({"_id": key, "refs": {"$lte": 0}})
+
+
+async def load(db, key: str) -> Optional[str]:
+    code = _decoded.get(key)
+    if code is not None:
+        _decoded.move_to_end(key)
+        return code
+    blob = await db[BLOB_COLLECTION].find_one({"_id": key}, {"codec": 1, "data": 1})
+    if blob is None:
+        return None
+    code = decode(blob["codec"], blob["data"])
+    _decoded[key] = code
+    if len(_decoded) > DECODED_CACHE_SIZE:
+        _decoded.popitem(last=False)
+    return code
+
+
+async def migrate_inline_code(db, batch_size: int = 500) -> int:
+    """Move `progress.<task>.code` strings written before blob storage into blobs. Returns entries moved."""
+    moved = 0
+    cursor = db.users.find({}, {"_id": 0, "id": 1, "progress": 1}).batch_size(batch_size)
+    async for user in cursor:
+        for task_id, entry in (user.get("progress") or {}).items():
+            if not isinstance(entry, dict) or not isinstance(entry.get("code"), str):
+                continue
+            key = await store(db, entry["code"])
+            result = await db.users.update_one(
+                {"id": user["id"], f"progress.{task_id}.code": entry["code"]},
+                {"$set": {f"progress.{task_id}.code_hash": key}, "$unset": {f"progress.{task_id}.code": ""}}
+            )
+            if result.modified_count:
+                moved += 1
+            else:
+                await release(db, key)  # resubmitted meanwhile; the new submission already has a blob
+    return moved
+
+
+def main():
+    import asyncio
+    import typer
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    app = typer.Typer()
+
+    @app.command()
+    def migrate():
+        """Move inline submitted code from progress records into the blob collection."""
+        async def run() -> int:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            try:
+                db = client[os.environ['DB_NAME']]
+                await ensure_indexes(db)
+                return await migrate_inline_code(db)
+            finally:
+                client.close()
+
+        started = time.perf_counter()
+        moved = asyncio.run(run())
+        typer.echo(f"moved={moved} took={time.perf_counter() - started:.1f}s", err=True)
+
+    @app.command()
+    def stats():
+        """Blob count, referenced submissions and stored vs. raw bytes."""
+        async def run() -> dict:
+            client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+            try:
+                pipeline = [{"$group": {"_id": None, "blobs": {"$sum": 1}, "refs": {"$sum": "$refs"},
+                                        "raw": {"$sum": "$size"}, "stored": {"$sum": {"$binarySize": "$data"}}}}]
+                rows = await client[os.environ['DB_NAME']][BLOB_COLLECTION].aggregate(pipeline).to_list(1)
+                return rows[0] if rows else {}
+            finally:
+                client.close()
+
+        typer.echo(asyncio.run(run()))
+
+    app()
+
+
+if __name__ == "__main__":
+    main()
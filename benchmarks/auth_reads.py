@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Mongo reads per request for authenticated routes.
+
+Drives the stub app in-process on mongomock (no server needed) with the user
+cache disabled, so every user lookup would be a real read, as on a cache miss
+or a request that lands on another worker. Counts `users` document reads per
+route and fails if any route that only needs token claims reads the user.
+
+    python benchmarks/auth_reads.py [--rounds 20]
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+os.environ["BENCH_MOCK_DB"] = "1"
+os.environ["USER_CACHE_TTL_SECONDS"] = "0"
+os.environ.setdefault("BENCH_LLM_LATENCY_MS", "0")
+os.environ.setdefault("ADMIN_EMAILS", "bench@iitb.ac.in")
+
+import mongomock.collection  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import stub_app  # noqa: E402
+
+# (method, path, json body, needs the full user document)
+ROUTES = [
+    ("GET", "/api/users/profile", None, True),
+    ("GET", "/api/skills/dsa", None, True),
+    ("GET", "/api/recommendations", None, True),
+    ("GET", "/api/bro/history", None, False),
+    ("POST", "/api/code/run", {"code": "print(1)"}, False),
+    ("POST", "/api/bro/chat", {"message": "hi"}, False),
+    ("PUT", "/api/users/timezone", {"timezone": "Asia/Kolkata"}, False),
+    ("POST", "/api/resume/create", {"company": "Acme", "content": {"summary": "bench"}}, False),
+    ("GET", "/api/admin/jobs", None, False),
+]
+
+reads = Counter()
+_find = mongomock.collection.Collection.find
+
+
+def counting_find(self, *args, **kwargs):
+    reads[self.name] += 1
+    return _find(self, *args, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    mongomock.collection.Collection.find = counting_find
+    failures = []
+    with TestClient(stub_app.app) as client:
+        registered = client.post("/api/auth/register", json={"email": "bench@iitb.ac.in", "password": "bench-password",
+                                                             "name": "Bench"}).json()
+        headers = {"Authorization": f"Bearer {registered['token']}"}
+
+        print(f"{'route':<34} {'status':>6} {'user reads/req':>15} {'all reads/req':>14}")
+        total_user, total_all, requests = 0, 0, 0
+        for method, path, body, needs_user in ROUTES:
+            statuses = set()
+            reads.clear()
+            for _ in range(args.rounds):
+                statuses.add(client.request(method, path, json=body, headers=headers).status_code)
+            user_reads, all_reads = reads["users"] / args.rounds, sum(reads.values()) / args.rounds
+            total_user += reads["users"]
+            total_all += sum(reads.values())
+            requests += args.rounds
+            print(f"{method + ' ' + path:<34} {'/'.join(map(str, sorted(statuses))):>6} {user_reads:>15.2f} {all_reads:>14.2f}")
+            if not needs_user and user_reads:
+                failures.append(f"{path} read the user document")
+            if statuses - {200, 429}:  # LLM/code routes hit their rate limit over many rounds
+                failures.append(f"{path} returned {sorted(statuses)}")
+        print(f"mean over the mix: {total_user / requests:.2f} user reads/request, {total_all / requests:.2f} reads/request")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
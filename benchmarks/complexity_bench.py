@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Static complexity analyzer: accuracy on the DSA catalog and latency.
+
+Accuracy:
+- every reference solution in a DSA task's `solution_explanation` should be
+  estimated at or below the task's `complexity` target, with no warnings,
+- each planted inefficient variant should get its expected estimate and
+  warning kind.
+
+Latency: `--runs` analyses of distinct submissions (the reference
+solutions, each made unique with a trailing comment) uncached, then the same
+code again from the per-hash cache.
+
+Exits non-zero on any accuracy miss, or if uncached p99 exceeds `--max-ms`.
+
+    python benchmarks/complexity_bench.py [--runs 2000] [--max-ms 10]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+import complexity  # noqa: E402
+
+# (name, code, expected estimate, expected warning kind)
+PLANTED = [
+    ("two sum, all pairs",
+     "def two_sum(nums, target):\n    for i in range(len(nums)):\n        for j in range(i + 1, len(nums)):\n"
+     "            if nums[i] + nums[j] == target:\n                return [i, j]\n",
+     "O(n^2)", "nested_loops_same_input"),
+    ("two sum, `in` on a slice",
+     "def two_sum(nums, target):\n    for i, x in enumerate(nums):\n        if target - x in nums[i + 1:]:\n"
+     "            return [i, nums.index(target - x, i + 1)]\n",
+     "O(n^2)", "list_membership"),
+    ("contains duplicate, seen list",
+     "def contains_duplicate(nums):\n    seen = []\n    for x in nums:\n        if x in seen:\n            return True\n"
+     "        seen.append(x)\n    return False\n",
+     "O(n^2)", "list_membership"),
+    ("palindrome, string building",
+     "def is_palindrome(s):\n    clean = ''\n    for c in s:\n        if c.isalnum():\n            clean += c.lower()\n"
+     "    return clean == clean[::-1]\n",
+     "O(n^2)", "string_concatenation"),
+    ("climb stairs, plain recursion",
+     "def climb_stairs(n):\n    if n <= 2:\n        return n\n    return climb_stairs(n - 1) + climb_stairs(n - 2)\n",
+     "O(2^n)", "recursion_without_memo"),
+    ("coin change, recursion in a loop",
+     "def coin_change(coins, amount):\n    if amount == 0:\n        return 0\n    if amount < 0:\n        return -1\n"
+     "    best = float('inf')\n    for c in coins:\n        r = coin_change(coins, amount - c)\n"
+     "        if r >= 0:\n            best = min(best, r + 1)\n    return -1 if best == float('inf') else best\n",
+     "O(2^n)", "recursion_without_memo"),
+    ("climb stairs, lru_cache",
+     "from functools import lru_cache\n\n@lru_cache(maxsize=None)\ndef climb_stairs(n):\n    if n <= 2:\n        return n\n"
+     "    return climb_stairs(n - 1) + climb_stairs(n - 2)\n",
+     "O(n)", None),
+    ("coin change, memo dict",
+     "def coin_change(coins, amount, memo=None):\n    memo = {} if memo is None else memo\n    if amount in memo:\n"
+     "        return memo[amount]\n    if amount <= 0:\n        return 0 if amount == 0 else -1\n    best = -1\n"
+     "    for c in coins:\n        r = coin_change(coins, amount - c, memo)\n        if r >= 0 and (best < 0 or r + 1 < best):\n"
+     "            best = r + 1\n    memo[amount] = best\n    return best\n",
+     "O(n^2)", None),
+    ("binary search",
+     "def search(nums, target):\n    lo, hi = 0, len(nums) - 1\n    while lo <= hi:\n        mid = (lo + hi) // 2\n"
+     "        if nums[mid] == target:\n            return mid\n        if nums[mid] < target:\n            lo = mid + 1\n"
+     "        else:\n            hi = mid - 1\n    return -1\n",
+     "O(log n)", None),
+]
+
+
+def references():
+    """(task, code) for every reference solution in the DSA track."""
+    tracks = json.loads((BACKEND / "content" / "tracks" / "dsa.json").read_text())["tracks"]
+    for track in tracks.values():
+        for task in track["tasks"]:
+            for code in re.findall(r"```python\n(.*?)```", task["solution_explanation"], re.S):
+                yield task, code
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2000)
+    parser.add_argument("--max-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    misses = []
+    solutions = list(references())
+    for task, code in solutions:
+        review = complexity.review(code, task)
+        if review["warnings"] or review["error"]:
+            misses.append(f"{task['id']} reference: {review['big_o']} {[w['kind'] for w in review['warnings']]}")
+    for name, code, expected, kind in PLANTED:
+        review = complexity.review(code)
+        kinds = [w["kind"] for w in review["warnings"]]
+        if review["big_o"] != expected or (kind is None and kinds) or (kind is not None and kind not in kinds):
+            misses.append(f"{name}: got {review['big_o']} {kinds}, expected {expected} {kind or 'no warnings'}")
+    print(f"accuracy: {len(solutions)} reference solutions, {len(PLANTED)} planted variants, {len(misses)} misses")
+    for miss in misses:
+        print(f"  {miss}")
+
+    codes = [solutions[i % len(solutions)][1] + f"\n# run {i}\n" for i in range(args.runs)]
+    uncached = []
+    for code in codes:
+        started = time.perf_counter()
+        complexity.analyze(code)
+        uncached.append((time.perf_counter() - started) * 1000)
+    cached = []
+    for code in codes[-complexity.ANALYSIS_CACHE_SIZE:]:
+        started = time.perf_counter()
+        complexity.analyze(code)
+        cached.append((time.perf_counter() - started) * 1000)
+    print(f"latency: uncached p50={pct(uncached, 50):.2f}ms p99={pct(uncached, 99):.2f}ms, "
+          f"cached p50={pct(cached, 50) * 1000:.0f}us")
+
+    if misses:
+        print("FAIL: analyzer missed expected estimates or warnings")
+        sys.exit(1)
+    if pct(uncached, 99) > args.max_ms:
+        print(f"FAIL: uncached p99 above {args.max_ms}ms")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Email-domain policy check cost as the allowlist grows.
+
+Compiles the default rules plus `N` extra college domains (half exact, half
+suffix) for each `--sizes` entry and times `allows()` over a mix of exact,
+subdomain, pattern-only and rejected addresses. For reference it also times
+the old approach, one precompiled regex search per rule.
+
+Exits non-zero if the largest allowlist is more than `--max-ratio` times
+slower per check than the smallest.
+
+    python benchmarks/email_policy_bench.py [--sizes 10,1000,10000,50000] [--checks 20000]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import emailpolicy  # noqa: E402
+
+
+def college_rules(n: int) -> list:
+    rules = emailpolicy.default_rule_documents()
+    for i in range(n):
+        kind = "domain" if i % 2 else "suffix"
+        rules.append({"id": f"c{i}", "kind": kind, "value": f"college{i}.ac.in" if i % 3 else f"uni{i}.edu.np"})
+    return rules
+
+
+def addresses(n: int, count: int, rng: random.Random) -> list:
+    out = []
+    for _ in range(count):
+        i = rng.randrange(max(n, 1))
+        out.append(rng.choice([
+            f"s@college{i}.ac.in", f"s@cs.uni{i}.edu.np", "s@iitb.ac.in", "s@gmail.com",
+            "s@mit.edu", "s@startup.io", f"s@mail{i}.example.com", "s@vitx.org",
+        ]))
+    return out
+
+
+def legacy_check(patterns, email: str) -> bool:
+    email = email.lower()
+    return any(p.search(email) for p in patterns)
+
+
+def per_check_us(check, emails) -> float:
+    start = time.perf_counter()
+    for email in emails:
+        check(email)
+    return (time.perf_counter() - start) / len(emails) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,10000,50000")
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    rng = random.Random(11)
+    results = []
+    print(f"{'rules':>7} {'compile ms':>11} {'policy us/check':>16} {'legacy us/check':>16}")
+    for n in sizes:
+        rules = college_rules(n)
+        start = time.perf_counter()
+        policy = emailpolicy.DomainPolicy(rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+        emails = addresses(n, args.checks, rng)
+        policy_us = min(per_check_us(policy.allows, emails) for _ in range(3))
+
+        # The old code: every rule as a regex searched in turn (sampled, it's slow at scale)
+        patterns = [re.compile(r["value"] if r["kind"] == "pattern" else "@" + re.escape(r["value"]) + "$"
+                               if r["kind"] == "domain" else r"\." + re.escape(r["value"]) + "$") for r in rules]
+        sample = emails[:max(20, args.checks // max(1, n // 10))]
+        legacy_us = per_check_us(lambda e: legacy_check(patterns, e), sample)
+
+        mismatches = sum(policy.allows(e) != legacy_check(patterns, e) for e in sample)
+        if mismatches:
+            print(f"FAIL: {mismatches} decisions differ from the per-pattern check at {n} rules")
+            sys.exit(1)
+        results.append(policy_us)
+        print(f"{len(rules):>7} {compile_ms:>11.1f} {policy_us:>16.2f} {legacy_us:>16.1f}")
+
+    ratio = results[-1] / results[0]
+    print(f"largest/smallest per-check ratio: {ratio:.2f}")
+    if ratio > args.max_ratio:
+        print(f"FAIL: per-check cost grew more than {args.max_ratio}x with the allowlist")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
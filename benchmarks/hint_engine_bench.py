@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Local hint engine: LLM call volume and latency of BRO chat on a replayed log.
+
+The log is replayed through `/api/bro/chat` on the stub app in-process, once
+with the hint engine and once without (every message goes to the LLM). Each
+replay reports LLM calls, counted from `llm_call_duration_seconds`, and p50
+and p99 reply latency.
+
+By default the log is synthetic. `--students` students each work through
+`--tasks` DSA tasks, sending `--messages` messages per task. Messages are
+drawn from a labelled mix of hint requests, solution requests, complexity
+questions, small talk and open questions, phrased differently from the
+classifier's training examples. With `--log`, the log is instead an ndjson
+export of `chat_history` (`message`, `task_id`, `user_id`, optionally a
+labelled `intent`).
+
+Classifier accuracy is measured on labelled messages. A message wrongly
+answered locally is the costly mistake, since the student gets a canned reply
+to a real question. A labelled message escalated to the LLM only costs a call.
+
+Exits non-zero if LLM calls drop by less than `--min-reduction`, or if more
+than `--max-wrong-local` of labelled messages get a local answer to the
+wrong intent.
+
+    python benchmarks/hint_engine_bench.py [--students 8] [--messages 6] [--log chat.ndjson]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("BENCH_MOCK_DB", "1")
+os.environ.setdefault("BENCH_LLM_LATENCY_MS", "200")
+os.environ.setdefault("RATE_LIMIT_LLM_CHAT_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_LLM_CHAT_BURST", "1000000")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import stub_app  # noqa: E402
+
+server = stub_app.server
+hints = server.hints
+
+TASK_IDS = ["arr-001", "str-001", "ll-001", "sq-001", "tree-001", "dp-001", "arr-002", "dp-002"]
+# Labelled phrasings not in hints.INTENT_EXAMPLES, with weights for a plausible chat mix
+MESSAGES = {
+    "hint": (0.35, [
+        "could i get a hint for this?", "what's the next hint", "i'm stuck, any tips?", "hint pls",
+        "no clue where to start", "give me a small nudge", "im stuck on this one", "another clue please",
+        "can you help me get going", "any hint?",
+    ]),
+    "solution": (0.08, [
+        "can you just show me the full solution", "pls give me the code", "tell me the answer already",
+        "just solve it", "show the solution please",
+    ]),
+    "complexity": (0.05, [
+        "what time complexity should i target here", "is n squared fine for this",
+        "can it be done in linear time?", "what's the optimal big o",
+    ]),
+    "greeting": (0.08, ["hey!", "hello bro", "hi there", "good morning bro"]),
+    "thanks": (0.12, ["thanks!", "ok thanks", "thank you so much", "got it, thanks bro", "thanks a lot!"]),
+    hints.OPEN: (0.32, [
+        "why does my solution fail for a single element", "how is a stack different from a queue",
+        "can you explain the second example", "what does index out of range mean",
+        "is a dictionary lookup constant time", "how would you test this with edge cases",
+        "why is my loop running forever", "what should i practice next after this",
+        "my output has an extra space at the end", "can you explain what a prefix sum is",
+        "should i sort the input first?", "def solve(nums):\n    return sorted(nums)\nwhy is this wrong?",
+        "please dont give me hints yet", "help me understand this traceback", "thanks but it still fails",
+        "how do i start a career in ml", "where do i begin learning dp",
+    ]),
+}
+
+
+def synthetic_log(args, rng: random.Random):
+    """[{user_id, task_id, message, intent}] in send order."""
+    intents = list(MESSAGES)
+    weights = [MESSAGES[i][0] for i in intents]
+    log = []
+    for student in range(args.students):
+        for task_id in rng.sample(TASK_IDS, min(args.tasks, len(TASK_IDS))):
+            for _ in range(args.messages):
+                intent = rng.choices(intents, weights)[0]
+                log.append({"user_id": f"s{student}", "task_id": task_id,
+                            "message": rng.choice(MESSAGES[intent][1]), "intent": intent})
+    return log
+
+
+def load_log(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def llm_calls() -> float:
+    total = 0.0
+    for line in server.metrics.REGISTRY.render().splitlines():
+        if line.startswith('llm_call_duration_seconds_count{endpoint="/bro/chat"'):
+            total += float(line.rsplit(" ", 1)[1])
+    return total
+
+
+def replay(client, headers, log):
+    latencies = []
+    intents = []
+    calls = llm_calls()
+    for entry in log:
+        started = time.perf_counter()
+        body = client.post("/api/bro/chat", json={"message": entry["message"], "task_id": entry.get("task_id")},
+                           headers=headers[entry["user_id"]]).json()
+        latencies.append((time.perf_counter() - started) * 1000)
+        intents.append((body.get("source"), body.get("intent")))
+    return llm_calls() - calls, latencies, intents
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=3)
+    parser.add_argument("--messages", type=int, default=6)
+    parser.add_argument("--log", help="ndjson chat_history export to replay instead of the synthetic log")
+    parser.add_argument("--min-reduction", type=float, default=0.4)
+    parser.add_argument("--max-wrong-local", type=float, default=0.02)
+    args = parser.parse_args()
+
+    log = load_log(args.log) if args.log else synthetic_log(args, random.Random(7))
+    with TestClient(stub_app.app) as client:
+        results = {}
+        for label, enabled in (("hints", True), ("llm only", False)):
+            # Fresh users per replay, so both start with no hints shown
+            headers = {}
+            for user_id in dict.fromkeys(entry["user_id"] for entry in log):
+                token = client.post("/api/auth/register", json={
+                    "email": f"{user_id}-{int(enabled)}@iitb.ac.in", "password": "pw123456",
+                    "name": user_id}).json()["token"]
+                headers[user_id] = {"Authorization": f"Bearer {token}"}
+            server.HINT_ENGINE_ENABLED = enabled
+            started = time.perf_counter()
+            calls, latencies, intents = replay(client, headers, log)
+            results[label] = (calls, intents)
+            print(f"{label:>9}: {len(log)} messages in {time.perf_counter() - started:.1f}s, {calls:.0f} LLM calls, "
+                  f"p50={pct(latencies, 50):.1f}ms p99={pct(latencies, 99):.1f}ms")
+        server.HINT_ENGINE_ENABLED = True
+
+    (with_hints, intents), (without, _) = results["hints"], results["llm only"]
+    reduction = 1 - with_hints / without if without else 0.0
+    print(f"LLM calls: {with_hints:.0f} vs {without:.0f}, {reduction:.1%} fewer")
+
+    labelled = [(entry, routed) for entry, routed in zip(log, intents) if entry.get("intent")]
+    correct = sum(1 for entry, (_, intent) in labelled if intent == entry["intent"])
+    escalated = [(entry, intent) for entry, (source, intent) in labelled
+                 if intent != entry["intent"] and source == "llm"]
+    wrong_local = [(entry, intent) for entry, (source, intent) in labelled
+                   if source == "local" and intent != entry["intent"]]
+    if labelled:
+        print(f"classifier: {correct}/{len(labelled)} correct, {len(escalated)} escalated to the LLM, "
+              f"{len(wrong_local)} answered locally as the wrong intent")
+        for message, label, intent in sorted({(e["message"], e["intent"], i) for e, i in escalated + wrong_local}):
+            print(f"  {message!r}: labelled {label}, classified {intent}")
+
+    if reduction < args.min_reduction:
+        print(f"FAIL: LLM calls reduced by {reduction:.1%}, below {args.min_reduction:.0%}")
+        sys.exit(1)
+    if labelled and len(wrong_local) / len(labelled) > args.max_wrong_local:
+        print(f"FAIL: {len(wrong_local)} messages answered locally as the wrong intent")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Simulation test for the LLM scheduler with a fake LLM.
+
+Replays a contended workload against `LLMScheduler`:
+- one heavy user floods background work (resume analyses / drafts),
+- several light users send interactive BRO chats and a little background work,
+and checks the scheduler's guarantees:
+- interactive requests never wait behind the background backlog,
+- light users' background jobs aren't stuck behind the heavy user's batch,
+- the concurrency cap and tokens-per-minute ceiling are never exceeded.
+
+Prints queue-wait percentiles per priority class and exits non-zero if any
+check fails.
+
+    python benchmarks/llm_scheduler_sim.py
+"""
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler  # noqa: E402
+
+MAX_CONCURRENCY = 4
+# 75 requests x 800 tokens slightly exceeds one minute's budget, so the ceiling binds
+TOKENS_PER_MINUTE = 58000
+LLM_LATENCY = (0.05, 0.15)
+COST = 800
+
+
+class FakeLLM:
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.dispatches = []  # (time, cost)
+
+    async def call(self, cost: int, rng: random.Random):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        self.dispatches.append((time.monotonic(), cost))
+        try:
+            await asyncio.sleep(rng.uniform(*LLM_LATENCY))
+        finally:
+            self.active -= 1
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+async def simulate(seed: int = 7):
+    rng = random.Random(seed)
+    llm = FakeLLM()
+    scheduler = LLMScheduler(max_concurrency=MAX_CONCURRENCY, tokens_per_minute=TOKENS_PER_MINUTE,
+                             max_background_wait=5.0)
+    waits = {INTERACTIVE: [], BACKGROUND: []}
+    finished = {}
+
+    async def request(priority, user_id, tag, delay):
+        await asyncio.sleep(delay)
+        enqueued = time.monotonic()
+        started = {}
+
+        async def factory():
+            started["at"] = time.monotonic()
+            await llm.call(COST, rng)
+
+        await scheduler.submit(priority, user_id, COST, factory)
+        waits[priority].append(started["at"] - enqueued)
+        finished[tag] = time.monotonic()
+
+    jobs = []
+    # Heavy user dumps 40 background jobs at t=0
+    jobs += [request(BACKGROUND, "heavy", f"heavy-{i}", 0.0) for i in range(40)]
+    # Light users: one background job each shortly after, plus chats throughout
+    for u in range(5):
+        jobs.append(request(BACKGROUND, f"light-{u}", f"light-bg-{u}", 0.01))
+        jobs += [request(INTERACTIVE, f"light-{u}", f"light-chat-{u}-{i}", rng.uniform(0.0, 1.5)) for i in range(6)]
+
+    start = time.monotonic()
+    await asyncio.gather(*jobs)
+    return llm, waits, finished, time.monotonic() - start
+
+
+def main():
+    llm, waits, finished, elapsed = asyncio.run(simulate())
+    failures = []
+
+    print(f"simulated {sum(len(w) for w in waits.values())} requests in {elapsed:.2f}s")
+    for priority, values in waits.items():
+        print(f"  {priority:<12} n={len(values):<3} wait p50={pct(values, 50) * 1000:7.1f}ms "
+              f"p95={pct(values, 95) * 1000:7.1f}ms max={max(values) * 1000:7.1f}ms")
+
+    # Interactive requests should wait at most about one LLM call for a free slot
+    if pct(waits[INTERACTIVE], 95) > LLM_LATENCY[1] * 1.5:
+        failures.append("interactive p95 queue wait exceeds one LLM call")
+    if statistics.median(waits[INTERACTIVE]) >= statistics.median(waits[BACKGROUND]):
+        failures.append("interactive requests are not prioritised over background")
+
+    # Fair queuing: every light user's background job beats the heavy user's median job
+    heavy_median = statistics.median(t for tag, t in finished.items() if tag.startswith("heavy-"))
+    slow_light = [tag for tag, t in finished.items() if tag.startswith("light-bg-") and t > heavy_median]
+    if slow_light:
+        failures.append(f"light users starved behind heavy user: {slow_light}")
+
+    if llm.peak > MAX_CONCURRENCY:
+        failures.append(f"concurrency cap exceeded: {llm.peak} > {MAX_CONCURRENCY}")
+
+    # Token bucket: tokens dispatched by time t never exceed the burst plus refill up to t
+    t0 = llm.dispatches[0][0]
+    dispatched = 0
+    for at, cost in llm.dispatches:
+        dispatched += cost
+        allowed = TOKENS_PER_MINUTE + (at - t0) * TOKENS_PER_MINUTE / 60
+        if dispatched > allowed + 1e-6:
+            failures.append("tokens-per-minute ceiling exceeded")
+            break
+
+    print(f"  peak concurrency={llm.peak}/{MAX_CONCURRENCY}, tokens dispatched={dispatched}")
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""Local load-testing benchmark for the SkillForge API.
+
+Boots `stub_app:app` (the real app with LLM/STT stubbed) under uvicorn,
+registers a pool of users, then drives a weighted mix of workloads from
+concurrent virtual users and reports throughput and p50/p95/p99 per route.
+Results are written as JSON so runs can be compared across commits.
+
+Examples:
+
+    # against a local mongod
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/load_test.py --duration 30
+
+    # no mongod available: in-memory stand-in (single worker only; needs mongomock-motor,
+    # which backend/requirements.txt installs for the tests)
+    python benchmarks/load_test.py --mock-db --out bench/before.json
+    python benchmarks/load_test.py --mock-db --compare bench/before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+
+DEFAULT_MIX = "login=1,browse=6,submit=2,chat=1"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'. Choose from: {sorted(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ============ RECORDING ============
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - start)
+        self.statuses[label][response.status_code] += 1
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def summary(self, elapsed: float) -> Dict[str, dict]:
+        routes = {}
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(label, []))
+            routes[label] = {
+                "requests": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "status_codes": {str(k): v for k, v in sorted(self.statuses.get(label, {}).items())},
+            }
+        return routes
+
+
+# ============ WORKLOADS ============
+
+class Catalog:
+    """Track and task ids discovered from the running API."""
+
+    def __init__(self):
+        self.dsa: Dict[str, List[str]] = {}
+        self.analytics: List[str] = []
+
+    async def load(self, client: httpx.AsyncClient, headers: dict):
+        tracks = (await client.get("/api/skills/dsa", headers=headers)).json()["tracks"]
+        for track in tracks:
+            detail = (await client.get(f"/api/skills/dsa/{track['id']}", headers=headers)).json()
+            self.dsa[track["id"]] = [t["id"] for t in detail["tasks"]]
+        self.analytics = [t["id"] for t in (await client.get("/api/skills/analytics", headers=headers)).json()["tracks"]]
+
+    def all_tasks(self) -> List[str]:
+        return [task for tasks in self.dsa.values() for task in tasks]
+
+
+async def scenario_login(client, rec: Recorder, account: dict, catalog: Catalog):
+    response = await rec.call(client, "POST /auth/login", "POST", "/api/auth/login",
+                              json={"email": account["email"], "password": account["password"]})
+    if response is not None and response.status_code == 200:
+        account["headers"] = {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+async def scenario_browse(client, rec: Recorder, account: dict, catalog: Catalog):
+    headers = account["headers"]
+    track_id = random.choice(list(catalog.dsa))
+    await rec.call(client, "GET /skills/dsa", "GET", "/api/skills/dsa", headers=headers)
+    await rec.call(client, "GET /skills/dsa/{track_id}", "GET", f"/api/skills/dsa/{track_id}", headers=headers)
+    task_id = random.choice(catalog.dsa[track_id])
+    await rec.call(client, "GET /skills/dsa/{track_id}/{task_id}", "GET", f"/api/skills/dsa/{track_id}/{task_id}", headers=headers)
+    if catalog.analytics:
+        analytics_id = random.choice(catalog.analytics)
+        await rec.call(client, "GET /skills/analytics/{track_id}", "GET", f"/api/skills/analytics/{analytics_id}", headers=headers)
+    await rec.call(client, "GET /users/profile", "GET", "/api/users/profile", headers=headers)
+    await rec.call(client, "GET /trends", "GET", "/api/trends", headers=headers)
+
+
+async def scenario_submit(client, rec: Recorder, account: dict, catalog: Catalog):
+    task_id = random.choice(catalog.all_tasks())
+    code = f"def solve(nums):\n    return sorted(nums)  # {random.randint(0, 50)}\n"
+    await rec.call(client, "POST /code/run", "POST", "/api/code/run",
+                   json={"code": code + "print(solve([3, 1, 2]))", "task_id": task_id}, headers=account["headers"])
+    await rec.call(client, "POST /tasks/{task_id}/submit", "POST", f"/api/tasks/{task_id}/submit",
+                   json={"task_id": task_id, "code": code}, headers=account["headers"])
+    await rec.call(client, "GET /readiness", "GET", "/api/readiness", headers=account["headers"])
+
+
+async def scenario_chat(client, rec: Recorder, account: dict, catalog: Catalog):
+    await rec.call(client, "POST /bro/chat", "POST", "/api/bro/chat",
+                   json={"message": "Can you give me a hint for two sum?"}, headers=account["headers"])
+    await rec.call(client, "GET /bro/history", "GET", "/api/bro/history", headers=account["headers"])
+
+
+SCENARIOS = {
+    "login": scenario_login,
+    "browse": scenario_browse,
+    "submit": scenario_submit,
+    "chat": scenario_chat,
+}
+
+
+async def register_accounts(client: httpx.AsyncClient, count: int, concurrency: int) -> List[dict]:
+    run_id = uuid.uuid4().hex[:8]
+    accounts = [{"email": f"bench-{run_id}-{i}@iitb.ac.in", "password": "bench-pass-123", "name": f"Bench {i}"}
+                for i in range(count)]
+    sem = asyncio.Semaphore(concurrency)
+
+    async def register(account):
+        async with sem:
+            r = await client.post("/api/auth/register", json=account)
+            r.raise_for_status()
+            account["headers"] = {"Authorization": f"Bearer {r.json()['token']}"}
+
+    await asyncio.gather(*(register(a) for a in accounts))
+    return accounts
+
+
+async def run_load(base_url: str, args) -> dict:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    rec = Recorder()
+    rng_seed = args.seed
+    random.seed(rng_seed)
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        accounts = await register_accounts(client, args.users, min(args.concurrency, 32))
+        catalog = Catalog()
+        await catalog.load(client, accounts[0]["headers"])
+
+        deadline = time.perf_counter() + args.duration
+        iterations = 0
+
+        async def virtual_user(idx: int):
+            nonlocal iterations
+            rng = random.Random(rng_seed + idx)
+            while time.perf_counter() < deadline:
+                scenario = SCENARIOS[rng.choices(names, weights)[0]]
+                await scenario(client, rec, rng.choice(accounts), catalog)
+                iterations += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(virtual_user(i) for i in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    routes = rec.summary(elapsed)
+    total = sum(r["requests"] for r in routes.values())
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "duration_s": args.duration, "concurrency": args.concurrency, "users": args.users,
+                "workers": args.workers, "mix": mix, "seed": args.seed, "mock_db": args.mock_db,
+                "llm_latency_ms": args.llm_latency_ms, "stt_latency_ms": args.stt_latency_ms,
+            },
+        },
+        "totals": {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "errors": sum(r["errors"] for r in routes.values()),
+            "scenarios": iterations,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        },
+        "routes": routes,
+    }
+
+
+# ============ SERVER LIFECYCLE ============
+
+def start_server(args, port: int) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["BENCH_LLM_LATENCY_MS"] = str(args.llm_latency_ms)
+    env["BENCH_STT_LATENCY_MS"] = str(args.stt_latency_ms)
+    if args.mock_db:
+        env["BENCH_MOCK_DB"] = "1"
+    cmd = [sys.executable, "-m", "uvicorn", "--app-dir", str(BENCH_DIR), "stub_app:app",
+           "--host", "127.0.0.1", "--port", str(port), "--workers", str(args.workers),
+           "--log-level", "warning", "--no-access-log"]
+    return subprocess.Popen(cmd, env=env, cwd=REPO_ROOT)
+
+
+def wait_until_ready(base_url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"Server exited early with code {proc.returncode}")
+        try:
+            if httpx.get(f"{base_url}/api/", timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit("Server did not become ready in time")
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# ============ REPORTING ============
+
+def print_report(result: dict, baseline: Optional[dict] = None):
+    totals = result["totals"]
+    print(f"\n{totals['requests']} requests in {totals['elapsed_s']}s "
+          f"({totals['throughput_rps']} req/s, {totals['errors']} errors)\n")
+    header = f"{'route':<40} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}"
+    if baseline:
+        header += f" {'Δp95':>8}"
+    print(header)
+    print("-" * len(header))
+    for label, r in result["routes"].items():
+        line = (f"{label:<40} {r['requests']:>7} {r['throughput_rps']:>8} "
+                f"{r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} {r['errors']:>5}")
+        base = (baseline or {}).get("routes", {}).get(label)
+        if base and base["p95_ms"]:
+            line += f" {(r['p95_ms'] - base['p95_ms']) / base['p95_ms'] * 100:>+7.1f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to drive load for")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent virtual users")
+    parser.add_argument("--users", type=int, default=50, help="Accounts registered before the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Scenario weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--stt-latency-ms", type=float, default=400.0)
+    parser.add_argument("--mock-db", action="store_true", help="Use in-memory mongomock-motor instead of MONGO_URL")
+    parser.add_argument("--base-url", help="Benchmark an already running server instead of booting one")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="Write the JSON result here")
+    parser.add_argument("--compare", help="Baseline JSON result to diff p95 against")
+    args = parser.parse_args()
+
+    if args.mock_db and args.workers > 1:
+        raise SystemExit("--mock-db keeps data per process; use a real mongod with --workers > 1")
+
+    proc = None
+    base_url = args.base_url
+    if not base_url:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = start_server(args, port)
+    try:
+        if proc:
+            wait_until_ready(base_url, proc)
+        result = asyncio.run(run_load(base_url, args))
+    finally:
+        if proc:
+            stop_server(proc)
+
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(result, baseline)
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"\nSaved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
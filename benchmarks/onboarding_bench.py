@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Bulk cohort onboarding throughput through `/api/admin/users/bulk`.
+
+Builds a `--users` row CSV roster (a few invalid and repeated rows mixed in,
+`--with-password` rows carrying a password, the rest invited), posts it to the
+stub app in-process on mongomock, then posts it again to check every row comes
+back as a duplicate. Also activates one invite and logs in with it.
+
+Exits non-zero if the first import takes longer than `--budget-s`. Timings
+need a real mongod (BENCH_MOCK_DB=0 with MONGO_URL/DB_NAME set): mongomock's
+unique-index check scans the collection on every insert, so on the default
+in-memory database keep `--users` to a few hundred.
+
+    BENCH_MOCK_DB=0 python benchmarks/onboarding_bench.py [--users 10000] [--with-password 32] [--budget-s 60]
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+
+os.environ.setdefault("BENCH_MOCK_DB", "1")
+os.environ.setdefault("ADMIN_EMAILS", "admin@iitb.ac.in")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import stub_app  # noqa: E402
+
+
+def roster(users: int, with_password: int) -> str:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["email", "name", "password", "timezone"])
+    for i in range(users):
+        if i % 1000 == 7:
+            writer.writerow([f"student{i}@gmail.org", f"Student {i}", "", ""])          # not an edu domain
+        elif i % 1000 == 8:
+            writer.writerow([f"student{i - 2}@nitk.ac.in", f"Student {i}", "", ""])     # repeated row
+        else:
+            password = f"pw-{i:06d}" if i < with_password else ""
+            writer.writerow([f"student{i}@nitk.ac.in", f"Student {i}", password, "Asia/Kolkata" if i % 2 else ""])
+    return out.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--with-password", type=int, default=32)
+    parser.add_argument("--budget-s", type=float, default=60.0)
+    args = parser.parse_args()
+
+    data = roster(args.users, args.with_password).encode()
+    failures = []
+    with TestClient(stub_app.app) as client:
+        token = client.post("/api/auth/register", json={"email": "admin@iitb.ac.in", "password": "admin-password",
+                                                        "name": "Admin"}).json()["token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        start = time.perf_counter()
+        response = client.post("/api/admin/users/bulk", files={"roster": ("roster.csv", data, "text/csv")}, headers=headers)
+        elapsed = time.perf_counter() - start
+        result = response.json()
+        counts = result["counts"]
+        print(f"imported {args.users} rows in {elapsed:.1f}s ({args.users / elapsed:.0f} rows/s): {counts}")
+
+        expected_bad = sum(1 for i in range(args.users) if i % 1000 in (7, 8))
+        if counts.get("created") != args.users - expected_bad:
+            failures.append(f"expected {args.users - expected_bad} created")
+
+        start = time.perf_counter()
+        again = client.post("/api/admin/users/bulk", files={"roster": ("roster.csv", data, "text/csv")},
+                            headers=headers).json()["counts"]
+        print(f"re-import in {time.perf_counter() - start:.1f}s: {again}")
+        if again.get("created"):
+            failures.append("re-import created users")
+
+        invited = next(r for r in result["rows"] if r.get("invite_token"))
+        activated = client.post("/api/auth/activate", json={"invite_token": invited["invite_token"], "password": "new-pass"})
+        login = client.post("/api/auth/login", json={"email": invited["email"], "password": "new-pass"})
+        reused = client.post("/api/auth/activate", json={"invite_token": invited["invite_token"], "password": "x"})
+        print(f"activate {activated.status_code}, login {login.status_code}, reuse invite {reused.status_code}")
+        if (activated.status_code, login.status_code, reused.status_code) != (200, 200, 400):
+            failures.append("invite activation flow")
+        if args.with_password:
+            with_pw = client.post("/api/auth/login", json={"email": "student0@nitk.ac.in", "password": "pw-000000"})
+            if with_pw.status_code != 200:
+                failures.append("roster password login")
+
+    if elapsed > args.budget_s:
+        failures.append(f"import took {elapsed:.1f}s, over the {args.budget_s}s budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
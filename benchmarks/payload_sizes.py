@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Per-route payload size and JSON encode time, before vs after compression.
+
+Runs the app in-process against an in-memory mongomock-motor database, seeds
+one user with resumes and a full page of BRO history, then for each heavy
+route reports:
+- raw JSON bytes vs gzip and brotli bytes on the wire,
+- time to encode the payload with the stdlib encoder vs orjson.
+
+    python benchmarks/payload_sizes.py [--out bench/payloads.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+os.environ["BENCH_MOCK_DB"] = "1"
+
+import stub_app  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+server = stub_app.server
+ENCODE_ROUNDS = 200
+
+
+def encode_ms(payload, encoder) -> float:
+    start = time.perf_counter()
+    for _ in range(ENCODE_ROUNDS):
+        encoder(payload)
+    return (time.perf_counter() - start) / ENCODE_ROUNDS * 1000
+
+
+def stdlib_encode(payload) -> bytes:
+    # What Starlette's JSONResponse does
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def seed(client: TestClient) -> dict:
+    r = client.post("/api/auth/register", json={"email": f"payload-{uuid.uuid4().hex[:6]}@iitb.ac.in",
+                                                 "password": "payload-pass", "name": "Payload"})
+    headers = {"Authorization": f"Bearer {r.json()['token']}"}
+    resume = {"summary": "Final-year CS student " * 20,
+              "experience": [{"role": "Intern", "bullets": ["Built a thing that scaled " * 5] * 4}] * 3,
+              "skills": ["Python", "SQL", "React", "Docker"] * 5}
+    for company in ("google", "microsoft", "amazon", "infosys"):
+        client.post("/api/resume/create", json={"company": company, "content": resume}, headers=headers)
+
+    user_id = client.get("/api/users/profile", headers=headers).json()["id"]
+    docs = [{"id": str(uuid.uuid4()), "user_id": user_id, "message": "How do I approach sliding window problems?",
+             "response": "Great question! Start by identifying the window invariant... " * 15, "context": "dsa",
+             "timestamp": datetime.now(timezone.utc).isoformat()} for _ in range(50)]
+    client.portal.call(server.db.chat_history.insert_many, docs)
+    return headers
+
+
+def measure(client: TestClient, headers: dict, path: str) -> dict:
+    sizes = {}
+    for encoding in ("identity", "gzip", "br"):
+        r = client.get(path, headers={**headers, "Accept-Encoding": encoding})
+        r.raise_for_status()
+        sizes[encoding] = int(r.headers.get("content-length") or len(r.content))
+    payload = r.json()
+    return {
+        "raw_bytes": sizes["identity"],
+        "gzip_bytes": sizes["gzip"],
+        "br_bytes": sizes["br"],
+        "gzip_ratio": round(sizes["identity"] / sizes["gzip"], 2),
+        "br_ratio": round(sizes["identity"] / sizes["br"], 2),
+        "stdlib_encode_ms": round(encode_ms(payload, stdlib_encode), 3),
+        "orjson_encode_ms": round(encode_ms(payload, orjson.dumps), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Write the JSON result here")
+    args = parser.parse_args()
+
+    results = {}
+    with TestClient(server.app) as client:
+        headers = seed(client)
+        paths = [f"/api/skills/dsa/{t}" for t in server.catalog().tracks("dsa")]
+        paths += [f"/api/skills/analytics/{t}" for t in server.catalog().tracks("analytics")]
+        paths += ["/api/resume/list", "/api/bro/history", "/api/users/profile", "/api/resume/templates"]
+        for path in paths:
+            results[path] = measure(client, headers, path)
+
+    print(f"{'route':<36} {'raw':>8} {'gzip':>8} {'br':>8} {'json ms':>8} {'orjson ms':>9}")
+    for path, r in results.items():
+        print(f"{path:<36} {r['raw_bytes']:>8} {r['gzip_bytes']:>8} {r['br_bytes']:>8} "
+              f"{r['stdlib_encode_ms']:>8} {r['orjson_encode_ms']:>9}")
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(results, indent=2))
+        print(f"\nSaved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Plagiarism detection recall and scaling on synthetic cohorts.
+
+For each `--sizes` entry, generates that many submissions to one task: random
+independent programs, plus copy rings in which a few students copy one
+program with renamed identifiers, reformatting and added comments (and
+sometimes one extra line). Times signing and LSH matching, and compares the
+number of candidate pairs with the n(n-1)/2 an all-pairs comparison would
+check.
+
+Exits non-zero if recall of the planted copies is below `--min-recall`, or if
+the per-submission cost at the largest size is more than `--max-ratio` times
+that of the smallest.
+
+    python benchmarks/plagiarism_bench.py [--sizes 1000,4000,16000] [--workers 1]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from itertools import combinations
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import plagiarism  # noqa: E402
+
+TASK = {"id": "bench-001", "starter_code": "def solve(arr):\n    # Your code here\n    pass\n", "solution_explanation": ""}
+NAMES = ["total", "best", "count", "acc", "result", "cur", "prev", "window", "left", "right", "seen", "stack"]
+OPS = ["+", "-", "*", "//", "%"]
+
+
+def statement(rng: random.Random, names, depth=1) -> str:
+    pad = "    " * depth
+    v, w = rng.sample(names, 2)
+    n = rng.randint(1, 50)
+    kind = rng.randrange(6)
+    if kind == 0:
+        return f"{pad}{v} = {w} {rng.choice(OPS)} {n}"
+    if kind == 1:
+        return f"{pad}for i in range({n}):\n{pad}    {v} {rng.choice(OPS)}= i + {w}"
+    if kind == 2:
+        return f"{pad}if {v} > {n}:\n{pad}    {w} = {v} {rng.choice(OPS)} {w}\n{pad}else:\n{pad}    {w} -= {n}"
+    if kind == 3:
+        return f"{pad}items.append({v} {rng.choice(OPS)} arr[{n} % len(arr)])"
+    if kind == 4:
+        return f"{pad}while {v} < {n}:\n{pad}    {v} += {rng.randint(1, 5)}"
+    return f"{pad}{v} = max({v}, min({w}, {n}))"
+
+
+def program(rng: random.Random) -> str:
+    names = rng.sample(NAMES, 5)
+    lines = [f"def {rng.choice(['solve', 'answer', 'run'])}(arr):", "    items = []"]
+    lines += [f"    {v} = {rng.randint(0, 9)}" for v in names]
+    lines += [statement(rng, names) for _ in range(rng.randint(10, 18))]
+    lines.append(f"    return items, {names[0]}")
+    return "\n".join(lines) + "\n"
+
+
+def disguise(code: str, rng: random.Random) -> str:
+    """A copy with renamed identifiers, different indentation and comments, maybe one extra line."""
+    renames = {name: f"{name[0]}{rng.randint(10, 99)}_{rng.choice('xyz')}" for name in NAMES + ["items", "arr", "i"]}
+    code = re.sub(r"\b(" + "|".join(renames) + r")\b", lambda m: renames[m.group(1)], code)
+    code = code.replace("def solve(", "def my_solution(").replace("    ", "  ")
+    lines = code.splitlines()
+    out = []
+    for line in lines:
+        out.append(line + ("  # " + rng.choice(["loop", "update", "edge case", "check"]) if rng.random() < 0.3 else ""))
+        if rng.random() < 0.1:
+            out.append("")
+    if rng.random() < 0.5:
+        out.insert(2, "  " + f"debug = {rng.randint(0, 9)}")
+    return "\n".join(out) + "\n"
+
+
+def cohort(n: int, rng: random.Random):
+    """(codes, planted pairs): about 5% of students are in copy rings of 2-4."""
+    codes, planted = [], set()
+    while len(codes) < n:
+        if rng.random() < 0.02 and n - len(codes) >= 4:
+            ring = rng.randint(2, 4)
+            original = program(rng)
+            start = len(codes)
+            codes.append(original)
+            codes.extend(disguise(original, rng) for _ in range(ring - 1))
+            planted.update(combinations(range(start, start + ring), 2))
+        else:
+            codes.append(program(rng))
+    return codes, planted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,4000,16000")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--max-ratio", type=float, default=2.0)
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    rng = random.Random(17)
+    per_submission = []
+    recalls = []
+    print(f"{'n':>7} {'sign s':>8} {'match s':>8} {'us/sub':>8} {'candidates':>11} {'all pairs':>13} "
+          f"{'planted':>8} {'recall':>7} {'extra':>6}")
+    for n in sizes:
+        codes, planted = cohort(n, rng)
+        start = time.perf_counter()
+        chunks = [(TASK, codes[i:i + plagiarism.SIGNATURE_CHUNK_SIZE])
+                  for i in range(0, n, plagiarism.SIGNATURE_CHUNK_SIZE)]
+        prepared = [p for chunk in plagiarism.prepare_many(chunks, args.workers) for p in chunk]
+        sign_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        entries = [(str(i), str(i), *p) for i, p in enumerate(prepared) if p is not None]
+        matches, candidates = plagiarism.find_matches(TASK["id"], entries)
+        match_s = time.perf_counter() - start
+
+        found = {tuple(sorted(int(u) for u in m["users"])) for m in matches}
+        recall = len(found & planted) / max(1, len(planted))
+        recalls.append(recall)
+        per_submission.append((sign_s + match_s) / n)
+        print(f"{n:>7} {sign_s:>8.2f} {match_s:>8.2f} {per_submission[-1] * 1e6:>8.0f} {candidates:>11} "
+              f"{n * (n - 1) // 2:>13} {len(planted):>8} {recall:>7.1%} {len(found - planted):>6}")
+
+    ratio = per_submission[-1] / per_submission[0]
+    print(f"largest/smallest per-submission cost: {ratio:.2f}")
+    if min(recalls) < args.min_recall:
+        print(f"FAIL: recall {min(recalls):.1%} below {args.min_recall:.0%}")
+        sys.exit(1)
+    if ratio > args.max_ratio:
+        print(f"FAIL: per-submission cost grew more than {args.max_ratio}x with cohort size")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Python code runs: warm forked workers vs. a fresh interpreter per run.
+
+Runs a few data-science submissions (pandas group-bys, a scikit-learn
+regression, plain Python) against the course datasets in
+`backend/content/datasets`:
+- cold: `--cold-runs` fresh `python` processes that import pandas and
+  scikit-learn, read the CSV and run the code, which is what a per-run sandbox
+  pays,
+- warm: `--runs` runs through `pyrunner.WarmPool` (p50/p99), after timing the
+  one-off template start.
+
+It also reports the memory of an idle warm worker and of a cold interpreter,
+from /proc/<pid>/smaps_rollup: RSS, and private memory (what the process adds
+on top of pages shared with the template).
+
+Exits non-zero if any run fails, if warm p50 isn't at least `--min-speedup`
+times faster than cold, or if a warm worker's private memory is more than
+`--max-private-ratio` of a cold interpreter's RSS.
+
+    python benchmarks/pyrunner_bench.py [--runs 200] [--cold-runs 5] [--workers 2]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND))
+
+import pyrunner  # noqa: E402
+
+DATASETS = BACKEND / "content" / "datasets"
+SUBMISSIONS = [
+    "df = load_dataset('sales')\n"
+    "print(df.groupby('region')['revenue'].sum().sort_values(ascending=False).head())\n",
+    "df = load_dataset('sales')\n"
+    "monthly = df.assign(month=df['order_date'].astype(str).str[:7]).pivot_table(\n"
+    "    index='month', columns='category', values='units', aggfunc='sum')\n"
+    "print(monthly.tail(3))\n",
+    "from sklearn.linear_model import LinearRegression\n"
+    "from sklearn.model_selection import train_test_split\n"
+    "df = load_dataset('housing')\n"
+    "X, y = df.drop(columns=['price']), df['price']\n"
+    "X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=0)\n"
+    "print(round(LinearRegression().fit(X_train, y_train).score(X_test, y_test), 3))\n",
+    "print(sum(i * i for i in range(10000)))\n",
+]
+# A cold run has no warm template: it imports and reads the CSVs itself
+COLD_PRELUDE = (
+    "import pandas, numpy\n"
+    "import sklearn.linear_model, sklearn.model_selection\n"
+    "_frames = {}\n"
+    "def load_dataset(name):\n"
+    "    if name not in _frames:\n"
+    f"        _frames[name] = pandas.read_csv({str(DATASETS)!r} + '/' + name + '.csv')\n"
+    "    return _frames[name]\n"
+)
+MEMORY_PROBE = "import time\nprint('ready', flush=True)\ntime.sleep(30)\n"
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def smaps(pid: int) -> dict:
+    """RSS and private (unshared) memory of a process, in MB."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {"rss": fields.get("Rss", 0.0),
+            "private": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--cold-runs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    parser.add_argument("--max-private-ratio", type=float, default=0.5)
+    args = parser.parse_args()
+
+    env = dict(os.environ, OMP_NUM_THREADS="1", OPENBLAS_NUM_THREADS="1", MKL_NUM_THREADS="1")
+    cold = []
+    for i in range(args.cold_runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", COLD_PRELUDE + SUBMISSIONS[i % len(SUBMISSIONS)]],
+                              env=env, capture_output=True, text=True)
+        cold.append((time.perf_counter() - started) * 1000)
+        if proc.returncode != 0:
+            print(f"FAIL: cold run failed:\n{proc.stderr}")
+            sys.exit(1)
+    print(f"cold: {args.cold_runs} fresh interpreters, p50={pct(cold, 50):.0f}ms max={max(cold):.0f}ms")
+
+    probe = subprocess.Popen([sys.executable, "-c", COLD_PRELUDE + "load_dataset('sales'); load_dataset('housing')\n"
+                              + MEMORY_PROBE], env=env, stdout=subprocess.PIPE, text=True)
+    probe.stdout.readline()
+    cold_mem = smaps(probe.pid)
+    probe.kill()
+    probe.wait()
+
+    pool = pyrunner.WarmPool(DATASETS, size=args.workers)
+    started = time.perf_counter()
+    pool.start()
+    start_ms = (time.perf_counter() - started) * 1000
+    try:
+        warm = []
+        for i in range(args.runs):
+            started = time.perf_counter()
+            result = pool.run(SUBMISSIONS[i % len(SUBMISSIONS)])
+            warm.append((time.perf_counter() - started) * 1000)
+            if not result["success"]:
+                print(f"FAIL: warm run failed: {result['error']}")
+                sys.exit(1)
+        print(f"warm: template started in {start_ms:.0f}ms (once), {args.runs} runs on {args.workers} workers, "
+              f"p50={pct(warm, 50):.1f}ms p99={pct(warm, 99):.1f}ms")
+
+        time.sleep(0.5)  # let the last replacements finish forking
+        workers = [smaps(w.process.pid) for w in list(pool._idle) if w.process.is_alive()]
+    finally:
+        pool.stop()
+
+    worker_mem = max(workers, key=lambda m: m["private"])
+    print(f"memory (MB): cold interpreter rss={cold_mem['rss']:.1f} private={cold_mem['private']:.1f}; "
+          f"idle warm worker rss={worker_mem['rss']:.1f} private={worker_mem['private']:.1f}")
+    speedup = pct(cold, 50) / pct(warm, 50)
+    print(f"speedup: {speedup:.0f}x at p50")
+
+    if speedup < args.min_speedup:
+        print(f"FAIL: warm runs less than {args.min_speedup}x faster than cold")
+        sys.exit(1)
+    if worker_mem["private"] > cold_mem["rss"] * args.max_private_ratio:
+        print(f"FAIL: a warm worker's private memory is over {args.max_private_ratio:.0%} of a cold interpreter")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Recommendation model build time and per-request scoring latency.
+
+Simulates `--users` students who work through tracks in order, biased towards
+the families their role cares about, builds the task-similarity model from
+their progress and then times online recommendations. Checks that completed
+tasks are never recommended and that each user's unfinished next-in-track task
+shows up.
+
+`--tasks` grows the catalog to that many tasks by cloning existing ones into
+their tracks, to check build and request cost at the catalog sizes content
+reloading and search are built for. The bench reports the recommender's
+per-worker array memory, which should grow with tasks x neighbours, not tasks
+squared.
+
+    python benchmarks/recommend_bench.py [--users 20000] [--rounds 500] [--tasks 10000]
+"""
+import argparse
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import content  # noqa: E402
+import recommend  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def simulate_user(catalog: content.Catalog, rng: random.Random) -> dict:
+    role = rng.choice(list(recommend.ROLE_FAMILIES))
+    progress = {}
+    for family, weight in recommend.ROLE_FAMILIES[role].items():
+        for track in catalog.tracks(family).values():
+            if rng.random() > weight:
+                continue
+            # Work through the track in order and stop somewhere (within the first 30, on grown catalogs)
+            for task in track["tasks"][:rng.randint(0, min(len(track["tasks"]), 30))]:
+                progress[task["id"]] = {"completed": True, "attempts": rng.randint(1, 3)}
+    return {"role": role, "progress": progress}
+
+
+def grow(catalog: content.Catalog, target: int) -> content.Catalog:
+    tracks = {f: {tid: {**t, "tasks": list(t["tasks"])} for tid, t in catalog.tracks(f).items()}
+              for f in content.TRACK_FAMILIES}
+    originals = [(f, tid, task) for f in tracks for tid, t in tracks[f].items() for task in t["tasks"]]
+    n = len(originals)
+    while n < target:
+        family, track_id, task = originals[n % len(originals)]
+        clone = copy.deepcopy(task)
+        clone["id"] = f"{task['id']}-x{n}"
+        tracks[family][track_id]["tasks"].append(clone)
+        n += 1
+    return content.Catalog(catalog.version, tracks, list(catalog.job_trends), dict(catalog.resume_templates),
+                           dict(catalog.skill_taxonomy))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=0, help="grow the catalog to this many tasks")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    catalog = content.load_catalog(BACKEND_DIR / "content")
+    if args.tasks:
+        catalog = grow(catalog, args.tasks)
+    users = [simulate_user(catalog, rng) for _ in range(args.users)]
+
+    start = time.perf_counter()
+    model = recommend.build_model((u["role"], u["progress"]) for u in users)
+    print(f"built model from {model.users} users x {len(model.task_ids)} tasks "
+          f"in {(time.perf_counter() - start) * 1000:.0f}ms ({len(str(model.to_document())) // 1024} KiB stored)")
+
+    recommender = recommend.Recommender()
+    recommender.model = model
+    failures = []
+    latencies = []
+    for i in range(args.rounds):
+        user = users[i % len(users)]
+        start = time.perf_counter()
+        recs = recommender.recommend(catalog, user, limit=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if any(user["progress"].get(r["id"], {}).get("completed") for r in recs):
+            failures.append(f"user {i}: recommended a completed task")
+    print(f"recommend p50={pct(latencies, 50):.3f}ms p99={pct(latencies, 99):.3f}ms")
+    arrays = [recommender._neighbors, recommender._similarities, *recommender._popularity.values()]
+    print(f"recommender arrays for {catalog.task_count} catalog tasks: {sum(a.nbytes for a in arrays) / 2**20:.1f} MiB")
+
+    sample = users[0]
+    print(f"example ({sample['role']}, {len(sample['progress'])} done):")
+    for rec in recommender.recommend(catalog, sample, limit=5):
+        print(f"  {rec['score']:.3f} {rec['title']:<40} {rec['reason']}")
+
+    if failures:
+        for failure in failures[:10]:
+            print(f"FAIL: {failure}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
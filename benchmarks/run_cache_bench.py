@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Code-run result cache: hit rate and latency on a simulated Run-button workload.
+
+`--students` students work through `--tasks` tasks (SQL tasks and
+pandas tasks on the course datasets), pressing Run `--presses` times each
+through `/api/code/run` on the stub app in-process. Most students first run
+the untouched starter code. After that, each press either reruns unchanged
+code (probability `--rerun`) or runs an edit of their own.
+
+The workload is replayed twice: with the result cache, then with it disabled.
+For each replay it reports wall time, hit rate, p50 latency of hits and
+misses, and the run time the cache reports as saved.
+
+Exits non-zero if a cached response differs from a fresh run of the same
+code, if the hit rate is below `--min-hit-rate`, or if the cached replay
+isn't at least `--min-speedup` times faster.
+
+    python benchmarks/run_cache_bench.py [--students 10] [--presses 10] [--rerun 0.5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+os.environ.setdefault("BENCH_MOCK_DB", "1")
+os.environ.setdefault("RATE_LIMIT_CODE_RUN_PER_MINUTE", "1000000")
+os.environ.setdefault("RATE_LIMIT_CODE_RUN_BURST", "1000000")
+# Python runs are off by default (demo mode); the bench needs real workers
+os.environ.setdefault("CODE_EXECUTION_WORKERS", "2")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import stub_app  # noqa: E402
+
+server = stub_app.server
+resultcache = server.resultcache
+
+SQL_EDITS = [
+    "SELECT department, COUNT(*) AS emp_count FROM employees GROUP BY department",
+    "SELECT department, AVG(salary) AS avg_salary FROM employees GROUP BY department",
+    "SELECT e.name, d.dept_name FROM employees e JOIN departments d ON e.dept_id = d.id",
+    "SELECT name, salary FROM employees ORDER BY salary DESC LIMIT {n}",
+    "SELECT name FROM employees WHERE salary > {n}000",
+]
+PY_STARTER = "df = load_dataset('sales')\nprint(df.head())\n"
+PY_EDITS = [
+    "df = load_dataset('sales')\nprint(df.groupby('region')['revenue'].sum())\n",
+    "df = load_dataset('sales')\nprint(df[df['units'] > {n}].shape)\n",
+    "df = load_dataset('housing')\nprint(df.describe().round(1))\n",
+    "df = load_dataset('housing')\nprint(df.corr()['price'].round(3))\n",
+    "df = load_dataset('housing')\nprint(df[df['sqft'] > {n}0]['price'].mean())\n",
+]
+TIMING_RE = re.compile(r"in [0-9.]+ ms")
+
+
+def workload(args, task_ids, rng: random.Random):
+    """[(student, task_id, code)] in press order."""
+    presses = []
+    for student in range(args.students):
+        for task_id in task_ids:
+            sql = task_id.startswith("sql-")
+            code = server.catalog().find_task(task_id)["starter_code"] if sql else PY_STARTER
+            for press in range(args.presses):
+                if press > 0 and rng.random() >= args.rerun:
+                    code = rng.choice(SQL_EDITS if sql else PY_EDITS).format(n=rng.randint(1, 200))
+                presses.append((student, task_id, code))
+    rng.shuffle(presses)
+    return presses
+
+
+def counter(name: str) -> dict:
+    values = {}
+    for line in server.metrics.REGISTRY.render().splitlines():
+        if line.startswith(name):
+            labels, value = line.rsplit(" ", 1)
+            values[labels] = float(value)
+    return values
+
+
+def replay(client, headers, presses):
+    latencies = {True: [], False: []}
+    responses = {}
+    start = time.perf_counter()
+    for student, task_id, code in presses:
+        started = time.perf_counter()
+        body = client.post("/api/code/run", json={"code": code, "task_id": task_id}, headers=headers[student]).json()
+        latencies[bool(body.pop("cached", False))].append((time.perf_counter() - started) * 1000)
+        # A cached response reports the original run's timing
+        body.pop("elapsed_ms", None)
+        body["output"] = TIMING_RE.sub("in _ ms", body["output"] or "")
+        if isinstance(body.get("result"), dict):
+            body["result"].pop("elapsed_ms", None)
+        responses.setdefault((task_id, resultcache.normalize(code)), body)
+    return time.perf_counter() - start, latencies, responses, len(latencies[True]) / len(presses)
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--tasks", type=int, default=4)
+    parser.add_argument("--presses", type=int, default=10)
+    parser.add_argument("--rerun", type=float, default=0.5)
+    parser.add_argument("--min-hit-rate", type=float, default=0.5)
+    parser.add_argument("--min-speedup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    task_ids = (["sql-001", "pyds-001", "sql-002", "pyds-002", "sql-003", "stats-001"] * args.tasks)[:args.tasks]
+    presses = workload(args, task_ids, random.Random(11))
+    with TestClient(stub_app.app) as client:
+        headers = {}
+        for student in range(args.students):
+            token = client.post("/api/auth/register", json={"email": f"s{student}@iitb.ac.in", "password": "pw123456",
+                                                            "name": f"S{student}"}).json()["token"]
+            headers[student] = {"Authorization": f"Bearer {token}"}
+
+        enabled = server.run_cache
+        results = {}
+        for label, run_cache in (("cached", enabled), ("uncached", resultcache.ResultCache(0, 0))):
+            server.run_cache = run_cache
+            before = counter("run_cache_saved_seconds_total").get("run_cache_saved_seconds_total", 0.0)
+            wall, latencies, responses, hit_rate = replay(client, headers, presses)
+            saved = counter("run_cache_saved_seconds_total").get("run_cache_saved_seconds_total", 0.0) - before
+            results[label] = (wall, responses, hit_rate)
+            print(f"{label:>9}: {len(presses)} runs in {wall:.2f}s, hit rate {hit_rate:.1%}, "
+                  f"p50 hit={pct(latencies[True], 50):.1f}ms miss={pct(latencies[False], 50):.1f}ms, "
+                  f"saved {saved:.2f}s of run time")
+        server.run_cache = enabled
+        print(f"lookups: {counter('run_cache_lookups_total')}")
+
+    (cached_wall, cached, hit_rate), (uncached_wall, fresh, _) = results["cached"], results["uncached"]
+    mismatched = [k for k in cached if cached[k] != fresh.get(k)]
+    if mismatched:
+        print(f"FAIL: {len(mismatched)} cached responses differ from fresh runs, e.g. {mismatched[0]}")
+        sys.exit(1)
+    if hit_rate < args.min_hit_rate:
+        print(f"FAIL: hit rate {hit_rate:.1%} below {args.min_hit_rate:.0%}")
+        sys.exit(1)
+    if uncached_wall / cached_wall < args.min_speedup:
+        print(f"FAIL: cached replay only {uncached_wall / cached_wall:.1f}x faster")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
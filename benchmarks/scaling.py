@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Multi-worker scaling benchmark for the catalog and auth routes.
+
+Runs the load generator from load_test.py against 1..N uvicorn workers with a
+catalog/auth-heavy mix and reports throughput, speedup and scaling efficiency
+per worker count. Needs a real mongod (MONGO_URL) because the in-memory
+stand-in is per process.
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/scaling.py --workers 1,2,4 --out bench/scaling.json
+"""
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import load_test
+
+SCALING_MIX = "login=1,browse=9"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--concurrency-per-worker", type=int, default=32,
+                        help="Virtual users per worker, so offered load grows with capacity")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--mix", default=SCALING_MIX)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--out", help="Write the JSON result here")
+    args = parser.parse_args()
+
+    if not os.environ.get("MONGO_URL"):
+        raise SystemExit("Set MONGO_URL to a running mongod; scaling runs can't use --mock-db")
+
+    runs = []
+    for workers in [int(w) for w in args.workers.split(",")]:
+        run_args = argparse.Namespace(
+            duration=args.duration, concurrency=args.concurrency_per_worker * workers, users=args.users,
+            workers=workers, mix=args.mix, seed=args.seed, mock_db=False, timeout=30.0,
+            llm_latency_ms=0.0, stt_latency_ms=0.0,
+        )
+        port = load_test.free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        proc = load_test.start_server(run_args, port)
+        try:
+            load_test.wait_until_ready(base_url, proc)
+            result = asyncio.run(load_test.run_load(base_url, run_args))
+        finally:
+            load_test.stop_server(proc)
+        runs.append({"workers": workers, "result": result})
+        print(f"workers={workers}: {result['totals']['throughput_rps']} req/s, {result['totals']['errors']} errors")
+
+    base_rps = runs[0]["result"]["totals"]["throughput_rps"] / runs[0]["workers"]
+    print(f"\n{'workers':>8} {'req/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for run in runs:
+        rps = run["result"]["totals"]["throughput_rps"]
+        run["speedup"] = round(rps / (base_rps * runs[0]["workers"]), 2) if base_rps else 0.0
+        run["efficiency"] = round(rps / (base_rps * run["workers"]), 2) if base_rps else 0.0
+        print(f"{run['workers']:>8} {rps:>10} {run['speedup']:>8} {run['efficiency']:>10.0%}")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps({"mix": args.mix, "runs": runs}, indent=2))
+        print(f"\nSaved results to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
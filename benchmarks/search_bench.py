@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Search index build, query and incremental-update timings on a large catalog.
+
+Grows the real catalog to `--tasks` tasks by cloning its tasks with shuffled
+wording, then reports:
+- full index build time,
+- per-query latency (p50/p99) for search and autocomplete,
+- time for an incremental update after editing a handful of tasks.
+
+Exits non-zero if search p99 is over `--budget-ms`.
+
+    python benchmarks/search_bench.py [--tasks 10000] [--budget-ms 1.0]
+"""
+import argparse
+import copy
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import content  # noqa: E402
+import search  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+QUERIES = ["sliding window", "GROUP BY", "binary search", "two pointers", "hash map", "linked list reverse",
+           "dynamic programming", "pandas merge", "train test split", "palindrome", "join tables", "recursion"]
+PREFIXES = ["s", "sl", "win", "gro", "pan", "rec", "bin", "dyn"]
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def grow(catalog: content.Catalog, target: int, rng: random.Random) -> content.Catalog:
+    tracks = {f: {tid: {**t, "tasks": list(t["tasks"])} for tid, t in catalog.tracks(f).items()}
+              for f in content.TRACK_FAMILIES}
+    originals = [(f, tid, task) for f in tracks for tid, t in tracks[f].items() for task in t["tasks"]]
+    vocabulary = sorted({w for _, _, task in originals for w in search.words(task["description"])})
+    n = len(originals)
+    while n < target:
+        family, track_id, task = rng.choice(originals)
+        clone = copy.deepcopy(task)
+        clone["id"] = f"{task['id']}-x{n}"
+        clone["title"] = f"{task['title']} {rng.choice(vocabulary)} {n}"
+        clone["description"] = task["description"] + " " + " ".join(rng.sample(vocabulary, 20))
+        tracks[family][track_id]["tasks"].append(clone)
+        n += 1
+    return content.Catalog(catalog.version, tracks, list(catalog.job_trends), dict(catalog.resume_templates),
+                           dict(catalog.skill_taxonomy))
+
+
+def edit(catalog: content.Catalog, count: int, rng: random.Random) -> content.Catalog:
+    tracks = {f: {tid: {**t, "tasks": list(t["tasks"])} for tid, t in catalog.tracks(f).items()}
+              for f in content.TRACK_FAMILIES}
+    all_tasks = [(f, tid, i) for f in tracks for tid, t in tracks[f].items() for i in range(len(t["tasks"]))]
+    for family, track_id, i in rng.sample(all_tasks, count):
+        task = tracks[family][track_id]["tasks"][i]
+        tracks[family][track_id]["tasks"][i] = {**task, "description": task["description"] + " edited sliding window"}
+    return content.Catalog(catalog.version + "-edit", tracks, list(catalog.job_trends), dict(catalog.resume_templates),
+                           dict(catalog.skill_taxonomy))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    catalog = grow(content.load_catalog(BACKEND_DIR / "content"), args.tasks, rng)
+
+    index = search.SearchIndex()
+    start = time.perf_counter()
+    index.update(catalog)
+    print(f"indexed {len(index)} tasks in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    search_ms = []
+    for _ in range(args.rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            search_ms.append((time.perf_counter() - start) * 1000)
+    print(f"search   p50={pct(search_ms, 50):.3f}ms p99={pct(search_ms, 99):.3f}ms")
+    for query in QUERIES[:3]:
+        top = index.search(query, limit=3)
+        print(f"  {query!r}: {[r['title'] for r in top]}")
+
+    suggest_ms = []
+    for _ in range(args.rounds):
+        for prefix in PREFIXES:
+            start = time.perf_counter()
+            index.suggest(prefix)
+            suggest_ms.append((time.perf_counter() - start) * 1000)
+    print(f"suggest  p50={pct(suggest_ms, 50):.3f}ms p99={pct(suggest_ms, 99):.3f}ms "
+          f"(e.g. 'sl' -> {[s['term'] for s in index.suggest('sl', limit=4)]})")
+
+    start = time.perf_counter()
+    reindexed, removed = index.update(edit(catalog, 10, rng))
+    print(f"incremental update: {reindexed} re-indexed, {removed} removed in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    if pct(search_ms, 99) > args.budget_ms:
+        print(f"FAIL: search p99 over {args.budget_ms}ms budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Batch skill-gap scoring throughput.
+
+Builds `--users` synthetic user documents (role, progress and stored
+`skill_levels`), loads them into a users x skills matrix the way a batch job
+reading Mongo would, and scores every user's trend gaps and gap-closing tasks
+with `SkillSpace.score_users`. Also checks the batch result matches the
+per-request `gaps()` path for a sample of users.
+
+    python benchmarks/skill_gap_bench.py [--users 10000]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import content  # noqa: E402
+import skillgap  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+ROLES = ["SDE", "Data Analyst", "Data Scientist", "ML Engineer", None]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    catalog = content.load_catalog(BACKEND_DIR / "content")
+    space = skillgap.space_for(catalog)
+    task_ids = list(space.task_index)
+
+    users = []
+    for _ in range(args.users):
+        progress = {tid: {"completed": True} for tid in rng.sample(task_ids, rng.randint(0, len(task_ids) // 2))}
+        users.append({"role": rng.choice(ROLES), "progress": progress, **space.levels_document(progress)})
+
+    start = time.perf_counter()
+    levels = np.zeros((len(users), len(space.skill_ids)), dtype=np.float32)
+    completed = np.zeros((len(users), len(space.tasks)), dtype=bool)
+    for u, user in enumerate(users):
+        for sid, value in user[skillgap.LEVELS_FIELD].items():
+            levels[u, space.skill_index[sid]] = value
+        completed[u] = space.completed_mask(user["progress"])
+    loaded = time.perf_counter()
+    result = space.score_users(levels, [u["role"] for u in users], completed)
+    scored = time.perf_counter()
+    print(f"{len(users)} users x {len(space.skill_ids)} skills x {len(space.tasks)} tasks: "
+          f"load {(loaded - start) * 1000:.0f}ms, score {(scored - loaded) * 1000:.0f}ms")
+
+    failures = 0
+    for u in rng.sample(range(len(users)), 50):
+        online = space.gaps(users[u], task_limit=5)
+        # Ties may come out in either order, so compare the gaps closed rather than task ids
+        online_gaps = [t["gap_closed"] for t in online["tasks"]]
+        batch_gaps = [round(float(g), 3) for g, i in zip(result["top_scores"][u], result["top_tasks"][u]) if i >= 0]
+        if not np.allclose(online_gaps, batch_gaps, atol=2e-3):
+            failures += 1
+            print(f"FAIL: user {u}: online {online_gaps} != batch {batch_gaps}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""SQL task execution: pooled dataset images vs. loading the dataset per query.
+
+Writes a synthetic HR dataset of `--employees` rows to a temporary datasets
+directory. Then it times:
+- building the image once, and opening a pooled connection from it,
+- `--queries` mixed student queries through `SqlEngine.run` from `--threads`
+  threads (p50/p99 and throughput),
+- the naive alternative: executing the dataset script into a fresh database
+  for each query (sampled),
+- how quickly a runaway query is stopped.
+
+Exits non-zero if a runaway query isn't stopped within twice the time limit,
+or if pooled p50 isn't at least `--min-speedup` times faster than per-query loading.
+
+    python benchmarks/sql_runner_bench.py [--employees 50000] [--queries 2000] [--threads 4]
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+import sqlrunner  # noqa: E402
+
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Research"]
+QUERIES = [
+    ("SELECT * FROM employees WHERE department = 'Engineering' LIMIT 100", None),
+    ("SELECT e.name, d.dept_name FROM employees e JOIN departments d ON e.dept_id = d.id WHERE e.dept_id = 3 LIMIT 200",
+     None),
+    ("SELECT department, COUNT(*), AVG(salary) FROM employees GROUP BY department HAVING AVG(salary) > 60000",
+     "SELECT department, COUNT(*) AS emp_count, AVG(salary) AS avg_salary FROM employees GROUP BY department "
+     "HAVING AVG(salary) > 60000"),
+    ("SELECT name, salary FROM employees ORDER BY salary DESC LIMIT 10", None),
+    ("SELECT COUNT(*) FROM employees WHERE manager_id IS NULL", None),
+]
+
+
+def dataset_script(n: int, rng: random.Random) -> str:
+    lines = [
+        "CREATE TABLE departments (id INTEGER PRIMARY KEY, dept_name TEXT NOT NULL, location TEXT NOT NULL, "
+        "budget INTEGER NOT NULL);",
+        "CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL, department TEXT, dept_id INTEGER, "
+        "salary INTEGER NOT NULL, hire_date TEXT NOT NULL, manager_id INTEGER);",
+        "CREATE INDEX idx_employees_dept_id ON employees(dept_id);",
+        "INSERT INTO departments VALUES " + ", ".join(
+            f"({i}, '{d}', 'City{i}', {rng.randint(5, 50) * 100000})" for i, d in enumerate(DEPARTMENTS, 1)) + ";",
+    ]
+    for start in range(1, n + 1, 500):
+        rows = []
+        for i in range(start, min(n + 1, start + 500)):
+            d = rng.randint(1, 5)
+            rows.append(f"({i}, 'Employee {i}', '{DEPARTMENTS[d - 1]}', {d}, {rng.randint(30, 150) * 1000}, "
+                        f"'20{rng.randint(10, 24)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}', "
+                        f"{'NULL' if i % 10 == 0 else rng.randint(1, 100)})")
+        lines.append("INSERT INTO employees VALUES " + ", ".join(rows) + ";")
+    return "\n".join(lines) + "\n"
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--naive-samples", type=int, default=10)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        script = dataset_script(args.employees, rng)
+        (Path(tmp) / "bench.sql").write_text(script)
+        engine = sqlrunner.SqlEngine(Path(tmp), pool_size=args.threads)
+
+        start = time.perf_counter()
+        pool = engine.pool("bench")
+        build_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        pool.release(pool.acquire())
+        connect_ms = (time.perf_counter() - start) * 1000
+        print(f"dataset: {args.employees} employees, image {len(pool.image) / 1e6:.1f} MB, "
+              f"built in {build_ms:.0f} ms, pooled connection opened in {connect_ms:.1f} ms")
+
+        def one(i):
+            query, reference = QUERIES[i % len(QUERIES)]
+            started = time.perf_counter()
+            result = engine.run({"dataset": "bench", "reference": reference}, query)
+            assert result["success"], result["error"]
+            return (time.perf_counter() - started) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            latencies = list(executor.map(one, range(args.queries)))
+        wall = time.perf_counter() - start
+        print(f"pooled:   {args.queries} queries on {args.threads} threads, p50={pct(latencies, 50):.2f}ms "
+              f"p99={pct(latencies, 99):.2f}ms, {args.queries / wall:.0f} queries/s")
+
+        naive = []
+        for i in range(args.naive_samples):
+            started = time.perf_counter()
+            conn = sqlite3.connect(":memory:")
+            conn.executescript(script)
+            conn.execute(QUERIES[i % len(QUERIES)][0]).fetchall()
+            conn.close()
+            naive.append((time.perf_counter() - started) * 1000)
+        print(f"per-query load: p50={pct(naive, 50):.1f}ms ({pct(naive, 50) / pct(latencies, 50):.0f}x slower)")
+
+        start = time.perf_counter()
+        runaway = engine.run({"dataset": "bench"},
+                             "SELECT COUNT(*) FROM employees a, employees b WHERE a.salary + b.salary = 1")
+        stopped_ms = (time.perf_counter() - start) * 1000
+        print(f"runaway cross join: stopped after {stopped_ms:.0f} ms ({runaway['error']})")
+
+    if runaway["success"] or stopped_ms > engine.time_limit * 2000:
+        print("FAIL: runaway query was not stopped in time")
+        sys.exit(1)
+    if pct(naive, 50) / pct(latencies, 50) < args.min_speedup:
+        print(f"FAIL: pooled queries less than {args.min_speedup}x faster than loading per query")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark entry point: the real FastAPI app with LLM/STT calls stubbed out.
+
+Run under uvicorn (the load generator does this for you):
+
+    uvicorn --app-dir benchmarks stub_app:app --port 8100
+
+Environment:
+    BENCH_LLM_LATENCY_MS   simulated chat completion latency (default 800)
+    BENCH_STT_LATENCY_MS   simulated transcription latency (default 400)
+    BENCH_MOCK_DB=1        use an in-memory mongomock-motor database instead of
+                           MONGO_URL (single worker only; needs mongomock-motor)
+"""
+import asyncio
+import os
+import sys
+import types
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+LLM_LATENCY = float(os.environ.get("BENCH_LLM_LATENCY_MS", "800")) / 1000
+STT_LATENCY = float(os.environ.get("BENCH_STT_LATENCY_MS", "400")) / 1000
+
+
+class UserMessage:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LlmChat:
+    def __init__(self, api_key: str, session_id: str, system_message: str):
+        self.session_id = session_id
+        self.system_message = system_message
+
+    def with_model(self, provider: str, model: str):
+        return self
+
+    async def send_message(self, message: UserMessage) -> str:
+        await asyncio.sleep(LLM_LATENCY)
+        return f"[stub reply to {len(message.text)} chars]"
+
+
+class OpenAISpeechToText:
+    def __init__(self, api_key: str):
+        pass
+
+    async def transcribe(self, file, model: str, response_format: str, language: str):
+        await asyncio.sleep(STT_LATENCY)
+        return types.SimpleNamespace(text="stub transcription")
+
+
+def _install_llm_stubs():
+    chat_mod = types.ModuleType("emergentintegrations.llm.chat")
+    chat_mod.LlmChat = LlmChat
+    chat_mod.UserMessage = UserMessage
+    openai_mod = types.ModuleType("emergentintegrations.llm.openai")
+    openai_mod.OpenAISpeechToText = OpenAISpeechToText
+    llm_pkg = types.ModuleType("emergentintegrations.llm")
+    llm_pkg.chat, llm_pkg.openai = chat_mod, openai_mod
+    root_pkg = types.ModuleType("emergentintegrations")
+    root_pkg.llm = llm_pkg
+    sys.modules.update({
+        "emergentintegrations": root_pkg,
+        "emergentintegrations.llm": llm_pkg,
+        "emergentintegrations.llm.chat": chat_mod,
+        "emergentintegrations.llm.openai": openai_mod,
+    })
+
+
+_install_llm_stubs()
+os.environ.setdefault("EMERGENT_LLM_KEY", "bench-stub-key")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "skillforge_bench")
+
+import server  # noqa: E402
+
+if os.environ.get("BENCH_MOCK_DB") == "1":
+    from mongomock_motor import AsyncMongoMockClient
+
+    server.db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+
+app = server.app
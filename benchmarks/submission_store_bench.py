@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Storage saved and read/write latency for content-addressed submission storage.
+
+Generates a synthetic corpus of `--submissions` code submissions over
+`--tasks` tasks, built from the catalog's starter code and worked solutions:
+untouched starter code, the common solutions with small whitespace/comment
+variations, and a tail of one-off code. Reports:
+- BSON bytes if every submission is stored inline (the old layout), inline
+  but compressed, and content-addressed (compressed unique blob documents
+  plus a 43-character hash per progress record),
+- store/release/load latency against a database for `--ops` submissions drawn
+  from the corpus (in-memory mongomock by default, or `--mongo-url`).
+
+Exits non-zero if content addressing saves less than `--min-saving` of the
+inline size.
+
+    python benchmarks/submission_store_bench.py [--submissions 1000000] [--ops 5000] [--mongo-url mongodb://...]
+"""
+import argparse
+import asyncio
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+import content  # noqa: E402
+import submissions  # noqa: E402
+
+CODE_BLOCK_RE = re.compile(r"```(?:python|sql)?\n(.*?)```", re.S)
+# BSON bytes per field: type byte + name + NUL, plus string length + NUL or binary length + subtype
+INLINE_FIELD_BYTES = 1 + len("code") + 1 + 4 + 1
+REF_FIELD_BYTES = 1 + len("code_hash") + 1 + 4 + 43 + 1
+BLOB_DOC_BYTES = 4 + 1 + (1 + 4 + 1 + 4 + 43 + 1) + (1 + 5 + 4) + (1 + 6 + 4 + 5) + (1 + 5 + 4 + 1) \
+    + (1 + 5 + 4) + (1 + 11 + 8)  # header, _id, refs, codec, data, size, created_at
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def task_sources(content_dir: Path, tasks: int, rng: random.Random):
+    """(starter, solutions) per task, cycling the catalog's tasks up to `tasks` with renamed entry points."""
+    catalog = content.load_catalog(content_dir)
+    base = []
+    for family in content.TRACK_FAMILIES:
+        for track in catalog.tracks(family).values():
+            for task in track["tasks"]:
+                starter = task.get("starter_code") or ""
+                block = CODE_BLOCK_RE.search(task.get("solution_explanation") or "")
+                tests = starter[starter.find("\n#"):] if "\n#" in starter else ""
+                solution = (block.group(1) if block else starter.replace("pass", "return None")) + tests
+                base.append((starter, solution))
+    sources = []
+    for t in range(tasks):
+        starter, solution = base[t % len(base)]
+        suffix = f"_{t // len(base)}" if t >= len(base) else ""
+        starter, solution = (re.sub(r"def (\w+)\(", rf"def \g<1>{suffix}(", c, count=1) for c in (starter, solution))
+        variants = [solution, solution.replace("    ", "\t"), solution.rstrip() + "\n",
+                    re.sub(r"  # .*", "", solution)]
+        sources.append((starter, variants[:rng.randint(2, len(variants))]))
+    return sources
+
+
+def corpus(n: int, sources, rng: random.Random):
+    for i in range(n):
+        starter, solutions = rng.choice(sources)
+        roll = rng.random()
+        if roll < 0.30:
+            yield starter  # "Run" on the untouched starter code
+        elif roll < 0.85:
+            yield rng.choice(solutions)
+        else:
+            # One-off: the student's own variable names and notes
+            yield f"# {rng.choice(['my attempt', 'v2', 'works?', 'todo: faster'])} #{i}\n" + rng.choice(solutions)
+
+
+def storage(n: int, sources, seed: int):
+    rng = random.Random(seed)
+    inline = inline_compressed = refs = 0
+    blobs = {}
+    start = time.perf_counter()
+    for code in corpus(n, sources, rng):
+        inline += len(code.encode()) + INLINE_FIELD_BYTES
+        key = submissions.digest(code)
+        refs += 1
+        if key not in blobs:
+            blobs[key] = len(submissions.encode(code)[1])
+        inline_compressed += blobs[key] + INLINE_FIELD_BYTES  # as a binary field; same code compresses the same
+    addressed = sum(blobs.values()) + len(blobs) * BLOB_DOC_BYTES + refs * REF_FIELD_BYTES
+    return inline, inline_compressed, addressed, len(blobs), time.perf_counter() - start
+
+
+async def latency(db, n_ops: int, sources, seed: int):
+    rng = random.Random(seed)
+    await submissions.ensure_indexes(db)
+    codes = list(corpus(n_ops, sources, rng))
+    held, store_ms, release_ms, load_ms = [], [], [], []
+    for code in codes:
+        start = time.perf_counter()
+        key = await submissions.store(db, code)
+        store_ms.append((time.perf_counter() - start) * 1000)
+        held.append(key)
+        if len(held) > n_ops // 2:  # a resubmission replaces an older record's blob
+            start = time.perf_counter()
+            await submissions.release(db, held.pop(rng.randrange(len(held))))
+            release_ms.append((time.perf_counter() - start) * 1000)
+    for key in rng.sample(held, min(len(held), 2000)):
+        submissions._decoded.pop(key, None)  # measure the database read, not the worker cache
+        start = time.perf_counter()
+        await submissions.load(db, key)
+        load_ms.append((time.perf_counter() - start) * 1000)
+    blobs = await db[submissions.BLOB_COLLECTION].count_documents({})
+    return store_ms, release_ms, load_ms, blobs, len(held)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--submissions", type=int, default=1_000_000)
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--content-dir", default=str(BACKEND_DIR / "content"))
+    parser.add_argument("--ops", type=int, default=5000)
+    parser.add_argument("--mongo-url")
+    parser.add_argument("--min-saving", type=float, default=0.3)
+    args = parser.parse_args()
+
+    codec = "zstd" if submissions.zstandard else "zlib"
+    sources = task_sources(Path(args.content_dir), args.tasks, random.Random(3))
+    inline, inline_compressed, addressed, unique, took = storage(args.submissions, sources, 5)
+    print(f"{args.submissions} submissions, {unique} distinct ({codec}, corpus pass {took:.1f}s)")
+    for label, size in (("inline", inline), (f"inline {codec}", inline_compressed), ("content-addressed", addressed)):
+        print(f"  {label:<18} {size / 1e6:9.1f} MB  ({size / inline:6.1%} of inline)")
+
+    if args.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(args.mongo_url)
+        db = client["submission_store_bench"]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        client, db = None, AsyncMongoMockClient()["submission_store_bench"]
+
+    async def run():
+        await db[submissions.BLOB_COLLECTION].drop()
+        try:
+            return await latency(db, args.ops, sources, 9)
+        finally:
+            await db[submissions.BLOB_COLLECTION].drop()
+
+    store_ms, release_ms, load_ms, blobs, held = asyncio.run(run())
+    if client:
+        client.close()
+    print(f"latency over {args.ops} ops ({'mongo' if args.mongo_url else 'mongomock'}), {blobs} blobs for {held} live refs:")
+    for label, values in (("store", store_ms), ("release", release_ms), ("load", load_ms)):
+        print(f"  {label:<8} p50={pct(values, 50):.3f}ms p99={pct(values, 99):.3f}ms")
+
+    saving = 1 - addressed / inline
+    if saving < args.min_saving:
+        print(f"FAIL: saved {saving:.0%}, expected at least {args.min_saving:.0%}")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
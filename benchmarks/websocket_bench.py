@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Multiplexed WebSocket: request latency, push latency and idle-socket cost.
+
+Boots `stub_app:app` under uvicorn (as load_test.py does) and measures:
+
+1. Requests: `--users` users each make `--requests` calls (profile, chat
+   history, a chat message BRO answers locally), once over HTTP with keep-alive and once
+   as `request` frames on one socket per user. Each HTTP call authenticates
+   again; the socket authenticated once when it opened.
+2. Push: a submission over HTTP, timed until its `progress` event reaches
+   the user's open socket. Without the socket, a client would have to poll
+   the profile to see the change.
+3. Idle scale: `--idle` sockets are opened and authenticated, then answer
+   heartbeats (every `--heartbeat` seconds) for `--hold` seconds. The bench
+   reports the server's RSS growth per socket and its CPU use while the
+   sockets sit idle, and checks that every socket is still open at the end.
+
+The server runs with per-message deflate off, as server.py recommends
+(`UVICORN_WS_PER_MESSAGE_DEFLATE=true` to compare). Deflate adds ~100KB of
+zlib state per socket.
+
+Exits non-zero if an idle socket drops, or if RSS per idle socket exceeds
+`--max-kb-per-socket`.
+
+    python benchmarks/websocket_bench.py [--idle 10000] [--hold 60] [--heartbeat 25] [--mock-db]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import websockets
+
+import load_test
+
+
+
+def rss_kb(pid: int) -> int:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def cpu_seconds(pid: int) -> float:
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime and stime, fields 14 and 15 of stat(5)
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))] if values else 0.0
+
+
+class Socket:
+    """A client connection that answers heartbeats and routes responses and events."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.waiting = {}
+        self.events = asyncio.Queue()
+        self.next_id = 0
+        self.reader = asyncio.create_task(self._read())
+
+    @classmethod
+    async def open(cls, url: str, token: str) -> "Socket":
+        ws = await websockets.connect(url, ping_interval=None, max_queue=4, open_timeout=60)
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        ready = json.loads(await ws.recv())
+        if ready.get("type") != "ready":
+            raise RuntimeError(f"unexpected first frame {ready}")
+        return cls(ws)
+
+    async def _read(self):
+        try:
+            async for text in self.ws:
+                frame = json.loads(text)
+                if frame["type"] == "ping":
+                    await self.ws.send('{"type": "pong"}')
+                elif frame["type"] == "response":
+                    self.waiting.pop(frame["id"]).set_result(frame)
+                elif frame["type"] == "event":
+                    self.events.put_nowait((time.perf_counter(), frame))
+        except websockets.ConnectionClosed:
+            pass
+
+    async def request(self, op: str, data: dict) -> dict:
+        self.next_id += 1
+        future = self.waiting[self.next_id] = asyncio.get_running_loop().create_future()
+        await self.ws.send(json.dumps({"type": "request", "id": self.next_id, "op": op, "data": data}))
+        return await future
+
+    @property
+    def open_(self) -> bool:
+        return self.ws.state == websockets.protocol.State.OPEN
+
+    async def close(self):
+        await self.ws.close()
+        self.reader.cancel()
+
+
+OPS = [
+    ("profile", {}, "GET", "/api/users/profile", None),
+    ("history", {}, "GET", "/api/bro/history", None),
+    ("chat", {"message": "thanks bro"}, "POST", "/api/bro/chat", {"message": "thanks bro"}),
+]
+
+
+async def bench_requests(base_url, ws_url, accounts, requests):
+    async def over_http(client, account):
+        latencies = []
+        for i in range(requests):
+            _, _, method, path, body = OPS[i % len(OPS)]
+            started = time.perf_counter()
+            r = await client.request(method, path, json=body, headers=account["headers"])
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    async def over_socket(socket):
+        latencies = []
+        for i in range(requests):
+            op, data, *_ = OPS[i % len(OPS)]
+            started = time.perf_counter()
+            frame = await socket.request(op, data)
+            assert frame["status"] == 200, frame
+            latencies.append((time.perf_counter() - started) * 1000)
+        return latencies
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        started = time.perf_counter()
+        http = sum(await asyncio.gather(*(over_http(client, a) for a in accounts)), [])
+        http_wall = time.perf_counter() - started
+    sockets = [await Socket.open(ws_url, a["token"]) for a in accounts]
+    started = time.perf_counter()
+    ws = sum(await asyncio.gather(*(over_socket(s) for s in sockets)), [])
+    ws_wall = time.perf_counter() - started
+    for label, latencies, wall in (("http", http, http_wall), ("socket", ws, ws_wall)):
+        print(f"  {label:>6}: {len(latencies)} requests, {len(latencies) / wall:.0f} req/s, "
+              f"p50={pct(latencies, 50):.1f}ms p99={pct(latencies, 99):.1f}ms")
+    return sockets
+
+
+async def bench_push(base_url, account, socket):
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        started = time.perf_counter()
+        r = await client.post("/api/tasks/arr-001/submit", json={"task_id": "arr-001", "code": "def f():\n    pass\n"},
+                              headers=account["headers"])
+        r.raise_for_status()
+        responded = time.perf_counter()
+        received, frame = await asyncio.wait_for(socket.events.get(), 10)
+    print(f"  submission answered in {(responded - started) * 1000:.1f}ms, progress event after "
+          f"{(received - started) * 1000:.1f}ms (points={frame['data']['points']})")
+
+
+async def bench_idle(ws_url, pid, tokens, count, hold, heartbeat, concurrency):
+    before = rss_kb(pid)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def open_one(i):
+        async with sem:
+            return await Socket.open(ws_url, tokens[i % len(tokens)])
+
+    started = time.perf_counter()
+    sockets = await asyncio.gather(*(open_one(i) for i in range(count)))
+    opened = time.perf_counter() - started
+    after = rss_kb(pid)
+    per_socket = (after - before) / count
+    print(f"  {count} sockets authenticated in {opened:.1f}s; server RSS {before / 1024:.0f}MB -> "
+          f"{after / 1024:.0f}MB, {per_socket:.1f}KB per socket")
+    cpu = cpu_seconds(pid)
+    await asyncio.sleep(hold)
+    cpu = cpu_seconds(pid) - cpu
+    alive = sum(1 for s in sockets if s.open_)
+    print(f"  after {hold}s ({hold // heartbeat} heartbeats): {alive}/{count} open, "
+          f"server RSS {rss_kb(pid) / 1024:.0f}MB, server CPU {cpu / hold:.1%}")
+    async with httpx.AsyncClient() as client:
+        metrics = (await client.get(ws_url.replace("ws", "http", 1).replace("/api/ws", "/metrics"))).text
+    closes = [line for line in metrics.splitlines() if line.startswith("websocket_disconnects_total")]
+    if closes:
+        print(f"  server closes: {', '.join(closes)}")
+    await asyncio.gather(*(s.close() for s in sockets))
+    return alive, per_socket
+
+
+async def run(args, base_url, pid):
+    ws_url = base_url.replace("http", "ws", 1) + "/api/ws"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        accounts = await load_test.register_accounts(client, args.users, concurrency=4)
+    for account in accounts:
+        account["token"] = account["headers"]["Authorization"].split(" ", 1)[1]
+
+    print("requests:")
+    sockets = await bench_requests(base_url, ws_url, accounts, args.requests)
+    print("push:")
+    await bench_push(base_url, accounts[0], sockets[0])
+    await asyncio.gather(*(s.close() for s in sockets))
+    print("idle:")
+    return await bench_idle(ws_url, pid, [a["token"] for a in accounts], args.idle, args.hold, args.heartbeat,
+                            args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--idle", type=int, default=10000)
+    parser.add_argument("--hold", type=int, default=60, help="seconds; over two heartbeats tests the timeout")
+    parser.add_argument("--heartbeat", type=int, default=25)
+    parser.add_argument("--concurrency", type=int, default=200, help="sockets opening at once")
+    parser.add_argument("--max-kb-per-socket", type=float, default=64)
+    parser.add_argument("--mock-db", action="store_true", help="in-memory database instead of MONGO_URL")
+    args = parser.parse_args()
+
+    os.environ["WS_MAX_CONNECTIONS"] = str(args.idle + args.users)
+    os.environ["WS_MAX_CONNECTIONS_PER_USER"] = str(args.idle)
+    os.environ["WS_HEARTBEAT_SECONDS"] = str(args.heartbeat)
+    os.environ.setdefault("RATE_LIMIT_LLM_CHAT_PER_MINUTE", "1000000")
+    os.environ.setdefault("RATE_LIMIT_LLM_CHAT_BURST", "1000000")
+    os.environ.setdefault("CODE_EXECUTION_WORKERS", "0")
+    os.environ.setdefault("UVICORN_WS_PER_MESSAGE_DEFLATE", "false")
+    port = load_test.free_port()
+    server_args = SimpleNamespace(llm_latency_ms=200, stt_latency_ms=400, mock_db=args.mock_db, workers=1)
+    proc = load_test.start_server(server_args, port)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        load_test.wait_until_ready(base_url, proc)
+        alive, per_socket = asyncio.run(run(args, base_url, proc.pid))
+    finally:
+        load_test.stop_server(proc)
+
+    if alive < args.idle:
+        print(f"FAIL: {args.idle - alive} idle sockets dropped")
+        sys.exit(1)
+    if per_socket > args.max_kb_per_socket:
+        print(f"FAIL: {per_socket:.1f}KB per idle socket, above {args.max_kb_per_socket:.0f}KB")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
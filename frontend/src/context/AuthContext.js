@@ -1,5 +1,6 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import axios from 'axios';
+import { ApiSocket, socketOrHttp } from '@/lib/socket';
 
 const AuthContext = createContext(null);
 
@@ -9,41 +10,133 @@ export const AuthProvider = ({ children }) => {
   const [user, setUser] = useState(null);
   const [token, setToken] = useState(localStorage.getItem('token'));
   const [loading, setLoading] = useState(true);
+  const [socket, setSocket] = useState(null);
+  const refreshing = useRef(null);
+  const refreshRef = useRef(null);
+  const signedIn = Boolean(token);
 
+  const storeTokens = (accessToken, refreshToken) => {
+    localStorage.setItem('token', accessToken);
+    if (refreshToken) localStorage.setItem('refresh_token', refreshToken);
+    setToken(accessToken);
+  };
+
+  const clearTokens = () => {
+    localStorage.removeItem('token');
+    localStorage.removeItem('refresh_token');
+    setToken(null);
+    setUser(null);
+  };
+
+  // Access tokens are short-lived: renew once on 401 and retry, and pick up
+  // tokens the server reissues after role/progress changes.
+  useEffect(() => {
+    const refreshAccessToken = async () => {
+      const refreshToken = localStorage.getItem('refresh_token');
+      if (!refreshToken) throw new Error('No refresh token');
+      try {
+        const response = await axios.post(`${API}/auth/refresh`, { refresh_token: refreshToken });
+        storeTokens(response.data.token, response.data.refresh_token);
+        return response.data.token;
+      } catch (error) {
+        // Another tab may have rotated the refresh token first
+        const latest = localStorage.getItem('refresh_token');
+        if (latest && latest !== refreshToken) return localStorage.getItem('token');
+        throw error;
+      }
+    };
+
+    // The socket renews its token the same way when the server closes it for an expired one
+    refreshRef.current = () => {
+      refreshing.current = refreshing.current || refreshAccessToken()
+        .catch((error) => {
+          clearTokens();
+          throw error;
+        })
+        .finally(() => { refreshing.current = null; });
+      return refreshing.current;
+    };
+
+    const responseInterceptor = axios.interceptors.response.use(
+      (response) => {
+        const reissued = response.headers['x-access-token'];
+        if (reissued) storeTokens(reissued);
+        return response;
+      },
+      async (error) => {
+        const original = error.config;
+        if (error.response?.status !== 401 || !original || original._retried || original.url.includes('/auth/')) {
+          throw error;
+        }
+        original._retried = true;
+        try {
+          refreshing.current = refreshing.current || refreshAccessToken();
+          const newToken = await refreshing.current;
+          original.headers = { ...original.headers, Authorization: `Bearer ${newToken}` };
+          return axios(original);
+        } catch (refreshError) {
+          clearTokens();
+          throw error;
+        } finally {
+          refreshing.current = null;
+        }
+      }
+    );
+    return () => axios.interceptors.response.eject(responseInterceptor);
+  }, []);
+
+  // One socket per sign-in; it authenticates with whatever token is current when it (re)connects
+  useEffect(() => {
+    if (!signedIn) return;
+    const apiSocket = new ApiSocket(() => localStorage.getItem('token'), () => refreshRef.current());
+    // Points, level and streak changes pushed from any worker, instead of refetching the profile
+    apiSocket.subscribe('progress', (data) => setUser(prev => prev && { ...prev, ...data }));
+    setSocket(apiSocket);
+    return () => {
+      apiSocket.close();
+      setSocket(null);
+    };
+  }, [signedIn]);
+
+  // Renewed and reissued tokens extend the socket's authentication without reconnecting
+  useEffect(() => {
+    if (socket && token) socket.reauth(token);
+  }, [socket, token]);
+
+  // Load the profile once for a session restored from storage. Sign-in responses carry the
+  // profile already, and renewed or reissued tokens only replace the token.
   useEffect(() => {
     const initAuth = async () => {
-      if (token) {
+      const storedToken = localStorage.getItem('token');
+      if (storedToken) {
         try {
           const response = await axios.get(`${API}/users/profile`, {
-            headers: { Authorization: `Bearer ${token}` }
+            headers: { Authorization: `Bearer ${storedToken}` }
           });
           setUser(response.data);
         } catch (error) {
           console.error('Auth init error:', error);
-          localStorage.removeItem('token');
-          setToken(null);
-          setUser(null);
+          // Only a rejected session signs out; a network blip or 5xx keeps the tokens for next load
+          if (error.response?.status === 401) clearTokens();
         }
       }
       setLoading(false);
     };
     initAuth();
-  }, [token]);
+  }, []);
 
   const login = async (email, password) => {
     const response = await axios.post(`${API}/auth/login`, { email, password });
-    const { token: newToken, user: userData } = response.data;
-    localStorage.setItem('token', newToken);
-    setToken(newToken);
+    const { token: newToken, refresh_token: refreshToken, user: userData } = response.data;
+    storeTokens(newToken, refreshToken);
     setUser(userData);
     return userData;
   };
 
   const register = async (name, email, password) => {
     const response = await axios.post(`${API}/auth/register`, { name, email, password });
-    const { token: newToken, user: userData } = response.data;
-    localStorage.setItem('token', newToken);
-    setToken(newToken);
+    const { token: newToken, refresh_token: refreshToken, user: userData } = response.data;
+    storeTokens(newToken, refreshToken);
     setUser(userData);
     return userData;
   };
@@ -56,11 +149,23 @@ export const AuthProvider = ({ children }) => {
   };
 
   const logout = () => {
-    localStorage.removeItem('token');
-    setToken(null);
-    setUser(null);
+    const refreshToken = localStorage.getItem('refresh_token');
+    if (refreshToken) {
+      axios.post(`${API}/auth/logout`, { refresh_token: refreshToken }).catch(() => {});
+    }
+    clearTokens();
   };
 
+  // An API call over the socket, or over HTTP via `httpFallback` while it's down
+  const request = async (op, data, httpFallback) => {
+    const result = await socketOrHttp(socket, op, data, async () => (await httpFallback()).data);
+    if (result?.access_token) storeTokens(result.access_token);
+    return result;
+  };
+
+  // Whether progress changes are being pushed; without the socket, callers refetch the profile
+  const isLive = () => Boolean(socket?.ready);
+
   const refreshProfile = async () => {
     if (token) {
       const response = await axios.get(`${API}/users/profile`, {
@@ -79,7 +184,9 @@ export const AuthProvider = ({ children }) => {
       register, 
       updateRole, 
       logout,
-      refreshProfile 
+      refreshProfile,
+      request,
+      isLive 
     }}>
       {children}
     </AuthContext.Provider>
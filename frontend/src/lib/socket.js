@@ -0,0 +1,111 @@
+// One authenticated WebSocket to /api/ws for chat, code runs, submissions and
+// pushed updates (see backend/realtime.py). Callers fall back to HTTP while it
+// is down: request() rejects with status 0 when the socket isn't ready. A request
+// already sent that loses its connection rejects with 503 instead, since it may
+// have run; retrying it over HTTP could e.g. submit twice.
+//
+// The server keeps the socket only while its access token is valid: send the
+// renewed token with reauth(), and after a 1008 close (expired or rejected
+// token) the socket refreshes it before reconnecting.
+
+const WS_URL = `${(process.env.REACT_APP_BACKEND_URL || window.location.origin).replace(/^http/, 'ws')}/api/ws`;
+const REQUEST_TIMEOUT_MS = 60000;
+const MAX_BACKOFF_MS = 30000;
+const POLICY_VIOLATION = 1008;
+
+export class ApiSocket {
+  constructor(getToken, refreshToken) {
+    this.getToken = getToken;
+    this.refreshToken = refreshToken;
+    this.ws = null;
+    this.ready = false;
+    this.closed = false;
+    this.nextId = 1;
+    this.pending = new Map();
+    this.listeners = new Map();
+    this.backoff = 1000;
+    this.connect();
+  }
+
+  connect() {
+    const token = this.getToken();
+    if (this.closed || !token) return;
+    const ws = new WebSocket(WS_URL);
+    this.ws = ws;
+    ws.onopen = () => ws.send(JSON.stringify({ type: 'auth', token }));
+    ws.onmessage = (e) => this.onFrame(JSON.parse(e.data));
+    ws.onclose = (e) => {
+      this.ready = false;
+      this.pending.forEach(({ reject, timer }) => {
+        clearTimeout(timer);
+        reject({ status: 503, error: 'Connection lost' });
+      });
+      this.pending.clear();
+      if (!this.closed) {
+        const reconnect = e.code === POLICY_VIOLATION
+          ? () => this.refreshToken().then(() => this.connect(), () => {})
+          : () => this.connect();
+        setTimeout(reconnect, this.backoff);
+        this.backoff = Math.min(this.backoff * 2, MAX_BACKOFF_MS);
+      }
+    };
+  }
+
+  reauth(token) {
+    if (this.ready && token) this.ws.send(JSON.stringify({ type: 'auth', token }));
+  }
+
+  onFrame(frame) {
+    if (frame.type === 'ready') {
+      this.ready = true;
+      this.backoff = 1000;
+    } else if (frame.type === 'ping') {
+      this.ws.send(JSON.stringify({ type: 'pong' }));
+    } else if (frame.type === 'response') {
+      const entry = this.pending.get(frame.id);
+      if (!entry) return;
+      this.pending.delete(frame.id);
+      clearTimeout(entry.timer);
+      if (frame.status < 400) entry.resolve(frame.data);
+      else entry.reject({ status: frame.status, error: frame.error });
+    } else if (frame.type === 'event') {
+      (this.listeners.get(frame.channel) || []).forEach(fn => fn(frame.data));
+    }
+  }
+
+  request(op, data) {
+    if (!this.ready) return Promise.reject({ status: 0, error: 'Not connected' });
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject({ status: 503, error: 'Timed out' });
+      }, REQUEST_TIMEOUT_MS);
+      this.pending.set(id, { resolve, reject, timer });
+      this.ws.send(JSON.stringify({ type: 'request', id, op, data }));
+    });
+  }
+
+  subscribe(channel, fn) {
+    const fns = this.listeners.get(channel) || [];
+    this.listeners.set(channel, [...fns, fn]);
+    return () => this.listeners.set(channel, (this.listeners.get(channel) || []).filter(f => f !== fn));
+  }
+
+  close() {
+    this.closed = true;
+    if (this.ws) this.ws.close();
+  }
+}
+
+// `op` over the socket, or `httpFallback()` (an axios call resolving to the same data) when it's down
+export const socketOrHttp = async (socket, op, data, httpFallback) => {
+  if (socket) {
+    try {
+      return await socket.request(op, data);
+    } catch (error) {
+      if (error.status !== 0) throw error;
+    }
+  }
+  return httpFallback();
+};
@@ -12,6 +12,14 @@ import { ArrowLeft, Play, Send, Lightbulb, CheckCircle2, MessageSquare, Code2, B
 
 const API = `${process.env.REACT_APP_BACKEND_URL}/api`;
 
+// Static complexity review from the backend, as lines for the output pane
+const formatAnalysis = (analysis) => {
+  if (!analysis || !analysis.big_o) return '';
+  const lines = [`\n\nEstimated time complexity: ${analysis.big_o}` + (analysis.target ? ` (target ${analysis.target})` : '')];
+  analysis.warnings.forEach(w => lines.push(`⚠ ${w.line ? `Line ${w.line}: ` : ''}${w.message}`));
+  return lines.join('\n');
+};
+
 const difficultyColors = {
   'Easy': 'bg-emerald-100 text-emerald-700',
   'Medium': 'bg-amber-100 text-amber-700',
@@ -21,7 +29,7 @@ const difficultyColors = {
 export default function TaskPage() {
   const { trackId, taskId } = useParams();
   const navigate = useNavigate();
-  const { token, refreshProfile } = useAuth();
+  const { token, request, isLive, refreshProfile } = useAuth();
   
   const [task, setTask] = useState(null);
   const [loading, setLoading] = useState(true);
@@ -48,6 +56,13 @@ export default function TaskPage() {
         });
         setTask(response.data);
         setCode(response.data.starter_code || '');
+        setCurrentHint(response.data.hint_level || 0);
+        if (response.data.attempts > 0) {
+          // Pick up where the student left off
+          axios.get(`${API}/tasks/${taskId}/submission`, {
+            headers: { Authorization: `Bearer ${token}` }
+          }).then(res => setCode(res.data.code)).catch(() => {});
+        }
         
         setChatMessages([{
           role: 'bro',
@@ -71,11 +86,11 @@ export default function TaskPage() {
     setIsRunning(true);
     setOutput('');
     try {
-      const response = await axios.post(`${API}/code/run`, 
+      const result = await request('run', { code, task_id: taskId }, () => axios.post(`${API}/code/run`,
         { code, task_id: taskId },
         { headers: { Authorization: `Bearer ${token}` }}
-      );
-      setOutput(response.data.output || response.data.error || 'No output');
+      ));
+      setOutput((result.output || result.error || 'No output') + formatAnalysis(result.analysis));
     } catch (error) {
       setOutput('Error running code.');
     } finally {
@@ -86,24 +101,32 @@ export default function TaskPage() {
   const handleSubmit = async () => {
     setIsSubmitting(true);
     try {
-      const response = await axios.post(`${API}/tasks/${taskId}/submit`,
+      const result = await request('submit', { task_id: taskId, code }, () => axios.post(`${API}/tasks/${taskId}/submit`,
         { task_id: taskId, code },
         { headers: { Authorization: `Bearer ${token}` }}
-      );
+      ));
       
-      // Update streak
-      await axios.post(`${API}/users/streak`, 
+      // Update streak; the new points and streak arrive as a `progress` event on the socket
+      await request('streak', { activity_type: 'dsa' }, () => axios.post(`${API}/users/streak`, 
         { activity_type: 'dsa' },
         { headers: { Authorization: `Bearer ${token}` }}
-      );
+      ));
       
-      if (response.data.points_earned > 0) {
-        toast.success(`🎉 +${response.data.points_earned} points!`);
-        await refreshProfile();
+      const warnings = result.analysis?.warnings || [];
+      if (warnings.length > 0) {
+        toast.warning(warnings[warnings.length - 1].message);
+      }
+      if (result.points_earned > 0) {
+        toast.success(`🎉 +${result.points_earned} points!`);
+        if (!isLive()) await refreshProfile();
       } else {
         toast.success('Submission recorded!');
       }
       setTask(prev => ({ ...prev, completed: true }));
+      // Submitting can unlock the solution; reload the detail so the solution tab picks it up
+      axios.get(`${API}/skills/dsa/${trackId}/${taskId}`, {
+        headers: { Authorization: `Bearer ${token}` }
+      }).then(res => setTask(res.data)).catch(() => {});
     } catch (error) {
       toast.error('Submission failed.');
     } finally {
@@ -121,11 +144,12 @@ export default function TaskPage() {
     setIsChatLoading(true);
 
     try {
-      const response = await axios.post(`${API}/bro/chat`,
-        { message: userMessage, context: `Task: ${task?.title}` },
+      const message = { message: userMessage, context: `Task: ${task?.title}`, task_id: taskId };
+      const reply = await request('chat', message, () => axios.post(`${API}/bro/chat`, message,
         { headers: { Authorization: `Bearer ${token}` }}
-      );
-      setChatMessages(prev => [...prev, { role: 'bro', content: response.data.response }]);
+      ));
+      setChatMessages(prev => [...prev, { role: 'bro', content: reply.response }]);
+      if (reply.hint_level) setCurrentHint(reply.hint_level);
     } catch (error) {
       setChatMessages(prev => [...prev, { role: 'bro', content: "Connection issues. Try again!" }]);
     } finally {
@@ -192,12 +216,19 @@ export default function TaskPage() {
     }
   };
 
-  const showNextHint = () => {
-    if (task?.hints && currentHint < task.hints.length) {
-      toast.info(`Hint ${currentHint + 1}: ${task.hints[currentHint]}`);
-      setCurrentHint(prev => prev + 1);
-    } else {
-      toast.info("No more hints. Ask BRO!");
+  const showNextHint = async () => {
+    try {
+      const result = await request('hint', { task_id: taskId }, () => axios.post(`${API}/tasks/${taskId}/hints/next`, {}, {
+        headers: { Authorization: `Bearer ${token}` }
+      }));
+      setCurrentHint(result.level);
+      if (result.hint) {
+        toast.info(`Hint ${result.level}: ${result.hint}`);
+      } else {
+        toast.info("No more hints. Ask BRO!");
+      }
+    } catch (error) {
+      toast.error('Failed to load hint');
     }
   };
 
@@ -254,7 +285,11 @@ export default function TaskPage() {
             <TabsContent value="solution" className="flex-1 overflow-auto m-0 p-0">
               <ScrollArea className="h-full">
                 <div className="p-6">
-                  {showSolution ? (
+                  {task.solution_locked ? (
+                    <div className="text-center py-8">
+                      <p className="text-slate-500">Solve this task to unlock the solution.</p>
+                    </div>
+                  ) : showSolution ? (
                     <div className="whitespace-pre-wrap text-slate-700 text-xs font-mono bg-slate-50 p-4 rounded-lg">
                       {task.solution_explanation}
                     </div>
@@ -0,0 +1,6 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level modules (`import metrics`), as they do when
+# the server is started from the backend directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
@@ -0,0 +1,85 @@
+import pytest
+
+import complexity
+
+LINEAR = """
+def total(nums):
+    t = 0
+    for x in nums:
+        t += x
+    return t
+"""
+
+NESTED = """
+def has_zero_pair(nums):
+    for a in nums:
+        for b in nums:
+            if a + b == 0:
+                return True
+    return False
+"""
+
+BINARY_SEARCH = """
+def lower_bound(nums, target):
+    lo, hi = 0, len(nums)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if nums[mid] < target:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+"""
+
+FIB = """
+def fib(n):
+    if n < 2:
+        return n
+    return fib(n - 1) + fib(n - 2)
+"""
+
+MEMO_FIB = "from functools import lru_cache\n\n@lru_cache(None)" + FIB
+
+LIST_MEMBERSHIP = """
+def common(nums, other):
+    out = []
+    for x in nums:
+        if x in other:
+            out.append(x)
+    return out
+"""
+
+
+@pytest.mark.parametrize("code, big_o, warnings", [
+    (LINEAR, "O(n)", []),
+    (NESTED, "O(n^2)", ["nested_loops_same_input"]),
+    ("def smallest(nums):\n    return sorted(nums)[0]\n", "O(n log n)", []),
+    (BINARY_SEARCH, "O(log n)", []),
+    (FIB, "O(2^n)", ["recursion_without_memo"]),
+    (MEMO_FIB, "O(n)", []),
+    (LIST_MEMBERSHIP, "O(n^2)", ["list_membership"]),
+])
+def test_estimates(code, big_o, warnings):
+    result = complexity.analyze(code)
+    assert result["error"] is None
+    assert result["big_o"] == big_o
+    assert [w["kind"] for w in result["warnings"]] == warnings
+
+
+def test_syntax_errors_are_reported_not_raised():
+    result = complexity.analyze("def f(:\n")
+    assert result["big_o"] is None
+    assert result["error"].startswith("SyntaxError")
+
+
+def test_parse_and_format_round_trip():
+    for text in ("O(1)", "O(log n)", "O(n)", "O(n log n)", "O(n^2)", "O(2^n)"):
+        assert complexity.format_cost(complexity.parse_cost(text)) == text
+    assert complexity.parse_cost("fast") is None
+
+
+def test_review_warns_above_the_task_target():
+    review = complexity.review(NESTED, {"complexity": "O(n)"})
+    assert review["target"] == "O(n)"
+    assert review["warnings"][-1]["kind"] == "above_target"
+    assert not any(w["kind"] == "above_target" for w in complexity.review(LINEAR, {"complexity": "O(n)"})["warnings"])
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import emailpolicy
+from emailpolicy import DomainPolicy, PolicyStore, normalize_rule
+
+
+def _rules(*pairs):
+    return [{"id": f"r{i}", "kind": kind, "value": value} for i, (kind, value) in enumerate(pairs)]
+
+
+def test_domains_and_suffixes():
+    policy = DomainPolicy(_rules(("domain", "gmail.com"), ("suffix", "edu")))
+    assert policy.allows("Someone@Gmail.com")
+    assert policy.allows("a@cs.stanford.edu")
+    assert not policy.allows("a@mail.gmail.com")
+    assert not policy.allows("a@edu")
+    assert not policy.allows("a@example.com")
+
+
+def test_default_patterns_match_institutions():
+    policy = DomainPolicy(emailpolicy.default_rule_documents())
+    assert policy.allows("student@iitb.ac.in")
+    assert policy.matching_rule("student@iitb.ac.in")["kind"] == "pattern"
+    assert not policy.allows("someone@example.com")
+
+
+def test_normalize_rule_cleans_domains():
+    assert normalize_rule("domain", " @Example.COM. ") == "example.com"
+    with pytest.raises(ValueError):
+        normalize_rule("domain", "not a domain")
+    with pytest.raises(ValueError):
+        normalize_rule("wildcard", "x")
+
+
+@pytest.mark.parametrize("pattern", ["", "[a-z", r"(\w+)@\1", r"(?P<x>a)(?P=x)", "(?i)@example\\."])
+def test_normalize_rule_rejects_patterns_that_break_the_policy(pattern):
+    with pytest.raises(ValueError):
+        normalize_rule("pattern", pattern)
+
+
+def test_policy_rejects_patterns_that_only_fail_together():
+    # Each compiles alone; joined into one alternation the group name repeats
+    with pytest.raises(ValueError):
+        DomainPolicy(_rules(("pattern", r"(?P<uni>iit)\w*\."), ("pattern", r"(?P<uni>nit)\w*\.")))
+
+
+def test_refresh_keeps_the_last_policy_that_compiled():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        store = PolicyStore(refresh_seconds=0)
+        await store.ensure_seeded(db)
+        await store.add_rule(db, "domain", "example.org")
+        assert store.policy.allows("a@example.org")
+
+        # A rule that bypassed validation, e.g. written to the collection by hand
+        await db[emailpolicy.RULES_COLLECTION].insert_one({"id": "bad", "kind": "pattern", "value": "[oops"})
+        await db[emailpolicy.VERSION_COLLECTION].update_one({"_id": emailpolicy.VERSION_ID}, {"$inc": {"version": 1}})
+        await store.refresh(db)
+        return store
+
+    store = asyncio.run(run())
+    assert store.policy.allows("a@example.org")
+    assert store.version == 3
+
+
+def test_add_rule_refuses_a_pattern_that_clashes_with_stored_ones():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        store = PolicyStore(refresh_seconds=0)
+        await store.ensure_seeded(db)
+        await store.add_rule(db, "pattern", r"(?P<uni>iit)\w*\.")
+        with pytest.raises(ValueError):
+            await store.add_rule(db, "pattern", r"(?P<uni>nit)\w*\.")
+        return await db[emailpolicy.RULES_COLLECTION].count_documents({"kind": "pattern", "value": {"$regex": "uni"}})
+
+    assert asyncio.run(run()) == 1
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+import hints
+
+TASK = {"id": "arr-001", "title": "Two Sum", "complexity": "O(n)", "hints": ["Use a dict.", "Store complements."]}
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("give me a hint", "hint"),
+    ("im stuck", "hint"),
+    ("show me the solution", "solution"),
+    ("what is the time complexity", "complexity"),
+    ("thanks a lot", "thanks"),
+])
+def test_common_messages_are_answered_locally(message, intent):
+    assert hints.intent_of(message)[0] == intent
+
+
+@pytest.mark.parametrize("message", [
+    "how do i start a career in ml",
+    "where do i begin learning dp",
+    "dont give me the solution, just explain recursion",
+    "thanks but why does my loop never end",
+    "def f(x):\n    return x",
+    "",
+])
+def test_everything_else_goes_to_the_llm(message):
+    assert hints.intent_of(message)[0] == hints.OPEN
+
+
+def _with_user(coro_factory):
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        await db.users.insert_one({"id": "u1", "name": "Asha", "progress": {}})
+        return await coro_factory(db)
+
+    return asyncio.run(run())
+
+
+def test_next_hint_walks_through_the_hints_once():
+    async def walk(db):
+        return [await hints.next_hint(db, "u1", TASK) for _ in range(3)]
+
+    assert _with_user(walk) == [(1, 2, "Use a dict."), (2, 2, "Store complements."), None]
+
+
+def test_next_hint_without_hints():
+    async def ask(db):
+        shown = await hints.next_hint(db, "u1", {**TASK, "hints": []})
+        user = await db.users.find_one({"id": "u1"})
+        return shown, user["progress"]
+
+    assert _with_user(ask) == (None, {})
+
+
+def test_answer_falls_back_to_the_llm_for_a_task_without_hints():
+    async def ask(db):
+        user = {"id": "u1", "name": "Asha"}
+        return await hints.answer(db, user, {**TASK, "hints": []}, "show me the solution")
+
+    assert _with_user(ask) == ("solution", None, None)
+
+
+def test_answer_formats_hints():
+    async def ask(db):
+        return await hints.answer(db, {"id": "u1", "name": "Asha"}, TASK, "give me a hint")
+
+    intent, reply, level = _with_user(ask)
+    assert (intent, level) == ("hint", 1)
+    assert reply == hints.format_hint(1, 2, "Use a dict.")
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from jobs import CronSchedule
+
+
+def at(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_fields_expand_lists_ranges_and_steps():
+    schedule = CronSchedule("*/15 9-17 1,15 * *")
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == set(range(9, 18))
+    assert schedule.days == {1, 15}
+
+
+def test_aliases():
+    assert CronSchedule("@daily").next_after(at(2026, 3, 4, 12, 30)) == at(2026, 3, 5, 0, 0)
+    # Weekday 1 is Monday
+    assert CronSchedule("@weekly").next_after(at(2026, 3, 4, 12, 30)) == at(2026, 3, 9, 0, 0)
+
+
+def test_next_after_is_strictly_after():
+    schedule = CronSchedule("30 2 * * *")
+    assert schedule.next_after(at(2026, 1, 1, 2, 30)) == at(2026, 1, 2, 2, 30)
+    assert schedule.next_after(at(2026, 1, 1, 2, 29, 59)) == at(2026, 1, 1, 2, 30)
+
+
+def test_next_after_rolls_over_months_and_years():
+    assert CronSchedule("0 0 1 * *").next_after(at(2026, 12, 15)) == at(2027, 1, 1)
+    assert CronSchedule("0 0 29 2 *").next_after(at(2026, 3, 1)) == at(2028, 2, 29)
+
+
+def test_day_and_weekday_match_either_when_both_are_restricted():
+    # The 13th, or any Friday
+    schedule = CronSchedule("0 0 13 * 5")
+    assert schedule.next_after(at(2026, 3, 1)) == at(2026, 3, 6)
+    assert schedule.next_after(at(2026, 3, 12)) == at(2026, 3, 13)
+
+
+@pytest.mark.parametrize("expression", ["* * * *", "60 * * * *", "* 24 * * *", "5-1 * * * *", "x * * * *"])
+def test_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_never_firing_schedule_raises():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(at(2026, 1, 1))
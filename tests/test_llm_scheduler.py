@@ -0,0 +1,71 @@
+import asyncio
+
+from llm import LLMGateway
+from llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler
+
+
+def test_budgets_are_split_across_workers():
+    scheduler = LLMScheduler(max_concurrency=32, tokens_per_minute=200000, workers=4)
+    assert scheduler.max_concurrency == 8
+    assert scheduler.tokens_per_minute == 50000
+
+
+def test_each_worker_keeps_at_least_one_slot():
+    scheduler = LLMScheduler(max_concurrency=2, tokens_per_minute=3, workers=8)
+    assert scheduler.max_concurrency == 1
+    assert scheduler.tokens_per_minute == 1
+
+
+def test_gateway_reads_worker_count_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_CONCURRENCY", "12")
+    monkeypatch.setenv("LLM_TOKENS_PER_MINUTE", "90000")
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    scheduler = LLMGateway.from_env().scheduler
+    assert scheduler.max_concurrency == 4
+    assert scheduler.tokens_per_minute == 30000
+
+
+def test_worker_never_runs_more_than_its_share():
+    async def run():
+        scheduler = LLMScheduler(max_concurrency=8, tokens_per_minute=10 ** 6, workers=4)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(scheduler.submit(INTERACTIVE, f"u{i}", 10, call) for i in range(10)))
+        return peak
+
+    assert asyncio.run(run()) == 2
+
+
+def test_interactive_goes_before_background():
+    async def run():
+        scheduler = LLMScheduler(max_concurrency=1, tokens_per_minute=10 ** 6)
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def record(name):
+            async def call():
+                order.append(name)
+            return call
+
+        first = asyncio.ensure_future(scheduler.submit(BACKGROUND, "a", 10, blocker))
+        await asyncio.sleep(0)
+        queued = [
+            asyncio.ensure_future(scheduler.submit(BACKGROUND, "b", 10, record("background"))),
+            asyncio.ensure_future(scheduler.submit(INTERACTIVE, "c", 10, record("interactive"))),
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, *queued)
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "background"]
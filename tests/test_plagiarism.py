@@ -0,0 +1,93 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import plagiarism
+
+TASK = {"id": "arr-001", "starter_code": "def solve(nums):\n    pass\n", "solution_explanation": ""}
+
+ORIGINAL = """
+def two_sum(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+    return []
+"""
+
+RENAMED = """
+def find_pair(values, goal):
+    # look for the complement
+    lookup = {}
+    for idx, value in enumerate(values):
+        if goal - value in lookup:
+            return [lookup[goal - value], idx]
+        lookup[value] = idx
+    return []
+"""
+
+DIFFERENT = """
+def two_sum(nums, target):
+    nums = sorted(enumerate(nums), key=lambda p: p[1])
+    lo, hi = 0, len(nums) - 1
+    while lo < hi:
+        total = nums[lo][1] + nums[hi][1]
+        if total == target:
+            return sorted([nums[lo][0], nums[hi][0]])
+        if total < target:
+            lo += 1
+        else:
+            hi -= 1
+    return []
+"""
+
+
+def test_renaming_and_comments_do_not_hide_a_copy():
+    assert plagiarism.similarity(plagiarism.signature(ORIGINAL), plagiarism.signature(RENAMED)) == 1.0
+
+
+def test_different_solutions_stay_below_threshold():
+    score = plagiarism.similarity(plagiarism.signature(ORIGINAL), plagiarism.signature(DIFFERENT))
+    assert score < plagiarism.MATCH_THRESHOLD
+
+
+def test_short_code_has_no_signature():
+    assert plagiarism.signature("x = 1") is None
+
+
+def test_starter_code_is_kept_out_of_buckets():
+    sig, bands = plagiarism.prepare({**TASK, "starter_code": ORIGINAL}, RENAMED)
+    assert sig is not None and bands == []
+
+
+def _index_all(submissions):
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        found = []
+        for user_id, code in submissions:
+            found += await plagiarism.index(db, TASK["id"], user_id, f"h-{user_id}", plagiarism.prepare(TASK, code))
+        return found
+
+    return asyncio.run(run())
+
+
+def _batch(submissions):
+    entries = [(user_id, f"h-{user_id}", *plagiarism.prepare(TASK, code)) for user_id, code in submissions]
+    return plagiarism.find_matches(TASK["id"], entries)[0]
+
+
+def test_incremental_and_batch_find_the_same_pairs():
+    submissions = [("a", ORIGINAL), ("b", DIFFERENT), ("c", RENAMED)]
+    incremental = sorted(m["_id"] for m in _index_all(submissions))
+    batch = sorted(m["_id"] for m in _batch(submissions))
+    assert incremental == batch == ["arr-001:a:c"]
+
+
+def test_oversized_buckets_are_skipped_in_both_paths(monkeypatch):
+    monkeypatch.setattr(plagiarism, "MAX_BUCKET_SIZE", 2)
+    submissions = [("a", ORIGINAL), ("b", RENAMED), ("c", ORIGINAL)]
+    batch = _batch(submissions)
+    # a and b matched while their buckets still held two; c's arrival makes them oversized
+    incremental = [m for m in _index_all(submissions) if m["users"] != ["a", "b"]]
+    assert batch == incremental == []
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from mongomock_motor import AsyncMongoMockClient
+
+import ratelimit
+from ratelimit import RateLimit, RateLimiter
+
+
+def _limiter(per_minute: int, burst: int) -> RateLimiter:
+    return RateLimiter(AsyncMongoMockClient()["test"], {"llm_chat": RateLimit(per_minute=per_minute, burst=burst)})
+
+
+def test_burst_is_enforced_locally():
+    async def run():
+        limiter = _limiter(per_minute=60, burst=2)
+        await limiter.check("u1", "llm_chat")
+        await limiter.check("u1", "llm_chat")
+        with pytest.raises(HTTPException) as rejected:
+            await limiter.check("u1", "llm_chat")
+        return rejected.value
+
+    error = asyncio.run(run())
+    assert error.status_code == 429
+    assert int(error.headers["Retry-After"]) >= 1
+
+
+def test_shared_rejection_refunds_the_local_token():
+    async def run():
+        limiter = _limiter(per_minute=2, burst=5)
+        await limiter.check("u1", "llm_chat")
+        await limiter.check("u1", "llm_chat")
+        for _ in range(3):
+            with pytest.raises(HTTPException):
+                await limiter.check("u1", "llm_chat")
+        return limiter._buckets[("u1", "llm_chat")][0]
+
+    # Only the two admitted requests spent local tokens
+    assert asyncio.run(run()) == pytest.approx(3, abs=0.1)
+
+
+def test_local_entries_evict_least_recently_used(monkeypatch):
+    monkeypatch.setattr(ratelimit, "MAX_LOCAL_ENTRIES", 10)
+    limiter = _limiter(per_minute=60, burst=5)
+    limit = limiter.limits["llm_chat"]
+    for i in range(10):
+        limiter._take_local((f"u{i}", "llm_chat"), limit, 0.0)
+    limiter._take_local(("u0", "llm_chat"), limit, 1.0)
+    limiter._take_local(("u10", "llm_chat"), limit, 2.0)
+
+    users = {user for user, _ in limiter._buckets}
+    assert "u0" in users and "u10" in users
+    assert "u1" not in users
+    assert len(users) == 10
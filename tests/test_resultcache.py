@@ -0,0 +1,27 @@
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+import resultcache
+
+
+def test_key_ignores_trailing_whitespace_but_not_task_or_suite():
+    base = resultcache.key("print(1)\n", "t1", "s1", "py3")
+    assert resultcache.key("print(1)   \r\n\n", "t1", "s1", "py3") == base
+    assert resultcache.key("print(1)", "t2", "s1", "py3") != base
+    assert resultcache.key("print(1)", "t1", "s2", "py3") != base
+
+
+def test_purge_stale_keeps_current_and_task_less_entries():
+    async def run():
+        db = AsyncMongoMockClient()["test"]
+        cache = resultcache.ResultCache(ttl=600, memory_ttl=0)
+        await cache.put(db, "current", "t1", "v2", {"success": True}, 0.1)
+        await cache.put(db, "old-suite", "t1", "v1", {"success": True}, 0.1)
+        await cache.put(db, "task-gone", "t9", "v1", {"success": True}, 0.1)
+        await cache.put(db, "playground", "", resultcache.suite_version(None), {"success": True}, 0.1)
+        deleted = await cache.purge_stale(db, {"t1": "v2"})
+        left = sorted([d["_id"] async for d in db[resultcache.RESULTS_COLLECTION].find({}, {"_id": 1})])
+        return deleted, left
+
+    assert asyncio.run(run()) == (2, ["current", "playground"])
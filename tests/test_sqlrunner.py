@@ -0,0 +1,64 @@
+import sqlrunner
+
+TABLES = {"employees", "departments"}
+
+
+def test_table_aliases_with_and_without_as():
+    query = "SELECT * FROM employees e JOIN departments AS d ON e.dept_id = d.id"
+    assert sqlrunner.table_aliases(query, TABLES) == {"e": "employees", "d": "departments"}
+
+
+def test_table_aliases_ignore_keywords_and_quotes():
+    assert sqlrunner.table_aliases("SELECT name FROM employees WHERE salary > 1", TABLES) == {}
+    query = 'SELECT * FROM "employees" "emp", departments dep'
+    assert sqlrunner.table_aliases(query, TABLES) == {"emp": "employees", "dep": "departments"}
+
+
+def test_compare_accepts_any_order_when_unordered():
+    result = sqlrunner.compare(["a"], [(1,), (2,)], False, ["a"], [(2,), (1,)], ordered=False)
+    assert result == {"correct": True, "reason": None}
+
+
+def test_compare_reports_wrong_order():
+    result = sqlrunner.compare(["a"], [(1,), (2,)], False, ["a"], [(2,), (1,)], ordered=True)
+    assert result["correct"] is False
+    assert result["reason"] == "Right rows, wrong order"
+
+
+def test_compare_rounds_floats():
+    assert sqlrunner.compare(["x"], [(0.1 + 0.2,)], False, ["x"], [(0.3,)], ordered=True)["correct"]
+
+
+def test_compare_counts_missing_and_unexpected_rows():
+    result = sqlrunner.compare(["a"], [(1,), (1,), (3,)], False, ["a"], [(1,), (2,)], ordered=False)
+    assert (result["missing_rows"], result["unexpected_rows"]) == (1, 2)
+
+
+def test_compare_checks_shape_and_truncation():
+    assert "columns" in sqlrunner.compare(["a", "b"], [], False, ["a"], [], ordered=False)["reason"]
+    assert not sqlrunner.compare(["a"], [(1,)], True, ["a"], [(1,)], ordered=False)["correct"]
+
+
+def test_summarize_plan_resolves_aliases():
+    plan = [
+        (2, 0, 0, "SCAN e"),
+        (5, 0, 0, "SEARCH d USING INTEGER PRIMARY KEY (rowid=?)"),
+        (7, 0, 0, "SCAN recent"),
+        (9, 0, 0, "USE TEMP B-TREE FOR ORDER BY"),
+    ]
+    summary = sqlrunner.summarize_plan(plan, TABLES, {"e": "employees", "d": "departments"})
+    assert summary["full_scans"] == ["employees"]
+    assert summary["index_lookups"] == ["departments"]
+    assert summary["temp_btrees"] == 1
+    assert len(summary["steps"]) == 4
+
+
+def test_scan_using_an_index_is_not_a_full_scan():
+    summary = sqlrunner.summarize_plan([(3, 0, 0, "SCAN employees USING INDEX idx_dept")], TABLES)
+    assert summary["full_scans"] == []
+    assert summary["index_lookups"] == ["employees"]
+
+
+def test_statement_body_strips_leading_comments():
+    assert sqlrunner.statement_body("  -- note\n/* block */ SELECT 1;  ") == "SELECT 1"
+    assert sqlrunner.statement_body("-- only a comment") == ""